@@ -14,7 +14,7 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.config import settings
 from app.core.database import Base
-from app.models import user, notification  # 导入所有模型
+from app.models import user, notification, token  # 导入所有模型
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,58 @@
+"""主键改用时间有序的 UUIDv7
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 10:00:00.000000
+
+新行的主键默认值由 gen_random_uuid()（v4，完全随机）改为 uuid_generate_v7()。
+已有 ID 仍是合法的 UUID，无需改写；只有新插入的行按时间顺序追加到索引右侧。
+
+同时删除与主键索引完全重复的 ix_*_id 索引，减少每次插入需要维护的 B-tree。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('users', 'notifications', 'notification_records')
+
+
+def upgrade() -> None:
+    # 基于 gen_random_uuid()：前 48 位替换为毫秒时间戳，版本号从 4 改为 7（置位 bit 52、53）
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$ LANGUAGE sql VOLATILE
+        """
+    )
+
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=sa.text('uuid_generate_v7()'))
+        op.drop_index(f'ix_{table}_id', table_name=table)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.create_index(f'ix_{table}_id', table, ['id'])
+        op.alter_column(table, 'id', server_default=sa.text('gen_random_uuid()'))
+
+    op.execute("DROP FUNCTION IF EXISTS uuid_generate_v7()")
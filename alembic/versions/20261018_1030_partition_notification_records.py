@@ -0,0 +1,122 @@
+"""notification_records 按 created_at 月份分区
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 10:30:00.000000
+
+把 notification_records 改为按 created_at 的 RANGE 分区表（每月一个分区，
+命名 notification_records_YYYYMM），并迁移已有数据。
+
+注意：
+- 分区表的主键/唯一约束必须包含分区键，因此主键改为 (id, created_at)，
+  原唯一约束 unique_notification_user 改为普通索引 (notification_id, user_id)，
+  重复发送改由发送逻辑在写入前去重
+- 不创建 DEFAULT 分区：未来分区由后台任务提前创建（见 app/core/partitions.py）
+- 迁移期间会锁表并复制全部数据，应在维护窗口执行
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移时额外创建的未来分区月数
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS notification_records_{month:%Y%m} "
+        f"PARTITION OF notification_records "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    op.rename_table('notification_records', 'notification_records_legacy')
+    op.execute('ALTER TABLE notification_records_legacy RENAME CONSTRAINT notification_records_pkey TO notification_records_legacy_pkey')
+
+    op.execute(
+        """
+        CREATE TABLE notification_records (
+            id uuid NOT NULL DEFAULT uuid_generate_v7(),
+            notification_id uuid NOT NULL REFERENCES notifications (id) ON DELETE CASCADE,
+            user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            is_read boolean NOT NULL DEFAULT false,
+            read_at timestamptz,
+            is_deleted boolean NOT NULL DEFAULT false,
+            deleted_at timestamptz,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+
+    # 覆盖已有数据的最早月份到未来 MONTHS_AHEAD 个月
+    now = datetime.now(timezone.utc)
+    current_month = date(now.year, now.month, 1)
+    oldest = op.get_bind().execute(sa.text('SELECT min(created_at) FROM notification_records_legacy')).scalar()
+    month = date(oldest.year, oldest.month, 1) if oldest else current_month
+    while month <= _add_months(current_month, MONTHS_AHEAD):
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    op.execute(
+        """
+        INSERT INTO notification_records
+            (id, notification_id, user_id, is_read, read_at, is_deleted, deleted_at, created_at)
+        SELECT id, notification_id, user_id, is_read, read_at, is_deleted, deleted_at, created_at
+        FROM notification_records_legacy
+        """
+    )
+    op.drop_table('notification_records_legacy')
+
+    # 在父表上创建索引，会自动创建到每个分区
+    op.create_index('ix_notification_records_notification_user', 'notification_records', ['notification_id', 'user_id'])
+    op.create_index('ix_notification_records_user_created', 'notification_records', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.rename_table('notification_records', 'notification_records_partitioned')
+
+    op.create_table(
+        'notification_records',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name='notification_records_pkey_new'),
+    )
+    # 分区后可能写入了重复记录，恢复唯一约束前只保留最早的一条
+    op.execute(
+        """
+        INSERT INTO notification_records
+        SELECT DISTINCT ON (notification_id, user_id)
+            id, notification_id, user_id, is_read, read_at, is_deleted, deleted_at, created_at
+        FROM notification_records_partitioned
+        ORDER BY notification_id, user_id, created_at
+        """
+    )
+    op.drop_table('notification_records_partitioned')
+    op.execute('ALTER TABLE notification_records RENAME CONSTRAINT notification_records_pkey_new TO notification_records_pkey')
+
+    op.create_unique_constraint('unique_notification_user', 'notification_records', ['notification_id', 'user_id'])
+    op.create_index(op.f('ix_notification_records_notification_id'), 'notification_records', ['notification_id'])
+    op.create_index(op.f('ix_notification_records_user_id'), 'notification_records', ['user_id'])
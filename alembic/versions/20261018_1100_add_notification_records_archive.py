@@ -0,0 +1,57 @@
+"""新增站内信记录归档表 notification_records_archive
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 11:00:00.000000
+
+超过 NOTIFICATION_ARCHIVE_AFTER_DAYS 的已读记录由后台任务从 notification_records
+移到该表（见 app/services/archive_service.py），热表只保留近期数据。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_records_archive',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_notification_records_archive_notification_id'),
+        'notification_records_archive',
+        ['notification_id'],
+    )
+    op.create_index(
+        'ix_notification_records_archive_user_created',
+        'notification_records_archive',
+        ['user_id', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    # 归档数据移回热表后再删除归档表
+    op.execute(
+        """
+        INSERT INTO notification_records (id, notification_id, user_id, is_read, read_at, created_at)
+        SELECT id, notification_id, user_id, true, read_at, created_at
+        FROM notification_records_archive
+        """
+    )
+    op.drop_index('ix_notification_records_archive_user_created', table_name='notification_records_archive')
+    op.drop_index(op.f('ix_notification_records_archive_notification_id'), table_name='notification_records_archive')
+    op.drop_table('notification_records_archive')
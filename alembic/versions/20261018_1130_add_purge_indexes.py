@@ -0,0 +1,38 @@
+"""新增数据清理任务使用的部分索引
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 11:30:00.000000
+
+- notification_records (created_at, id) WHERE is_deleted：按键集遍历软删除的记录
+- notifications (expires_at) WHERE expires_at IS NOT NULL：查找已过期的站内信
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_notification_records_deleted',
+        'notification_records',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('is_deleted'),
+    )
+    op.create_index(
+        'ix_notifications_expires_at',
+        'notifications',
+        ['expires_at'],
+        postgresql_where=sa.text('expires_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_expires_at', table_name='notifications')
+    op.drop_index('ix_notification_records_deleted', table_name='notification_records')
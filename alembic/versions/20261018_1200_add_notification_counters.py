@@ -0,0 +1,53 @@
+"""新增用户未读计数表，站内信增加过期处理时间
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 12:00:00.000000
+
+- notification_counters：按 (user_id, type) 保存未过期、未删除的未读记录数，并从现有记录回填
+- notifications.expiry_processed_at：过期处理器扣除未读计数后写入，已过期的站内信直接标记为已处理
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'notifications',
+        sa.Column('expiry_processed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute('UPDATE notifications SET expiry_processed_at = now() WHERE expires_at <= now()')
+
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('unread_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'type'),
+    )
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, type, unread_count)
+        SELECT r.user_id, n.type, count(*)
+        FROM notification_records r
+        JOIN notifications n ON n.id = r.notification_id
+        WHERE NOT r.is_read
+          AND NOT r.is_deleted
+          AND n.expiry_processed_at IS NULL
+        GROUP BY r.user_id, n.type
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_counters')
+    op.drop_column('notifications', 'expiry_processed_at')
@@ -0,0 +1,27 @@
+"""站内信增加逻辑删除时间 deleted_at
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 12:30:00.000000
+
+删除站内信时先写入 deleted_at 使其不可见，记录由后台作业分批物理删除。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    # 尚未物理删除完的站内信在降级后会重新可见，先直接删除（由外键级联删除剩余记录）
+    op.execute('DELETE FROM notifications WHERE deleted_at IS NOT NULL')
+    op.drop_column('notifications', 'deleted_at')
@@ -0,0 +1,25 @@
+"""站内信增加撤回时间 recalled_at
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 13:00:00.000000
+
+撤回时只写入 recalled_at，用户记录由后台作业分批删除。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('recalled_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'recalled_at')
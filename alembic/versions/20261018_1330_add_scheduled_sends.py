@@ -0,0 +1,51 @@
+"""新增定时发送队列表 scheduled_sends
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 13:30:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scheduled_sends',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('send_to_all', sa.Boolean(), server_default='false', nullable=False),
+        sa.Column('user_ids', postgresql.ARRAY(postgresql.UUID(as_uuid=True)), nullable=True),
+        sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sent_count', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_scheduled_sends_notification_id'), 'scheduled_sends', ['notification_id'])
+    op.create_index(
+        'ix_scheduled_sends_due',
+        'scheduled_sends',
+        ['scheduled_at'],
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_sends_due', table_name='scheduled_sends')
+    op.drop_index(op.f('ix_scheduled_sends_notification_id'), table_name='scheduled_sends')
+    op.drop_table('scheduled_sends')
@@ -0,0 +1,53 @@
+"""新增全员发送表 fanouts 及分区断点表 fanout_partitions
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'fanouts',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('priority', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='running', nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_fanouts_notification_id'), 'fanouts', ['notification_id'])
+
+    op.create_table(
+        'fanout_partitions',
+        sa.Column('fanout_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('partition', sa.Integer(), nullable=False),
+        sa.Column('cursor', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('upper_user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('sent_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('1'), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['fanout_id'], ['fanouts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('fanout_id', 'partition'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('fanout_partitions')
+    op.drop_index(op.f('ix_fanouts_notification_id'), table_name='fanouts')
+    op.drop_table('fanouts')
@@ -0,0 +1,26 @@
+"""定时发送与全员发送新增受众规则列 audience
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 14:30:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scheduled_sends', sa.Column('audience', postgresql.JSONB(), nullable=True))
+    op.add_column('fanouts', sa.Column('audience', postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('fanouts', 'audience')
+    op.drop_column('scheduled_sends', 'audience')
@@ -0,0 +1,57 @@
+"""新增受众分群表 segments / segment_members，定时发送与全员发送新增 segment_id
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 15:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'segments',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('audience', postgresql.JSONB(), nullable=False),
+        sa.Column('refresh_interval_seconds', sa.Integer(), server_default=sa.text('3600'), nullable=False),
+        sa.Column('member_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'segment_members',
+        sa.Column('segment_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['segment_id'], ['segments.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('segment_id', 'user_id'),
+    )
+    op.create_index(op.f('ix_segment_members_user_id'), 'segment_members', ['user_id'])
+
+    for table in ('scheduled_sends', 'fanouts'):
+        op.add_column(table, sa.Column('segment_id', postgresql.UUID(as_uuid=True), nullable=True))
+        op.create_foreign_key(
+            f'{table}_segment_id_fkey', table, 'segments', ['segment_id'], ['id'], ondelete='CASCADE'
+        )
+
+
+def downgrade() -> None:
+    for table in ('fanouts', 'scheduled_sends'):
+        op.drop_constraint(f'{table}_segment_id_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'segment_id')
+    op.drop_index(op.f('ix_segment_members_user_id'), table_name='segment_members')
+    op.drop_table('segment_members')
+    op.drop_table('segments')
@@ -0,0 +1,31 @@
+"""站内信新增 content_hash，按内容去重
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-18 16:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '016'
+down_revision: Union[str, None] = '015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ix_notifications_content_hash',
+        'notifications',
+        ['content_hash'],
+        unique=True,
+        postgresql_where=sa.text('content_hash IS NOT NULL AND deleted_at IS NULL AND recalled_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_content_hash', table_name='notifications')
+    op.drop_column('notifications', 'content_hash')
@@ -0,0 +1,41 @@
+"""站内信新增 collapse_key，用户记录新增 collapse_count
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-18 16:30:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '017'
+down_revision: Union[str, None] = '016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('collapse_key', sa.String(length=100), nullable=True))
+    op.create_index(
+        'ix_notifications_collapse_key',
+        'notifications',
+        ['collapse_key'],
+        postgresql_where=sa.text('collapse_key IS NOT NULL'),
+    )
+    # 带常量默认值的新增列只修改元数据，不重写已有分区
+    op.add_column(
+        'notification_records',
+        sa.Column('collapse_count', sa.Integer(), server_default=sa.text('1'), nullable=False),
+    )
+    op.add_column(
+        'notification_records_archive',
+        sa.Column('collapse_count', sa.Integer(), server_default=sa.text('1'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('notification_records_archive', 'collapse_count')
+    op.drop_column('notification_records', 'collapse_count')
+    op.drop_index('ix_notifications_collapse_key', table_name='notifications')
+    op.drop_column('notifications', 'collapse_key')
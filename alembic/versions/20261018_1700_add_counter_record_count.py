@@ -0,0 +1,38 @@
+"""用户站内信计数新增 record_count（收件箱记录数）
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-18 17:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '018'
+down_revision: Union[str, None] = '017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'notification_counters',
+        sa.Column('record_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+    # 按现有记录初始化；此后由发送累加、收件箱容量控制重算
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, type, unread_count, record_count)
+        SELECT r.user_id, n.type, 0, count(*)
+        FROM notification_records r
+        JOIN notifications n ON n.id = r.notification_id
+        WHERE r.is_deleted = false
+        GROUP BY r.user_id, n.type
+        ON CONFLICT (user_id, type) DO UPDATE SET record_count = EXCLUDED.record_count
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('notification_counters', 'record_count')
@@ -0,0 +1,66 @@
+"""新增站内信模板表 notification_templates / notification_template_versions，站内信新增模板引用
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-18 17:30:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '019'
+down_revision: Union[str, None] = '018'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_templates',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_notification_templates_name',
+        'notification_templates',
+        ['name'],
+        unique=True,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_table(
+        'notification_template_versions',
+        sa.Column('template_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('action_url', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['template_id'], ['notification_templates.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('template_id', 'version'),
+    )
+
+    op.add_column('notifications', sa.Column('template_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('notifications', sa.Column('template_version', sa.Integer(), nullable=True))
+    op.add_column('notifications', sa.Column('variables', postgresql.JSONB(), nullable=True))
+    op.create_foreign_key(
+        'notifications_template_id_fkey', 'notifications', 'notification_templates', ['template_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('notifications_template_id_fkey', 'notifications', type_='foreignkey')
+    op.drop_column('notifications', 'variables')
+    op.drop_column('notifications', 'template_version')
+    op.drop_column('notifications', 'template_id')
+    op.drop_table('notification_template_versions')
+    op.drop_index('ix_notification_templates_name', table_name='notification_templates')
+    op.drop_table('notification_templates')
@@ -0,0 +1,27 @@
+"""站内信记录、归档记录和定时发送新增按用户的模板变量 variables
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-18 18:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '020'
+down_revision: Union[str, None] = '019'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 可空、无默认值的新增列只修改元数据，不重写已有分区
+    for table in ('notification_records', 'notification_records_archive', 'scheduled_sends'):
+        op.add_column(table, sa.Column('variables', postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ('scheduled_sends', 'notification_records_archive', 'notification_records'):
+        op.drop_column(table, 'variables')
@@ -0,0 +1,35 @@
+"""新增用户通知偏好表 notification_preferences
+
+Revision ID: 021
+Revises: 020
+Create Date: 2026-10-18 18:30:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '021'
+down_revision: Union[str, None] = '020'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_preferences',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('muted_types', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('min_priority', sa.SmallInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('quiet_start', sa.SmallInteger(), nullable=True),
+        sa.Column('quiet_end', sa.SmallInteger(), nullable=True),
+        sa.Column('utc_offset_minutes', sa.SmallInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_preferences')
@@ -0,0 +1,63 @@
+"""notification_records 恢复 (站内信, 用户) 的唯一性
+
+Revision ID: 022
+Revises: 021
+Create Date: 2026-10-19 09:00:00.000000
+
+分区表的唯一索引必须包含分区键 created_at，原来的 (notification_id, user_id) 只能是普通索引，
+并发或重试的发送会写入重复记录。
+
+- notifications 新增 sent_at（首次发送时间），之后写入的记录都以它作为 created_at，
+  同一站内信的记录 created_at 相同，(notification_id, user_id, created_at) 唯一索引即保证每个用户只有一条记录
+- 已发送过的站内信以最早一条记录的时间回填 sent_at；已有记录不改写 created_at（改写分区键会在分区间搬移数据）
+- 创建唯一索引前删除完全相同 (notification_id, user_id, created_at) 的重复记录，只保留 ID 最小的一条
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '022'
+down_revision: Union[str, None] = '021'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        """
+        UPDATE notifications n
+        SET sent_at = r.first_created_at
+        FROM (
+            SELECT notification_id, min(created_at) AS first_created_at
+            FROM notification_records
+            GROUP BY notification_id
+        ) r
+        WHERE r.notification_id = n.id
+        """
+    )
+
+    op.execute(
+        """
+        DELETE FROM notification_records r
+        USING notification_records d
+        WHERE r.notification_id = d.notification_id
+          AND r.user_id = d.user_id
+          AND r.created_at = d.created_at
+          AND r.id > d.id
+        """
+    )
+    op.drop_index('ix_notification_records_notification_user', table_name='notification_records')
+    op.create_index(
+        'ix_notification_records_notification_user',
+        'notification_records',
+        ['notification_id', 'user_id', 'created_at'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_records_notification_user', table_name='notification_records')
+    op.create_index('ix_notification_records_notification_user', 'notification_records', ['notification_id', 'user_id'])
+    op.drop_column('notifications', 'sent_at')
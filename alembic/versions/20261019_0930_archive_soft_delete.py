@@ -0,0 +1,26 @@
+"""归档记录软删除
+
+Revision ID: 023
+Revises: 022
+Create Date: 2026-10-19 09:30:00.000000
+
+notification_records_archive 新增 deleted_at。用户删除归档记录时只写入删除时间，
+不再物理删除，重复发送同一站内信时仍能识别该用户已收到过。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '023'
+down_revision: Union[str, None] = '022'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_records_archive', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notification_records_archive', 'deleted_at')
@@ -0,0 +1,27 @@
+"""定时发送心跳
+
+Revision ID: 024
+Revises: 023
+Create Date: 2026-10-19 10:00:00.000000
+
+scheduled_sends 新增 heartbeat_at。执行中的定时发送定期续约心跳，
+调度器只重新领取心跳超时的发送，不再按领取时间重新领取仍在执行的长时间发送。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '024'
+down_revision: Union[str, None] = '023'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scheduled_sends', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE scheduled_sends SET heartbeat_at = claimed_at WHERE claimed_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('scheduled_sends', 'heartbeat_at')
@@ -0,0 +1,26 @@
+"""幂等键占用期限
+
+Revision ID: 025
+Revises: 024
+Create Date: 2026-10-19 11:00:00.000000
+
+idempotency_keys 新增 locked_until。处理中的幂等键只占用到该时间，
+执行请求的进程中途退出时，同键重试在占用期限过后可以接管，不再一直返回 409 直到幂等键过期。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '025'
+down_revision: Union[str, None] = '024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'locked_until')
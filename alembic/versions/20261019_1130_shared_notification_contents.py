@@ -0,0 +1,74 @@
+"""站内信共享正文表 notification_contents
+
+Revision ID: 026
+Revises: 025
+Create Date: 2026-10-19 11:30:00.000000
+
+按内容去重不再复用整条站内信（复用时重复的事件会按 (站内信, 用户) 去重而不再送达），
+改为只共享正文：每次创建都是新的站内信，notifications.content 为空，content_hash 引用共享正文。
+已有的去重站内信按正文重新计算摘要并迁入共享正文表。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '026'
+down_revision: Union[str, None] = '025'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_contents',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash'),
+    )
+    op.drop_index('ix_notifications_content_hash', table_name='notifications')
+    op.alter_column('notifications', 'content', existing_type=sa.Text(), nullable=True)
+
+    op.execute(
+        "UPDATE notifications SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex') "
+        "WHERE content_hash IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO notification_contents (content_hash, content) "
+        "SELECT DISTINCT ON (content_hash) content_hash, content FROM notifications "
+        "WHERE content_hash IS NOT NULL ORDER BY content_hash"
+    )
+    op.execute("UPDATE notifications SET content = NULL WHERE content_hash IS NOT NULL")
+
+    op.create_foreign_key(
+        'fk_notifications_content_hash',
+        'notifications',
+        'notification_contents',
+        ['content_hash'],
+        ['content_hash'],
+    )
+    op.create_index(
+        'ix_notifications_content_hash',
+        'notifications',
+        ['content_hash'],
+        postgresql_where=sa.text('content_hash IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_content_hash', table_name='notifications')
+    op.drop_constraint('fk_notifications_content_hash', 'notifications', type_='foreignkey')
+    op.execute(
+        "UPDATE notifications n SET content = c.content, content_hash = NULL "
+        "FROM notification_contents c WHERE n.content_hash = c.content_hash"
+    )
+    op.alter_column('notifications', 'content', existing_type=sa.Text(), nullable=False)
+    op.drop_table('notification_contents')
+    op.create_index(
+        'ix_notifications_content_hash',
+        'notifications',
+        ['content_hash'],
+        unique=True,
+        postgresql_where=sa.text('content_hash IS NOT NULL AND deleted_at IS NULL AND recalled_at IS NULL'),
+    )
@@ -0,0 +1,58 @@
+"""折叠合并过的记录改用站内信的首次发送时间
+
+Revision ID: 027
+Revises: 026
+Create Date: 2026-10-19 12:00:00.000000
+
+此前折叠合并只把记录改指向新站内信，created_at 仍是旧站内信的发送时间，按 created_at 查找该站内信记录的条件
+（发送去重、未读计数、清理）会漏掉它：再次发送时重复插入，未读数被重复计入。
+重复的记录删除并扣除其未读数，其余记录的 created_at 改为所属站内信的 sent_at（跨分区移动）。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '027'
+down_revision: Union[str, None] = '026'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        WITH duplicated AS (
+            DELETE FROM notification_records r
+            USING notifications n
+            WHERE r.notification_id = n.id
+              AND r.created_at <> n.sent_at
+              AND EXISTS (
+                  SELECT 1 FROM notification_records f
+                  WHERE f.notification_id = r.notification_id
+                    AND f.user_id = r.user_id
+                    AND f.created_at = n.sent_at
+              )
+            RETURNING r.user_id, n.type, r.is_read, r.is_deleted, n.expiry_processed_at, n.recalled_at
+        )
+        UPDATE notification_counters c
+        SET unread_count = greatest(c.unread_count - d.amount, 0)
+        FROM (
+            SELECT user_id, type, count(*) AS amount
+            FROM duplicated
+            WHERE NOT is_read AND NOT is_deleted AND expiry_processed_at IS NULL AND recalled_at IS NULL
+            GROUP BY user_id, type
+        ) d
+        WHERE c.user_id = d.user_id AND c.type = d.type
+        """
+    )
+    op.execute(
+        "UPDATE notification_records r SET created_at = n.sent_at "
+        "FROM notifications n "
+        "WHERE r.notification_id = n.id AND r.created_at <> n.sent_at"
+    )
+
+
+def downgrade() -> None:
+    # 数据修正，无需回滚
+    pass
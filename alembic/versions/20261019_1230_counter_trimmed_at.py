@@ -0,0 +1,26 @@
+"""收件箱容量检查时间
+
+Revision ID: 028
+Revises: 027
+Create Date: 2026-10-19 12:30:00.000000
+
+notification_counters 新增 trimmed_at。超限用户按最近一次检查时间从早到晚轮流处理，
+记录全部未读、无法清理的用户不会在每次检查中都占满名额，使其他超限用户一直得不到处理。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '028'
+down_revision: Union[str, None] = '027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_counters', sa.Column('trimmed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notification_counters', 'trimmed_at')
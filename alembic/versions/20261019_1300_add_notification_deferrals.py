@@ -0,0 +1,40 @@
+"""新增免打扰推迟送达表 notification_deferrals
+
+Revision ID: 029
+Revises: 028
+Create Date: 2026-10-19 13:00:00.000000
+
+发送时处于免打扰时段的用户此前直接跳过，之后不会再收到该站内信。改为登记到本表，
+免打扰结束后由后台任务写入收件箱。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '029'
+down_revision: Union[str, None] = '028'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_deferrals',
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deliver_after', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('variables', postgresql.JSONB(), nullable=True),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('notification_id', 'user_id'),
+    )
+    op.create_index(
+        op.f('ix_notification_deferrals_deliver_after'), 'notification_deferrals', ['deliver_after']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_notification_deferrals_deliver_after'), table_name='notification_deferrals')
+    op.drop_table('notification_deferrals')
@@ -0,0 +1,62 @@
+"""新增送达表 notification_deliveries，记录恢复以送达时间为 created_at
+
+Revision ID: 030
+Revises: 029
+Create Date: 2026-10-19 13:30:00.000000
+
+迁移 022 让记录统一以站内信的首次发送时间为 created_at，以便 (notification_id, user_id, created_at) 唯一索引
+保证每个用户只有一条记录。但重复发送旧站内信、免打扰结束后的送达会写入早已过去的月分区，分区卸载后直接失败，
+且这些记录在收件箱和游标分页中排在很靠后的位置。
+
+- 新增不分区的 notification_deliveries，主键 (notification_id, user_id) 保证每个用户只收到一次；
+  以现有记录和归档记录回填
+- 之后写入的记录以送达时间为 created_at；已有记录不改写（改写分区键会在分区间搬移数据）
+- 记录表的唯一索引改回普通索引 (notification_id, user_id)
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '030'
+down_revision: Union[str, None] = '029'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_deliveries',
+        sa.Column('notification_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('notification_id', 'user_id'),
+    )
+    op.execute(
+        """
+        INSERT INTO notification_deliveries (notification_id, user_id)
+        SELECT notification_id, user_id FROM notification_records
+        UNION
+        SELECT notification_id, user_id FROM notification_records_archive
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+    op.drop_index('ix_notification_records_notification_user', table_name='notification_records')
+    op.create_index(
+        'ix_notification_records_notification_user', 'notification_records', ['notification_id', 'user_id']
+    )
+
+
+def downgrade() -> None:
+    # 送达表保证了每个 (站内信, 用户) 只有一条记录，恢复的唯一索引不会冲突
+    op.drop_index('ix_notification_records_notification_user', table_name='notification_records')
+    op.create_index(
+        'ix_notification_records_notification_user',
+        'notification_records',
+        ['notification_id', 'user_id', 'created_at'],
+        unique=True,
+    )
+    op.drop_table('notification_deliveries')
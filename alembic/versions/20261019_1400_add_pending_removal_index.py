@@ -0,0 +1,33 @@
+"""站内信新增部分索引 ix_notifications_pending_removal，删除后由后台作业逐批扣减未读计数
+
+Revision ID: 031
+Revises: 030
+Create Date: 2026-10-19 14:00:00.000000
+
+删除站内信不再在请求内一次性扣减所有用户的未读计数，而是与撤回一样由后台作业按被删除的记录逐批扣减。
+查询未读数时需要找出作业尚未扣完计数的站内信，扣除其下尚未删到的未读记录。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '031'
+down_revision: Union[str, None] = '030'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_notifications_pending_removal',
+        'notifications',
+        ['id'],
+        postgresql_where=sa.text(
+            'expiry_processed_at IS NULL AND (deleted_at IS NOT NULL OR recalled_at IS NOT NULL)'
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_pending_removal', table_name='notifications')
@@ -0,0 +1,27 @@
+"""站内信新增 expiry_cursor，过期处理分批扣除未读计数
+
+Revision ID: 032
+Revises: 031
+Create Date: 2026-10-19 14:30:00.000000
+
+过期处理此前在一个事务中用一条 GROUP BY/UPDATE 扣除所有收件人的未读计数。改为按 user_id 顺序分批，
+每批一个短事务，expiry_cursor 记录已处理到的用户，进程重启后从断点继续。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '032'
+down_revision: Union[str, None] = '031'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('expiry_cursor', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'expiry_cursor')
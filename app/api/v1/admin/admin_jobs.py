@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.dependencies import require_admin
+from app.models.user import User
+from app.schemas.job import JobResponse
+from app.tasks.jobs import job_registry
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(require_admin),
+):
+    """
+    获取后台作业状态（管理端）
+
+    - **job_id**: 作业 ID
+
+    返回作业进度、成功/失败数量及错误明细
+    """
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="作业不存在",
+        )
+    return JobResponse.model_validate(job)
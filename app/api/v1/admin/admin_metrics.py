@@ -0,0 +1,25 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.metrics import metrics
+from app.dependencies import require_admin
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=Dict[str, Dict[str, float]])
+async def get_metrics(
+    current_user: User = Depends(require_admin),
+):
+    """
+    获取运行指标（管理端）
+
+    返回当前实例的计数器（counters）和最近一次的仪表值（gauges），例如：
+    - **notification_purge_rows_total**: 清理删除的总行数
+    - **notification_purge_rows_per_second**: 最近一次清理的删除速率
+    - **notification_purge_lock_wait_seconds_total**: 清理锁定并删除每批行（含等待站内信行上的锁）的累计耗时
+    - **notification_purge_lock_timeouts_total**: 清理因锁等待超时中止的次数
+    """
+    return metrics.snapshot()
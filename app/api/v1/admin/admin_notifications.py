@@ -1,9 +1,12 @@
+from datetime import datetime, timezone
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.core.database import get_db
-from app.dependencies import require_admin
+from app.core.idempotency import idempotency_store
+from app.dependencies import get_idempotency_key, require_admin
 from app.models.user import User
 from app.schemas.notification import (
     NotificationCreate,
@@ -11,8 +14,17 @@ from app.schemas.notification import (
     NotificationResponse,
     NotificationListResponse,
     NotificationSendRequest,
+    SendEstimateResponse,
+    ScheduledSendResponse,
+    FanoutResponse,
 )
+from app.schemas.job import JobResponse
+from app.services.fanout_service import FanoutService
 from app.services.notification_service import NotificationService
+from app.services.schedule_service import ScheduledSendService
+from app.tasks.expiry import expiry_sweeper
+from app.tasks.fanout import fanout_executor
+from app.tasks.scheduler import scheduled_send_dispatcher
 
 router = APIRouter()
 
@@ -21,6 +33,7 @@ router = APIRouter()
 async def create_notification(
     notification_create: NotificationCreate,
     current_user: User = Depends(require_admin),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
 ):
     """
@@ -33,13 +46,21 @@ async def create_notification(
     - **priority**: 优先级（0:普通 1:重要 2:紧急）
     - **expires_at**: 过期时间（可选）
 
-    注意：此接口仅创建站内信内容，不会发送给用户，需要调用发送接口
+    注意：此接口仅创建站内信内容，不会发送给用户，需要调用发送接口。
+    携带 Idempotency-Key 头时，重试返回第一次创建的站内信，不会重复创建
     """
-    return NotificationService.create_notification(
-        db,
-        notification_create,
-        created_by_id=str(current_user.id),
-    )
+
+    def create() -> NotificationResponse:
+        notification = NotificationService.create_notification(
+            db,
+            notification_create,
+            created_by_id=str(current_user.id),
+        )
+        # 登记到过期处理器（按内容去重命中已有站内信时重复登记同一时间，没有副作用）
+        expiry_sweeper.schedule(notification.id, notification.expires_at)
+        return notification
+
+    return idempotency_store.execute(db, idempotency_key, notification_create, create)
 
 
 @router.get("/notifications", response_model=NotificationListResponse)
@@ -59,7 +80,11 @@ async def get_notifications(
     """
     from app.models.notification import Notification
 
-    query = db.query(Notification).order_by(Notification.created_at.desc())
+    query = (
+        db.query(Notification)
+        .filter(Notification.deleted_at.is_(None))
+        .order_by(Notification.created_at.desc())
+    )
     total = query.count()
     notifications = query.offset(skip).limit(limit).all()
 
@@ -102,10 +127,17 @@ async def update_notification(
 
     注意：仅更新站内信内容，不影响已发送的用户记录
     """
-    return NotificationService.update_notification(db, notification_id, notification_update)
+    notification = NotificationService.update_notification(db, notification_id, notification_update)
+    if "expires_at" in notification_update.model_fields_set:
+        expiry_sweeper.schedule(notification.id, notification.expires_at)
+    return notification
 
 
-@router.delete("/notifications/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/notifications/{notification_id}",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def delete_notification(
     notification_id: str,
     current_user: User = Depends(require_admin),
@@ -116,10 +148,81 @@ async def delete_notification(
 
     - **notification_id**: 站内信 ID
 
-    注意：删除站内信会同时删除所有用户的站内信记录
+    注意：删除站内信会同时删除所有用户的站内信记录。站内信立即对用户不可见，
+    记录在后台分批删除，返回的作业可通过 GET /admin/jobs/{job_id} 查询进度
+    """
+    job = NotificationService.delete_notification(db, notification_id)
+    return JobResponse.model_validate(job)
+
+
+@router.post(
+    "/notifications/{notification_id}/recall",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def recall_notification(
+    notification_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    撤回已发送的站内信（管理端）
+
+    - **notification_id**: 站内信 ID
+
+    站内信立即对所有用户不可见，内容保留；用户记录在后台分批删除并同步扣减未读数，
+    返回的作业可通过 GET /admin/jobs/{job_id} 查询进度。已撤回的站内信不能再次发送
+    """
+    job = NotificationService.recall_notification(db, notification_id)
+    return JobResponse.model_validate(job)
+
+
+def _validate_send_request(send_request: NotificationSendRequest) -> bool:
+    """
+    校验发送目标，返回是否为全员发送（send_to_all、受众规则或受众分群）
+
+    Raises:
+        HTTPException: 指定了多种全员发送目标，既不是全员发送也没有指定用户，或全员发送时指定了按用户的模板变量
+    """
+    # 验证：send_to_all、audience、segment_id 只能指定一种，指定时忽略 user_ids
+    broadcast = [send_request.send_to_all, send_request.audience is not None, send_request.segment_id is not None]
+    if sum(broadcast) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="send_to_all、audience、segment_id 只能指定一种",
+        )
+    # 验证：如果不是发送给所有人，则必须提供 user_ids
+    if not any(broadcast) and not send_request.user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="send_to_all=False 时，user_ids 不能为空",
+        )
+    if any(broadcast) and send_request.variables:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="variables 只能用于发送给指定用户",
+        )
+    return any(broadcast)
+
+
+@router.post("/notifications/{notification_id}/send/estimate", response_model=SendEstimateResponse)
+async def estimate_send(
+    notification_id: str,
+    send_request: NotificationSendRequest,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    预估发送规模（管理端，不实际发送）
+
+    请求体与发送接口相同（scheduled_at 被忽略），返回预计覆盖的用户数、其中已收到而会被跳过的用户数，
+    以及按该优先级通道最近的写入速率估算的耗时。全员发送和受众规则的人数来自查询规划器的统计信息，
+    不扫描用户表和记录表
     """
-    NotificationService.delete_notification(db, notification_id)
-    return None
+    _validate_send_request(send_request)
+    estimate = NotificationService.estimate_send(db, notification_id, send_request)
+    lane, rate, seconds = fanout_executor.project(estimate.priority, estimate.estimated_new)
+    return estimate.model_copy(update={"lane": lane, "rows_per_second": rate, "estimated_seconds": seconds})
 
 
 @router.post("/notifications/{notification_id}/send")
@@ -127,6 +230,7 @@ async def send_notification(
     notification_id: str,
     send_request: NotificationSendRequest,
     current_user: User = Depends(require_admin),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
 ):
     """
@@ -135,19 +239,150 @@ async def send_notification(
     - **notification_id**: 站内信 ID
     - **user_ids**: 用户 ID 列表（send_to_all=False 时必填）
     - **send_to_all**: 是否发送给所有用户（如果为 True，则忽略 user_ids）
+    - **audience**: 受众规则（可选，按用户状态、登录时间、注册时间、是否收到/读过其他站内信在数据库中筛选）
+    - **segment_id**: 受众分群 ID（可选，发送给分群的当前成员）
+    - **variables**: 按用户的模板变量（可选，用户 ID -> 变量，只能与 user_ids 一起使用；个性化站内信必填）
+    - **scheduled_at**: 计划发送时间（可选，为空或已过去时立即发送）
 
-    返回成功发送的用户数量
+    立即发送给指定用户时返回成功发送的用户数量，以及格式错误或不存在而被拒绝的用户 ID；发送给所有用户、受众规则或受众分群时按用户 ID 分区在后台并行发送，
+    返回的作业可通过 GET /admin/jobs/{job_id} 查询进度，各分区断点可通过 GET /admin/fanouts/{fanout_id} 查询；
+    定时发送时返回定时发送信息，到期后由调度器自动发送。
+    携带 Idempotency-Key 头时，超时重试直接返回第一次的结果，不会重复校验和发送
     """
-    # 验证：如果不是发送给所有人，则必须提供 user_ids
-    if not send_request.send_to_all and not send_request.user_ids:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="send_to_all=False 时，user_ids 不能为空",
+    broadcast = _validate_send_request(send_request)
+    return idempotency_store.execute(
+        db,
+        idempotency_key,
+        send_request,
+        lambda: _send_notification(db, notification_id, send_request, broadcast, str(current_user.id)),
+    )
+
+
+def _send_notification(
+    db: Session,
+    notification_id: str,
+    send_request: NotificationSendRequest,
+    broadcast: bool,
+    created_by_id: str,
+) -> dict:
+    """执行发送：定时发送入队、全员发送提交扩散执行器，或直接发送给指定用户"""
+    scheduled_at = send_request.scheduled_at
+    if scheduled_at is not None:
+        if scheduled_at.tzinfo is None:
+            scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+        if scheduled_at > datetime.now(timezone.utc):
+            scheduled_send = ScheduledSendService.create(db, notification_id, send_request, created_by_id=created_by_id)
+            scheduled_send_dispatcher.schedule(scheduled_send.id, scheduled_send.scheduled_at)
+            return {
+                "message": f"已计划于 {scheduled_send.scheduled_at.isoformat()} 发送",
+                "scheduled_send": scheduled_send,
+            }
+
+    if broadcast:
+        fanout = FanoutService.create(
+            db,
+            notification_id,
+            settings.FANOUT_PARTITIONS,
+            send_request.audience,
+            send_request.segment_id,
         )
+        task = fanout_executor.submit(fanout)
+        if fanout.segment_id is not None:
+            message = "已开始发送给受众分群"
+        elif fanout.audience is not None:
+            message = "已开始按受众规则发送"
+        else:
+            message = "已开始发送给所有用户"
+        return {
+            "message": message,
+            "job": JobResponse.model_validate(task.job),
+        }
 
-    if send_request.send_to_all:
-        count = NotificationService.send_to_all_users(db, notification_id)
-    else:
-        count = NotificationService.send_to_users(db, notification_id, send_request.user_ids)
+    count, rejected = NotificationService.send_to_users(
+        db, notification_id, send_request.user_ids, send_request.variables
+    )
+    return {"message": f"成功发送给 {count} 个用户", "rejected_user_ids": rejected}
 
-    return {"message": f"成功发送给 {count} 个用户"}
+
+@router.get("/scheduled-sends", response_model=List[ScheduledSendResponse])
+async def get_scheduled_sends(
+    status_filter: Optional[str] = Query(
+        None,
+        alias="status",
+        pattern="^(pending|running|sent|failed|cancelled)$",
+        description="状态筛选",
+    ),
+    skip: int = Query(0, ge=0, description="跳过数量"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取定时发送列表（管理端）
+
+    按计划发送时间升序返回
+
+    - **status**: 状态筛选（pending, running, sent, failed, cancelled）
+    - **skip**: 跳过数量
+    - **limit**: 返回数量
+    """
+    return ScheduledSendService.list_scheduled_sends(db, status_filter, skip, limit)
+
+
+@router.post("/scheduled-sends/{scheduled_send_id}/cancel", response_model=ScheduledSendResponse)
+async def cancel_scheduled_send(
+    scheduled_send_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    取消定时发送（管理端）
+
+    - **scheduled_send_id**: 定时发送 ID
+
+    只能取消尚未开始发送的定时发送
+    """
+    return ScheduledSendService.cancel(db, scheduled_send_id)
+
+
+@router.get("/fanouts/{fanout_id}", response_model=FanoutResponse)
+async def get_fanout(
+    fanout_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取全员发送详情（管理端）
+
+    - **fanout_id**: 全员发送 ID
+
+    返回整体状态及各分区的断点、已发送数量和失败原因
+    """
+    return FanoutService.get_fanout(db, fanout_id)
+
+
+@router.post(
+    "/fanouts/{fanout_id}/retry",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def retry_fanout(
+    fanout_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    重试全员发送（管理端）
+
+    - **fanout_id**: 全员发送 ID
+
+    只重发未完成的分区，每个分区从各自的断点继续；已完成的分区不会重复发送
+    """
+    if fanout_executor.is_active(fanout_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="全员发送仍在进行中",
+        )
+    fanout = FanoutService.retry(db, fanout_id)
+    task = fanout_executor.submit(fanout)
+    return JobResponse.model_validate(task.job)
@@ -0,0 +1,108 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.idempotency import idempotency_store
+from app.dependencies import get_idempotency_key, require_admin
+from app.models.user import User
+from app.schemas.job import JobResponse
+from app.schemas.segment import SegmentCreate, SegmentResponse
+from app.services.segment_service import SegmentService
+
+router = APIRouter()
+
+
+@router.post("/segments", response_model=SegmentResponse, status_code=status.HTTP_201_CREATED)
+async def create_segment(
+    segment_create: SegmentCreate,
+    current_user: User = Depends(require_admin),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: Session = Depends(get_db),
+):
+    """
+    创建受众分群（管理端）
+
+    - **name**: 分群名称（唯一）
+    - **audience**: 受众规则，与发送接口的 audience 相同
+    - **refresh_interval_seconds**: 成员刷新间隔（秒，默认 3600，最小 60）
+
+    创建后立即在后台计算首次成员，之后按刷新间隔增量刷新；首次刷新完成前不能用于发送。
+    携带 Idempotency-Key 头时，重试返回第一次创建的分群
+    """
+
+    def create() -> SegmentResponse:
+        segment = SegmentService.create_segment(db, segment_create, created_by_id=str(current_user.id))
+        SegmentService.submit_refresh(db, str(segment.id))
+        return segment
+
+    return idempotency_store.execute(db, idempotency_key, segment_create, create)
+
+
+@router.get("/segments", response_model=List[SegmentResponse])
+async def get_segments(
+    skip: int = Query(0, ge=0, description="跳过数量"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取受众分群列表（管理端）
+
+    - **skip**: 跳过数量
+    - **limit**: 返回数量
+    """
+    return SegmentService.list_segments(db, skip, limit)
+
+
+@router.get("/segments/{segment_id}", response_model=SegmentResponse)
+async def get_segment(
+    segment_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取受众分群详情（管理端）
+
+    - **segment_id**: 分群 ID
+
+    返回受众规则、当前成员数和上次刷新时间
+    """
+    return SegmentService.get_segment(db, segment_id)
+
+
+@router.post(
+    "/segments/{segment_id}/refresh",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def refresh_segment(
+    segment_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    立即刷新受众分群成员（管理端）
+
+    - **segment_id**: 分群 ID
+
+    只插入新符合规则的用户、移除不再符合的成员，返回的作业结果包含新增和移除数量
+    """
+    job = SegmentService.submit_refresh(db, segment_id)
+    return JobResponse.model_validate(job)
+
+
+@router.delete("/segments/{segment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_segment(
+    segment_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    删除受众分群（管理端）
+
+    - **segment_id**: 分群 ID
+
+    注意：引用该分群的定时发送和全员发送记录会一并删除
+    """
+    SegmentService.delete_segment(db, segment_id)
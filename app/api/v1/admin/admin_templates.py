@@ -0,0 +1,130 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.idempotency import idempotency_store
+from app.dependencies import get_idempotency_key, require_admin
+from app.models.user import User
+from app.schemas.template import (
+    TemplateCreate,
+    TemplateUpdate,
+    TemplateResponse,
+    TemplateRenderRequest,
+    TemplateRenderResponse,
+)
+from app.services.template_service import TemplateService
+
+router = APIRouter()
+
+
+@router.post("/templates", response_model=TemplateResponse, status_code=status.HTTP_201_CREATED)
+async def create_template(
+    template_create: TemplateCreate,
+    current_user: User = Depends(require_admin),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: Session = Depends(get_db),
+):
+    """
+    创建站内信模板（管理端）
+
+    - **name**: 模板名称（唯一）
+    - **title**: 标题模板
+    - **content**: 内容模板
+    - **action_url**: 跳转链接模板（可选）
+
+    模板使用 $name 或 ${name} 引用变量，字面量 $ 写作 $$。
+    携带 Idempotency-Key 头时，重试返回第一次创建的模板
+    """
+    return idempotency_store.execute(
+        db,
+        idempotency_key,
+        template_create,
+        lambda: TemplateService.create_template(db, template_create, created_by_id=str(current_user.id)),
+    )
+
+
+@router.get("/templates", response_model=List[TemplateResponse])
+async def get_templates(
+    skip: int = Query(0, ge=0, description="跳过数量"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取站内信模板列表（管理端）
+
+    - **skip**: 跳过数量
+    - **limit**: 返回数量
+    """
+    return TemplateService.list_templates(db, skip, limit)
+
+
+@router.get("/templates/{template_id}", response_model=TemplateResponse)
+async def get_template(
+    template_id: str,
+    version: Optional[int] = Query(None, ge=1, description="模板版本（为空表示当前版本）"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    获取站内信模板详情（管理端）
+
+    - **template_id**: 模板 ID
+    - **version**: 模板版本（可选，用于查看已发送站内信引用的旧版本）
+    """
+    return TemplateService.get_template(db, template_id, version)
+
+
+@router.put("/templates/{template_id}", response_model=TemplateResponse)
+async def update_template(
+    template_id: str,
+    template_update: TemplateUpdate,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    更新站内信模板（管理端）
+
+    - **template_id**: 模板 ID
+    - **name**: 模板名称（可选）
+    - **title**: 标题模板（可选）
+    - **content**: 内容模板（可选）
+    - **action_url**: 跳转链接模板（可选）
+
+    注意：修改标题、内容或链接会新建版本，已创建的站内信仍引用原版本
+    """
+    return TemplateService.update_template(db, template_id, template_update)
+
+
+@router.delete("/templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_template(
+    template_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    删除站内信模板（管理端）
+
+    - **template_id**: 模板 ID
+
+    已由该模板创建的站内信不受影响
+    """
+    TemplateService.delete_template(db, template_id)
+
+
+@router.post("/templates/{template_id}/render", response_model=TemplateRenderResponse)
+async def render_template(
+    template_id: str,
+    render_request: TemplateRenderRequest,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    预览模板渲染结果（管理端）
+
+    - **template_id**: 模板 ID
+    - **variables**: 模板变量
+    - **version**: 模板版本（可选，默认当前版本）
+    """
+    return TemplateService.render(db, template_id, render_request.variables, render_request.version)
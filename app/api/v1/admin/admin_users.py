@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Query, UploadFile, status
+
+from app.dependencies import require_admin
+from app.models.user import User
+from app.schemas.job import JobResponse
+from app.services.user_import_service import UserImportService
+from app.tasks.jobs import job_registry
+
+router = APIRouter()
+
+
+@router.post("/users/import", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_users(
+    file: UploadFile = File(..., description="CSV 或 NDJSON 文件"),
+    file_format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="文件格式（默认按文件名判断）"),
+    current_user: User = Depends(require_admin),
+):
+    """
+    批量导入用户（管理端）
+
+    - **file**: CSV（表头 username,email,password）或 NDJSON（每行一个 JSON 对象）
+    - **file_format**: 文件格式 csv / ndjson（可选）
+
+    导入在后台执行，返回作业信息；通过 GET /admin/jobs/{job_id} 查询进度和逐行错误
+    """
+    # 先把上传内容落盘，后台作业在请求结束后仍可流式读取
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".import") as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        path = tmp.name
+
+    file_format = file_format or UserImportService.detect_format(file.filename, file.content_type)
+    job = job_registry.submit(
+        "user_import",
+        lambda job: UserImportService.run_import(job, path, file_format),
+    )
+    return JobResponse.model_validate(job)
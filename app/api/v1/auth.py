@@ -1,9 +1,12 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import verify_refresh_token
-from app.dependencies import get_current_user
+from app.core.revocation import token_revocation
+from app.dependencies import get_current_user, security
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.services.auth_service import AuthService
 from app.models.user import User
@@ -43,18 +46,18 @@ async def refresh(token: str, db: Session = Depends(get_db)):
 
     - **token**: Refresh Token
 
-    返回新的 Access Token 和 Refresh Token
+    返回新的 Access Token 和 Refresh Token。
+    Refresh Token 每次刷新都会轮换，旧 Token 立即失效；重复使用旧 Token 会导致整个会话被吊销
     """
     payload = verify_refresh_token(token)
-    if payload is None:
+    if payload is None or token_revocation.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的 Refresh Token",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user_id = payload.get("user_id")
-    return AuthService.refresh(db, user_id)
+    return AuthService.refresh(db, payload)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -69,14 +72,21 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    refresh_token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     """
     用户登出
 
     需要在 Header 中提供有效的 Access Token
-    客户端应删除本地存储的 Token
+    - **refresh_token**: Refresh Token（可选，提供时一并吊销）
 
-    注意：由于使用无状态 JWT，服务端无法主动使 Token 失效
-    客户端应自行删除 Token 以实现登出效果
+    服务端会吊销当前 Access Token（按 jti 记录到吊销列表），
+    吊销在所有 worker 间最迟 TOKEN_REVOCATION_SYNC_SECONDS 秒后生效
     """
+    access_token = credentials.credentials if credentials else None
+    AuthService.logout(db, access_token, refresh_token)
     return {"message": "登出成功，请删除客户端 Token"}
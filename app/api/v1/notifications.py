@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
@@ -6,7 +7,9 @@ from app.core.database import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.schemas.notification import NotificationRecordResponse, NotificationRecordListResponse
+from app.schemas.preference import NotificationPreferenceResponse, NotificationPreferenceUpdate
 from app.services.notification_service import NotificationService
+from app.services.preference_service import PreferenceService
 
 router = APIRouter()
 
@@ -17,6 +20,7 @@ async def get_notifications(
     notification_type: Optional[str] = Query(None, description="站内信类型"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    before: Optional[datetime] = Query(None, description="游标：上一页返回的 next_cursor"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -28,6 +32,7 @@ async def get_notifications(
     - **notification_type**: 站内信类型筛选（system, business, reminder, announcement）
     - **page**: 页码（从 1 开始）
     - **page_size**: 每页数量（1-100）
+    - **before**: 游标分页，传入上一页的 next_cursor（使用游标时 page 应保持为 1）
     """
     skip = (page - 1) * page_size
     return NotificationService.get_user_notifications(
@@ -37,6 +42,7 @@ async def get_notifications(
         notification_type=notification_type,
         skip=skip,
         limit=page_size,
+        before=before,
     )
 
 
@@ -54,6 +60,39 @@ async def get_unread_count(
     return {"unread_count": count}
 
 
+@router.get("/preferences", response_model=NotificationPreferenceResponse)
+async def get_preferences(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    获取通知偏好
+
+    返回当前用户屏蔽的站内信类型、接收的最低优先级和免打扰时段
+    """
+    return PreferenceService.get_preferences(db, str(current_user.id))
+
+
+@router.put("/preferences", response_model=NotificationPreferenceResponse)
+async def update_preferences(
+    preference_update: NotificationPreferenceUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    设置通知偏好（整体替换）
+
+    - **muted_types**: 屏蔽的站内信类型（系统通知不能屏蔽）
+    - **min_priority**: 接收的最低优先级
+    - **quiet_hours_start** / **quiet_hours_end**: 免打扰时段（当地时间，可跨零点），时段内只立即接收紧急站内信，
+      其余站内信推迟到时段结束后送达
+    - **utc_offset_minutes**: 当地时间相对 UTC 的分钟数
+
+    偏好在发送时生效：被屏蔽的站内信不会写入收件箱，已收到的站内信不受影响
+    """
+    return PreferenceService.update_preferences(db, str(current_user.id), preference_update)
+
+
 @router.get("/{record_id}", response_model=NotificationRecordResponse)
 async def get_notification_detail(
     record_id: str,
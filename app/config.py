@@ -39,6 +39,28 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=15, description="Access Token 有效期（分钟）")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7, description="Refresh Token 有效期（天）")
 
+    # Token 吊销配置
+    TOKEN_REVOCATION_SYNC_SECONDS: int = Field(
+        default=5, description="吊销列表同步间隔（秒），即吊销在多 worker 间生效的最大延迟"
+    )
+    TOKEN_REVOCATION_REBUILD_MINUTES: int = Field(default=60, description="吊销列表全量重建间隔（分钟）")
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = Field(default=100000, description="布隆过滤器预估容量")
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = Field(default=0.001, description="布隆过滤器假阳性率")
+
+    # 登录会话（Refresh Token 轮换）配置
+    SESSION_CACHE_SIZE: int = Field(default=100000, description="内存中缓存的会话数量上限")
+    SESSION_SWEEP_INTERVAL_SECONDS: int = Field(default=3600, description="过期会话清理间隔（秒）")
+    SESSION_SWEEP_BATCH_SIZE: int = Field(default=1000, description="过期会话每批删除数量")
+
+    # 幂等键配置
+    IDEMPOTENCY_KEY_TTL_HOURS: int = Field(default=24, description="Idempotency-Key 的保留时间（小时），期间重试返回原结果")
+    IDEMPOTENCY_CLAIM_LEASE_SECONDS: int = Field(
+        default=60, description="处理中的幂等键的占用时长（秒），超时未完成视为执行进程已退出，允许重试接管"
+    )
+    IDEMPOTENCY_CACHE_SIZE: int = Field(default=10000, description="内存中缓存的已完成请求结果数量上限")
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: int = Field(default=3600, description="过期幂等键清理间隔（秒）")
+    IDEMPOTENCY_SWEEP_BATCH_SIZE: int = Field(default=1000, description="过期幂等键每批删除数量")
+
     # CORS 配置
     BACKEND_CORS_ORIGINS: List[str] = Field(
         default=["http://localhost:3000", "http://localhost:8000"],
@@ -48,6 +70,104 @@ class Settings(BaseSettings):
     # 密码加密
     PASSWORD_BCRYPT_ROUNDS: int = Field(default=12, description="密码加密 rounds")
 
+    # 站内信记录分区配置
+    NOTIFICATION_PARTITION_MONTHS_AHEAD: int = Field(default=3, description="提前创建的月分区数量")
+    NOTIFICATION_PARTITION_CHECK_SECONDS: int = Field(default=86400, description="分区维护检查间隔（秒）")
+
+    # 站内信记录归档配置
+    NOTIFICATION_ARCHIVE_AFTER_DAYS: int = Field(
+        default=90, description="已读记录超过多少天后移入归档表（0 表示不归档）"
+    )
+    NOTIFICATION_ARCHIVE_BATCH_SIZE: int = Field(default=5000, description="每批归档的记录数")
+    NOTIFICATION_ARCHIVE_INTERVAL_SECONDS: int = Field(default=3600, description="归档任务执行间隔（秒）")
+
+    # 站内信过期处理配置
+    NOTIFICATION_EXPIRY_HORIZON_SECONDS: int = Field(
+        default=300, description="过期处理器每次装载未来多少秒内到期的站内信"
+    )
+    NOTIFICATION_EXPIRY_BATCH_SIZE: int = Field(default=1000, description="过期处理器每次最多装载的站内信数")
+    NOTIFICATION_EXPIRY_USER_BATCH_SIZE: int = Field(
+        default=1000, description="过期处理每批扣除未读计数的用户数（每批一个事务）"
+    )
+
+    # 定时发送配置
+    SCHEDULED_SEND_HORIZON_SECONDS: int = Field(
+        default=60, description="定时发送调度器每次装载未来多少秒内到期的发送（即时间轮大小）"
+    )
+    SCHEDULED_SEND_BATCH_SIZE: int = Field(default=1000, description="定时发送调度器每次最多装载的发送数")
+    SCHEDULED_SEND_CLAIM_TIMEOUT_SECONDS: int = Field(
+        default=600, description="发送中的定时发送超过该时间没有心跳，视为执行进程已退出并重新领取（秒）"
+    )
+    SCHEDULED_SEND_HEARTBEAT_SECONDS: int = Field(
+        default=60, description="发送中的定时发送续约心跳的间隔（秒），需明显小于领取超时"
+    )
+    SCHEDULED_SEND_MAX_ATTEMPTS: int = Field(default=3, description="定时发送最多尝试次数")
+    SCHEDULED_SEND_RETRY_DELAY_SECONDS: int = Field(default=60, description="定时发送失败后的重试间隔（秒）")
+
+    # 站内信数据清理配置
+    NOTIFICATION_PURGE_INTERVAL_SECONDS: int = Field(default=600, description="清理任务执行间隔（秒）")
+    NOTIFICATION_PURGE_DELETED_AFTER_DAYS: int = Field(
+        default=7, description="软删除的记录保留多少天后物理删除（保留期内仍参与发送去重）"
+    )
+    NOTIFICATION_PURGE_BATCH_SIZE: int = Field(default=1000, description="每批物理删除的行数")
+    NOTIFICATION_PURGE_MAX_BATCHES: int = Field(default=200, description="单次清理最多执行的批数")
+    NOTIFICATION_PURGE_PAUSE_MS: int = Field(default=50, description="清理批之间的停顿（毫秒）")
+    NOTIFICATION_PURGE_LOCK_TIMEOUT_MS: int = Field(default=200, description="清理时单条语句的锁等待上限（毫秒）")
+
+    # 收件箱容量配置
+    INBOX_MAX_RECORDS: int = Field(
+        default=0, description="每个用户收件箱最多保留的记录数，超出后删除最早的已读记录（0 表示不限制）"
+    )
+    INBOX_MAX_RECORDS_PER_TYPE: int = Field(
+        default=0, description="每个用户每种类型最多保留的记录数（0 表示不限制）"
+    )
+    INBOX_TRIM_INTERVAL_SECONDS: int = Field(default=600, description="收件箱容量检查间隔（秒）")
+    INBOX_TRIM_BATCH_SIZE: int = Field(default=1000, description="收件箱清理每批删除的记录数")
+    INBOX_TRIM_MAX_USERS: int = Field(default=1000, description="单次检查最多处理的超限用户数")
+
+    # 站内信模板配置
+    TEMPLATE_CACHE_SIZE: int = Field(default=1000, description="内存中缓存的已编译模板版本数量上限")
+    TEMPLATE_RECIPIENT_VARIABLES_MAX_BYTES: int = Field(
+        default=1024, description="个性化发送时每个用户的模板变量序列化后的最大字节数"
+    )
+
+    # 用户通知偏好配置
+    PREFERENCE_SYNC_SECONDS: int = Field(
+        default=30, description="偏好摘要同步间隔（秒），即其他 worker 上首次屏蔽某类型站内信生效的最大延迟"
+    )
+
+    # 免打扰推迟送达配置
+    NOTIFICATION_DEFERRAL_INTERVAL_SECONDS: int = Field(
+        default=60, description="检查免打扰已结束的推迟送达的间隔（秒），即免打扰结束后送达的最大延迟"
+    )
+    NOTIFICATION_DEFERRAL_BATCH_SIZE: int = Field(default=1000, description="推迟送达每批写入的用户数")
+
+    # 全员发送（扩散）配置
+    FANOUT_WORKERS: int = Field(default=4, description="全员发送的工作进程数（每个进程使用自己的数据库连接）")
+    FANOUT_PARTITIONS: int = Field(default=16, description="每次全员发送按用户 ID 切分的分区数")
+    FANOUT_CHUNK_SIZE: int = Field(default=1000, description="全员发送每块覆盖的用户数")
+    FANOUT_MAX_ROWS_PER_SECOND: int = Field(
+        default=0, description="所有工作进程合计每秒最多写入的记录数（0 表示不限速）"
+    )
+    FANOUT_WEIGHT_NORMAL: int = Field(default=1, description="普通优先级通道的调度权重")
+    FANOUT_WEIGHT_IMPORTANT: int = Field(default=4, description="重要优先级通道的调度权重")
+    FANOUT_WEIGHT_URGENT: int = Field(default=16, description="紧急优先级通道的调度权重")
+
+    # 受众分群配置
+    SEGMENT_REFRESH_CHECK_SECONDS: int = Field(
+        default=60, description="检查受众分群是否到期刷新的间隔（秒，各分群按自己的刷新间隔刷新）"
+    )
+
+    # 后台作业配置
+    JOB_WORKERS: int = Field(default=4, description="后台作业线程数")
+    JOB_HISTORY_SIZE: int = Field(default=200, description="保留的后台作业状态数量")
+
+    # 批量导入用户配置
+    USER_IMPORT_BATCH_SIZE: int = Field(default=1000, description="批量导入每批写入的用户数")
+    USER_IMPORT_HASH_WORKERS: int = Field(
+        default=0, description="批量导入时密码哈希的进程数（0 表示使用 CPU 核数）"
+    )
+
     @property
     def CORS_ORIGINS(self) -> List[str]:
         """获取 CORS 源列表"""
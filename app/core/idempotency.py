@@ -0,0 +1,197 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.idempotency import IdempotencyKey
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    幂等请求存储（Idempotency-Key）
+
+    客户端或代理超时重试写请求时携带同一个 Idempotency-Key，只有第一次真正执行，
+    之后的重试直接返回第一次的结果，不再重复校验、写入站内信记录。
+
+    - 首次请求先以 INSERT ... ON CONFLICT 占用幂等键，并发的同键请求只有一个能占用成功，
+      其余返回 409；执行成功后把响应写回该行，执行失败时释放幂等键，允许修正后重试
+    - 占用只维持一个较短的期限（locked_until）：执行请求的进程中途退出时，同键重试在期限过后接管执行；
+      被接管的一方之后写回响应或释放幂等键时按占用期限判断归属，不会覆盖接管方
+    - 已完成请求的结果缓存在进程内 LRU 中，重试命中缓存时不访问数据库；
+      其他 worker 完成的请求在缓存未命中时从 idempotency_keys 表读取
+    - 同一幂等键只能用于相同的请求体，否则返回 422
+    """
+
+    def __init__(self, capacity: int, ttl: timedelta, lease: timedelta):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.lease = lease
+        self._lock = threading.Lock()
+        # 幂等键摘要 -> (请求体摘要, 响应, 过期时间)
+        self._cache: "OrderedDict[str, Tuple[str, Any, datetime]]" = OrderedDict()
+
+    def _cache_get(self, key: str) -> Optional[Tuple[str, Any, datetime]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= datetime.now(timezone.utc):
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: str, request_hash: str, response: Any, expires_at: datetime) -> None:
+        with self._lock:
+            self._cache[key] = (request_hash, response, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def _cache_pop(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    @staticmethod
+    def _replay(request_hash: str, stored_hash: str, response: Any) -> Any:
+        if request_hash != stored_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key 已用于其他请求",
+            )
+        return response
+
+    def execute(self, db: Session, key: Optional[str], payload: Any, handler: Callable[[], Any]) -> Any:
+        """
+        按幂等键执行写请求
+
+        Args:
+            db: 数据库会话
+            key: 幂等键（已按用户、方法、路径限定作用域；为 None 时直接执行）
+            payload: 请求体，用于识别同一幂等键被用于不同的请求
+            handler: 实际执行请求的函数
+
+        Returns:
+            Any: 响应内容（JSON 兼容），重试时为第一次执行的结果
+
+        Raises:
+            HTTPException: 同一幂等键的请求仍在处理（409），或幂等键已用于其他请求（422）；
+                           以及 handler 本身抛出的异常
+        """
+        if key is None:
+            return handler()
+
+        key = _digest(key)
+        request_hash = _digest(json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False))
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._replay(request_hash, cached[0], cached[1])
+
+        now = datetime.now(timezone.utc)
+        expires_at = now + self.ttl
+        locked_until = now + self.lease
+        # 占用幂等键；已过期（尚未被清理）的旧记录，或占用期限已过仍未完成的记录直接覆盖
+        stmt = insert(IdempotencyKey).values(
+            key=key, request_hash=request_hash, expires_at=expires_at, locked_until=locked_until
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={
+                "request_hash": request_hash,
+                "response": None,
+                "created_at": now,
+                "expires_at": expires_at,
+                "locked_until": locked_until,
+            },
+            where=or_(
+                IdempotencyKey.expires_at <= now,
+                and_(IdempotencyKey.response.is_(None), IdempotencyKey.locked_until <= now),
+            ),
+        )
+        claimed = db.execute(stmt).rowcount
+        db.commit()
+
+        if not claimed:
+            record = db.get(IdempotencyKey, key, populate_existing=True)
+            if record is None or record.response is None:
+                if record is not None:
+                    self._replay(request_hash, record.request_hash, None)
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="相同 Idempotency-Key 的请求正在处理",
+                )
+            self._cache_put(key, record.request_hash, record.response, record.expires_at)
+            return self._replay(request_hash, record.request_hash, record.response)
+
+        # 仍由本次请求占用（未被超时接管）的幂等键
+        owned = (IdempotencyKey.key == key, IdempotencyKey.locked_until == locked_until)
+        try:
+            response = jsonable_encoder(handler())
+        except Exception:
+            # 执行失败不占用幂等键，客户端可以用同一个键重试
+            db.rollback()
+            db.query(IdempotencyKey).filter(*owned).delete(synchronize_session=False)
+            db.commit()
+            raise
+
+        completed = db.query(IdempotencyKey).filter(*owned).update(
+            {"response": response, "locked_until": None}, synchronize_session=False
+        )
+        db.commit()
+        if completed:
+            self._cache_put(key, request_hash, response, expires_at)
+        return response
+
+    def prune_expired(self, db: Session, batch_size: int) -> int:
+        """
+        分批删除已过期的幂等键
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批删除数量
+
+        Returns:
+            int: 删除的幂等键数量
+        """
+        total = 0
+        while True:
+            keys = [
+                row.key
+                for row in db.query(IdempotencyKey.key)
+                .filter(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+                .limit(batch_size)
+            ]
+            if not keys:
+                break
+
+            db.query(IdempotencyKey).filter(IdempotencyKey.key.in_(keys)).delete(synchronize_session=False)
+            db.commit()
+
+            for key in keys:
+                self._cache_pop(key)
+            total += len(keys)
+
+            if len(keys) < batch_size:
+                break
+        return total
+
+
+idempotency_store = IdempotencyStore(
+    capacity=settings.IDEMPOTENCY_CACHE_SIZE,
+    ttl=timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+    lease=timedelta(seconds=settings.IDEMPOTENCY_CLAIM_LEASE_SECONDS),
+)
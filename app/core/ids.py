@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_seq = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    生成时间有序的 UUIDv7（RFC 9562）
+
+    布局：48 位毫秒时间戳 | 4 位版本号 | 12 位序列号 | 2 位变体 | 62 位随机数
+
+    同一毫秒内生成的 ID 通过 12 位序列号保证单进程内单调递增，
+    使新行始终追加到 B-tree 索引的右侧，避免随机 UUID 造成的页分裂。
+
+    Returns:
+        uuid.UUID: UUIDv7
+    """
+    global _last_ms, _seq
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _seq = int.from_bytes(os.urandom(2), "big") & 0x7FF  # 起始值留出一半空间用于递增
+        else:
+            # 同一毫秒内（或时钟回拨）沿用上次的时间戳并递增序列号
+            _seq += 1
+            if _seq > 0xFFF:
+                _last_ms += 1
+                _seq = 0
+            ms = _last_ms
+        seq = _seq
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
+# 数据库端生成 UUIDv7 的函数（与迁移 004 中的定义相同），供 INSERT ... SELECT 等不经过 Python 的批量写入使用：
+# 基于 gen_random_uuid()，前 48 位替换为毫秒时间戳，版本号从 4 改为 7（置位 bit 52、53）
+UUID_GENERATE_V7_SQL = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(
+                    uuid_send(gen_random_uuid())
+                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6
+                ),
+                52, 1
+            ),
+            53, 1
+        ),
+        'hex'
+    )::uuid
+$$ LANGUAGE sql VOLATILE
+"""
@@ -0,0 +1,49 @@
+from threading import Lock
+from typing import Dict, Optional
+
+
+class Metrics:
+    """
+    进程内运行指标
+
+    计数器（counter）只增不减，仪表（gauge）记录最近一次的值；
+    通过管理端接口查看，多实例部署时各实例分别统计。
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def set(self, name: str, value: float) -> None:
+        """设置仪表值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        """读取计数器当前值"""
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def get_gauge(self, name: str) -> Optional[float]:
+        """读取仪表最近一次的值（从未设置时返回 None）"""
+        with self._lock:
+            return self._gauges.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取当前全部指标
+
+        Returns:
+            Dict[str, Dict[str, float]]: {"counters": {...}, "gauges": {...}}
+        """
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+
+metrics = Metrics()
@@ -0,0 +1,110 @@
+import re
+from datetime import date, datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 按月分区的父表
+PARTITIONED_TABLE = "notification_records"
+
+_PARTITION_NAME = re.compile(rf"^{PARTITIONED_TABLE}_(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: datetime) -> date:
+    """取所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """月份加减"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """月份对应的分区表名，如 notification_records_202610"""
+    return f"{PARTITIONED_TABLE}_{month:%Y%m}"
+
+
+def list_partitions(db: Session) -> List[Tuple[str, date]]:
+    """
+    列出当前挂载的月分区
+
+    Returns:
+        List[Tuple[str, date]]: (分区表名, 月份)，按月份升序
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :parent
+            """
+        ),
+        {"parent": PARTITIONED_TABLE},
+    )
+    partitions = []
+    for (name,) in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(db: Session, months_ahead: int) -> List[str]:
+    """
+    确保当前月及未来 months_ahead 个月的分区存在
+
+    Args:
+        db: 数据库会话
+        months_ahead: 提前创建的月数
+
+    Returns:
+        List[str]: 新创建的分区表名
+    """
+    existing = {name for name, _ in list_partitions(db)}
+    current = month_start(datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARTITIONED_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    db.commit()
+    return created
+
+
+def detach_partitions_before(db: Session, before: date, drop: bool = False) -> List[str]:
+    """
+    卸载（可选删除）早于指定月份的分区
+
+    卸载后的分区成为普通表，不再参与查询，可单独归档或备份后删除。
+
+    Args:
+        db: 数据库会话
+        before: 早于该月份（不含）的分区会被卸载
+        drop: 卸载后是否直接删除
+
+    Returns:
+        List[str]: 被卸载的分区表名
+    """
+    detached = []
+    for name, month in list_partitions(db):
+        if month >= before:
+            break
+        db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        detached.append(name)
+    return detached
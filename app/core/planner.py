@@ -0,0 +1,35 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) 语句：只生成执行计划，不执行查询"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def planned_rows(db: Session, query) -> int:
+    """
+    查询规划器估算的结果行数
+
+    来自表的统计信息（ANALYZE / autovacuum 维护），不扫描数据，开销与结果规模无关；
+    统计信息过期时会有偏差。
+
+    Args:
+        db: 数据库会话
+        query: SELECT 语句
+
+    Returns:
+        int: 估算行数
+    """
+    plan = db.execute(Explain(query)).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
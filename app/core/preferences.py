@@ -0,0 +1,105 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.notification import NotificationPriority, NotificationType
+from app.models.preference import TYPE_BITS, NotificationPreference
+
+# 不受用户偏好影响的站内信类型
+EXEMPT_TYPES = frozenset({NotificationType.SYSTEM.value})
+# 免打扰时段内仍然送达的最低优先级
+QUIET_HOURS_BYPASS_PRIORITY = int(NotificationPriority.URGENT.value)
+# 全部优先级的位集
+ALL_PRIORITIES = (1 << len(NotificationPriority)) - 1
+
+
+class PreferenceCache:
+    """
+    用户通知偏好的进程内摘要
+
+    按站内信类型缓存一个优先级位集：第 p 位为 1 表示至少有一个用户会屏蔽该类型、优先级为 p 的站内信
+    （屏蔽了该类型，或设置的最低优先级高于 p）；另记录是否有用户设置了免打扰时段。
+    发送时据此决定 INSERT ... SELECT 是否需要关联偏好表，没有任何用户会屏蔽的站内信不做这次反连接。
+
+    摘要以 notification_preferences 表为准，由 sync() 周期性重建，本进程修改的偏好立即并入。
+    其他 worker 上第一个屏蔽某类型的用户最迟在一个同步周期后生效；此后该类型的发送都会关联偏好表，
+    按表中的最新偏好过滤。尚未同步过时视为所有站内信都可能被屏蔽。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocked: Optional[Dict[str, int]] = None
+        self._quiet_hours = False
+
+    @staticmethod
+    def _blocked_priorities(muted_types: int, min_priority: int) -> Dict[str, int]:
+        """单个用户的偏好展开为 类型 -> 被屏蔽的优先级位集"""
+        below = (1 << min_priority) - 1
+        return {
+            notification_type: ALL_PRIORITIES if muted_types & bit else below
+            for notification_type, bit in TYPE_BITS.items()
+            if notification_type not in EXEMPT_TYPES
+        }
+
+    def sync(self, db: Session) -> None:
+        """
+        从数据库重建摘要
+
+        只读取 (muted_types, min_priority, 是否设置免打扰) 的不同组合，结果行数与用户数无关。
+
+        Args:
+            db: 数据库会话
+        """
+        rows = (
+            db.query(
+                NotificationPreference.muted_types,
+                NotificationPreference.min_priority,
+                NotificationPreference.quiet_start.isnot(None),
+            )
+            .distinct()
+            .all()
+        )
+        blocked = dict.fromkeys(TYPE_BITS, 0)
+        quiet_hours = False
+        for muted_types, min_priority, has_quiet_hours in rows:
+            for notification_type, priorities in self._blocked_priorities(muted_types, min_priority).items():
+                blocked[notification_type] |= priorities
+            quiet_hours = quiet_hours or bool(has_quiet_hours)
+        with self._lock:
+            self._blocked = blocked
+            self._quiet_hours = quiet_hours
+
+    def add(self, preference: NotificationPreference) -> None:
+        """并入本进程刚保存的偏好（只会扩大屏蔽范围，取消屏蔽在下次同步时生效）"""
+        with self._lock:
+            if self._blocked is None:
+                return
+            for notification_type, priorities in self._blocked_priorities(
+                preference.muted_types, preference.min_priority
+            ).items():
+                self._blocked[notification_type] |= priorities
+            self._quiet_hours = self._quiet_hours or preference.quiet_start is not None
+
+    def may_block(self, notification_type: str, priority: int) -> Tuple[bool, bool]:
+        """
+        判断某类型、某优先级的站内信是否可能被用户偏好屏蔽
+
+        Args:
+            notification_type: 站内信类型
+            priority: 站内信优先级
+
+        Returns:
+            Tuple[bool, bool]: (是否可能被屏蔽类型或最低优先级过滤, 是否可能被免打扰时段过滤)
+        """
+        if notification_type in EXEMPT_TYPES:
+            return False, False
+        quiet = priority < QUIET_HOURS_BYPASS_PRIORITY
+        with self._lock:
+            if self._blocked is None:
+                return True, quiet
+            priorities = self._blocked.get(notification_type, ALL_PRIORITIES)
+            return bool(priorities >> priority & 1), quiet and self._quiet_hours
+
+
+preference_cache = PreferenceCache()
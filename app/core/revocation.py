@@ -0,0 +1,174 @@
+import hashlib
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.token import RevokedToken
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+
+    用于快速判断 jti "一定未被吊销"，存在假阳性但没有假阴性。
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # 双重哈希：用一次 blake2b 的两个 64 位分量模拟 k 个哈希函数
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        """添加元素"""
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class TokenRevocationCache:
+    """
+    Token 吊销缓存
+
+    每个 worker 进程在内存中维护一份吊销列表：
+    - 布隆过滤器：绝大多数"未吊销"的判断在这里直接返回，不访问数据库
+    - 精确集合：布隆过滤器命中时用于排除假阳性
+
+    吊销记录以 revoked_tokens 表为准，通过 sync() 周期性增量同步，
+    因此其他 worker 写入的吊销最迟在一个同步周期后生效。
+    """
+
+    # 增量同步时向前回看的时间窗口，避免遗漏提交较晚的记录
+    SYNC_OVERLAP = timedelta(seconds=30)
+
+    def __init__(self, capacity: int, error_rate: float, full_rebuild_interval: timedelta):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.full_rebuild_interval = full_rebuild_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked: Set[str] = set()
+        self._last_sync_at: Optional[datetime] = None
+        self._last_rebuild_at: Optional[datetime] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """
+        判断 jti 是否已被吊销
+
+        Args:
+            jti: Token 唯一标识（旧 Token 没有 jti，视为未吊销）
+
+        Returns:
+            bool: 是否已被吊销
+        """
+        if not jti:
+            return False
+        if jti not in self._bloom:
+            return False
+        return jti in self._revoked
+
+    def add(self, jti: str) -> None:
+        """将 jti 加入本地缓存（本进程内立即生效）"""
+        with self._lock:
+            self._bloom.add(jti)
+            self._revoked.add(jti)
+
+    def revoke(
+        self,
+        db: Session,
+        jti: str,
+        token_type: str,
+        expires_at: datetime,
+        user_id: Optional[str] = None,
+    ) -> None:
+        """
+        吊销 Token
+
+        Args:
+            db: 数据库会话
+            jti: Token 唯一标识
+            token_type: Token 类型
+            expires_at: Token 过期时间（过期后吊销记录可被清理）
+            user_id: 用户 ID
+        """
+        # 同一 Token 并发登出时先查后插会触发主键冲突，由 ON CONFLICT 保证只写入一次
+        db.execute(
+            insert(RevokedToken)
+            .values(jti=jti, user_id=user_id, token_type=token_type, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        db.commit()
+        self.add(jti)
+
+    def sync(self, db: Session) -> None:
+        """
+        从数据库同步吊销记录
+
+        平时只拉取上次同步之后的新增记录；每隔 full_rebuild_interval 全量重建一次，
+        以便丢弃已过期的 jti（布隆过滤器无法删除元素）。
+        """
+        now = datetime.now(timezone.utc)
+        full_rebuild = (
+            self._last_rebuild_at is None
+            or now - self._last_rebuild_at >= self.full_rebuild_interval
+        )
+
+        query = db.query(RevokedToken.jti).filter(RevokedToken.expires_at > now)
+        if not full_rebuild:
+            query = query.filter(RevokedToken.revoked_at >= self._last_sync_at - self.SYNC_OVERLAP)
+        jtis = [row.jti for row in query]
+
+        with self._lock:
+            if full_rebuild:
+                bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+                for jti in jtis:
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._revoked = set(jtis)
+                self._last_rebuild_at = now
+            else:
+                for jti in jtis:
+                    self._bloom.add(jti)
+                    self._revoked.add(jti)
+            self._last_sync_at = now
+
+    def purge_expired(self, db: Session) -> int:
+        """
+        删除已过期的吊销记录
+
+        Returns:
+            int: 删除的记录数
+        """
+        deleted = (
+            db.query(RevokedToken)
+            .filter(RevokedToken.expires_at <= datetime.now(timezone.utc))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+
+token_revocation = TokenRevocationCache(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    full_rebuild_interval=timedelta(minutes=settings.TOKEN_REVOCATION_REBUILD_MINUTES),
+)
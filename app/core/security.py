@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -60,7 +61,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expires_delta: 过期时间增量
 
     Returns:
-        str: JWT Token
+        str: JWT Token（包含唯一标识 jti，用于服务端吊销）
     """
     to_encode = data.copy()
     if expires_delta:
@@ -68,7 +69,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -78,14 +79,15 @@ def create_refresh_token(data: dict) -> str:
     创建 Refresh Token
 
     Args:
-        data: 要编码的数据（通常包含 user_id）
+        data: 要编码的数据（通常包含 user_id 和会话家族 ID fid，可指定 jti）
 
     Returns:
-        str: JWT Refresh Token
+        str: JWT Refresh Token（包含唯一标识 jti，用于服务端吊销）
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -0,0 +1,239 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.ids import uuid7
+from app.models.token import UserSession
+
+
+class SessionState:
+    """缓存中的会话快照"""
+
+    __slots__ = ("user_id", "current_jti", "expires_at", "revoked")
+
+    def __init__(self, user_id: str, current_jti: str, expires_at: datetime, revoked: bool):
+        self.user_id = user_id
+        self.current_jti = current_jti
+        self.expires_at = expires_at
+        self.revoked = revoked
+
+    @classmethod
+    def from_model(cls, session: UserSession) -> "SessionState":
+        return cls(
+            user_id=str(session.user_id),
+            current_jti=session.current_jti,
+            expires_at=_as_aware(session.expires_at),
+            revoked=session.revoked_at is not None,
+        )
+
+
+def _as_aware(value: datetime) -> datetime:
+    """统一为带时区的 UTC 时间"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionStore:
+    """
+    登录会话存储（Refresh Token 轮换）
+
+    每次登录创建一个 Token 家族（user_sessions 一行），家族内同一时刻只有一个有效的
+    Refresh Token（current_jti）。刷新时用条件 UPDATE 原子地轮换 jti；
+    出示已被轮换掉的旧 Token 视为重用（Token 泄露），整个家族立即失效。
+
+    热点会话状态缓存在进程内 LRU 中，缓存命中时刷新只需一次按主键的 UPDATE；
+    缓存可能落后于其他 worker，因此缓存未命中、与出示的 jti 不一致或 UPDATE 未命中时，
+    都先锁定会话行（SELECT ... FOR UPDATE）再以数据库为准判断是否重用。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, SessionState]" = OrderedDict()
+
+    def _cache_get(self, family_id: str) -> Optional[SessionState]:
+        with self._lock:
+            state = self._cache.get(family_id)
+            if state is not None:
+                self._cache.move_to_end(family_id)
+            return state
+
+    def _cache_put(self, family_id: str, state: SessionState) -> None:
+        with self._lock:
+            self._cache[family_id] = state
+            self._cache.move_to_end(family_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def _cache_pop(self, family_id: str) -> None:
+        with self._lock:
+            self._cache.pop(family_id, None)
+
+    def _load(self, db: Session, family_id: str, for_update: bool = False) -> Optional[SessionState]:
+        stmt = select(UserSession).where(UserSession.family_id == uuid.UUID(family_id))
+        if for_update:
+            stmt = stmt.with_for_update()
+        session = db.execute(stmt.execution_options(populate_existing=True)).scalar_one_or_none()
+        if session is None:
+            return None
+        state = SessionState.from_model(session)
+        self._cache_put(family_id, state)
+        return state
+
+    def create(self, db: Session, user_id: str) -> Tuple[str, str]:
+        """
+        创建会话（登录时调用）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+
+        Returns:
+            Tuple[str, str]: (family_id, 首个 Refresh Token 的 jti)
+        """
+        family_id = uuid7()
+        jti = uuid.uuid4().hex
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        db.add(
+            UserSession(
+                family_id=family_id,
+                user_id=user_id,
+                current_jti=jti,
+                generation=0,
+                expires_at=expires_at,
+            )
+        )
+        db.commit()
+        self._cache_put(str(family_id), SessionState(str(user_id), jti, expires_at, False))
+        return str(family_id), jti
+
+    def rotate(self, db: Session, family_id: str, user_id: str, presented_jti: str) -> Optional[str]:
+        """
+        轮换 Refresh Token
+
+        Args:
+            db: 数据库会话
+            family_id: 会话家族 ID
+            user_id: Token 中的用户 ID
+            presented_jti: 客户端出示的 Refresh Token jti
+
+        Returns:
+            Optional[str]: 新 Refresh Token 的 jti；会话无效、已过期或检测到重用时返回 None
+        """
+        state = self._cache_get(family_id)
+        if state is not None and (state.revoked or state.user_id != user_id):
+            return None
+        if self._is_usable(state, user_id) and presented_jti == state.current_jti:
+            new_jti = self._advance(db, family_id, user_id, presented_jti)
+            if new_jti is not None:
+                return new_jti
+
+        # 缓存未命中或已落后（其他 worker 已轮换、续期或吊销）：锁定会话行，以数据库为准判断，
+        # 避免把其他 worker 刚轮换出的合法 Token 误判为重用
+        state = self._load(db, family_id, for_update=True)
+        if not self._is_usable(state, user_id):
+            db.commit()
+            return None
+        if presented_jti != state.current_jti:
+            self.revoke_family(db, family_id)
+            return None
+        return self._advance(db, family_id, user_id, presented_jti)
+
+    def _advance(self, db: Session, family_id: str, user_id: str, presented_jti: str) -> Optional[str]:
+        """
+        条件 UPDATE 轮换 jti 并提交
+
+        Returns:
+            Optional[str]: 新的 jti；数据库中的当前 jti 已不是 presented_jti 或家族已吊销时返回 None
+        """
+        new_jti = uuid.uuid4().hex
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        result = db.execute(
+            update(UserSession)
+            .where(
+                UserSession.family_id == uuid.UUID(family_id),
+                UserSession.current_jti == presented_jti,
+                UserSession.revoked_at.is_(None),
+            )
+            .values(
+                current_jti=new_jti,
+                generation=UserSession.generation + 1,
+                expires_at=expires_at,
+            )
+        )
+        db.commit()
+        if result.rowcount == 0:
+            return None
+
+        self._cache_put(family_id, SessionState(user_id, new_jti, expires_at, False))
+        return new_jti
+
+    @staticmethod
+    def _is_usable(state: Optional[SessionState], user_id: str) -> bool:
+        return (
+            state is not None
+            and not state.revoked
+            and state.user_id == user_id
+            and state.expires_at > datetime.now(timezone.utc)
+        )
+
+    def revoke_family(self, db: Session, family_id: str) -> None:
+        """
+        吊销整个 Token 家族（检测到重用或登出时调用）
+
+        Args:
+            db: 数据库会话
+            family_id: 会话家族 ID
+        """
+        db.execute(
+            update(UserSession)
+            .where(UserSession.family_id == uuid.UUID(family_id), UserSession.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+        self._cache_pop(family_id)
+
+    def prune_expired(self, db: Session, batch_size: int) -> int:
+        """
+        分批删除已过期的会话
+
+        已吊销但未过期的家族会保留到过期，以便继续识别重用的旧 Token。
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批删除数量
+
+        Returns:
+            int: 删除的会话数量
+        """
+        total = 0
+        while True:
+            family_ids = [
+                row.family_id
+                for row in db.query(UserSession.family_id)
+                .filter(UserSession.expires_at <= datetime.now(timezone.utc))
+                .limit(batch_size)
+            ]
+            if not family_ids:
+                break
+
+            db.query(UserSession).filter(UserSession.family_id.in_(family_ids)).delete(
+                synchronize_session=False
+            )
+            db.commit()
+
+            for family_id in family_ids:
+                self._cache_pop(str(family_id))
+            total += len(family_ids)
+
+            if len(family_ids) < batch_size:
+                break
+        return total
+
+
+session_store = SessionStore(capacity=settings.SESSION_CACHE_SIZE)
@@ -0,0 +1,189 @@
+import string
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.models.template import NotificationTemplateVersion
+
+# 模板字段：站内信中由模板渲染的字段
+TEMPLATE_FIELDS = ("title", "content", "action_url")
+
+
+class TemplateError(ValueError):
+    """模板语法错误或渲染时缺少变量"""
+
+
+def _compile_source(source: str) -> Tuple[str, FrozenSet[str]]:
+    """
+    把 string.Template 语法（$name、${name}、$$）的模板编译为 str.format_map 的格式串
+
+    渲染时只调用一次 format_map（C 实现），不再逐次做正则匹配。
+
+    Returns:
+        Tuple[str, FrozenSet[str]]: (格式串, 引用的变量名)
+
+    Raises:
+        TemplateError: 模板中有无效的 $ 占位符
+    """
+    parts = []
+    names = set()
+    position = 0
+    for match in string.Template.pattern.finditer(source):
+        parts.append(source[position:match.start()].replace("{", "{{").replace("}", "}}"))
+        name = match.group("named") or match.group("braced")
+        if match.group("escaped") is not None:
+            parts.append("$")
+        elif name is not None:
+            parts.append("{" + name + "}")
+            names.add(name)
+        else:
+            raise TemplateError(f"模板语法错误：位置 {match.start()} 的 $ 后不是有效的变量名（字面量 $ 请写作 $$）")
+        position = match.end()
+    parts.append(source[position:].replace("{", "{{").replace("}", "}}"))
+    return "".join(parts), frozenset(names)
+
+
+class _Partial(dict):
+    """部分渲染用的变量：缺少的变量保留原占位符"""
+
+    def __missing__(self, key: str) -> str:
+        return "${" + key + "}"
+
+
+class CompiledTemplate:
+    """
+    编译后的站内信模板
+
+    各字段预先编译为格式串，渲染一个用户只需每个字段一次 format_map；
+    render_many 按字段批量渲染，适合发送时一次渲染大量用户。
+    """
+
+    __slots__ = ("_formats", "variables")
+
+    def __init__(self, title: str, content: str, action_url: Optional[str] = None):
+        self._formats: Dict[str, str] = {}
+        variables = set()
+        for field, source in zip(TEMPLATE_FIELDS, (title, content, action_url)):
+            if source is None:
+                continue
+            self._formats[field], names = _compile_source(source)
+            variables |= names
+        # 模板引用的全部变量名
+        self.variables: FrozenSet[str] = frozenset(variables)
+
+    def _missing(self, variables: Mapping[str, Any]) -> TemplateError:
+        missing = sorted(self.variables.difference(variables))
+        return TemplateError(f"缺少模板变量：{', '.join(missing)}")
+
+    def render(self, variables: Mapping[str, Any], partial: bool = False) -> Dict[str, Optional[str]]:
+        """
+        渲染一组变量
+
+        Args:
+            variables: 变量名 -> 值（非字符串的值按 str() 转换）
+            partial: 是否部分渲染（缺少的变量保留 ${name} 占位符，不报错）
+
+        Returns:
+            Dict[str, Optional[str]]: title、content、action_url（模板没有链接时为 None）
+
+        Raises:
+            TemplateError: 缺少模板引用的变量
+        """
+        if partial:
+            variables = _Partial(variables)
+        try:
+            rendered = {field: fmt.format_map(variables) for field, fmt in self._formats.items()}
+        except KeyError:
+            raise self._missing(variables)
+        rendered.setdefault("action_url", None)
+        return rendered
+
+    def render_many(
+        self, variables_list: Iterable[Mapping[str, Any]], partial: bool = False
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        批量渲染多组变量（每组对应一个用户）
+
+        按字段整列渲染，循环体只有 format_map 调用。
+
+        Args:
+            variables_list: 每个用户的变量
+            partial: 是否部分渲染（缺少的变量保留 ${name} 占位符，不报错）
+
+        Returns:
+            List[Dict[str, Optional[str]]]: 与 variables_list 顺序一致的渲染结果
+
+        Raises:
+            TemplateError: 任一组缺少模板引用的变量
+        """
+        variables_list = [_Partial(v) for v in variables_list] if partial else list(variables_list)
+        try:
+            columns = {field: list(map(fmt.format_map, variables_list)) for field, fmt in self._formats.items()}
+        except KeyError:
+            raise self._missing(next(v for v in variables_list if not self.variables.issubset(v)))
+        title = columns["title"]
+        content = columns["content"]
+        action_url = columns.get("action_url", [None] * len(variables_list))
+        return [
+            {"title": t, "content": c, "action_url": a}
+            for t, c, a in zip(title, content, action_url)
+        ]
+
+
+class TemplateCache:
+    """
+    编译后模板的进程内 LRU 缓存，按 (模板 ID, 版本) 缓存
+
+    模板的每个版本一经创建不再修改（修改模板会新建版本），因此缓存无需失效，
+    渲染已发送站内信时引用的旧版本也能命中。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, int], CompiledTemplate]" = OrderedDict()
+
+    def put(self, template_id, version: int, compiled: CompiledTemplate) -> None:
+        """放入编译后的模板（创建、修改模板时调用，避免随后的渲染再编译一次）"""
+        key = (str(template_id), version)
+        with self._lock:
+            self._cache[key] = compiled
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def get(self, db: Session, template_id, version: int) -> Optional[CompiledTemplate]:
+        """
+        获取编译后的模板，未命中时从 notification_template_versions 读取并编译
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+            version: 模板版本
+
+        Returns:
+            Optional[CompiledTemplate]: 编译后的模板，版本不存在时为 None
+        """
+        key = (str(template_id), version)
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+        if compiled is not None:
+            metrics.inc("template_cache_hits_total")
+            return compiled
+
+        metrics.inc("template_cache_misses_total")
+        row = db.get(NotificationTemplateVersion, (template_id, version))
+        if row is None:
+            return None
+        compiled = CompiledTemplate(row.title, row.content, row.action_url)
+        self.put(template_id, version, compiled)
+        return compiled
+
+
+template_cache = TemplateCache(settings.TEMPLATE_CACHE_SIZE)
@@ -1,10 +1,11 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import Generator, Optional
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.security import verify_access_token
+from app.core.revocation import token_revocation
 from app.models.user import User
 
 # 临时禁用认证的开关
@@ -26,9 +27,9 @@ def _get_or_create_default_user(db: Session) -> User:
         return default_user
 
     # 不存在则创建
-    from uuid import uuid4
+    from app.core.ids import uuid7
     default_user = User(
-        id=uuid4(),
+        id=uuid7(),
         username="test_user",
         email="test@example.com",
         password_hash="dummy_hash",  # 临时使用，不验证密码
@@ -63,6 +64,9 @@ def get_current_user_optional(
         if payload is None:
             return None
 
+        if token_revocation.is_revoked(payload.get("jti")):
+            return None
+
         user_id = payload.get("user_id")
         if user_id is None:
             return None
@@ -104,6 +108,10 @@ def get_current_user(
     if payload is None:
         raise credentials_exception
 
+    # 已吊销的 Token（如已登出）视为无效
+    if token_revocation.is_revoked(payload.get("jti")):
+        raise credentials_exception
+
     user_id = payload.get("user_id")
     if user_id is None:
         raise credentials_exception
@@ -125,3 +133,25 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     # TODO: 实现管理员角色系统
     # 目前暂时允许所有用户访问管理接口
     return current_user
+
+
+def get_idempotency_key(
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        min_length=1,
+        max_length=255,
+        description="幂等键：超时重试时携带相同的值，只执行一次并返回第一次的结果",
+    ),
+    current_user: User = Depends(get_current_user),
+) -> Optional[str]:
+    """
+    获取请求的幂等键
+
+    幂等键按 用户 + 方法 + 路径 限定作用域，不同用户或不同接口使用相同的值互不影响；
+    未提供 Idempotency-Key 头时返回 None
+    """
+    if idempotency_key is None:
+        return None
+    return f"{current_user.id} {request.method} {request.url.path} {idempotency_key}"
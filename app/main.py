@@ -1,8 +1,54 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.api.v1 import auth, notifications
-from app.api.v1.admin import admin_notifications
+from app.api.v1.admin import (
+    admin_notifications,
+    admin_users,
+    admin_jobs,
+    admin_metrics,
+    admin_segments,
+    admin_templates,
+)
+from app.tasks.periodic import start_periodic_tasks, stop_periodic_tasks
+from app.tasks import (  # 导入即注册后台任务
+    token_revocation,
+    sessions,
+    partitions,
+    archive,
+    purge,
+    segments,
+    idempotency,
+    inbox_trim,
+    preferences,
+    deferrals,
+)
+from app.tasks.expiry import expiry_sweeper
+from app.tasks.fanout import fanout_executor
+from app.tasks.scheduler import scheduled_send_dispatcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动/停止后台任务"""
+    # 先加载一次吊销列表，避免启动后第一个同步周期内放行已吊销的 Token
+    token_revocation.sync_revoked_tokens()
+    # 先加载一次偏好摘要，否则第一个同步周期内的发送都要关联偏好表
+    preferences.sync_preferences()
+    # 确保当月及未来的分区存在，否则新记录无处写入
+    partitions.ensure_future_partitions()
+    start_periodic_tasks()
+    expiry_sweeper.start()
+    fanout_executor.start()
+    scheduled_send_dispatcher.start()
+    yield
+    scheduled_send_dispatcher.stop(timeout=5)
+    fanout_executor.stop(timeout=5)
+    expiry_sweeper.stop(timeout=5)
+    stop_periodic_tasks()
+
 
 # 创建 FastAPI 应用
 app = FastAPI(
@@ -12,6 +58,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
+    lifespan=lifespan,
 )
 
 # 配置 CORS
@@ -33,6 +80,11 @@ app.include_router(
     prefix=f"{settings.API_V1_PREFIX}/admin",
     tags=["站内信管理"],
 )
+app.include_router(admin_segments.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["受众分群"])
+app.include_router(admin_templates.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["站内信模板"])
+app.include_router(admin_users.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["用户管理"])
+app.include_router(admin_jobs.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["后台作业"])
+app.include_router(admin_metrics.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["运行指标"])
 
 
 @app.get("/")
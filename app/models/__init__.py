@@ -1,5 +1,41 @@
 """数据库模型"""
 from app.models.user import User
-from app.models.notification import Notification, NotificationRecord
+from app.models.notification import (
+    Notification,
+    NotificationContent,
+    NotificationRecord,
+    NotificationDelivery,
+    NotificationDeferral,
+    NotificationRecordArchive,
+    NotificationCounter,
+    ScheduledSend,
+    Fanout,
+    FanoutPartition,
+)
+from app.models.segment import Segment, SegmentMember
+from app.models.template import NotificationTemplate, NotificationTemplateVersion
+from app.models.preference import NotificationPreference
+from app.models.token import RevokedToken, UserSession
+from app.models.idempotency import IdempotencyKey
 
-__all__ = ["User", "Notification", "NotificationRecord"]
+__all__ = [
+    "User",
+    "Notification",
+    "NotificationContent",
+    "NotificationRecord",
+    "NotificationDelivery",
+    "NotificationDeferral",
+    "NotificationRecordArchive",
+    "NotificationCounter",
+    "ScheduledSend",
+    "Fanout",
+    "FanoutPartition",
+    "Segment",
+    "SegmentMember",
+    "NotificationTemplate",
+    "NotificationTemplateVersion",
+    "NotificationPreference",
+    "RevokedToken",
+    "UserSession",
+    "IdempotencyKey",
+]
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """幂等键表：记录带 Idempotency-Key 的写请求及其结果，重试时直接返回原结果"""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True, comment="幂等键摘要（用户 + 方法 + 路径 + Idempotency-Key）")
+    request_hash = Column(String(64), nullable=False, comment="请求体摘要（同一幂等键只能用于相同的请求）")
+    response = Column(JSONB, nullable=True, comment="响应内容（为空表示请求仍在处理）")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    locked_until = Column(
+        DateTime(timezone=True), nullable=True, comment="处理中的占用期限（超时未完成时允许重试接管，完成后为空）"
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="过期时间")
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key}, completed={self.response is not None})>"
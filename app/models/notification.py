@@ -1,12 +1,12 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Boolean, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Boolean, Index, false, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import uuid
 import enum
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 
 class NotificationType(str, enum.Enum):
@@ -24,15 +24,46 @@ class NotificationPriority(str, enum.Enum):
     URGENT = 2  # 紧急
 
 
+class ScheduledSendStatus(str, enum.Enum):
+    """定时发送状态枚举"""
+    PENDING = "pending"  # 等待发送
+    RUNNING = "running"  # 发送中
+    SENT = "sent"  # 已发送
+    FAILED = "failed"  # 发送失败
+    CANCELLED = "cancelled"  # 已取消
+
+
+class FanoutStatus(str, enum.Enum):
+    """全员发送（及其分区）状态枚举"""
+    PENDING = "pending"  # 等待发送
+    RUNNING = "running"  # 发送中
+    DONE = "done"  # 已完成
+    FAILED = "failed"  # 发送失败
+
+
+class NotificationContent(Base):
+    """站内信共享正文表：按内容去重创建的站内信只引用正文，内容相同的站内信共用一行"""
+
+    __tablename__ = "notification_contents"
+
+    content_hash = Column(String(64), primary_key=True, comment="正文摘要")
+    content = Column(Text, nullable=False, comment="正文")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+
+    def __repr__(self):
+        return f"<NotificationContent(content_hash={self.content_hash})>"
+
+
 class Notification(Base):
     """站内信内容表"""
 
     __tablename__ = "notifications"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     type = Column(String(50), nullable=False, index=True, comment="站内信类型")
     title = Column(String(200), nullable=False, comment="标题")
-    content = Column(Text, nullable=False, comment="内容")
+    # 按内容去重创建的站内信不在本行保存正文（为空），读取 content 时取共享正文
+    body = Column("content", Text, nullable=True, comment="内容（为空表示使用 content_hash 对应的共享正文）")
     action_url = Column(String(500), nullable=True, comment="点击跳转链接")
     priority = Column(Integer, default=0, nullable=False, comment="优先级 0:普通 1:重要 2:紧急")
     created_by = Column(
@@ -48,6 +79,50 @@ class Notification(Base):
         comment="创建时间",
     )
     expires_at = Column(DateTime(timezone=True), nullable=True, comment="过期时间")
+    sent_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="首次发送时间（该站内信记录 created_at 的下界，首次发送时写入）",
+    )
+    expiry_processed_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="过期处理时间（已从未读计数中扣除；撤回、删除作业逐批扣除，撤回作业删完后写入）",
+    )
+    expiry_cursor = Column(
+        UUID(as_uuid=True),
+        nullable=True,
+        comment="过期处理进度（分批扣除未读计数时已处理的最后一个用户 ID，处理完后清空）",
+    )
+    deleted_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="删除时间（逻辑删除，记录由后台作业分批物理删除并扣减未读计数）",
+    )
+    recalled_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="撤回时间（内容保留，用户记录由后台作业分批删除）",
+    )
+    collapse_key = Column(
+        String(100),
+        nullable=True,
+        comment="折叠键：发送时用户已有同键、同类型的未读记录则更新该记录，不再新增",
+    )
+    content_hash = Column(
+        String(64),
+        ForeignKey("notification_contents.content_hash"),
+        nullable=True,
+        comment="共享正文摘要（按内容去重创建时写入；修改站内信后正文写回本行并清空）",
+    )
+    template_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notification_templates.id"),
+        nullable=True,
+        comment="模板 ID（由模板渲染创建时写入；修改标题、内容或链接后清空）",
+    )
+    template_version = Column(Integer, nullable=True, comment="渲染时使用的模板版本")
+    variables = Column(JSONB, nullable=True, comment="渲染时使用的模板变量")
 
     # 关系
     created_by_user = relationship(
@@ -55,12 +130,56 @@ class Notification(Base):
         back_populates="created_notifications",
         foreign_keys=[created_by],
     )
+    # selectin：不改变站内信查询本身（部分查询带 FOR UPDATE，不能外连接）
+    shared_content = relationship("NotificationContent", lazy="selectin")
+    # passive_deletes：删除站内信时交给数据库的 ON DELETE CASCADE，不把全部记录加载到会话中
     records = relationship(
         "NotificationRecord",
         back_populates="notification",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # 清理任务按过期时间扫描已过期的站内信
+        Index(
+            "ix_notifications_expires_at",
+            "expires_at",
+            postgresql_where=text("expires_at IS NOT NULL"),
+        ),
+        # 发送时按折叠键查找同键的站内信
+        Index(
+            "ix_notifications_collapse_key",
+            "collapse_key",
+            postgresql_where=text("collapse_key IS NOT NULL"),
+        ),
+        # 按共享正文查找引用它的站内信
+        Index(
+            "ix_notifications_content_hash",
+            "content_hash",
+            postgresql_where=text("content_hash IS NOT NULL"),
+        ),
+        # 查询未读数时找出删除、撤回作业尚未扣完计数的站内信（只包含正在处理的少量行）
+        Index(
+            "ix_notifications_pending_removal",
+            "id",
+            postgresql_where=text(
+                "expiry_processed_at IS NULL AND (deleted_at IS NOT NULL OR recalled_at IS NOT NULL)"
+            ),
+        ),
     )
 
+    @property
+    def content(self) -> str:
+        """内容：本行保存的正文，或按内容去重创建时的共享正文"""
+        if self.body is None and self.shared_content is not None:
+            return self.shared_content.content
+        return self.body
+
+    @content.setter
+    def content(self, value: str) -> None:
+        self.body = value
+
     def __repr__(self):
         return f"<Notification(id={self.id}, type={self.type}, title={self.title})>"
 
@@ -70,38 +189,335 @@ class NotificationRecord(Base):
 
     __tablename__ = "notification_records"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7, server_default=text("uuid_generate_v7()"))
     notification_id = Column(
         UUID(as_uuid=True),
         ForeignKey("notifications.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
         comment="站内信 ID",
     )
     user_id = Column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
         comment="用户 ID",
     )
-    is_read = Column(Boolean, default=False, nullable=False, comment="是否已读")
+    is_read = Column(Boolean, default=False, server_default=false(), nullable=False, comment="是否已读")
     read_at = Column(DateTime(timezone=True), nullable=True, comment="阅读时间")
-    is_deleted = Column(Boolean, default=False, nullable=False, comment="是否已删除")
+    is_deleted = Column(Boolean, default=False, server_default=false(), nullable=False, comment="是否已删除")
     deleted_at = Column(DateTime(timezone=True), nullable=True, comment="删除时间")
+    collapse_count = Column(
+        Integer, default=1, server_default=text("1"), nullable=False, comment="折叠的投递次数（按折叠键合并）"
+    )
+    variables = Column(
+        JSONB, nullable=True, comment="该用户的模板变量（个性化发送时写入，读取时与站内信的共享变量合并渲染）"
+    )
+    # 分区键：表按 created_at 月份做 RANGE 分区，分区表的主键必须包含分区键
     created_at = Column(
         DateTime(timezone=True),
+        primary_key=True,
         server_default=func.now(),
         nullable=False,
-        comment="创建时间",
+        comment="创建时间（送达时间）",
     )
 
     # 关系
     notification = relationship("Notification", back_populates="records")
     user = relationship("User", back_populates="notification_records")
 
-    # 唯一约束：一个用户只能收到一次同一条站内信
-    __table_args__ = (UniqueConstraint("notification_id", "user_id", name="unique_notification_user"),)
+    # 分区表的唯一索引必须包含分区键，"一个用户只能收到一次同一条站内信"由 notification_deliveries 的主键保证
+    __table_args__ = (
+        Index("ix_notification_records_notification_user", "notification_id", "user_id"),
+        Index("ix_notification_records_user_created", "user_id", "created_at"),
+        # 清理任务按 (created_at, id) 键集遍历软删除的记录
+        Index(
+            "ix_notification_records_deleted",
+            "created_at",
+            "id",
+            postgresql_where=text("is_deleted"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     def __repr__(self):
         return f"<NotificationRecord(id={self.id}, notification_id={self.notification_id}, user_id={self.user_id}, is_read={self.is_read})>"
+
+
+class NotificationDelivery(Base):
+    """站内信送达表
+
+    每个 (站内信, 用户) 送达过一次即有一行，不分区、只有两个 UUID 列。发送时先在此占位（ON CONFLICT DO NOTHING），
+    只为占位成功的用户写入记录，并发或重试的发送因此不会重复写入。记录被归档、清理或从收件箱中清出后该行仍保留，
+    之后重复发送也不会再次送达；站内信删除时级联删除。
+    """
+
+    __tablename__ = "notification_deliveries"
+
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notifications.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="站内信 ID",
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="用户 ID",
+    )
+
+    def __repr__(self):
+        return f"<NotificationDelivery(notification_id={self.notification_id}, user_id={self.user_id})>"
+
+
+class NotificationDeferral(Base):
+    """免打扰推迟送达表
+
+    发送时处于免打扰时段（且未屏蔽该站内信）的用户不写入记录，改为在此登记，
+    免打扰结束后由后台任务按普通发送写入记录（重新按偏好判断、按 (站内信, 用户) 去重）。
+    """
+
+    __tablename__ = "notification_deferrals"
+
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notifications.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="站内信 ID",
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="用户 ID",
+    )
+    deliver_after = Column(DateTime(timezone=True), nullable=False, index=True, comment="送达时间（免打扰结束时间）")
+    variables = Column(JSONB, nullable=True, comment="该用户的模板变量（个性化发送时写入）")
+
+    def __repr__(self):
+        return f"<NotificationDeferral(notification_id={self.notification_id}, user_id={self.user_id})>"
+
+
+class NotificationRecordArchive(Base):
+    """站内信记录归档表（冷数据）
+
+    只保存超过归档期限的已读、未删除记录，去掉了热表中对归档数据无意义的状态列。
+    用户删除归档记录时同样是软删除。
+    """
+
+    __tablename__ = "notification_records_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, comment="记录 ID（沿用热表中的 ID）")
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notifications.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="站内信 ID",
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="用户 ID",
+    )
+    read_at = Column(DateTime(timezone=True), nullable=True, comment="阅读时间")
+    collapse_count = Column(
+        Integer, default=1, server_default=text("1"), nullable=False, comment="折叠的投递次数（按折叠键合并）"
+    )
+    variables = Column(JSONB, nullable=True, comment="该用户的模板变量")
+    deleted_at = Column(DateTime(timezone=True), nullable=True, comment="删除时间（软删除）")
+    created_at = Column(DateTime(timezone=True), nullable=False, comment="创建时间")
+
+    # 关系
+    notification = relationship("Notification")
+
+    __table_args__ = (Index("ix_notification_records_archive_user_created", "user_id", "created_at"),)
+
+    @property
+    def is_read(self) -> bool:
+        """归档记录均为已读"""
+        return True
+
+    def __repr__(self):
+        return f"<NotificationRecordArchive(id={self.id}, notification_id={self.notification_id}, user_id={self.user_id})>"
+
+
+class NotificationCounter(Base):
+    """用户站内信计数表
+
+    按 (用户, 站内信类型) 维护未过期、未删除的未读记录数，读取未读数时无需统计记录表。
+    发送、标记已读、删除以及站内信过期时同步增减。
+
+    record_count 是收件箱记录数的上界：发送时累加，删除、归档时不扣减，
+    收件箱容量控制按它挑出可能超限的用户，清理后按记录表重算并写入 trimmed_at。
+    """
+
+    __tablename__ = "notification_counters"
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="用户 ID",
+    )
+    type = Column(String(50), primary_key=True, comment="站内信类型")
+    unread_count = Column(Integer, default=0, server_default=text("0"), nullable=False, comment="未读数量")
+    record_count = Column(
+        Integer, default=0, server_default=text("0"), nullable=False, comment="收件箱记录数（上界）"
+    )
+    trimmed_at = Column(
+        DateTime(timezone=True), nullable=True, comment="收件箱容量最近一次检查时间（超限用户按它轮流处理）"
+    )
+
+    def __repr__(self):
+        return f"<NotificationCounter(user_id={self.user_id}, type={self.type}, unread_count={self.unread_count})>"
+
+
+class ScheduledSend(Base):
+    """定时发送队列表
+
+    到期的发送由进程内的时间轮调度器触发（见 app/tasks/scheduler.py）。
+    """
+
+    __tablename__ = "scheduled_sends"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notifications.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="站内信 ID",
+    )
+    send_to_all = Column(Boolean, default=False, server_default=false(), nullable=False, comment="是否发送给所有用户")
+    user_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=True, comment="接收用户 ID 列表")
+    variables = Column(JSONB, nullable=True, comment="按用户的模板变量（用户 ID -> 变量）")
+    audience = Column(JSONB, nullable=True, comment="受众规则")
+    segment_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("segments.id", ondelete="CASCADE"),
+        nullable=True,
+        comment="受众分群 ID",
+    )
+    scheduled_at = Column(DateTime(timezone=True), nullable=False, comment="计划发送时间")
+    status = Column(
+        String(20),
+        default=ScheduledSendStatus.PENDING.value,
+        server_default=ScheduledSendStatus.PENDING.value,
+        nullable=False,
+        comment="状态",
+    )
+    attempts = Column(Integer, default=0, server_default=text("0"), nullable=False, comment="已尝试次数")
+    sent_count = Column(Integer, nullable=True, comment="成功发送的用户数量")
+    error = Column(Text, nullable=True, comment="最近一次失败原因")
+    created_by = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="创建者 ID",
+    )
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    claimed_at = Column(DateTime(timezone=True), nullable=True, comment="被调度器领取的时间")
+    heartbeat_at = Column(
+        DateTime(timezone=True), nullable=True, comment="发送中最近一次心跳时间（超时未续约视为执行进程已退出）"
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="完成时间")
+
+    # 调度器按计划时间装载未完成的发送
+    __table_args__ = (
+        Index(
+            "ix_scheduled_sends_due",
+            "scheduled_at",
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<ScheduledSend(id={self.id}, notification_id={self.notification_id}, scheduled_at={self.scheduled_at}, status={self.status})>"
+
+
+class Fanout(Base):
+    """全员发送表
+
+    一次“发送给所有用户”（或符合受众规则、属于某个分群的用户）按用户 ID 切成若干分区，
+    由扩散执行器并行发送（见 app/tasks/fanout.py）。
+    """
+
+    __tablename__ = "fanouts"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notifications.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="站内信 ID",
+    )
+    priority = Column(Integer, default=0, server_default=text("0"), nullable=False, comment="发送时的站内信优先级")
+    audience = Column(JSONB, nullable=True, comment="受众规则（为空表示所有用户）")
+    segment_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("segments.id", ondelete="CASCADE"),
+        nullable=True,
+        comment="受众分群 ID（为空表示所有用户）",
+    )
+    status = Column(
+        String(20),
+        default=FanoutStatus.RUNNING.value,
+        server_default=FanoutStatus.RUNNING.value,
+        nullable=False,
+        comment="状态",
+    )
+    error = Column(Text, nullable=True, comment="中止原因")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="完成时间")
+
+    partitions = relationship(
+        "FanoutPartition",
+        back_populates="fanout",
+        order_by="FanoutPartition.partition",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    def __repr__(self):
+        return f"<Fanout(id={self.id}, notification_id={self.notification_id}, status={self.status})>"
+
+
+class FanoutPartition(Base):
+    """全员发送分区表
+
+    每个分区覆盖 (cursor, upper_user_id] 范围内的用户，每发送一块就推进 cursor，
+    失败的分区可以单独从断点重试。
+    """
+
+    __tablename__ = "fanout_partitions"
+
+    fanout_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("fanouts.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="全员发送 ID",
+    )
+    partition = Column(Integer, primary_key=True, comment="分区序号")
+    cursor = Column(UUID(as_uuid=True), nullable=True, comment="已发送到的用户 ID（不含，为空表示从头开始）")
+    upper_user_id = Column(UUID(as_uuid=True), nullable=True, comment="分区上界用户 ID（含，为空表示不设上界）")
+    status = Column(
+        String(20),
+        default=FanoutStatus.PENDING.value,
+        server_default=FanoutStatus.PENDING.value,
+        nullable=False,
+        comment="状态",
+    )
+    sent_count = Column(Integer, default=0, server_default=text("0"), nullable=False, comment="已发送的用户数量")
+    attempts = Column(Integer, default=1, server_default=text("1"), nullable=False, comment="已尝试次数")
+    error = Column(Text, nullable=True, comment="最近一次失败原因")
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间"
+    )
+
+    fanout = relationship("Fanout", back_populates="partitions")
+
+    def __repr__(self):
+        return f"<FanoutPartition(fanout_id={self.fanout_id}, partition={self.partition}, status={self.status})>"
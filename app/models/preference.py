@@ -0,0 +1,52 @@
+from sqlalchemy import Column, Integer, SmallInteger, DateTime, ForeignKey, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.models.notification import NotificationType
+
+# 站内信类型 -> 在 muted_types 位掩码中的位（按 NotificationType 成员顺序，只能在末尾追加新类型）
+TYPE_BITS = {member.value: 1 << index for index, member in enumerate(NotificationType)}
+
+
+def type_bit(notification_type) -> int:
+    """站内信类型在 muted_types 中对应的位（未知类型为 0）"""
+    return TYPE_BITS.get(getattr(notification_type, "value", notification_type), 0)
+
+
+class NotificationPreference(Base):
+    """用户通知偏好表
+
+    每个用户一行，没有行表示全部默认（不屏蔽任何站内信）。
+    屏蔽的类型存为位掩码，免打扰时段换算为 UTC 的分钟数，发送时可直接在 SQL 中按位判断。
+    """
+
+    __tablename__ = "notification_preferences"
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="用户 ID",
+    )
+    muted_types = Column(
+        Integer, default=0, server_default=text("0"), nullable=False, comment="屏蔽的站内信类型位掩码"
+    )
+    min_priority = Column(
+        SmallInteger, default=0, server_default=text("0"), nullable=False, comment="接收的最低优先级"
+    )
+    quiet_start = Column(SmallInteger, nullable=True, comment="免打扰开始（UTC 当天第几分钟）")
+    quiet_end = Column(SmallInteger, nullable=True, comment="免打扰结束（UTC 当天第几分钟，不含）")
+    utc_offset_minutes = Column(
+        SmallInteger, default=0, server_default=text("0"), nullable=False, comment="用户所在时区相对 UTC 的分钟数"
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="更新时间",
+    )
+
+    def __repr__(self):
+        return f"<NotificationPreference(user_id={self.user_id}, muted_types={self.muted_types})>"
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.core.ids import uuid7
+
+
+class Segment(Base):
+    """受众分群表
+
+    按受众规则定期刷新成员（segment_members），重复发给同一批用户时不必每次重新计算规则。
+    """
+
+    __tablename__ = "segments"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    name = Column(String(100), unique=True, nullable=False, comment="分群名称")
+    audience = Column(JSONB, nullable=False, comment="受众规则")
+    refresh_interval_seconds = Column(
+        Integer, default=3600, server_default=text("3600"), nullable=False, comment="成员刷新间隔（秒）"
+    )
+    member_count = Column(Integer, default=0, server_default=text("0"), nullable=False, comment="成员数量")
+    refreshed_at = Column(DateTime(timezone=True), nullable=True, comment="最近一次刷新时间（为空表示尚未刷新）")
+    created_by = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="创建者 ID",
+    )
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+
+    def __repr__(self):
+        return f"<Segment(id={self.id}, name={self.name}, member_count={self.member_count})>"
+
+
+class SegmentMember(Base):
+    """受众分群成员表（只有两个 UUID 列，按 (segment_id, user_id) 有序存放）"""
+
+    __tablename__ = "segment_members"
+
+    segment_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("segments.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="分群 ID",
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,  # 删除用户时级联删除成员
+        comment="用户 ID",
+    )
+
+    def __repr__(self):
+        return f"<SegmentMember(segment_id={self.segment_id}, user_id={self.user_id})>"
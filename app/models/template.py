@@ -0,0 +1,68 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.core.ids import uuid7
+
+
+class NotificationTemplate(Base):
+    """站内信模板表
+
+    模板内容按版本保存在 notification_template_versions 中，修改模板会新建版本，
+    已有站内信仍引用创建时的版本。删除模板为逻辑删除，已发送站内信仍可按原版本渲染。
+    """
+
+    __tablename__ = "notification_templates"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    name = Column(String(100), nullable=False, comment="模板名称（未删除的模板中唯一）")
+    version = Column(Integer, default=1, server_default=text("1"), nullable=False, comment="当前版本")
+    created_by = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="创建者 ID",
+    )
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="更新时间",
+    )
+    deleted_at = Column(DateTime(timezone=True), nullable=True, comment="删除时间（逻辑删除）")
+
+    __table_args__ = (
+        Index(
+            "ix_notification_templates_name",
+            "name",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<NotificationTemplate(id={self.id}, name={self.name}, version={self.version})>"
+
+
+class NotificationTemplateVersion(Base):
+    """站内信模板版本表（创建后不再修改，编译结果按 (模板, 版本) 缓存）"""
+
+    __tablename__ = "notification_template_versions"
+
+    template_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("notification_templates.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="模板 ID",
+    )
+    version = Column(Integer, primary_key=True, comment="版本号")
+    title = Column(String(200), nullable=False, comment="标题模板")
+    content = Column(Text, nullable=False, comment="内容模板")
+    action_url = Column(String(500), nullable=True, comment="跳转链接模板")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+
+    def __repr__(self):
+        return f"<NotificationTemplateVersion(template_id={self.template_id}, version={self.version})>"
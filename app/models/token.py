@@ -0,0 +1,59 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class RevokedToken(Base):
+    """已吊销 Token 表"""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True, comment="Token 唯一标识")
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=True,
+        comment="用户 ID",
+    )
+    token_type = Column(String(20), nullable=False, comment="Token 类型 access/refresh")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="Token 过期时间")
+    revoked_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+        comment="吊销时间",
+    )
+
+    def __repr__(self):
+        return f"<RevokedToken(jti={self.jti}, token_type={self.token_type})>"
+
+
+class UserSession(Base):
+    """登录会话表（Refresh Token 家族）"""
+
+    __tablename__ = "user_sessions"
+
+    family_id = Column(UUID(as_uuid=True), primary_key=True, comment="Token 家族 ID")
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="用户 ID",
+    )
+    current_jti = Column(String(64), nullable=False, comment="当前有效的 Refresh Token jti")
+    generation = Column(Integer, default=0, nullable=False, comment="轮换次数")
+    revoked_at = Column(DateTime(timezone=True), nullable=True, comment="吊销时间（检测到重用或登出）")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="会话过期时间")
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="创建时间",
+    )
+
+    def __repr__(self):
+        return f"<UserSession(family_id={self.family_id}, user_id={self.user_id}, generation={self.generation})>"
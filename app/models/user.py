@@ -3,10 +3,10 @@ from sqlalchemy import Column, String, DateTime, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import uuid
 import enum
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 
 class UserStatus(str, enum.Enum):
@@ -22,7 +22,7 @@ class User(Base):
 
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     username = Column(String(50), unique=True, nullable=False, index=True, comment="用户名")
     email = Column(String(100), unique=True, nullable=False, index=True, comment="邮箱")
     password_hash = Column(String(255), nullable=False, comment="密码哈希")
@@ -11,10 +11,17 @@ from app.schemas.notification import (
     NotificationUpdate,
     NotificationResponse,
     NotificationListResponse,
+    AudienceRule,
     NotificationSendRequest,
+    SendEstimateResponse,
     NotificationRecordResponse,
     NotificationRecordListResponse,
+    ScheduledSendResponse,
+    FanoutPartitionResponse,
+    FanoutResponse,
 )
+from app.schemas.segment import SegmentCreate, SegmentResponse
+from app.schemas.job import JobResponse
 
 __all__ = [
     "UserCreate",
@@ -26,7 +33,15 @@ __all__ = [
     "NotificationUpdate",
     "NotificationResponse",
     "NotificationListResponse",
+    "AudienceRule",
     "NotificationSendRequest",
+    "SendEstimateResponse",
     "NotificationRecordResponse",
     "NotificationRecordListResponse",
+    "ScheduledSendResponse",
+    "FanoutPartitionResponse",
+    "FanoutResponse",
+    "SegmentCreate",
+    "SegmentResponse",
+    "JobResponse",
 ]
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    """后台作业状态响应"""
+
+    id: str
+    kind: str
+    status: str
+    total: Optional[int] = None
+    processed: int
+    succeeded: int
+    failed: int
+    errors: List[Dict[str, Any]]
+    result: Dict[str, Any]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,19 +1,49 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from uuid import UUID
-from pydantic import BaseModel, Field, field_serializer
+from pydantic import BaseModel, Field, field_serializer, model_validator
 from app.models.notification import NotificationType
+from app.models.user import UserStatus
 
 
 class NotificationCreate(BaseModel):
     """创建站内信请求"""
 
     type: NotificationType = Field(..., description="站内信类型")
-    title: str = Field(..., min_length=1, max_length=200, description="标题")
-    content: str = Field(..., min_length=1, description="内容")
-    action_url: Optional[str] = Field(None, max_length=500, description="点击跳转链接")
+    title: Optional[str] = Field(None, min_length=1, max_length=200, description="标题（未指定模板时必填）")
+    content: Optional[str] = Field(None, min_length=1, description="内容（未指定模板时必填）")
+    action_url: Optional[str] = Field(None, max_length=500, description="点击跳转链接（模板没有链接时使用）")
     priority: int = Field(default=0, ge=0, le=2, description="优先级 0:普通 1:重要 2:紧急")
     expires_at: Optional[datetime] = Field(None, description="过期时间")
+    template_id: Optional[UUID] = Field(None, description="模板 ID：指定时标题、内容由模板渲染")
+    template_version: Optional[int] = Field(None, ge=1, description="模板版本（为空表示当前版本）")
+    variables: Optional[Dict[str, Any]] = Field(None, description="模板变量（所有用户共享）")
+    personalized: bool = Field(
+        default=False,
+        description="按用户个性化：模板中 variables 未提供的变量在发送时按用户提供，用户读取时再合并渲染",
+    )
+    collapse_key: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=100,
+        description="折叠键：发送时用户已有同键、同类型的未读记录则更新该记录（次数加一、显示最新内容），不再新增",
+    )
+    dedupe: bool = Field(
+        default=False,
+        description="按内容去重：正文存入共享正文表，正文相同的站内信共用一份（每次创建仍是独立的站内信，照常送达）",
+    )
+
+    @model_validator(mode="after")
+    def check_content(self) -> "NotificationCreate":
+        """指定模板时由模板渲染标题和内容，否则必须直接给出"""
+        if self.template_id is not None:
+            if self.title is not None or self.content is not None:
+                raise ValueError("指定模板时不能同时指定 title、content")
+        elif self.title is None or self.content is None:
+            raise ValueError("未指定模板时 title、content 必填")
+        elif self.personalized:
+            raise ValueError("personalized 只能用于由模板创建的站内信")
+        return self
 
 
 class NotificationUpdate(BaseModel):
@@ -27,11 +57,43 @@ class NotificationUpdate(BaseModel):
     expires_at: Optional[datetime] = Field(None, description="过期时间")
 
 
+class AudienceRule(BaseModel):
+    """受众规则：各条件同时满足的用户，在数据库中筛选"""
+
+    statuses: Optional[List[UserStatus]] = Field(None, description="用户状态（满足其一）")
+    last_login_after: Optional[datetime] = Field(None, description="最后登录时间不早于")
+    last_login_before: Optional[datetime] = Field(None, description="最后登录时间早于")
+    created_after: Optional[datetime] = Field(None, description="注册时间不早于")
+    created_before: Optional[datetime] = Field(None, description="注册时间早于")
+    received_notification_id: Optional[UUID] = Field(None, description="收到过该站内信的用户")
+    read_notification_id: Optional[UUID] = Field(None, description="读过该站内信的用户")
+    unread_notification_id: Optional[UUID] = Field(None, description="收到该站内信但尚未阅读的用户")
+
+
 class NotificationSendRequest(BaseModel):
     """发送站内信请求"""
 
     user_ids: List[str] = Field(default_factory=list, description="用户 ID 列表（send_to_all=False 时必填）")
     send_to_all: bool = Field(default=False, description="是否发送给所有用户")
+    audience: Optional[AudienceRule] = Field(None, description="受众规则（与 send_to_all、segment_id 互斥，指定时忽略 user_ids）")
+    segment_id: Optional[UUID] = Field(None, description="受众分群 ID（与 send_to_all、audience 互斥，指定时忽略 user_ids）")
+    variables: Optional[Dict[str, Dict[str, Any]]] = Field(
+        None, description="按用户的模板变量（用户 ID -> 变量，只能用于发送给 user_ids，覆盖站内信的共享变量）"
+    )
+    scheduled_at: Optional[datetime] = Field(None, description="计划发送时间（为空或已过去时立即发送）")
+
+
+class SendEstimateResponse(BaseModel):
+    """发送预估响应"""
+
+    estimated_recipients: int = Field(..., description="预计覆盖的用户数")
+    already_delivered: int = Field(..., description="其中已收到该站内信、发送时将被跳过的用户数")
+    estimated_new: int = Field(..., description="预计新写入的记录数")
+    exact: bool = Field(..., description="以上数量是否为精确值（否则来自查询规划器统计信息）")
+    priority: int = Field(..., description="站内信优先级")
+    lane: Optional[str] = Field(None, description="发送所在的优先级通道")
+    rows_per_second: Optional[float] = Field(None, description="用于预估耗时的写入速率（行/秒）")
+    estimated_seconds: Optional[float] = Field(None, description="预计耗时（秒，尚无速率参考时为空）")
 
 
 class NotificationResponse(BaseModel):
@@ -46,8 +108,15 @@ class NotificationResponse(BaseModel):
     created_by: Optional[UUID] = None
     created_at: datetime
     expires_at: Optional[datetime] = None
-
-    @field_serializer('id', 'created_by')
+    sent_at: Optional[datetime] = Field(None, description="首次发送时间（尚未发送过时为空）")
+    recalled_at: Optional[datetime] = None
+    collapse_key: Optional[str] = None
+    content_hash: Optional[str] = Field(None, description="共享正文摘要（按内容去重创建且未修改过的站内信才有）")
+    template_id: Optional[UUID] = Field(None, description="模板 ID（由模板渲染创建的站内信才有）")
+    template_version: Optional[int] = None
+    variables: Optional[Dict[str, Any]] = None
+
+    @field_serializer('id', 'created_by', 'template_id')
     def serialize_uuid(self, value: Optional[UUID]) -> Optional[str]:
         """将 UUID 序列化为字符串"""
         return str(value) if value else None
@@ -70,6 +139,7 @@ class NotificationRecordResponse(BaseModel):
     notification: NotificationResponse
     is_read: bool
     read_at: Optional[datetime] = None
+    collapse_count: int = Field(1, description="折叠的投递次数（大于 1 表示合并了多次同折叠键的投递）")
     created_at: datetime
 
     @field_serializer('id')
@@ -84,6 +154,77 @@ class NotificationRecordResponse(BaseModel):
 class NotificationRecordListResponse(BaseModel):
     """站内信记录列表响应（用户端）"""
 
-    total: int
+    total: int = Field(..., description="站内信总数（翻页进入归档区之前只统计近期数据）")
     unread_count: int
     items: List[NotificationRecordResponse]
+    next_cursor: Optional[datetime] = Field(None, description="下一页游标（作为 before 参数传入），没有更多数据时为空")
+
+
+class ScheduledSendResponse(BaseModel):
+    """定时发送响应"""
+
+    id: UUID
+    notification_id: UUID
+    send_to_all: bool
+    user_ids: Optional[List[UUID]] = None
+    audience: Optional[AudienceRule] = None
+    segment_id: Optional[UUID] = None
+    scheduled_at: datetime
+    status: str
+    attempts: int
+    sent_count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @field_serializer('id', 'notification_id')
+    def serialize_uuid(self, value: UUID) -> str:
+        """将 UUID 序列化为字符串"""
+        return str(value)
+
+    class Config:
+        from_attributes = True
+
+
+class FanoutPartitionResponse(BaseModel):
+    """全员发送分区响应"""
+
+    partition: int
+    cursor: Optional[UUID] = Field(None, description="已发送到的用户 ID（不含）")
+    upper_user_id: Optional[UUID] = Field(None, description="分区上界用户 ID（含，为空表示不设上界）")
+    status: str
+    sent_count: int
+    attempts: int
+    error: Optional[str] = None
+    updated_at: datetime
+
+    @field_serializer('cursor', 'upper_user_id')
+    def serialize_uuid(self, value: Optional[UUID]) -> Optional[str]:
+        """将 UUID 序列化为字符串"""
+        return str(value) if value else None
+
+    class Config:
+        from_attributes = True
+
+
+class FanoutResponse(BaseModel):
+    """全员发送响应"""
+
+    id: UUID
+    notification_id: UUID
+    priority: int
+    audience: Optional[AudienceRule] = None
+    segment_id: Optional[UUID] = None
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    partitions: List[FanoutPartitionResponse]
+
+    @field_serializer('id', 'notification_id')
+    def serialize_uuid(self, value: UUID) -> str:
+        """将 UUID 序列化为字符串"""
+        return str(value)
+
+    class Config:
+        from_attributes = True
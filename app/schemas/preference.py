@@ -0,0 +1,36 @@
+from datetime import datetime, time
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from app.models.notification import NotificationType
+
+
+class NotificationPreferenceUpdate(BaseModel):
+    """设置通知偏好请求（整体替换；系统通知不受偏好影响）"""
+
+    muted_types: List[NotificationType] = Field(default_factory=list, description="屏蔽的站内信类型")
+    min_priority: int = Field(default=0, ge=0, le=2, description="接收的最低优先级 0:普通 1:重要 2:紧急")
+    quiet_hours_start: Optional[time] = Field(None, description="免打扰开始时间（当地时间，HH:MM）")
+    quiet_hours_end: Optional[time] = Field(None, description="免打扰结束时间（当地时间，HH:MM，可跨零点）")
+    utc_offset_minutes: int = Field(default=0, ge=-720, le=840, description="当地时间相对 UTC 的分钟数，如东八区为 480")
+
+    @model_validator(mode="after")
+    def check_preferences(self) -> "NotificationPreferenceUpdate":
+        """系统通知不能屏蔽，免打扰时段的开始和结束必须同时给出且不相同"""
+        if NotificationType.SYSTEM in self.muted_types:
+            raise ValueError("系统通知不能屏蔽")
+        if (self.quiet_hours_start is None) != (self.quiet_hours_end is None):
+            raise ValueError("quiet_hours_start、quiet_hours_end 必须同时指定")
+        if self.quiet_hours_start is not None and self.quiet_hours_start == self.quiet_hours_end:
+            raise ValueError("免打扰开始时间和结束时间不能相同")
+        return self
+
+
+class NotificationPreferenceResponse(BaseModel):
+    """通知偏好响应"""
+
+    muted_types: List[NotificationType] = Field(default_factory=list, description="屏蔽的站内信类型")
+    min_priority: int = Field(default=0, description="接收的最低优先级")
+    quiet_hours_start: Optional[time] = Field(None, description="免打扰开始时间（当地时间）")
+    quiet_hours_end: Optional[time] = Field(None, description="免打扰结束时间（当地时间）")
+    utc_offset_minutes: int = Field(default=0, description="当地时间相对 UTC 的分钟数")
+    updated_at: Optional[datetime] = Field(None, description="更新时间（从未设置过时为空）")
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, field_serializer
+
+from app.schemas.notification import AudienceRule
+
+
+class SegmentCreate(BaseModel):
+    """创建受众分群请求"""
+
+    name: str = Field(..., min_length=1, max_length=100, description="分群名称")
+    audience: AudienceRule = Field(..., description="受众规则")
+    refresh_interval_seconds: int = Field(default=3600, ge=60, description="成员刷新间隔（秒）")
+
+
+class SegmentResponse(BaseModel):
+    """受众分群响应"""
+
+    id: UUID
+    name: str
+    audience: AudienceRule
+    refresh_interval_seconds: int
+    member_count: int
+    refreshed_at: Optional[datetime] = None
+    created_by: Optional[UUID] = None
+    created_at: datetime
+
+    @field_serializer('id', 'created_by')
+    def serialize_uuid(self, value: Optional[UUID]) -> Optional[str]:
+        """将 UUID 序列化为字符串"""
+        return str(value) if value else None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, field_serializer
+
+
+class TemplateCreate(BaseModel):
+    """创建站内信模板请求
+
+    模板使用 $name 或 ${name} 引用变量，字面量 $ 写作 $$。
+    """
+
+    name: str = Field(..., min_length=1, max_length=100, description="模板名称")
+    title: str = Field(..., min_length=1, max_length=200, description="标题模板")
+    content: str = Field(..., min_length=1, description="内容模板")
+    action_url: Optional[str] = Field(None, max_length=500, description="跳转链接模板")
+
+
+class TemplateUpdate(BaseModel):
+    """更新站内信模板请求（修改标题、内容或链接会新建版本）"""
+
+    name: Optional[str] = Field(None, min_length=1, max_length=100, description="模板名称")
+    title: Optional[str] = Field(None, min_length=1, max_length=200, description="标题模板")
+    content: Optional[str] = Field(None, min_length=1, description="内容模板")
+    action_url: Optional[str] = Field(None, max_length=500, description="跳转链接模板")
+
+
+class TemplateResponse(BaseModel):
+    """站内信模板响应（title、content、action_url 为该版本的模板）"""
+
+    id: UUID
+    name: str
+    version: int
+    title: str
+    content: str
+    action_url: Optional[str] = None
+    variables: List[str] = Field(default_factory=list, description="模板引用的变量名")
+    created_by: Optional[UUID] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_serializer('id', 'created_by')
+    def serialize_uuid(self, value: Optional[UUID]) -> Optional[str]:
+        """将 UUID 序列化为字符串"""
+        return str(value) if value else None
+
+
+class TemplateRenderRequest(BaseModel):
+    """渲染站内信模板请求（预览）"""
+
+    variables: Dict[str, Any] = Field(default_factory=dict, description="模板变量")
+    version: Optional[int] = Field(None, ge=1, description="模板版本（为空表示当前版本）")
+
+
+class TemplateRenderResponse(BaseModel):
+    """渲染结果"""
+
+    version: int = Field(..., description="使用的模板版本")
+    title: str
+    content: str
+    action_url: Optional[str] = None
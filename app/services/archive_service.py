@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.notification import NotificationRecord, NotificationRecordArchive
+
+
+class NotificationArchiveService:
+    """站内信记录归档服务（热/冷分层）"""
+
+    @staticmethod
+    def hot_boundary() -> Optional[datetime]:
+        """
+        热数据边界
+
+        早于该时间的已读记录会被移入归档表；未启用归档时返回 None。
+        """
+        if settings.NOTIFICATION_ARCHIVE_AFTER_DAYS <= 0:
+            return None
+        return datetime.now(timezone.utc) - timedelta(days=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS)
+
+    @staticmethod
+    def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+        """
+        归档一批记录
+
+        用一条 DELETE ... RETURNING + INSERT 的 CTE 语句把记录从热表移到归档表，
+        按 created_at 从旧到新处理；SKIP LOCKED 跳过正被用户操作的行，不与在线请求互相等待。
+
+        Args:
+            db: 数据库会话
+            cutoff: 早于该时间的已读记录会被归档
+            batch_size: 本批最多归档的记录数
+
+        Returns:
+            int: 本批归档的记录数
+        """
+        batch = (
+            select(NotificationRecord.id, NotificationRecord.created_at)
+            .where(
+                NotificationRecord.created_at < cutoff,
+                NotificationRecord.is_read == True,
+                NotificationRecord.is_deleted == False,
+            )
+            .order_by(NotificationRecord.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(NotificationRecord)
+            .where(tuple_(NotificationRecord.id, NotificationRecord.created_at).in_(batch))
+            .returning(
+                NotificationRecord.id,
+                NotificationRecord.notification_id,
+                NotificationRecord.user_id,
+                NotificationRecord.read_at,
+                NotificationRecord.collapse_count,
+                NotificationRecord.variables,
+                NotificationRecord.created_at,
+            )
+            .cte("moved")
+        )
+        stmt = insert(NotificationRecordArchive).from_select(
+            ["id", "notification_id", "user_id", "read_at", "collapse_count", "variables", "created_at"],
+            select(moved),
+        )
+        count = db.execute(stmt).rowcount
+        db.commit()
+        return count
+
+    @staticmethod
+    def archive_old_records(db: Session, max_batches: int = 100, pause_seconds: float = 0.1) -> int:
+        """
+        分批归档超过期限的已读记录
+
+        Args:
+            db: 数据库会话
+            max_batches: 单次运行最多处理的批数（剩余部分留给下次运行）
+            pause_seconds: 批之间的停顿，给在线请求让出 IO
+
+        Returns:
+            int: 归档的记录总数
+        """
+        cutoff = NotificationArchiveService.hot_boundary()
+        if cutoff is None:
+            return 0
+
+        batch_size = settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+        total = 0
+        for _ in range(max_batches):
+            count = NotificationArchiveService.archive_batch(db, cutoff, batch_size)
+            total += count
+            if count < batch_size:
+                break
+            time.sleep(pause_seconds)
+        return total
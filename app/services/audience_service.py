@@ -0,0 +1,102 @@
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session
+
+from app.models.notification import Notification, NotificationRecord, NotificationRecordArchive
+from app.models.user import User
+from app.schemas.notification import AudienceRule
+
+
+class AudienceService:
+    """受众规则服务：把规则编译为 users 表上的 SQL 条件，发送时直接拼进 INSERT ... SELECT"""
+
+    @staticmethod
+    def validate(db: Session, audience: AudienceRule) -> None:
+        """
+        校验受众规则
+
+        Args:
+            db: 数据库会话
+            audience: 受众规则
+
+        Raises:
+            HTTPException: 规则没有任何条件，或引用的站内信不存在
+        """
+        if not audience.model_dump(exclude_none=True):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="受众规则至少需要一个条件，发送给所有用户请使用 send_to_all",
+            )
+        AudienceService.conditions(db, audience)
+
+    @staticmethod
+    def _notification_created_at(db: Session, notification_id):
+        created_at = db.query(Notification.created_at).filter(Notification.id == notification_id).scalar()
+        if created_at is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"受众规则引用的站内信 {notification_id} 不存在",
+            )
+        return created_at
+
+    @staticmethod
+    def _record_exists(db: Session, notification_id, read: Optional[bool]):
+        """
+        用户是否有该站内信的记录（read 为 None 时不限已读状态）
+
+        记录不早于站内信创建，附加 created_at 条件让分区表只扫描站内信创建之后的分区；
+        归档记录均为已读，只在不要求未读时参与匹配。
+        """
+        created_at = AudienceService._notification_created_at(db, notification_id)
+        hot = [
+            NotificationRecord.notification_id == notification_id,
+            NotificationRecord.user_id == User.id,
+            NotificationRecord.created_at >= created_at,
+        ]
+        if read is not None:
+            hot.append(NotificationRecord.is_read.is_(read))
+        if read is False:
+            hot.append(NotificationRecord.is_deleted.is_(False))
+            return exists().where(*hot)
+
+        archived = exists().where(
+            NotificationRecordArchive.notification_id == notification_id,
+            NotificationRecordArchive.user_id == User.id,
+        )
+        return or_(exists().where(*hot), archived)
+
+    @staticmethod
+    def conditions(db: Session, audience: AudienceRule) -> List:
+        """
+        把受众规则编译为 users 表上的过滤条件
+
+        Args:
+            db: 数据库会话
+            audience: 受众规则
+
+        Returns:
+            List: SQL 条件列表（同时满足）
+
+        Raises:
+            HTTPException: 引用的站内信不存在
+        """
+        conditions = []
+        if audience.statuses:
+            conditions.append(User.status.in_(audience.statuses))
+        if audience.last_login_after is not None:
+            conditions.append(User.last_login_at >= audience.last_login_after)
+        if audience.last_login_before is not None:
+            conditions.append(User.last_login_at < audience.last_login_before)
+        if audience.created_after is not None:
+            conditions.append(User.created_at >= audience.created_after)
+        if audience.created_before is not None:
+            conditions.append(User.created_at < audience.created_before)
+        if audience.received_notification_id is not None:
+            conditions.append(AudienceService._record_exists(db, audience.received_notification_id, None))
+        if audience.read_notification_id is not None:
+            conditions.append(AudienceService._record_exists(db, audience.read_notification_id, True))
+        if audience.unread_notification_id is not None:
+            conditions.append(AudienceService._record_exists(db, audience.unread_notification_id, False))
+        return conditions
@@ -1,11 +1,21 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
-from app.core.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.core.security import (
+    get_password_hash,
+    verify_password,
+    create_access_token,
+    create_refresh_token,
+    verify_access_token,
+    verify_refresh_token,
+)
+from app.core.revocation import token_revocation
+from app.core.session_store import session_store
 
 
 class AuthService:
@@ -26,33 +36,49 @@ class AuthService:
         Raises:
             HTTPException: 用户名或邮箱已存在
         """
-        # 检查用户名是否已存在
-        existing_user = db.query(User).filter(User.username == user_create.username).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="用户名已存在",
-            )
-
-        # 检查邮箱是否已存在
-        existing_email = db.query(User).filter(User.email == user_create.email).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="邮箱已被使用",
-            )
-
-        # 创建新用户
+        # 只执行一条 INSERT，由唯一约束判断用户名/邮箱冲突（无"先查后插"的竞态）
         user = User(
             username=user_create.username,
             email=user_create.email,
             password_hash=get_password_hash(user_create.password),
         )
         db.add(user)
+        try:
+            # INSERT ... RETURNING 同时取回服务端默认值，提交后无需再 refresh
+            db.flush()
+        except IntegrityError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=AuthService._conflict_detail(e),
+            )
+
+        user_response = UserResponse.model_validate(user)
         db.commit()
-        db.refresh(user)
 
-        return UserResponse.model_validate(user)
+        return user_response
+
+    @staticmethod
+    def _conflict_detail(error: IntegrityError) -> str:
+        """
+        将 users 表唯一约束冲突映射为错误信息
+
+        Args:
+            error: 数据库完整性错误
+
+        Returns:
+            str: 错误信息
+
+        Raises:
+            IntegrityError: 非用户名/邮箱冲突的完整性错误原样抛出
+        """
+        diag = getattr(error.orig, "diag", None)
+        constraint = getattr(diag, "constraint_name", None) or str(error.orig)
+        if "email" in constraint:
+            return "邮箱已被使用"
+        if "username" in constraint:
+            return "用户名已存在"
+        raise error
 
     @staticmethod
     def authenticate(db: Session, username: str, password: str) -> Optional[User]:
@@ -108,9 +134,10 @@ class AuthService:
         user.last_login_at = datetime.utcnow()
         db.commit()
 
-        # 生成 token
+        # 创建会话（Refresh Token 家族）并生成 token
+        family_id, jti = session_store.create(db, str(user.id))
         access_token = create_access_token(data={"user_id": str(user.id), "username": user.username})
-        refresh_token = create_refresh_token(data={"user_id": str(user.id)})
+        refresh_token = create_refresh_token(data={"user_id": str(user.id), "fid": family_id, "jti": jti})
 
         return {
             "access_token": access_token,
@@ -119,20 +146,43 @@ class AuthService:
         }
 
     @staticmethod
-    def refresh(db: Session, user_id: str) -> dict:
+    def refresh(db: Session, payload: dict) -> dict:
         """
-        刷新 Token
+        刷新 Token（Refresh Token 轮换）
+
+        每个 Refresh Token 只能使用一次：刷新成功后旧 Token 立即失效；
+        再次出示已失效的旧 Token 会被视为重用，整个会话被吊销。
 
         Args:
             db: 数据库会话
-            user_id: 用户 ID
+            payload: 已验证的 Refresh Token 负载
 
         Returns:
             dict: 包含新的 access_token 和 refresh_token 的字典
 
         Raises:
-            HTTPException: 用户不存在
+            HTTPException: 会话无效/已吊销/检测到重用，或用户不存在
         """
+        invalid_token_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的 Refresh Token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+        user_id = payload.get("user_id")
+        family_id = payload.get("fid")
+        jti = payload.get("jti")
+        # 旧版本签发的 Refresh Token 没有会话信息，需要重新登录
+        if not user_id or not family_id or not jti:
+            raise invalid_token_exception
+
+        try:
+            new_jti = session_store.rotate(db, family_id, user_id, jti)
+        except ValueError:
+            raise invalid_token_exception
+        if new_jti is None:
+            raise invalid_token_exception
+
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(
@@ -142,10 +192,45 @@ class AuthService:
 
         # 生成新的 token
         access_token = create_access_token(data={"user_id": str(user.id), "username": user.username})
-        refresh_token = create_refresh_token(data={"user_id": str(user.id)})
+        refresh_token = create_refresh_token(data={"user_id": str(user.id), "fid": family_id, "jti": new_jti})
 
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer",
         }
+
+    @staticmethod
+    def logout(db: Session, access_token: Optional[str], refresh_token: Optional[str] = None) -> None:
+        """
+        用户登出（服务端吊销 Token）
+
+        Args:
+            db: 数据库会话
+            access_token: 当前 Access Token
+            refresh_token: Refresh Token（可选，提供时一并吊销）
+        """
+        tokens = []
+        if access_token:
+            tokens.append(verify_access_token(access_token))
+        if refresh_token:
+            refresh_payload = verify_refresh_token(refresh_token)
+            tokens.append(refresh_payload)
+            # 结束整个会话，该家族后续轮换出的 Token 也不再有效
+            if refresh_payload and refresh_payload.get("fid"):
+                try:
+                    session_store.revoke_family(db, refresh_payload["fid"])
+                except ValueError:
+                    pass
+
+        for payload in tokens:
+            # 无效 Token 或旧版本签发的无 jti Token 无需吊销
+            if payload is None or not payload.get("jti"):
+                continue
+            token_revocation.revoke(
+                db,
+                jti=payload["jti"],
+                token_type=payload["type"],
+                expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+                user_id=payload.get("user_id"),
+            )
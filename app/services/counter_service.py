@@ -0,0 +1,294 @@
+import uuid
+from typing import Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import Integer, Select, column, func, literal, or_, select, update, values
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.orm import Session
+
+from app.models.notification import Notification, NotificationCounter, NotificationRecord
+
+
+class NotificationCounterService:
+    """
+    用户站内信计数服务
+
+    未读数只包含未过期、未删除的未读记录。所有方法只执行语句、不提交事务，
+    由调用方与记录的变更放在同一个事务中提交。
+
+    记录数（record_count）只在发送时累加，删除、归档时不扣减，是收件箱大小的上界，
+    由收件箱容量控制在清理后按记录表重算（见 InboxTrimService）。
+    """
+
+    @staticmethod
+    def _upsert(db: Session, counts: Select, columns: Sequence[str] = ("unread_count",)) -> int:
+        """
+        按 (user_id, type, *columns) 查询结果累加计数
+
+        Returns:
+            int: 受影响的计数行数
+        """
+        stmt = insert(NotificationCounter).from_select(["user_id", "type", *columns], counts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id, NotificationCounter.type],
+            set_={name: getattr(NotificationCounter, name) + getattr(stmt.excluded, name) for name in columns},
+        )
+        return db.execute(stmt).rowcount
+
+    @staticmethod
+    def increment_users(db: Session, notification_type: str, user_ids: Iterable) -> None:
+        """
+        指定用户的未读数和记录数各加 1（发送站内信时调用）
+
+        Args:
+            db: 数据库会话
+            notification_type: 站内信类型
+            user_ids: 用户 ID 列表
+        """
+        rows = [
+            {"user_id": user_id, "type": notification_type, "unread_count": 1, "record_count": 1}
+            for user_id in user_ids
+        ]
+        if not rows:
+            return
+        stmt = insert(NotificationCounter).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id, NotificationCounter.type],
+            set_={
+                "unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count,
+                "record_count": NotificationCounter.record_count + stmt.excluded.record_count,
+            },
+        )
+        db.execute(stmt)
+
+    @staticmethod
+    def increment_selected(db: Session, notification_type: str, user_ids: Select) -> int:
+        """
+        查询出的用户未读数和记录数各加 1
+
+        Args:
+            db: 数据库会话
+            notification_type: 站内信类型
+            user_ids: 只选择一列用户 ID 的查询（可以是 INSERT ... RETURNING 的 CTE）
+
+        Returns:
+            int: 计数加 1 的用户数
+        """
+        user_id = user_ids.selected_columns[0]
+        counts = select(user_id, literal(notification_type), literal(1), literal(1))
+        return NotificationCounterService._upsert(db, counts, ("unread_count", "record_count"))
+
+    @staticmethod
+    def decrement(db: Session, user_id: str, notification_type: str, amount: int = 1) -> None:
+        """
+        单个用户的未读数减少（标记已读、删除未读记录时调用）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+            notification_type: 站内信类型
+            amount: 减少的数量
+        """
+        db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id, NotificationCounter.type == notification_type)
+            .values(unread_count=func.greatest(NotificationCounter.unread_count - amount, 0))
+        )
+
+    @staticmethod
+    def decrement_users(db: Session, notification_type: str, amounts: Mapping) -> None:
+        """
+        多个用户的未读数分别减少（撤回站内信分批删除记录时调用）
+
+        Args:
+            db: 数据库会话
+            notification_type: 站内信类型
+            amounts: 用户 ID -> 减少的数量
+        """
+        if not amounts:
+            return
+        deltas = values(
+            column("user_id", UUID(as_uuid=True)),
+            column("amount", Integer),
+            name="deltas",
+        ).data(list(amounts.items()))
+        db.execute(
+            update(NotificationCounter)
+            .where(
+                NotificationCounter.user_id == deltas.c.user_id,
+                NotificationCounter.type == notification_type,
+            )
+            .values(unread_count=func.greatest(NotificationCounter.unread_count - deltas.c.amount, 0))
+        )
+
+    @staticmethod
+    def _unread_by_user(
+        notification: Notification,
+        notification_type: str,
+        after_user_id=None,
+        until_user_id=None,
+    ) -> Select:
+        """统计一条站内信在每个用户下的未读记录数（可按用户 ID 范围限定）"""
+        conditions = [
+            NotificationRecord.notification_id == notification.id,
+            NotificationRecord.created_at >= notification.created_at,
+            NotificationRecord.is_read == False,
+            NotificationRecord.is_deleted == False,
+        ]
+        if after_user_id is not None:
+            conditions.append(NotificationRecord.user_id > after_user_id)
+        if until_user_id is not None:
+            conditions.append(NotificationRecord.user_id <= until_user_id)
+        return (
+            select(
+                NotificationRecord.user_id,
+                literal(notification_type).label("type"),
+                func.count().label("unread_count"),
+            )
+            .where(*conditions)
+            .group_by(NotificationRecord.user_id)
+        )
+
+    @staticmethod
+    def add_notification(
+        db: Session,
+        notification: Notification,
+        notification_type: str,
+        after_user_id=None,
+        until_user_id=None,
+    ) -> None:
+        """
+        把一条站内信的所有未读记录计入计数（取消过期、修改类型时调用）
+
+        Args:
+            db: 数据库会话
+            notification: 站内信
+            notification_type: 计入的类型
+            after_user_id: 只计入 ID 大于该值的用户（可选）
+            until_user_id: 只计入 ID 小于等于该值的用户（可选）
+        """
+        NotificationCounterService._upsert(
+            db,
+            NotificationCounterService._unread_by_user(notification, notification_type, after_user_id, until_user_id),
+        )
+
+    @staticmethod
+    def remove_notification(
+        db: Session,
+        notification: Notification,
+        notification_type: str,
+        after_user_id=None,
+    ) -> None:
+        """
+        从计数中扣除一条站内信的所有未读记录（修改类型时调用）
+
+        Args:
+            db: 数据库会话
+            notification: 站内信
+            notification_type: 扣除的类型
+            after_user_id: 只扣除 ID 大于该值的用户（可选）
+        """
+        unread = NotificationCounterService._unread_by_user(
+            notification, notification_type, after_user_id
+        ).subquery()
+        db.execute(
+            update(NotificationCounter)
+            .where(
+                NotificationCounter.user_id == unread.c.user_id,
+                NotificationCounter.type == notification_type,
+            )
+            .values(unread_count=func.greatest(NotificationCounter.unread_count - unread.c.unread_count, 0))
+        )
+
+    @staticmethod
+    def remove_notification_batch(
+        db: Session,
+        notification: Notification,
+        notification_type: str,
+        after_user_id,
+        limit: int,
+    ) -> Optional[uuid.UUID]:
+        """
+        按用户 ID 顺序，从 after_user_id 之后至多 limit 个有未读记录的用户的计数中扣除一条站内信的未读记录（分批过期处理时调用）
+
+        沿 (notification_id, user_id) 索引按序读取，每批只涉及 limit 个用户的计数行。
+
+        Args:
+            db: 数据库会话
+            notification: 站内信
+            notification_type: 扣除的类型
+            after_user_id: 上一批最后一个用户 ID（第一批为 None）
+            limit: 每批用户数
+
+        Returns:
+            Optional[uuid.UUID]: 本批最后一个用户 ID；不足 limit 个用户（已全部扣除）时返回 None
+        """
+        rows = db.execute(
+            NotificationCounterService._unread_by_user(notification, notification_type, after_user_id)
+            .order_by(NotificationRecord.user_id)
+            .limit(limit)
+        ).all()
+        NotificationCounterService.decrement_users(
+            db, notification_type, {row.user_id: row.unread_count for row in rows}
+        )
+        return rows[-1].user_id if len(rows) == limit else None
+
+    @staticmethod
+    def reset(db: Session, user_id: str) -> None:
+        """用户的全部未读数清零（全部标记已读时调用）"""
+        db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id, NotificationCounter.unread_count != 0)
+            .values(unread_count=0)
+        )
+
+    @staticmethod
+    def _pending_unread(user_id: str):
+        """
+        用户在已删除、已撤回或已到期，但计数尚未扣完的站内信下仍计入计数的未读记录数
+
+        这些站内信由后台作业或过期处理逐批扣减计数（过期处理已扣到 expiry_cursor 的用户不再计入），
+        按部分索引找出的少量站内信逐条探查 (站内信, 用户) 索引。
+        """
+        return (
+            select(func.count())
+            .select_from(NotificationRecord)
+            .join(Notification, Notification.id == NotificationRecord.notification_id)
+            .where(
+                Notification.expiry_processed_at.is_(None),
+                or_(
+                    Notification.deleted_at.isnot(None),
+                    Notification.recalled_at.isnot(None),
+                    Notification.expires_at <= func.now(),
+                ),
+                or_(Notification.expiry_cursor.is_(None), NotificationRecord.user_id > Notification.expiry_cursor),
+                NotificationRecord.user_id == user_id,
+                NotificationRecord.created_at >= Notification.created_at,
+                NotificationRecord.is_read == False,
+                NotificationRecord.is_deleted == False,
+            )
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    def get_unread_count(db: Session, user_id: str) -> int:
+        """
+        获取用户的未读数量
+
+        删除、撤回作业和过期处理逐批扣减计数，尚未扣到的未读记录在这里扣除，站内信删除、撤回或到期后未读数立即不再包含它。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+
+        Returns:
+            int: 未读数量
+        """
+        counted = (
+            select(func.coalesce(func.sum(NotificationCounter.unread_count), 0))
+            .where(NotificationCounter.user_id == user_id)
+            .scalar_subquery()
+        )
+        count = db.execute(
+            select(func.greatest(counted - NotificationCounterService._pending_unread(user_id), 0))
+        ).scalar_one()
+        return int(count)
@@ -0,0 +1,97 @@
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.models.notification import NotificationDeferral
+from app.services.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDeferralService:
+    """
+    免打扰推迟送达服务
+
+    发送时处于免打扰时段的用户登记在 notification_deferrals 中，免打扰结束后由本服务按普通发送写入收件箱：
+    重新按偏好判断（此时仍在免打扰中的用户再次推迟）、按 (站内信, 用户) 去重并累加未读计数。
+    每批只处理一条站内信的登记，登记的删除与记录的写入在同一个事务中提交。
+    """
+
+    @staticmethod
+    def deliver_batch(db: Session, batch_size: int) -> int:
+        """
+        送达一批已到期的推迟登记
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批最多处理的用户数
+
+        Returns:
+            int: 本批处理的登记数（0 表示没有到期的登记）
+        """
+        due = NotificationDeferral.deliver_after <= func.now()
+        notification_id = db.execute(
+            select(NotificationDeferral.notification_id)
+            .where(due)
+            .order_by(NotificationDeferral.deliver_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if notification_id is None:
+            db.commit()
+            return 0
+
+        rows = db.execute(
+            select(NotificationDeferral.user_id, NotificationDeferral.variables)
+            .where(NotificationDeferral.notification_id == notification_id, due)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        keys = [(notification_id, row.user_id) for row in rows]
+        db.execute(
+            delete(NotificationDeferral)
+            .where(tuple_(NotificationDeferral.notification_id, NotificationDeferral.user_id).in_(keys))
+            .execution_options(synchronize_session=False)
+        )
+        variables = {str(row.user_id): row.variables for row in rows if row.variables is not None}
+        try:
+            # 提交时一并删除已处理的登记
+            count, _ = NotificationService.send_to_users(
+                db, str(notification_id), [str(row.user_id) for row in rows], variables or None
+            )
+        except HTTPException as e:
+            # 站内信已被删除或撤回：丢弃该站内信的全部登记
+            db.rollback()
+            logger.info("站内信 %s 无法送达（%s），丢弃推迟送达登记", notification_id, e.detail)
+            db.execute(
+                delete(NotificationDeferral)
+                .where(NotificationDeferral.notification_id == notification_id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return len(rows)
+
+        metrics.inc("notification_deferrals_delivered_total", count)
+        return len(rows)
+
+    @staticmethod
+    def deliver_due(db: Session, batch_size: int) -> int:
+        """
+        送达所有已到期的推迟登记
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批最多处理的用户数
+
+        Returns:
+            int: 处理的登记数
+        """
+        total = 0
+        while True:
+            processed = NotificationDeferralService.deliver_batch(db, batch_size)
+            if not processed:
+                return total
+            total += processed
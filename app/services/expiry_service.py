@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.notification import Notification
+from app.services.counter_service import NotificationCounterService
+
+
+class NotificationExpiryService:
+    """站内信过期服务"""
+
+    @staticmethod
+    def not_expired():
+        """未过期条件（需要查询中包含 notifications 表）"""
+        return or_(Notification.expires_at.is_(None), Notification.expires_at > func.now())
+
+    @staticmethod
+    def pending(db: Session, until: datetime, limit: int) -> List[Tuple]:
+        """
+        按过期时间顺序取出 until 之前到期、尚未处理的站内信
+
+        走 expires_at 部分索引的范围扫描，已到期但未处理的（如服务重启期间到期的）也会返回。
+
+        Args:
+            db: 数据库会话
+            until: 截止时间
+            limit: 最多返回数量
+
+        Returns:
+            List[Tuple]: (站内信 ID, 过期时间)，按过期时间升序
+        """
+        rows = (
+            db.query(Notification.id, Notification.expires_at)
+            .filter(
+                Notification.expires_at <= until,
+                Notification.expiry_processed_at.is_(None),
+                # 撤回、删除的站内信由撤回、删除作业逐批扣除计数
+                Notification.recalled_at.is_(None),
+                Notification.deleted_at.is_(None),
+            )
+            .order_by(Notification.expires_at)
+            .limit(limit)
+            .all()
+        )
+        db.commit()
+        return [(row.id, row.expires_at) for row in rows]
+
+    @staticmethod
+    def lock_progress(db: Session, notification: Notification) -> None:
+        """
+        站内信已到期但尚未过期处理完时，以共享锁重新读取过期处理进度（expiry_processed_at、expiry_cursor）
+
+        持锁期间过期处理无法推进（SKIP LOCKED 跳过，稍后重新装载），调用方按读到的进度维护计数，不会与其重复扣减或遗漏。
+
+        Args:
+            db: 数据库会话
+            notification: 站内信
+        """
+        expires_at = notification.expires_at
+        if notification.expiry_processed_at is None and expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            db.refresh(notification, with_for_update={"read": True})
+
+    @staticmethod
+    def expire(db: Session, notification_id) -> bool:
+        """
+        处理一条已到期的站内信：按用户分批从未读计数中扣除其未读记录，全部扣完后标记为已处理
+
+        每批一个短事务：锁定站内信行（SKIP LOCKED，多个实例同时处理时只有一个实例会处理），
+        从 expiry_cursor 之后按 user_id 顺序扣除至多 NOTIFICATION_EXPIRY_USER_BATCH_SIZE 个用户的计数并推进 expiry_cursor，
+        中途退出后从断点继续。发送、删除记录和修改站内信以共享锁或行锁读取进度，与正在进行的批互斥。
+
+        Args:
+            db: 数据库会话
+            notification_id: 站内信 ID
+
+        Returns:
+            bool: 是否处理完该站内信（未到期、已处理、已撤回或删除，或正被占用时返回 False）
+        """
+        batch_size = settings.NOTIFICATION_EXPIRY_USER_BATCH_SIZE
+        while True:
+            notification = (
+                db.query(Notification)
+                .filter(
+                    Notification.id == notification_id,
+                    Notification.expires_at <= datetime.now(timezone.utc),
+                    Notification.expiry_processed_at.is_(None),
+                    Notification.recalled_at.is_(None),
+                    Notification.deleted_at.is_(None),
+                )
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if not notification:
+                db.rollback()
+                return False
+
+            cursor = NotificationCounterService.remove_notification_batch(
+                db, notification, notification.type, notification.expiry_cursor, batch_size
+            )
+            notification.expiry_cursor = cursor
+            if cursor is None:
+                notification.expiry_processed_at = func.now()
+            db.commit()
+            if cursor is None:
+                return True
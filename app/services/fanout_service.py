@@ -0,0 +1,328 @@
+import uuid
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.notification import Fanout, FanoutPartition, FanoutStatus, Notification
+from app.models.segment import SegmentMember
+from app.models.user import User
+from app.schemas.notification import AudienceRule, FanoutResponse
+from app.services.audience_service import AudienceService
+from app.services.notification_service import NotificationService
+from app.services.segment_service import SegmentService
+
+
+class FanoutAborted(Exception):
+    """
+    全员发送中止（站内信在发送途中被删除或撤回）
+
+    分块在扩散执行器的工作进程中发送，异常需要跨进程传回；HTTPException 无法按参数重建，
+    工作进程把它转换为这个只带一个字符串参数、可以序列化的异常。
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class FanoutService:
+    """站内信扩散服务：把“发送给所有用户”按用户 ID 切成分区，每个分区独立推进和断点续发"""
+
+    @staticmethod
+    def create(
+        db: Session,
+        notification_id: str,
+        partitions: int,
+        audience: Optional[AudienceRule] = None,
+        segment_id: Optional[uuid.UUID] = None,
+    ) -> FanoutResponse:
+        """
+        创建全员发送
+
+        沿主键索引把用户等分为 partitions 段（ntile），每段一个分区；
+        最后一个分区不设上界，发送期间新注册的用户也会被覆盖。
+        指定受众规则时，每一块都在 INSERT ... SELECT 中按规则筛选用户；
+        指定受众分群时按分群成员切分和分块，直接从成员表读取用户。
+
+        Args:
+            db: 数据库会话
+            notification_id: 站内信 ID
+            partitions: 分区数
+            audience: 受众规则（可选，为空表示所有用户）
+            segment_id: 受众分群 ID（可选，与 audience 互斥）
+
+        Returns:
+            FanoutResponse: 全员发送信息
+
+        Raises:
+            HTTPException: 站内信不存在或已撤回，站内信需要按用户提供模板变量，受众规则无效，或分群不存在、尚未刷新
+        """
+        notification = NotificationService.get_notification(db, notification_id)
+        if notification.recalled_at is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="站内信已撤回",
+            )
+        # 个性化站内信需要每个用户的模板变量，不能全员发送
+        NotificationService.validate_recipient_variables(db, notification, [], None)
+        if audience is not None:
+            AudienceService.validate(db, audience)
+        if segment_id is not None:
+            SegmentService.get_sendable_segment(db, segment_id)
+
+        member_id = FanoutService._members(segment_id)
+        buckets = select(member_id, func.ntile(partitions).over(order_by=member_id).label("bucket"))
+        if segment_id is not None:
+            buckets = buckets.where(SegmentMember.segment_id == segment_id)
+        buckets = buckets.subquery()
+        # PostgreSQL 没有 uuid 的 max()，按文本取最大值：标准文本形式的字典序与 uuid 的字节序一致
+        upper = cast(func.max(cast(buckets.c[0], String)), UUID(as_uuid=True))
+        uppers = db.execute(select(upper).group_by(buckets.c.bucket).order_by(buckets.c.bucket)).scalars().all()
+
+        fanout = Fanout(
+            notification_id=notification.id,
+            priority=notification.priority,
+            audience=audience.model_dump(mode="json", exclude_none=True) if audience is not None else None,
+            segment_id=segment_id,
+        )
+        cursor = None
+        for index in range(max(len(uppers), 1)):
+            upper = uppers[index] if index < len(uppers) - 1 else None
+            fanout.partitions.append(FanoutPartition(partition=index, cursor=cursor, upper_user_id=upper))
+            cursor = upper
+        db.add(fanout)
+        # 首次发送时间在派发前写入，工作进程之间不再争用站内信的行锁
+        NotificationService.mark_sent(db, db.get(Notification, notification.id))
+        db.commit()
+        db.refresh(fanout)
+
+        return FanoutResponse.model_validate(fanout)
+
+    @staticmethod
+    def get_fanout(db: Session, fanout_id: str) -> FanoutResponse:
+        """
+        获取全员发送及各分区进度
+
+        Args:
+            db: 数据库会话
+            fanout_id: 全员发送 ID
+
+        Returns:
+            FanoutResponse: 全员发送信息
+
+        Raises:
+            HTTPException: 全员发送不存在
+        """
+        fanout = db.query(Fanout).filter(Fanout.id == fanout_id).first()
+        if not fanout:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="全员发送不存在",
+            )
+        return FanoutResponse.model_validate(fanout)
+
+    @staticmethod
+    def retry(db: Session, fanout_id: str) -> FanoutResponse:
+        """
+        重试全员发送中未完成的分区
+
+        已完成的分区保持不变，其余分区从各自的断点继续。
+
+        Args:
+            db: 数据库会话
+            fanout_id: 全员发送 ID
+
+        Returns:
+            FanoutResponse: 重置后的全员发送信息
+
+        Raises:
+            HTTPException: 全员发送不存在，或所有分区均已完成
+        """
+        fanout = db.query(Fanout).filter(Fanout.id == fanout_id).first()
+        if not fanout:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="全员发送不存在",
+            )
+        unfinished = [p for p in fanout.partitions if p.status != FanoutStatus.DONE.value]
+        if not unfinished:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="全员发送已完成，无需重试",
+            )
+
+        for partition in unfinished:
+            partition.status = FanoutStatus.PENDING.value
+            partition.attempts += 1
+            partition.error = None
+        fanout.status = FanoutStatus.RUNNING.value
+        fanout.error = None
+        fanout.finished_at = None
+        db.commit()
+        db.refresh(fanout)
+
+        return FanoutResponse.model_validate(fanout)
+
+    @staticmethod
+    def _members(segment_id: Optional[uuid.UUID]):
+        """切分和分块所沿的用户 ID 列：指定分群时为成员表主键，否则为 users 主键"""
+        return SegmentMember.user_id if segment_id is not None else User.id
+
+    @staticmethod
+    def next_boundary(
+        db: Session,
+        after_user_id: Optional[uuid.UUID],
+        chunk_size: int,
+        upper_user_id: Optional[uuid.UUID] = None,
+        segment_id: Optional[uuid.UUID] = None,
+    ) -> Optional[uuid.UUID]:
+        """
+        计算下一块的上界
+
+        沿主键索引从 after_user_id 之后数 chunk_size 个用户，只读取一个 ID。
+
+        Args:
+            db: 数据库会话
+            after_user_id: 上一块的上界（None 表示从头开始）
+            chunk_size: 每块用户数
+            upper_user_id: 分区上界（None 表示不设上界）
+            segment_id: 受众分群 ID（指定时在分群成员中计数）
+
+        Returns:
+            Optional[uuid.UUID]: 本块最后一个用户的 ID；分区内剩余用户不足一块时返回 None，表示本块发送到分区末尾
+        """
+        member_id = FanoutService._members(segment_id)
+        query = select(member_id)
+        if segment_id is not None:
+            query = query.where(SegmentMember.segment_id == segment_id)
+        if after_user_id is not None:
+            query = query.where(member_id > after_user_id)
+        if upper_user_id is not None:
+            query = query.where(member_id <= upper_user_id)
+        return db.execute(query.order_by(member_id).offset(chunk_size - 1).limit(1)).scalar()
+
+    @staticmethod
+    def send_chunk(
+        fanout_id: uuid.UUID,
+        partition: int,
+        notification_id: str,
+        cursor: Optional[uuid.UUID],
+        upper_user_id: Optional[uuid.UUID],
+        chunk_size: int,
+        audience: Optional[AudienceRule] = None,
+        segment_id: Optional[uuid.UUID] = None,
+    ) -> Tuple[Optional[uuid.UUID], int, bool]:
+        """
+        发送分区的下一块（在扩散执行器的工作进程中运行，使用进程自己的连接）
+
+        分区断点、已发送数与本块的记录在同一个事务中提交：进程中途退出时断点不会越过未写入的用户，
+        重试时重复发送的部分按 (站内信, 用户) 去重。
+
+        Args:
+            fanout_id: 全员发送 ID
+            partition: 分区序号
+            notification_id: 站内信 ID
+            cursor: 分区当前断点
+            upper_user_id: 分区上界
+            chunk_size: 每块用户数
+            audience: 受众规则（可选）
+            segment_id: 受众分群 ID（可选）
+
+        Returns:
+            Tuple[Optional[uuid.UUID], int, bool]: (新断点, 本块发送的用户数, 分区是否已发送完)
+
+        Raises:
+            FanoutAborted: 站内信不存在或已撤回（发送途中被删除、撤回时中止整个全员发送）
+        """
+        db = SessionLocal()
+        try:
+            boundary = FanoutService.next_boundary(db, cursor, chunk_size, upper_user_id, segment_id)
+            exhausted = boundary is None
+            until = upper_user_id if exhausted else boundary
+
+            try:
+                count = NotificationService.send_to_all_users(
+                    db, notification_id, cursor, until, audience, segment_id
+                )
+            except HTTPException as e:
+                db.rollback()
+                raise FanoutAborted(e.detail) from None
+
+            db.query(FanoutPartition).filter(
+                FanoutPartition.fanout_id == fanout_id,
+                FanoutPartition.partition == partition,
+            ).update(
+                {
+                    "cursor": until,
+                    "status": FanoutStatus.DONE.value if exhausted else FanoutStatus.RUNNING.value,
+                    "sent_count": FanoutPartition.sent_count + count,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            return until, count, exhausted
+        finally:
+            db.close()
+
+    @staticmethod
+    def fail_partition(db: Session, fanout_id: uuid.UUID, partition: int, error: str) -> None:
+        """
+        标记分区失败（断点保留，可单独重试）
+
+        Args:
+            db: 数据库会话
+            fanout_id: 全员发送 ID
+            partition: 分区序号
+            error: 失败原因
+        """
+        db.query(FanoutPartition).filter(
+            FanoutPartition.fanout_id == fanout_id,
+            FanoutPartition.partition == partition,
+        ).update(
+            {"status": FanoutStatus.FAILED.value, "error": error},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def finish(db: Session, fanout_id: uuid.UUID, error: Optional[str] = None) -> None:
+        """
+        结束全员发送
+
+        指定 error 时视为整体中止，未完成的分区全部标记失败；否则有分区失败时整体为失败。
+
+        Args:
+            db: 数据库会话
+            fanout_id: 全员发送 ID
+            error: 中止原因（可选）
+        """
+        if error is not None:
+            db.query(FanoutPartition).filter(
+                FanoutPartition.fanout_id == fanout_id,
+                FanoutPartition.status != FanoutStatus.DONE.value,
+            ).update(
+                {"status": FanoutStatus.FAILED.value, "error": error},
+                synchronize_session=False,
+            )
+
+        failed = db.query(
+            select(FanoutPartition.partition)
+            .where(
+                FanoutPartition.fanout_id == fanout_id,
+                FanoutPartition.status != FanoutStatus.DONE.value,
+            )
+            .exists()
+        ).scalar()
+        db.query(Fanout).filter(Fanout.id == fanout_id).update(
+            {
+                "status": FanoutStatus.FAILED.value if failed else FanoutStatus.DONE.value,
+                "error": error,
+                "finished_at": func.now(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
@@ -0,0 +1,182 @@
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, delete, func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.models.notification import Notification, NotificationCounter, NotificationRecord
+
+logger = logging.getLogger(__name__)
+
+
+class InboxTrimService:
+    """
+    收件箱容量控制服务
+
+    用户收件箱（或其中某一类型）的记录数超过上限时，按创建时间从早到晚分批物理删除已读记录，
+    未读记录不会被删除。超限用户由计数表的 record_count 选出，不扫描记录表；
+    record_count 只增不减，是记录数的上界，选出的用户会先精确统计，清理后再按记录表重算。
+
+    记录数不超过未读数（没有已读记录可删）的用户不会被选出；其余超限用户按最近一次检查时间（trimmed_at）
+    从早到晚轮流处理，清理不掉的用户排到队尾，不会一直占满单次处理的名额。
+    """
+
+    @staticmethod
+    def _over_limit(db: Session, limit: int) -> List[Tuple]:
+        """
+        按计数表挑出可能超限的 (用户, 类型)，类型为 None 表示按用户总量超限
+
+        Args:
+            db: 数据库会话
+            limit: 最多返回数量
+
+        Returns:
+            List[Tuple]: (用户 ID, 站内信类型或 None, 记录数上限)
+        """
+        candidates = []
+        if settings.INBOX_MAX_RECORDS_PER_TYPE > 0:
+            rows = (
+                db.query(NotificationCounter.user_id, NotificationCounter.type)
+                .filter(
+                    NotificationCounter.record_count > settings.INBOX_MAX_RECORDS_PER_TYPE,
+                    NotificationCounter.record_count > NotificationCounter.unread_count,
+                )
+                .order_by(NotificationCounter.trimmed_at.asc().nulls_first())
+                .limit(limit)
+                .all()
+            )
+            candidates += [(user_id, type_, settings.INBOX_MAX_RECORDS_PER_TYPE) for user_id, type_ in rows]
+        if settings.INBOX_MAX_RECORDS > 0 and len(candidates) < limit:
+            total = func.sum(NotificationCounter.record_count)
+            rows = (
+                db.query(NotificationCounter.user_id)
+                .group_by(NotificationCounter.user_id)
+                .having(total > settings.INBOX_MAX_RECORDS, total > func.sum(NotificationCounter.unread_count))
+                .order_by(func.min(NotificationCounter.trimmed_at).asc().nulls_first())
+                .limit(limit - len(candidates))
+                .all()
+            )
+            candidates += [(user_id, None, settings.INBOX_MAX_RECORDS) for (user_id,) in rows]
+        db.commit()
+        return candidates
+
+    @staticmethod
+    def _records(user_id, notification_type: Optional[str]) -> Select:
+        """用户收件箱中（指定类型的）未删除记录，选择删除时匹配的键"""
+        query = select(NotificationRecord.created_at, NotificationRecord.id).where(
+            NotificationRecord.user_id == user_id,
+            NotificationRecord.is_deleted == False,
+        )
+        if notification_type is not None:
+            query = query.join(Notification, Notification.id == NotificationRecord.notification_id).where(
+                Notification.type == notification_type
+            )
+        return query
+
+    @staticmethod
+    def recount(db: Session, user_id) -> None:
+        """
+        按记录表重算用户各类型的记录数，修正删除、归档造成的偏差，并记录本次检查时间
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+        """
+        size = (
+            select(func.count())
+            .select_from(NotificationRecord)
+            .join(Notification, Notification.id == NotificationRecord.notification_id)
+            .where(
+                NotificationRecord.user_id == NotificationCounter.user_id,
+                NotificationRecord.is_deleted == False,
+                Notification.type == NotificationCounter.type,
+            )
+            .scalar_subquery()
+        )
+        db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(record_count=size, trimmed_at=func.now())
+        )
+        db.commit()
+
+    @staticmethod
+    def trim_user(db: Session, user_id, notification_type: Optional[str], max_records: int) -> int:
+        """
+        删除用户最早的已读记录，直到（指定类型的）记录数不超过上限
+
+        每批一个短事务，用 FOR UPDATE SKIP LOCKED 跳过正被在线请求占用的记录；
+        剩余记录全部未读时停止。完成后重算该用户的记录数。
+        送达表中的行不随记录删除，作为墓碑使被清理的站内信重复发送时不会再次送达。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+            notification_type: 站内信类型，None 表示按收件箱总量
+            max_records: 记录数上限
+
+        Returns:
+            int: 删除的记录数
+        """
+        records = InboxTrimService._records(user_id, notification_type)
+        excess = db.execute(select(func.count()).select_from(records.subquery())).scalar_one() - max_records
+
+        trimmed = 0
+        while excess > 0:
+            batch = (
+                records.where(NotificationRecord.is_read == True)
+                .order_by(NotificationRecord.created_at)
+                .limit(min(excess, settings.INBOX_TRIM_BATCH_SIZE))
+                .with_for_update(of=NotificationRecord, skip_locked=True)
+            )
+            keys = [tuple(row) for row in db.execute(batch)]
+            if not keys:
+                break
+            db.execute(
+                delete(NotificationRecord)
+                .where(tuple_(NotificationRecord.created_at, NotificationRecord.id).in_(keys))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            trimmed += len(keys)
+            excess -= len(keys)
+            metrics.inc("inbox_trim_rows_total", len(keys))
+        db.commit()
+
+        InboxTrimService.recount(db, user_id)
+        return trimmed
+
+    @staticmethod
+    def trim(db: Session) -> int:
+        """
+        清理所有超限的收件箱（单次最多处理 INBOX_TRIM_MAX_USERS 个）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            int: 删除的记录数
+        """
+        if settings.INBOX_MAX_RECORDS <= 0 and settings.INBOX_MAX_RECORDS_PER_TYPE <= 0:
+            return 0
+
+        candidates = InboxTrimService._over_limit(db, settings.INBOX_TRIM_MAX_USERS)
+        metrics.set("inbox_trim_last_run_users", len(candidates))
+
+        trimmed = 0
+        for user_id, notification_type, max_records in candidates:
+            try:
+                trimmed += InboxTrimService.trim_user(db, user_id, notification_type, max_records)
+            except Exception:
+                db.rollback()
+                logger.exception("清理用户 %s 的收件箱失败", user_id)
+                # 排到队尾，不在下次检查中再次优先处理
+                db.execute(
+                    update(NotificationCounter)
+                    .where(NotificationCounter.user_id == user_id)
+                    .values(trimmed_at=func.now())
+                )
+                db.commit()
+        return trimmed
@@ -1,22 +1,323 @@
-from datetime import datetime
-from typing import List, Optional
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy import and_, cast, column, delete, exists, func, literal, select, update, values
+from sqlalchemy.dialects.postgresql import JSONB, UUID, insert as pg_insert
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from fastapi import HTTPException, status
 
-from app.models.notification import Notification, NotificationRecord
+from app.config import settings
+from app.core.planner import planned_rows
+from app.core.templates import template_cache
+from app.models.notification import (
+    Notification,
+    NotificationContent,
+    NotificationDeferral,
+    NotificationDelivery,
+    NotificationRecord,
+    NotificationRecordArchive,
+)
+from app.models.segment import SegmentMember
 from app.models.user import User
+from app.services.archive_service import NotificationArchiveService
+from app.services.audience_service import AudienceService
+from app.services.counter_service import NotificationCounterService
+from app.services.expiry_service import NotificationExpiryService
+from app.services.purge_service import NotificationPurgeService
+from app.services.preference_service import PreferenceService
+from app.services.segment_service import SegmentService
+from app.services.template_service import TemplateService
+from app.tasks.jobs import Job, job_registry
 from app.schemas.notification import (
+    AudienceRule,
     NotificationCreate,
     NotificationUpdate,
     NotificationResponse,
     NotificationRecordResponse,
     NotificationRecordListResponse,
+    NotificationSendRequest,
+    SendEstimateResponse,
 )
 
 
 class NotificationService:
     """站内信服务"""
 
+    # UUIDv7 中的时间戳与记录 created_at 的最大允许偏差（应用与数据库时钟差 + 事务时长）
+    RECORD_ID_CLOCK_SKEW = timedelta(days=1)
+
+    @staticmethod
+    def _record_id_filters(record_id: str) -> list:
+        """
+        按记录 ID 查询的过滤条件
+
+        notification_records 按 created_at 分区。新记录的 ID 是 UUIDv7，其中带有写入时间；
+        记录的 created_at 是送达时间，不早于写入时间（按折叠键合并的记录保留 ID、送达时间更新），
+        据此附加 created_at 下界条件，裁剪掉更早的分区；旧的 uuid4 ID 无法推断时间，只按 ID 查询。
+        """
+        filters = [NotificationRecord.id == record_id]
+        try:
+            parsed = uuid.UUID(str(record_id))
+        except ValueError:
+            return filters
+
+        if parsed.version == 7:
+            written_at = datetime.fromtimestamp((parsed.int >> 80) / 1000, tz=timezone.utc)
+            filters.append(NotificationRecord.created_at >= written_at - NotificationService.RECORD_ID_CLOCK_SKEW)
+        return filters
+
+    @staticmethod
+    def _visible():
+        """用户可见的站内信条件：未删除、未撤回且未过期（需要查询中包含 notifications 表）"""
+        return and_(
+            Notification.deleted_at.is_(None),
+            Notification.recalled_at.is_(None),
+            NotificationExpiryService.not_expired(),
+        )
+
+    @staticmethod
+    def _get_active_notification(db: Session, notification_id: str) -> Notification:
+        """
+        获取未删除的站内信
+
+        Raises:
+            HTTPException: 站内信不存在或已删除
+        """
+        notification = (
+            db.query(Notification)
+            .filter(Notification.id == notification_id, Notification.deleted_at.is_(None))
+            .first()
+        )
+        if not notification:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="站内信不存在",
+            )
+        return notification
+
+    @staticmethod
+    def _ensure_not_recalled(notification: Notification) -> None:
+        """
+        检查站内信未被撤回
+
+        Raises:
+            HTTPException: 站内信已撤回
+        """
+        if notification.recalled_at is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="站内信已撤回",
+            )
+
+    @staticmethod
+    def _requested_users(user_ids: List[uuid.UUID], variables: Optional[Dict[uuid.UUID, dict]] = None):
+        """
+        把用户 ID 列表作为 VALUES 行集，一条语句内与其他表关联
+
+        指定 variables 时行集多一列 variables（该用户的模板变量，没有时为 NULL）
+        """
+        if variables is None:
+            return values(column("user_id", UUID(as_uuid=True)), name="requested_users").data(
+                [(user_id,) for user_id in user_ids]
+            )
+        return values(
+            column("user_id", UUID(as_uuid=True)),
+            column("variables", JSONB(none_as_null=True)),
+            name="requested_users",
+        ).data([(user_id, variables.get(user_id)) for user_id in user_ids])
+
+    @staticmethod
+    def _resolve_users(db: Session, user_ids: List[str]) -> Tuple[List[uuid.UUID], List[str]]:
+        """
+        校验请求中的用户 ID
+
+        格式错误的 ID 在本地剔除；其余 ID 作为 VALUES 行集与 users 表关联，一条查询找出不存在的用户。
+
+        Returns:
+            Tuple[List[uuid.UUID], List[str]]: (存在的用户 ID（去重）, 格式错误或不存在的 ID)
+        """
+        parsed: Dict[uuid.UUID, None] = {}
+        rejected: List[str] = []
+        for user_id in user_ids:
+            try:
+                parsed[uuid.UUID(str(user_id))] = None
+            except ValueError:
+                rejected.append(str(user_id))
+        if not parsed:
+            return [], rejected
+
+        requested = NotificationService._requested_users(list(parsed))
+        found = set(
+            db.execute(select(requested.c.user_id).join(User, User.id == requested.c.user_id)).scalars()
+        )
+        rejected.extend(str(user_id) for user_id in parsed if user_id not in found)
+        return [user_id for user_id in parsed if user_id in found], rejected
+
+    @staticmethod
+    def recipient_variables(db: Session, notification) -> FrozenSet[str]:
+        """站内信需要按用户提供的模板变量：模板引用、但站内信的共享变量没有提供的变量"""
+        if notification.template_id is None:
+            return frozenset()
+        compiled = TemplateService.get_compiled(db, notification.template_id, notification.template_version)
+        return compiled.variables.difference(notification.variables or {})
+
+    @staticmethod
+    def validate_recipient_variables(
+        db: Session,
+        notification,
+        user_ids: List[uuid.UUID],
+        variables: Optional[Dict[str, Dict[str, Any]]],
+    ) -> Dict[uuid.UUID, dict]:
+        """
+        校验按用户的模板变量
+
+        个性化站内信（模板中有共享变量未提供的变量）的每个接收用户都必须提供这些变量，
+        因此不能发送给所有用户、受众规则或受众分群（此时 user_ids 为空、variables 为 None）。
+
+        Args:
+            db: 数据库会话
+            notification: 站内信
+            user_ids: 接收用户 ID
+            variables: 用户 ID -> 该用户的模板变量
+
+        Returns:
+            Dict[uuid.UUID, dict]: 用户 ID -> 该用户的模板变量（没有时为空字典）
+
+        Raises:
+            HTTPException: 站内信不是由模板创建的、用户 ID 无效、变量过大，或缺少需要按用户提供的变量
+        """
+        required = NotificationService.recipient_variables(db, notification)
+        if not variables:
+            if required:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"站内信需要按用户提供模板变量（{', '.join(sorted(required))}），只能发送给指定用户",
+                )
+            return {}
+        if notification.template_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="站内信不是由模板创建的，不能指定按用户的模板变量",
+            )
+
+        parsed: Dict[uuid.UUID, dict] = {}
+        max_bytes = settings.TEMPLATE_RECIPIENT_VARIABLES_MAX_BYTES
+        for user_id, user_variables in variables.items():
+            try:
+                key = uuid.UUID(str(user_id))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"无效的用户 ID：{user_id}",
+                )
+            if len(json.dumps(user_variables, ensure_ascii=False).encode("utf-8")) > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"用户 {user_id} 的模板变量超过 {max_bytes} 字节",
+                )
+            parsed[key] = user_variables
+
+        if required:
+            for user_id in user_ids:
+                missing = required.difference(parsed.get(user_id, ()))
+                if missing:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"用户 {user_id} 缺少模板变量：{', '.join(sorted(missing))}",
+                    )
+        return parsed
+
+    @staticmethod
+    def _render_records(db: Session, records: list) -> List[NotificationRecordResponse]:
+        """
+        转换为响应格式，个性化记录按模板重新渲染
+
+        带模板变量的记录与站内信的共享变量合并（用户变量优先），按 (模板, 版本) 分组后批量渲染，
+        编译后的模板来自缓存，一页记录通常不访问数据库。
+        """
+        items = [NotificationRecordResponse.model_validate(record) for record in records]
+
+        groups = defaultdict(list)
+        for index, record in enumerate(records):
+            notification = record.notification
+            if record.variables is not None and notification.template_id is not None:
+                merged = {**(notification.variables or {}), **record.variables}
+                groups[(notification.template_id, notification.template_version)].append((index, merged))
+
+        for (template_id, version), entries in groups.items():
+            compiled = template_cache.get(db, template_id, version)
+            if compiled is None:
+                continue
+            rendered = compiled.render_many((merged for _, merged in entries), partial=True)
+            for (index, _), fields in zip(entries, rendered):
+                item = items[index]
+                fields["action_url"] = fields["action_url"] or item.notification.action_url
+                items[index] = item.model_copy(update={"notification": item.notification.model_copy(update=fields)})
+        return items
+
+    @staticmethod
+    def mark_sent(db: Session, notification: Notification) -> datetime:
+        """
+        站内信的首次发送时间，尚未发送过时在当前事务中写入
+
+        记录的 created_at 是各自的送达时间，都不早于首次发送时间。并发的首次发送由站内信的行锁串行，
+        后到者读到先到者写入的时间。
+        """
+        if notification.sent_at is None:
+            sent_at = db.execute(
+                update(Notification)
+                .where(Notification.id == notification.id, Notification.sent_at.is_(None))
+                .values(sent_at=func.now())
+                .returning(Notification.sent_at)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if sent_at is None:
+                sent_at = db.execute(
+                    select(Notification.sent_at).where(Notification.id == notification.id)
+                ).scalar_one()
+            set_committed_value(notification, "sent_at", sent_at)
+        return notification.sent_at
+
+    @staticmethod
+    def _received(notification: Notification, recipient_id=None):
+        """
+        recipient_id 所指用户已收到该站内信的条件（按送达表判断，记录已归档、清理时同样成立）；
+        recipient_id 为 None 时表示是否有任何用户收到过
+        """
+        conditions = [NotificationDelivery.notification_id == notification.id]
+        if recipient_id is not None:
+            conditions.append(NotificationDelivery.user_id == recipient_id)
+        return exists().where(*conditions)
+
+    @staticmethod
+    def _get_archived_record(
+        db: Session,
+        user_id: str,
+        record_id: str,
+        visible_only: bool = False,
+    ) -> Optional[NotificationRecordArchive]:
+        """在归档表中查找用户的站内信记录，visible_only 时排除已删除的记录和已过期的站内信"""
+        query = db.query(NotificationRecordArchive).filter(
+            NotificationRecordArchive.id == record_id,
+            NotificationRecordArchive.user_id == user_id,
+        )
+        if visible_only:
+            query = (
+                query.filter(NotificationRecordArchive.deleted_at.is_(None))
+                .join(Notification)
+                .filter(NotificationService._visible())
+            )
+        return query.first()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """站内信正文摘要：正文相同时相同"""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     @staticmethod
     def create_notification(
         db: Session,
@@ -26,6 +327,12 @@ class NotificationService:
         """
         创建站内信（仅创建内容，不发送给用户）
 
+        指定 dedupe 时正文按摘要存入共享正文表，站内信行只引用摘要：自动化场景反复创建的相同正文只存一份。
+        每次创建仍是一条新的站内信，发送、已读和计数都各自独立，重复的事件照常送达。
+
+        指定模板时用 variables 渲染模板得到标题、内容和链接，并记录模板版本和变量。
+        个性化站内信只渲染共享变量，其余变量保留占位符，发送时按用户提供、读取时再渲染。
+
         Args:
             db: 数据库会话
             notification_create: 站内信创建信息
@@ -33,16 +340,51 @@ class NotificationService:
 
         Returns:
             NotificationResponse: 站内信信息
+
+        Raises:
+            HTTPException: 模板不存在、缺少模板变量或渲染后的标题过长
         """
-        notification = Notification(
-            type=notification_create.type,
-            title=notification_create.title,
-            content=notification_create.content,
-            action_url=notification_create.action_url,
-            priority=notification_create.priority,
-            created_by=created_by_id,
-            expires_at=notification_create.expires_at,
-        )
+        if notification_create.template_id is not None:
+            rendered = TemplateService.render(
+                db,
+                str(notification_create.template_id),
+                notification_create.variables or {},
+                notification_create.template_version,
+                partial=notification_create.personalized,
+            )
+            notification_create = notification_create.model_copy(
+                update={
+                    "title": rendered.title,
+                    "content": rendered.content,
+                    "action_url": rendered.action_url or notification_create.action_url,
+                    "template_version": rendered.version,
+                }
+            )
+
+        values = {
+            "type": notification_create.type,
+            "title": notification_create.title,
+            "content": notification_create.content,
+            "action_url": notification_create.action_url,
+            "priority": notification_create.priority,
+            "created_by": created_by_id,
+            "expires_at": notification_create.expires_at,
+            "collapse_key": notification_create.collapse_key,
+            "template_id": notification_create.template_id,
+            "template_version": notification_create.template_version,
+            "variables": notification_create.variables if notification_create.template_id is not None else None,
+        }
+        if notification_create.dedupe:
+            content_hash = NotificationService.content_hash(notification_create.content)
+            # 并发创建相同正文时由主键保证只插入一行；共享正文不会被删除，插入后可直接引用
+            db.execute(
+                pg_insert(NotificationContent)
+                .values(content_hash=content_hash, content=notification_create.content)
+                .on_conflict_do_nothing(index_elements=[NotificationContent.content_hash])
+            )
+            values.update(content=None, content_hash=content_hash)
+
+        notification = Notification(**values)
         db.add(notification)
         db.commit()
         db.refresh(notification)
@@ -64,12 +406,7 @@ class NotificationService:
         Raises:
             HTTPException: 站内信不存在
         """
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="站内信不存在",
-            )
+        notification = NotificationService._get_active_notification(db, notification_id)
 
         return NotificationResponse.model_validate(notification)
 
@@ -93,17 +430,41 @@ class NotificationService:
         Raises:
             HTTPException: 站内信不存在
         """
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="站内信不存在",
-            )
+        notification = NotificationService._get_active_notification(db, notification_id)
+        # 与分批过期处理互斥，按最新的过期处理进度维护计数
+        db.refresh(notification, with_for_update=True)
+
+        old_type = notification.type
+        counted = notification.expiry_processed_at is None
+        cursor = notification.expiry_cursor
 
         # 更新字段
         update_data = notification_update.model_dump(exclude_unset=True)
+        # 共享正文可能被其他站内信引用，修改前先把正文写回本行，不再引用共享正文
+        if update_data and notification.content_hash is not None:
+            notification.body = notification.shared_content.content
+            notification.content_hash = None
         for field, value in update_data.items():
             setattr(notification, field, value)
+        # 直接修改了渲染结果，不再对应模板
+        if any(field in update_data for field in ("title", "content", "action_url")):
+            notification.template_id = None
+            notification.template_version = None
+            notification.variables = None
+
+        # 维护未读计数：仍计入计数的用户（分批过期处理中只有进度之后的）修改类型时在类型间转移，
+        # 已扣除的用户在站内信被延期时重新计入；撤回的站内信已不在任何收件箱中，不再参与计数
+        expires_at = notification.expires_at
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if notification.recalled_at is None:
+            if counted and notification.type != old_type:
+                NotificationCounterService.remove_notification(db, notification, old_type, after_user_id=cursor)
+                NotificationCounterService.add_notification(db, notification, notification.type, after_user_id=cursor)
+            if (not counted or cursor is not None) and (expires_at is None or expires_at > datetime.now(timezone.utc)):
+                NotificationCounterService.add_notification(db, notification, notification.type, until_user_id=cursor)
+                notification.expiry_processed_at = None
+                notification.expiry_cursor = None
 
         db.commit()
         db.refresh(notification)
@@ -111,109 +472,478 @@ class NotificationService:
         return NotificationResponse.model_validate(notification)
 
     @staticmethod
-    def delete_notification(db: Session, notification_id: str) -> None:
+    def delete_notification(db: Session, notification_id: str) -> Job:
         """
         删除站内信（会同时删除所有用户的站内信记录）
 
+        只写入 deleted_at，站内信立即对所有用户不可见；记录由后台作业分批物理删除，
+        并在同一事务内逐批扣减未读计数，进度可通过作业查询接口获取。
+
         Args:
             db: 数据库会话
             notification_id: 站内信 ID
 
+        Returns:
+            Job: 物理删除的后台作业
+
         Raises:
             HTTPException: 站内信不存在
         """
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
+        notification = NotificationService._get_active_notification(db, notification_id)
+        notification.deleted_at = func.now()
+        db.commit()
+
+        return job_registry.submit(
+            "notification_delete",
+            lambda job: NotificationPurgeService.run_delete(job, notification_id),
+        )
+
+    @staticmethod
+    def recall_notification(db: Session, notification_id: str) -> Job:
+        """
+        撤回已发送的站内信
+
+        只更新站内信本身的 recalled_at，所有用户立即看不到该站内信；
+        用户记录由后台作业分批删除，并在同一事务内逐批扣减未读计数。站内信内容保留。
+
+        Args:
+            db: 数据库会话
+            notification_id: 站内信 ID
+
+        Returns:
+            Job: 删除用户记录的后台作业
+
+        Raises:
+            HTTPException: 站内信不存在或已撤回
+        """
+        notification = NotificationService._get_active_notification(db, notification_id)
+        recalled = (
+            db.query(Notification)
+            .filter(Notification.id == notification.id, Notification.recalled_at.is_(None))
+            .update({"recalled_at": func.now()}, synchronize_session=False)
+        )
+        db.commit()
+        if not recalled:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="站内信不存在",
+                status_code=status.HTTP_409_CONFLICT,
+                detail="站内信已撤回",
             )
 
-        db.delete(notification)
-        db.commit()
+        return job_registry.submit(
+            "notification_recall",
+            lambda job: NotificationPurgeService.run_recall(job, notification_id),
+        )
+
+    @staticmethod
+    def _collapse(db: Session, notification: Notification, user_ids, recipient_variables=None) -> int:
+        """
+        按折叠键合并投递
+
+        user_ids 中已有同折叠键、同类型、仍然可见的站内信的未读记录时，把该记录移到本站内信下并累加折叠次数：
+        用户看到最新内容，记录数和未读数都不增加。被合并的用户已在送达表中占位，随后的写入不会再插入新记录。
+        每个用户最多合并一条（最新的）记录；并发发送抢先送达、未能重新插入的记录按删除数减去重新插入数扣除未读数。
+
+        记录的 created_at 是送达时间，合并相当于一次新的送达：不在原行上改写分区键，而是在一条语句中
+        删除原记录、以当前时间重新插入（记录 ID 不变），使其排在收件箱最前面。
+
+        Args:
+            db: 数据库会话
+            notification: 正在发送的站内信
+            user_ids: 只选择一列用户 ID 的查询
+            recipient_variables: 含 user_id、variables 两列的按用户模板变量（为空时清空记录的变量）
+
+        Returns:
+            int: 合并的记录数
+        """
+        if (
+            notification.collapse_key is None
+            or notification.expiry_processed_at is not None
+            or notification.expiry_cursor is not None
+        ):
+            return 0
+        # 每个用户最多合并一条（最新的）同键记录；已收到本站内信的用户不合并，原记录保留
+        candidates = (
+            select(NotificationRecord.id)
+            .join(Notification, Notification.id == NotificationRecord.notification_id)
+            .where(
+                Notification.collapse_key == notification.collapse_key,
+                Notification.type == notification.type,
+                Notification.id != notification.id,
+                Notification.expiry_processed_at.is_(None),
+                NotificationService._visible(),
+                NotificationRecord.user_id.in_(user_ids),
+                NotificationRecord.is_read.is_(False),
+                NotificationRecord.is_deleted.is_(False),
+                ~NotificationService._received(notification, NotificationRecord.user_id),
+            )
+            .distinct(NotificationRecord.user_id)
+            .order_by(NotificationRecord.user_id, NotificationRecord.created_at.desc())
+        )
+        moved = (
+            delete(NotificationRecord)
+            .where(
+                NotificationRecord.id.in_(candidates),
+                NotificationRecord.is_read.is_(False),
+                NotificationRecord.is_deleted.is_(False),
+            )
+            .returning(NotificationRecord.id, NotificationRecord.user_id, NotificationRecord.collapse_count)
+            .cte("moved")
+        )
+        claimed = (
+            pg_insert(NotificationDelivery)
+            .from_select(
+                ["notification_id", "user_id"],
+                select(literal(notification.id, UUID(as_uuid=True)), moved.c.user_id),
+            )
+            .on_conflict_do_nothing()
+            .returning(NotificationDelivery.user_id)
+            .cte("claimed")
+        )
+        columns = ["id", "notification_id", "user_id", "collapse_count"]
+        selected = [
+            moved.c.id,
+            literal(notification.id, UUID(as_uuid=True)),
+            moved.c.user_id,
+            moved.c.collapse_count + 1,
+        ]
+        if recipient_variables is not None:
+            # VALUES 中的参数按 text 推断类型，写入前显式转换为 jsonb
+            columns.append("variables")
+            selected.append(
+                select(cast(recipient_variables.c.variables, JSONB))
+                .where(recipient_variables.c.user_id == moved.c.user_id)
+                .scalar_subquery()
+            )
+        records = select(*selected).join(claimed, claimed.c.user_id == moved.c.user_id)
+        reinserted = (
+            pg_insert(NotificationRecord)
+            .from_select(columns, records, include_defaults=False)
+            .returning(NotificationRecord.user_id)
+            .cte("reinserted")
+        )
+        # 并发发送已先送达的用户原记录被删除却没有重新插入，按删除数减去重新插入数扣除未读数
+        lost = select(moved.c.user_id).except_all(select(reinserted.c.user_id)).scalar_subquery()
+        merged, lost_user_ids = db.execute(
+            select(select(func.count()).select_from(reinserted).scalar_subquery(), func.array(lost))
+        ).one()
+        NotificationCounterService.decrement_users(db, notification.type, Counter(lost_user_ids))
+        return merged
+
+    @staticmethod
+    def _insert_records(notification: Notification, recipients):
+        """
+        INSERT ... SELECT 写入记录
+
+        先在送达表中为收件人占位，只为占位成功的用户写入记录：已收到过的用户（含记录已归档、清理的），
+        以及并发或重试的同一发送已写入的用户，都由送达表主键上的 ON CONFLICT DO NOTHING 跳过，不会产生重复记录。
+        记录的 created_at 取默认值，即本次送达时间。
+
+        Args:
+            notification: 正在发送的站内信
+            recipients: 第一列为用户 ID 的查询，可选的第二列为该用户的模板变量
+
+        Returns:
+            Insert: 写入记录的语句（调用方可追加 RETURNING）
+        """
+        candidates = recipients.cte("recipients")
+        user_id, *variables = candidates.c
+        claimed = (
+            pg_insert(NotificationDelivery)
+            .from_select(["notification_id", "user_id"], select(literal(notification.id, UUID(as_uuid=True)), user_id))
+            .on_conflict_do_nothing()
+            .returning(NotificationDelivery.user_id)
+            .cte("claimed")
+        )
+        columns = ["notification_id", "user_id"]
+        selected = [literal(notification.id, UUID(as_uuid=True)), claimed.c.user_id]
+        records = select(*selected)
+        if variables:
+            # VALUES 中的参数按 text 推断类型，写入前显式转换为 jsonb
+            columns.append("variables")
+            records = records.add_columns(cast(variables[0], JSONB)).join(
+                candidates, user_id == claimed.c.user_id
+            )
+        return pg_insert(NotificationRecord).from_select(columns, records, include_defaults=False)
+
+    @staticmethod
+    def _insert_counted(db: Session, notification: Notification, stmt) -> int:
+        """
+        执行写入记录的语句，并为未读计数仍计入该站内信的用户累加计数
+
+        站内信已过期处理完时不累加；分批过期处理中（极少见）进度之前的用户已扣除计数，只为之后的用户累加。
+
+        Args:
+            db: 数据库会话
+            notification: 正在发送的站内信（已按 NotificationExpiryService.lock_progress 读取过期处理进度）
+            stmt: 写入记录的语句
+
+        Returns:
+            int: 写入的记录数
+        """
+        if notification.expiry_processed_at is not None:
+            return db.execute(stmt).rowcount
+        cursor = notification.expiry_cursor
+        if cursor is None:
+            # 写入记录与累加未读计数在同一条语句中完成
+            sent = stmt.returning(NotificationRecord.user_id).cte("sent")
+            return NotificationCounterService.increment_selected(db, notification.type, select(sent.c.user_id))
+        user_ids = db.execute(stmt.returning(NotificationRecord.user_id)).scalars().all()
+        NotificationCounterService.increment_users(
+            db, notification.type, [user_id for user_id in user_ids if user_id > cursor]
+        )
+        return len(user_ids)
+
+    @staticmethod
+    def _defer_quiet_hours(
+        db: Session,
+        notification: Notification,
+        recipient_id,
+        conditions: List,
+        now: datetime,
+        source=None,
+        variables=None,
+    ) -> int:
+        """
+        登记处于免打扰时段的收件人，免打扰结束后由后台任务写入收件箱
+
+        这些用户已被本次发送的偏好过滤排除，不登记就再也收不到该站内信。
+
+        Args:
+            db: 数据库会话
+            notification: 正在发送的站内信
+            recipient_id: 收件人用户 ID 列
+            conditions: 收件人范围条件（不含偏好过滤）
+            now: 判断免打扰时段的时间（与本次发送的偏好过滤相同）
+            source: 收件人所在的 FROM（为空时按 recipient_id 推断）
+            variables: 按用户的模板变量列（可选）
+
+        Returns:
+            int: 推迟送达的用户数
+        """
+        deferral = PreferenceService.quiet_hours_deferral(notification, recipient_id, now)
+        if deferral is None:
+            return 0
+        quiet, deliver_after = deferral
+        columns = ["notification_id", "user_id", "deliver_after"]
+        selected = [literal(notification.id, UUID(as_uuid=True)), recipient_id, deliver_after]
+        if variables is not None:
+            columns.append("variables")
+            selected.append(variables)
+        recipients = select(*selected)
+        if source is not None:
+            recipients = recipients.select_from(source)
+        recipients = recipients.where(
+            *conditions, *quiet, ~NotificationService._received(notification, recipient_id)
+        )
+        stmt = (
+            pg_insert(NotificationDeferral)
+            .from_select(columns, recipients)
+            .on_conflict_do_nothing(
+                index_elements=[NotificationDeferral.notification_id, NotificationDeferral.user_id]
+            )
+        )
+        return db.execute(stmt).rowcount
 
     @staticmethod
     def send_to_users(
         db: Session,
         notification_id: str,
         user_ids: List[str],
-    ) -> int:
+        variables: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Tuple[int, List[str]]:
         """
         发送站内信给指定用户
 
+        先剔除格式错误和不存在的用户 ID（不会因个别无效 ID 触发外键错误而整批失败），
+        再以 VALUES 行集一条 INSERT ... SELECT 写入尚未收到的用户。
+        站内信带折叠键时，已有同键未读记录的用户改为合并到该记录。
+        按通知偏好屏蔽了该站内信的用户在同一条语句中排除，不写入记录；处于免打扰时段的用户登记为推迟送达，
+        免打扰结束后再写入（不计入返回的发送数量）。
+        指定按用户的模板变量时，变量随 VALUES 行集写入各用户的记录，内容仍只存一份。
+
         Args:
             db: 数据库会话
             notification_id: 站内信 ID
             user_ids: 用户 ID 列表
+            variables: 用户 ID -> 该用户的模板变量（可选）
 
         Returns:
-            int: 成功发送的用户数量
+            Tuple[int, List[str]]: (成功发送的用户数量（含合并到已有记录的）, 被拒绝的用户 ID)
 
         Raises:
-            HTTPException: 站内信不存在
+            HTTPException: 站内信不存在或已撤回，或按用户的模板变量无效
         """
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="站内信不存在",
-            )
+        notification = NotificationService._get_active_notification(db, notification_id)
+        NotificationService._ensure_not_recalled(notification)
+
+        valid, rejected = NotificationService._resolve_users(db, user_ids)
+        if not valid:
+            return 0, rejected
+        recipient_variables = NotificationService.validate_recipient_variables(db, notification, valid, variables)
+
+        # 与 users 关联：校验之后才被删除的用户同样跳过
+        requested = NotificationService._requested_users(valid, recipient_variables or None)
+        NotificationExpiryService.lock_progress(db, notification)
+        NotificationService.mark_sent(db, notification)
+        selected = [requested.c.user_id]
+        if recipient_variables:
+            selected.append(requested.c.variables)
+
+        # 屏蔽了该站内信的用户在语句内排除，既不新增也不合并记录；免打扰中的用户推迟送达
+        now = datetime.now(timezone.utc)
+        preference_filters = PreferenceService.conditions(notification, requested.c.user_id, now)
+        collapsed = NotificationService._collapse(
+            db,
+            notification,
+            select(requested.c.user_id).join(User, User.id == requested.c.user_id).where(*preference_filters),
+            requested if recipient_variables else None,
+        )
+        recipients = select(*selected).join(User, User.id == requested.c.user_id).where(*preference_filters)
+        count = NotificationService._insert_counted(
+            db, notification, NotificationService._insert_records(notification, recipients)
+        )
+        NotificationService._defer_quiet_hours(
+            db,
+            notification,
+            requested.c.user_id,
+            [],
+            now,
+            source=requested.join(User, User.id == requested.c.user_id),
+            variables=cast(requested.c.variables, JSONB) if recipient_variables else None,
+        )
+        db.commit()
 
-        # 批量创建站内信记录
-        records = []
-        for user_id in user_ids:
-            # 检查是否已存在
-            existing = (
-                db.query(NotificationRecord)
-                .filter(
-                    NotificationRecord.notification_id == notification_id,
-                    NotificationRecord.user_id == user_id,
-                )
-                .first()
-            )
-            if not existing:
-                records.append(
-                    NotificationRecord(
-                        notification_id=notification_id,
-                        user_id=user_id,
-                    )
-                )
+        return collapsed + count, rejected
 
-        db.bulk_save_objects(records)
-        db.commit()
+    @staticmethod
+    def estimate_send(
+        db: Session,
+        notification_id: str,
+        send_request: NotificationSendRequest,
+    ) -> SendEstimateResponse:
+        """
+        预估发送规模（不写入任何记录）
+
+        指定用户时精确统计（无效的用户 ID 不计入）；发送给所有用户或按受众规则发送时，由查询规划器按统计信息估算，
+        不扫描用户表和记录表；受众分群的人数取最近一次刷新时的成员数。
+        站内信从未发送过时，已收到的用户数直接为 0。
+
+        Args:
+            db: 数据库会话
+            notification_id: 站内信 ID
+            send_request: 发送请求
 
-        return len(records)
+        Returns:
+            SendEstimateResponse: 预估结果（不含耗时，由扩散执行器按写入速率补充）
+
+        Raises:
+            HTTPException: 站内信不存在或已撤回，受众规则无效，或分群不存在、尚未刷新
+        """
+        notification = NotificationService._get_active_notification(db, notification_id)
+        NotificationService._ensure_not_recalled(notification)
+
+        if not (send_request.send_to_all or send_request.audience is not None or send_request.segment_id is not None):
+            valid, _ = NotificationService._resolve_users(db, send_request.user_ids)
+            recipients = len(valid)
+            delivered = 0
+            if valid:
+                requested = NotificationService._requested_users(valid)
+                delivered = db.execute(
+                    select(func.count())
+                    .select_from(requested)
+                    .where(NotificationService._received(notification, requested.c.user_id))
+                ).scalar()
+            exact = True
+        else:
+            if send_request.segment_id is not None:
+                segment = SegmentService.get_sendable_segment(db, send_request.segment_id)
+                recipient_id = SegmentMember.user_id
+                targets = select(recipient_id).where(SegmentMember.segment_id == segment.id)
+                recipients = segment.member_count
+            else:
+                recipient_id = User.id
+                targets = select(recipient_id)
+                if send_request.audience is not None:
+                    AudienceService.validate(db, send_request.audience)
+                    targets = targets.where(*AudienceService.conditions(db, send_request.audience))
+                recipients = planned_rows(db, targets)
+
+            delivered = 0
+            if db.query(NotificationService._received(notification)).scalar():
+                received = targets.where(NotificationService._received(notification, recipient_id))
+                delivered = min(planned_rows(db, received), recipients)
+            exact = False
+
+        return SendEstimateResponse(
+            estimated_recipients=recipients,
+            already_delivered=delivered,
+            estimated_new=recipients - delivered,
+            exact=exact,
+            priority=notification.priority,
+        )
 
     @staticmethod
     def send_to_all_users(
         db: Session,
         notification_id: str,
+        after_user_id: Optional[uuid.UUID] = None,
+        until_user_id: Optional[uuid.UUID] = None,
+        audience: Optional[AudienceRule] = None,
+        segment_id: Optional[uuid.UUID] = None,
     ) -> int:
         """
         发送站内信给所有用户
 
+        指定用户 ID 范围时只发送给范围内的用户，供扩散执行器按范围分块发送；
+        指定受众规则时只发送给符合规则的用户；指定受众分群时直接从分群成员表按主键顺序读取用户，
+        不再计算规则。站内信带折叠键时，已有同键未读记录的用户改为合并到该记录。
+        按通知偏好屏蔽了该站内信的用户作为一个反连接条件排除，不写入记录；处于免打扰时段的用户登记为推迟送达，
+        免打扰结束后再写入（不计入返回的发送数量）。
+        只执行语句、不提交事务，由调用方与分块断点放在同一个事务中提交。
+
         Args:
             db: 数据库会话
             notification_id: 站内信 ID
+            after_user_id: 只发送给 ID 大于该值的用户（可选）
+            until_user_id: 只发送给 ID 小于等于该值的用户（可选）
+            audience: 受众规则（可选）
+            segment_id: 受众分群 ID（可选）
 
         Returns:
-            int: 成功发送的用户数量
+            int: 成功发送的用户数量（含合并到已有记录的）
 
         Raises:
-            HTTPException: 站内信不存在
+            HTTPException: 站内信不存在或已撤回，或受众规则引用的站内信不存在
         """
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not notification:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="站内信不存在",
-            )
-
-        # 获取所有用户 ID
-        all_users = db.query(User.id).all()
-        user_ids = [str(user.id) for user in all_users]
+        notification = NotificationService._get_active_notification(db, notification_id)
+        NotificationService._ensure_not_recalled(notification)
+
+        # 在数据库内一条 INSERT ... SELECT 完成，用户 ID 不经过 Python
+        recipient_id = SegmentMember.user_id if segment_id is not None else User.id
+        conditions = []
+        if segment_id is not None:
+            conditions.append(SegmentMember.segment_id == segment_id)
+        if after_user_id is not None:
+            conditions.append(recipient_id > after_user_id)
+        if until_user_id is not None:
+            conditions.append(recipient_id <= until_user_id)
+        if audience is not None:
+            conditions.extend(AudienceService.conditions(db, audience))
+        now = datetime.now(timezone.utc)
+        preference_filters = PreferenceService.conditions(notification, recipient_id, now)
+
+        NotificationExpiryService.lock_progress(db, notification)
+        NotificationService.mark_sent(db, notification)
+        collapsed = NotificationService._collapse(
+            db, notification, select(recipient_id).where(*conditions, *preference_filters)
+        )
+        recipients = select(recipient_id).where(*conditions, *preference_filters)
+        count = NotificationService._insert_counted(
+            db, notification, NotificationService._insert_records(notification, recipients)
+        )
+        NotificationService._defer_quiet_hours(db, notification, recipient_id, conditions, now)
 
-        return NotificationService.send_to_users(db, notification_id, user_ids)
+        return collapsed + count
 
     @staticmethod
     def get_user_notifications(
@@ -223,6 +953,7 @@ class NotificationService:
         notification_type: Optional[str] = None,
         skip: int = 0,
         limit: int = 20,
+        before: Optional[datetime] = None,
     ) -> NotificationRecordListResponse:
         """
         获取用户的站内信列表
@@ -234,6 +965,8 @@ class NotificationService:
             notification_type: 站内信类型筛选
             skip: 跳过数量（分页）
             limit: 返回数量（分页）
+            before: 游标，只返回创建时间早于该时间的站内信（使用上一页的 next_cursor）；
+                    指定后查询只扫描该时间之前的分区
 
         Returns:
             NotificationRecordListResponse: 站内信列表
@@ -243,6 +976,7 @@ class NotificationService:
             db.query(NotificationRecord)
             .filter(NotificationRecord.user_id == user_id, NotificationRecord.is_deleted == False)
             .join(Notification)
+            .filter(NotificationService._visible())
         )
 
         # 筛选条件
@@ -252,33 +986,60 @@ class NotificationService:
         if notification_type:
             query = query.filter(Notification.type == notification_type)
 
+        # 游标分页：created_at 是分区键，上界条件可直接裁剪掉更新的分区
+        page_query = query
+        if before is not None:
+            page_query = page_query.filter(NotificationRecord.created_at < before)
+
         # 排序（最新站内信在前）
-        query = query.order_by(NotificationRecord.created_at.desc())
+        page_query = page_query.order_by(NotificationRecord.created_at.desc())
 
         # 总数
         total = query.count()
 
         # 未读数量
-        unread_count = (
-            db.query(NotificationRecord)
-            .filter(
-                NotificationRecord.user_id == user_id,
-                NotificationRecord.is_read == False,
-                NotificationRecord.is_deleted == False,
-            )
-            .count()
-        )
+        unread_count = NotificationCounterService.get_unread_count(db, user_id)
 
         # 分页
-        records = query.offset(skip).limit(limit).all()
+        records = page_query.offset(skip).limit(limit).all()
+
+        # 热数据不足一页、或这一页已越过热数据边界时，才需要合并归档表（归档记录均为已读）
+        boundary = NotificationArchiveService.hot_boundary()
+        if (
+            boundary is not None
+            and is_read is not False
+            and (len(records) < limit or records[-1].created_at < boundary)
+        ):
+            archive_query = (
+                db.query(NotificationRecordArchive)
+                .filter(NotificationRecordArchive.user_id == user_id, NotificationRecordArchive.deleted_at.is_(None))
+                .join(Notification)
+                .filter(NotificationService._visible())
+            )
+            if notification_type:
+                archive_query = archive_query.filter(Notification.type == notification_type)
+            total += archive_query.count()
+
+            if before is not None:
+                archive_query = archive_query.filter(NotificationRecordArchive.created_at < before)
+
+            # 两边各取前 skip + limit 条按时间归并，即为合并后的这一页
+            window = skip + limit
+            hot_records = page_query.limit(window).all() if skip else records
+            archived_records = (
+                archive_query.order_by(NotificationRecordArchive.created_at.desc()).limit(window).all()
+            )
+            merged = sorted(hot_records + archived_records, key=lambda r: r.created_at, reverse=True)
+            records = merged[skip:window]
 
-        # 转换为响应格式
-        items = [NotificationRecordResponse.model_validate(record) for record in records]
+        # 转换为响应格式（个性化记录按模板渲染）
+        items = NotificationService._render_records(db, records)
 
         return NotificationRecordListResponse(
             total=total,
             unread_count=unread_count,
             items=items,
+            next_cursor=records[-1].created_at if len(records) == limit else None,
         )
 
     @staticmethod
@@ -304,20 +1065,25 @@ class NotificationService:
         record = (
             db.query(NotificationRecord)
             .filter(
-                NotificationRecord.id == record_id,
+                *NotificationService._record_id_filters(record_id),
                 NotificationRecord.user_id == user_id,
                 NotificationRecord.is_deleted == False,
             )
+            .join(Notification)
+            .filter(NotificationService._visible())
             .first()
         )
 
+        if not record:
+            record = NotificationService._get_archived_record(db, user_id, record_id, visible_only=True)
+
         if not record:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="站内信不存在",
             )
 
-        return NotificationRecordResponse.model_validate(record)
+        return NotificationService._render_records(db, [record])[0]
 
     @staticmethod
     def mark_as_read(
@@ -336,26 +1102,39 @@ class NotificationService:
         Raises:
             HTTPException: 站内信不存在
         """
-        record = (
-            db.query(NotificationRecord)
-            .filter(
-                NotificationRecord.id == record_id,
-                NotificationRecord.user_id == user_id,
-                NotificationRecord.is_deleted == False,
-            )
+        filters = [
+            *NotificationService._record_id_filters(record_id),
+            NotificationRecord.user_id == user_id,
+            NotificationRecord.is_deleted == False,
+        ]
+        row = (
+            db.query(NotificationRecord.is_read, Notification.type, Notification.expiry_processed_at)
+            .join(Notification)
+            .filter(*filters, NotificationService._visible())
             .first()
         )
 
-        if not record:
+        if not row:
+            # 归档记录都是已读的，无需处理
+            if NotificationService._get_archived_record(db, user_id, record_id, visible_only=True):
+                return
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="站内信不存在",
             )
 
-        if not record.is_read:
-            record.is_read = True
-            record.read_at = datetime.utcnow()
-            db.commit()
+        if row.is_read:
+            return
+
+        # 条件更新：并发标记同一条记录时只有一个请求会扣减未读计数
+        updated = (
+            db.query(NotificationRecord)
+            .filter(*filters, NotificationRecord.is_read == False)
+            .update({"is_read": True, "read_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        if updated and row.expiry_processed_at is None:
+            NotificationCounterService.decrement(db, user_id, row.type)
+        db.commit()
 
     @staticmethod
     def mark_all_as_read(db: Session, user_id: str) -> int:
@@ -369,22 +1148,16 @@ class NotificationService:
         Returns:
             int: 标记为已读的数量
         """
-        # 查询未读的站内信
-        unread_records = (
+        count = (
             db.query(NotificationRecord)
             .filter(
                 NotificationRecord.user_id == user_id,
                 NotificationRecord.is_read == False,
                 NotificationRecord.is_deleted == False,
             )
-            .all()
+            .update({"is_read": True, "read_at": datetime.utcnow()}, synchronize_session=False)
         )
-
-        count = 0
-        for record in unread_records:
-            record.is_read = True
-            record.read_at = datetime.utcnow()
-            count += 1
+        NotificationCounterService.reset(db, user_id)
 
         db.commit()
         return count
@@ -406,23 +1179,45 @@ class NotificationService:
         Raises:
             HTTPException: 站内信不存在
         """
-        record = (
-            db.query(NotificationRecord)
-            .filter(
-                NotificationRecord.id == record_id,
-                NotificationRecord.user_id == user_id,
-            )
-            .first()
-        )
+        filters = [
+            *NotificationService._record_id_filters(record_id),
+            NotificationRecord.user_id == user_id,
+        ]
+        record = db.query(NotificationRecord).filter(*filters).first()
 
         if not record:
+            # 归档记录同样软删除
+            archived = NotificationService._get_archived_record(db, user_id, record_id)
+            if archived:
+                db.query(NotificationRecordArchive).filter(
+                    NotificationRecordArchive.id == archived.id,
+                    NotificationRecordArchive.deleted_at.is_(None),
+                ).update({"deleted_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                return
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="站内信不存在",
             )
 
-        record.is_deleted = True
-        record.deleted_at = datetime.utcnow()
+        if record.is_deleted:
+            return
+
+        notification = record.notification
+        NotificationExpiryService.lock_progress(db, notification)
+        counted = notification.expiry_processed_at is None and (
+            notification.expiry_cursor is None or record.user_id > notification.expiry_cursor
+        )
+        # 条件更新并返回更新时的已读状态：与并发的删除、标记已读之间只扣减一次未读计数
+        deleted = db.execute(
+            update(NotificationRecord)
+            .where(*filters, NotificationRecord.is_deleted == False)
+            .values(is_deleted=True, deleted_at=datetime.utcnow())
+            .returning(NotificationRecord.is_read)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if deleted and not deleted.is_read and counted:
+            NotificationCounterService.decrement(db, user_id, notification.type)
         db.commit()
 
     @staticmethod
@@ -437,12 +1232,4 @@ class NotificationService:
         Returns:
             int: 未读数量
         """
-        return (
-            db.query(NotificationRecord)
-            .filter(
-                NotificationRecord.user_id == user_id,
-                NotificationRecord.is_read == False,
-                NotificationRecord.is_deleted == False,
-            )
-            .count()
-        )
+        return NotificationCounterService.get_unread_count(db, user_id)
@@ -0,0 +1,212 @@
+from datetime import datetime, time, timezone
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, case, exists, literal, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.preferences import preference_cache
+from app.models.notification import Notification, NotificationType
+from app.models.preference import TYPE_BITS, NotificationPreference, type_bit
+from app.schemas.preference import NotificationPreferenceResponse, NotificationPreferenceUpdate
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class PreferenceService:
+    """用户通知偏好服务"""
+
+    @staticmethod
+    def _to_utc_minute(value: time, utc_offset_minutes: int) -> int:
+        """当地时间换算为 UTC 当天第几分钟"""
+        return (value.hour * 60 + value.minute - utc_offset_minutes) % MINUTES_PER_DAY
+
+    @staticmethod
+    def _to_local_time(minute: int, utc_offset_minutes: int) -> time:
+        """UTC 当天第几分钟换算为当地时间"""
+        minute = (minute + utc_offset_minutes) % MINUTES_PER_DAY
+        return time(minute // 60, minute % 60)
+
+    @staticmethod
+    def _response(preference: Optional[NotificationPreference]) -> NotificationPreferenceResponse:
+        """组装偏好响应（没有偏好行时返回默认值）"""
+        if preference is None:
+            return NotificationPreferenceResponse()
+        quiet_hours = {}
+        if preference.quiet_start is not None:
+            quiet_hours = {
+                "quiet_hours_start": PreferenceService._to_local_time(
+                    preference.quiet_start, preference.utc_offset_minutes
+                ),
+                "quiet_hours_end": PreferenceService._to_local_time(
+                    preference.quiet_end, preference.utc_offset_minutes
+                ),
+            }
+        return NotificationPreferenceResponse(
+            muted_types=[
+                NotificationType(notification_type)
+                for notification_type, bit in TYPE_BITS.items()
+                if preference.muted_types & bit
+            ],
+            min_priority=preference.min_priority,
+            utc_offset_minutes=preference.utc_offset_minutes,
+            updated_at=preference.updated_at,
+            **quiet_hours,
+        )
+
+    @staticmethod
+    def get_preferences(db: Session, user_id: str) -> NotificationPreferenceResponse:
+        """
+        获取用户的通知偏好
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+
+        Returns:
+            NotificationPreferenceResponse: 通知偏好（从未设置过时为默认值）
+        """
+        return PreferenceService._response(db.get(NotificationPreference, user_id))
+
+    @staticmethod
+    def update_preferences(
+        db: Session,
+        user_id: str,
+        preference_update: NotificationPreferenceUpdate,
+    ) -> NotificationPreferenceResponse:
+        """
+        设置用户的通知偏好（整体替换）
+
+        屏蔽的类型合并为位掩码，免打扰时段换算为 UTC 分钟数后保存；全部为默认值时删除偏好行，
+        使偏好表只保存真正有过滤效果的用户。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户 ID
+            preference_update: 通知偏好
+
+        Returns:
+            NotificationPreferenceResponse: 保存后的通知偏好
+        """
+        muted_types = 0
+        for notification_type in preference_update.muted_types:
+            muted_types |= type_bit(notification_type)
+        values = {
+            "muted_types": muted_types,
+            "min_priority": preference_update.min_priority,
+            "quiet_start": None,
+            "quiet_end": None,
+            "utc_offset_minutes": preference_update.utc_offset_minutes,
+        }
+        if preference_update.quiet_hours_start is not None:
+            values["quiet_start"] = PreferenceService._to_utc_minute(
+                preference_update.quiet_hours_start, preference_update.utc_offset_minutes
+            )
+            values["quiet_end"] = PreferenceService._to_utc_minute(
+                preference_update.quiet_hours_end, preference_update.utc_offset_minutes
+            )
+
+        if not muted_types and not values["min_priority"] and values["quiet_start"] is None:
+            db.query(NotificationPreference).filter(NotificationPreference.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            return NotificationPreferenceResponse(utc_offset_minutes=preference_update.utc_offset_minutes)
+
+        stmt = insert(NotificationPreference).values(user_id=user_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationPreference.user_id],
+            set_={**values, "updated_at": func.now()},
+        ).returning(NotificationPreference)
+        preference = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+        db.commit()
+        preference_cache.add(preference)
+
+        return PreferenceService._response(preference)
+
+    @staticmethod
+    def _muted(notification: Notification) -> List:
+        """用户屏蔽了该站内信（类型或最低优先级）的条件"""
+        blocks = []
+        bit = type_bit(notification.type)
+        if bit:
+            blocks.append(NotificationPreference.muted_types.op("&")(bit) != 0)
+        blocks.append(NotificationPreference.min_priority > notification.priority)
+        return blocks
+
+    @staticmethod
+    def _in_quiet_hours(minute: int):
+        """用户当前（UTC 当天第 minute 分钟）处于免打扰时段的条件"""
+        start = NotificationPreference.quiet_start
+        end = NotificationPreference.quiet_end
+        # 时段不跨零点时落在 [start, end) 内，跨零点时落在 [start, 24:00) 或 [00:00, end) 内
+        return or_(
+            and_(start < end, start <= minute, end > minute),
+            and_(start > end, or_(start <= minute, end > minute)),
+        )
+
+    @staticmethod
+    def conditions(notification: Notification, user_id_column, now: Optional[datetime] = None) -> List:
+        """
+        发送时按用户偏好过滤收件人的条件
+
+        返回的条件直接放进发送的 INSERT ... SELECT，由数据库按偏好表主键反连接排除屏蔽了该站内信、
+        或当前处于免打扰时段的用户，用户不经过 Python（免打扰的用户由 quiet_hours_deferral 推迟送达）。
+        进程内摘要表明没有任何用户会屏蔽该站内信时返回空列表，发送语句不关联偏好表。
+
+        Args:
+            notification: 正在发送的站内信
+            user_id_column: 收件人用户 ID 列
+            now: 判断免打扰时段的当前时间（为空表示现在）
+
+        Returns:
+            List: 过滤条件（可能为空）
+        """
+        by_preference, by_quiet_hours = preference_cache.may_block(notification.type, notification.priority)
+        blocks = []
+        if by_preference:
+            blocks.extend(PreferenceService._muted(notification))
+        if by_quiet_hours:
+            now = now or datetime.now(timezone.utc)
+            blocks.append(PreferenceService._in_quiet_hours(now.hour * 60 + now.minute))
+        if not blocks:
+            return []
+        return [~exists().where(NotificationPreference.user_id == user_id_column, or_(*blocks))]
+
+    @staticmethod
+    def quiet_hours_deferral(
+        notification: Notification, user_id_column, now: Optional[datetime] = None
+    ) -> Optional[Tuple[List, Any]]:
+        """
+        发送时处于免打扰时段、且未屏蔽该站内信的收件人的条件，以及各自的送达时间
+
+        这些用户被 conditions 排除在本次写入之外，由调用方登记到推迟送达表，免打扰结束后再写入收件箱。
+        条件引用偏好表，放进 SELECT 时与收件人按主键关联。
+
+        Args:
+            notification: 正在发送的站内信
+            user_id_column: 收件人用户 ID 列
+            now: 判断免打扰时段的当前时间（为空表示现在）
+
+        Returns:
+            Optional[Tuple[List, Any]]: (条件, 送达时间表达式)；进程内摘要表明没有用户会因免打扰被过滤时为 None
+        """
+        by_preference, by_quiet_hours = preference_cache.may_block(notification.type, notification.priority)
+        if not by_quiet_hours:
+            return None
+        now = now or datetime.now(timezone.utc)
+        minute = now.hour * 60 + now.minute
+        conditions = [
+            NotificationPreference.user_id == user_id_column,
+            PreferenceService._in_quiet_hours(minute),
+        ]
+        if by_preference:
+            conditions.append(~or_(*PreferenceService._muted(notification)))
+        # 免打扰结束时间：今天的 quiet_end，已过（跨零点的时段）则为明天的 quiet_end
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = NotificationPreference.quiet_end
+        deliver_after = literal(day_start, DateTime(timezone=True)) + func.make_interval(
+            0, 0, 0, case((end <= minute, 1), else_=0), 0, end
+        )
+        return conditions, deliver_after
@@ -0,0 +1,520 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, and_, delete, func, or_, select, text, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.core.database import SessionLocal
+from app.models.notification import Notification, NotificationRecord, NotificationRecordArchive
+from app.services.counter_service import NotificationCounterService
+from app.tasks.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL 错误码 lock_not_available：等待锁超过 lock_timeout
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+class _Budget:
+    """单次清理运行的批次预算与批间节流"""
+
+    def __init__(self, max_batches: Optional[int], pause_seconds: float):
+        # max_batches 为 None 表示不限批数
+        self.remaining = max_batches
+        self.pause_seconds = pause_seconds
+
+    def take(self) -> bool:
+        """占用一个批次，预算用完返回 False"""
+        if self.remaining is None:
+            return True
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def pause(self) -> None:
+        """批之间停顿，给在线请求让出 IO 和锁"""
+        if self.pause_seconds > 0:
+            time.sleep(self.pause_seconds)
+
+
+class NotificationPurgeService:
+    """
+    站内信数据清理服务
+
+    物理删除软删除超过保留期的站内信记录，以及已过期或已被删除的站内信（连同其记录和归档记录）。
+    所有删除都按键集（keyset）顺序小批量进行：每批一个短事务，用 FOR UPDATE SKIP LOCKED
+    跳过正被在线请求占用的行，并设置 lock_timeout，避免与在线流量互相阻塞。
+    """
+
+    # 删除记录时扣减未读计数所需的站内信列
+    COUNTED_COLUMNS = (
+        Notification.id,
+        Notification.type,
+        Notification.created_at,
+        Notification.expiry_processed_at,
+        Notification.expiry_cursor,
+    )
+
+    @staticmethod
+    def _delete_batch(
+        db: Session,
+        model,
+        keys_query: Select,
+        returning: Sequence = (),
+        on_delete: Optional[Callable[[Session, list], None]] = None,
+    ) -> List[tuple]:
+        """
+        在一个事务内锁定并删除一批行
+
+        先执行 keys_query（SELECT ... FOR UPDATE SKIP LOCKED）锁定本批行，再按选出的键删除。
+        SKIP LOCKED 本身不等待行锁，但 DELETE 要等待外键上的共享锁（如正在写入记录的发送持有站内信行的
+        KEY SHARE 锁）以及级联删除的行锁；加锁和删除的耗时合计计入锁等待指标。
+
+        Args:
+            db: 数据库会话
+            model: 要删除的模型
+            keys_query: 选出本批键的查询，选择列即删除时匹配的键
+            returning: 删除时返回的列
+            on_delete: 在同一事务内处理被删除行（returning 的结果）的回调
+
+        Returns:
+            List[tuple]: 本批删除的键（按 keys_query 的顺序）
+
+        Raises:
+            OperationalError: 锁等待超过 NOTIFICATION_PURGE_LOCK_TIMEOUT_MS
+        """
+        db.execute(text(f"SET LOCAL lock_timeout = '{int(settings.NOTIFICATION_PURGE_LOCK_TIMEOUT_MS)}ms'"))
+
+        start = time.perf_counter()
+        try:
+            keys = [tuple(row) for row in db.execute(keys_query)]
+            deleted = []
+            if keys:
+                stmt = (
+                    delete(model)
+                    .where(tuple_(*keys_query.selected_columns).in_(keys))
+                    .execution_options(synchronize_session=False)
+                )
+                if returning:
+                    deleted = db.execute(stmt.returning(*returning)).all()
+                else:
+                    db.execute(stmt)
+        finally:
+            metrics.inc("notification_purge_lock_wait_seconds_total", time.perf_counter() - start)
+
+        if keys and on_delete is not None:
+            on_delete(db, deleted)
+        db.commit()
+        return keys
+
+    @staticmethod
+    def _purge_keyset(
+        db: Session,
+        model,
+        base_query: Select,
+        key_columns: Sequence,
+        batch_size: int,
+        budget: _Budget,
+        job: Optional[Job] = None,
+        returning: Sequence = (),
+        on_delete: Optional[Callable[[Session, list], None]] = None,
+    ) -> Tuple[int, bool]:
+        """
+        按键集顺序分批删除 base_query 匹配的行
+
+        每批从上一批最后一个键之后继续，被跳过的加锁行留给下次运行，不会被反复扫描；
+        因此只有不加锁的复查确认已没有匹配行时才返回已处理完。
+
+        Args:
+            db: 数据库会话
+            model: 要删除的模型
+            base_query: 选择 key_columns 并带过滤条件的查询
+            key_columns: 键集排序列（同时作为删除时匹配的键）
+            batch_size: 每批删除数量
+            budget: 本次运行的批次预算
+            job: 汇报删除进度的后台作业（可选）
+            returning: 删除时返回的列
+            on_delete: 每批在同一事务内处理被删除行的回调
+
+        Returns:
+            Tuple[int, bool]: (删除的行数, 是否已处理完所有匹配行（有被跳过的加锁行时为 False）)
+        """
+        purged = 0
+        after = None
+        while budget.take():
+            query = base_query
+            if after is not None:
+                query = query.where(tuple_(*key_columns) > after)
+            query = query.order_by(*key_columns).limit(batch_size).with_for_update(skip_locked=True)
+
+            keys = NotificationPurgeService._delete_batch(db, model, query, returning, on_delete)
+            purged += len(keys)
+            metrics.inc("notification_purge_rows_total", len(keys))
+            if job is not None:
+                job.advance(processed=len(keys), succeeded=len(keys))
+            if len(keys) < batch_size:
+                # SKIP LOCKED 跳过的加锁行同样会让这一批不满：不加锁地再确认没有剩余的行，才算处理完
+                remaining = db.execute(select(base_query.exists())).scalar()
+                db.commit()
+                return purged, not remaining
+
+            after = keys[-1]
+            budget.pause()
+        return purged, False
+
+    @staticmethod
+    def purge_deleted_records(db: Session, budget: _Budget) -> int:
+        """
+        物理删除软删除超过保留期的站内信记录
+
+        送达表中的行不随记录删除，物理删除后重复发送也不会再次送达。
+
+        Args:
+            db: 数据库会话
+            budget: 本次运行的批次预算
+
+        Returns:
+            int: 删除的记录数
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.NOTIFICATION_PURGE_DELETED_AFTER_DAYS)
+        key_columns = (NotificationRecord.created_at, NotificationRecord.id)
+        base_query = select(*key_columns).where(
+            NotificationRecord.is_deleted == True,
+            NotificationRecord.deleted_at < cutoff,
+        )
+        purged, _ = NotificationPurgeService._purge_keyset(
+            db, NotificationRecord, base_query, key_columns, settings.NOTIFICATION_PURGE_BATCH_SIZE, budget
+        )
+        return purged
+
+    @staticmethod
+    def _purge_records(
+        db: Session,
+        notification,
+        budget: _Budget,
+        job: Optional[Job] = None,
+        on_delete: Optional[Callable[[Session, list], None]] = None,
+    ) -> Tuple[int, bool]:
+        """
+        分批删除一条站内信的全部记录和归档记录
+
+        on_delete 在删除记录的同一事务内收到被删除记录的 (user_id, is_read, is_deleted)。
+
+        Returns:
+            Tuple[int, bool]: (删除的行数, 是否已全部删除)
+        """
+        batch_size = settings.NOTIFICATION_PURGE_BATCH_SIZE
+
+        # (notification_id, user_id) 索引支持按 user_id 键集遍历
+        key_columns = (NotificationRecord.user_id, NotificationRecord.created_at, NotificationRecord.id)
+        records_query = select(*key_columns).where(
+            NotificationRecord.notification_id == notification.id,
+            NotificationRecord.created_at >= notification.created_at,
+        )
+        returning = (
+            (NotificationRecord.user_id, NotificationRecord.is_read, NotificationRecord.is_deleted)
+            if on_delete is not None
+            else ()
+        )
+        purged, records_done = NotificationPurgeService._purge_keyset(
+            db, NotificationRecord, records_query, key_columns, batch_size, budget, job, returning, on_delete
+        )
+        if not records_done:
+            return purged, False
+
+        archive_query = select(NotificationRecordArchive.id).where(
+            NotificationRecordArchive.notification_id == notification.id
+        )
+        count, archive_done = NotificationPurgeService._purge_keyset(
+            db, NotificationRecordArchive, archive_query, (NotificationRecordArchive.id,), batch_size, budget, job
+        )
+        return purged + count, archive_done
+
+    @staticmethod
+    def _unread_decrement(notification) -> Optional[Callable[[Session, list], None]]:
+        """
+        返回按被删除的未读记录扣减未读计数的回调；站内信的计数已扣除（expiry_processed_at 不为空）时返回 None
+
+        记录按批删除时每行只会被一个事务删除，撤回作业、删除作业和清理任务同时处理同一条站内信也不会重复扣减；
+        分批过期处理到一半的站内信，只扣减进度（expiry_cursor）之后的用户。
+        """
+        if notification.expiry_processed_at is not None:
+            return None
+        cursor = notification.expiry_cursor
+
+        def decrement_unread(db: Session, rows: list) -> None:
+            unread = Counter(
+                row.user_id
+                for row in rows
+                if not row.is_read and not row.is_deleted and (cursor is None or row.user_id > cursor)
+            )
+            NotificationCounterService.decrement_users(db, notification.type, unread)
+
+        return decrement_unread
+
+    @staticmethod
+    def purge_notification(
+        db: Session,
+        notification,
+        budget: _Budget,
+        job: Optional[Job] = None,
+    ) -> Tuple[int, bool]:
+        """
+        物理删除一条站内信
+
+        先分批删除其站内信记录和归档记录，全部删完后再删除站内信本身，
+        避免外键级联在一个事务里删除海量记录。计数尚未扣除的（逻辑删除的）站内信，
+        每批在删除记录的同一事务内扣减对应用户的未读计数。
+
+        Args:
+            db: 数据库会话
+            notification: 站内信（需包含 COUNTED_COLUMNS 中的列）
+            budget: 批次预算
+            job: 汇报删除进度的后台作业（可选）
+
+        Returns:
+            Tuple[int, bool]: (删除的行数, 站内信本身是否已删除)
+        """
+        purged, done = NotificationPurgeService._purge_records(
+            db, notification, budget, job, NotificationPurgeService._unread_decrement(notification)
+        )
+        if not done or not budget.take():
+            return purged, False
+
+        notification_query = (
+            select(Notification.id).where(Notification.id == notification.id).with_for_update(skip_locked=True)
+        )
+        count = len(NotificationPurgeService._delete_batch(db, Notification, notification_query))
+        metrics.inc("notification_purge_rows_total", count)
+        budget.pause()
+        return purged + count, count > 0
+
+    @staticmethod
+    def remove_recalled(
+        db: Session,
+        notification,
+        budget: _Budget,
+        job: Optional[Job] = None,
+    ) -> Tuple[int, bool]:
+        """
+        分批删除已撤回站内信的用户记录，站内信内容保留
+
+        每批在删除记录的同一事务内，按被删除的未读记录扣减对应用户的未读计数，
+        不需要重新统计收件箱；全部删完后写入 expiry_processed_at，表示计数已扣除完毕。
+
+        Args:
+            db: 数据库会话
+            notification: 已撤回的站内信（需包含 COUNTED_COLUMNS 中的列）
+            budget: 批次预算
+            job: 汇报删除进度的后台作业（可选）
+
+        Returns:
+            Tuple[int, bool]: (删除的行数, 是否已全部删除)
+        """
+        decrement_unread = NotificationPurgeService._unread_decrement(notification)
+        purged, done = NotificationPurgeService._purge_records(db, notification, budget, job, decrement_unread)
+        if done and decrement_unread is not None:
+            db.query(Notification).filter(Notification.id == notification.id).update(
+                {"expiry_processed_at": func.now(), "expiry_cursor": None}, synchronize_session=False
+            )
+            db.commit()
+        return purged, done
+
+    @staticmethod
+    def purge_dead_notifications(db: Session, budget: _Budget) -> int:
+        """
+        物理删除已过期或已被删除的站内信
+
+        已删除的站内信通常由删除作业处理，这里负责兜底（如作业所在进程重启），同样逐批扣减未读计数。
+
+        Args:
+            db: 数据库会话
+            budget: 本次运行的批次预算
+
+        Returns:
+            int: 删除的行数（记录、归档记录和站内信合计）
+        """
+        dead = (
+            db.query(*NotificationPurgeService.COUNTED_COLUMNS)
+            .filter(
+                or_(
+                    # 过期的站内信先由过期处理扣除未读计数，再物理删除
+                    and_(
+                        Notification.expiry_processed_at.isnot(None),
+                        Notification.expires_at <= datetime.now(timezone.utc),
+                    ),
+                    Notification.deleted_at.isnot(None),
+                ),
+            )
+            .order_by(Notification.expiry_processed_at)
+            .limit(settings.NOTIFICATION_PURGE_BATCH_SIZE)
+            .all()
+        )
+        db.commit()
+
+        purged = 0
+        for notification in dead:
+            count, done = NotificationPurgeService.purge_notification(db, notification, budget)
+            purged += count
+            if not done:
+                return purged
+
+        # 撤回后尚未删完记录的站内信（撤回作业所在进程重启时由这里继续）
+        recalled = (
+            db.query(*NotificationPurgeService.COUNTED_COLUMNS)
+            .filter(Notification.recalled_at.isnot(None), Notification.expiry_processed_at.is_(None))
+            .order_by(Notification.recalled_at)
+            .limit(settings.NOTIFICATION_PURGE_BATCH_SIZE)
+            .all()
+        )
+        db.commit()
+        for notification in recalled:
+            count, done = NotificationPurgeService.remove_recalled(db, notification, budget)
+            purged += count
+            if not done:
+                break
+        return purged
+
+    @staticmethod
+    def _count_records(db: Session, notification) -> int:
+        """统计一条站内信的记录和归档记录数（作为作业总量）"""
+        count = (
+            db.query(NotificationRecord)
+            .filter(
+                NotificationRecord.notification_id == notification.id,
+                NotificationRecord.created_at >= notification.created_at,
+            )
+            .count()
+            + db.query(NotificationRecordArchive)
+            .filter(NotificationRecordArchive.notification_id == notification.id)
+            .count()
+        )
+        db.commit()
+        return count
+
+    @staticmethod
+    def _run_until_done(db: Session, step: Callable[[], bool]) -> None:
+        """
+        反复执行 step 直到其返回 True
+
+        锁等待超时或站内信行被清理任务锁住时，停顿后重试。
+        """
+        pause_seconds = max(settings.NOTIFICATION_PURGE_PAUSE_MS / 1000, 1.0)
+        while True:
+            try:
+                if step():
+                    return
+            except OperationalError as exc:
+                db.rollback()
+                if getattr(exc.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                metrics.inc("notification_purge_lock_timeouts_total")
+            time.sleep(pause_seconds)
+
+    @staticmethod
+    def run_delete(job: Job, notification_id: str) -> None:
+        """
+        删除作业：分批删除一条已逻辑删除的站内信及其全部记录并扣减未读计数（在后台作业中运行）
+
+        不限批数，批间按 NOTIFICATION_PURGE_PAUSE_MS 节流；锁等待超时后停顿重试。
+
+        Args:
+            job: 后台作业
+            notification_id: 站内信 ID
+        """
+        db = SessionLocal()
+        try:
+            notification = (
+                db.query(*NotificationPurgeService.COUNTED_COLUMNS)
+                .filter(Notification.id == notification_id, Notification.deleted_at.isnot(None))
+                .first()
+            )
+            if notification is None:
+                return
+            job.total = NotificationPurgeService._count_records(db, notification)
+
+            budget = _Budget(None, settings.NOTIFICATION_PURGE_PAUSE_MS / 1000)
+
+            def step() -> bool:
+                _, done = NotificationPurgeService.purge_notification(db, notification, budget, job)
+                if done:
+                    return True
+                # 站内信行可能已由清理任务删除
+                gone = db.query(Notification.id).filter(Notification.id == notification.id).first() is None
+                db.commit()
+                return gone
+
+            NotificationPurgeService._run_until_done(db, step)
+            job.result = {"notification_id": str(notification.id), "records_deleted": job.processed}
+        finally:
+            db.close()
+
+    @staticmethod
+    def run_recall(job: Job, notification_id: str) -> None:
+        """
+        撤回作业：分批删除一条已撤回站内信的用户记录并扣减未读计数（在后台作业中运行）
+
+        Args:
+            job: 后台作业
+            notification_id: 站内信 ID
+        """
+        db = SessionLocal()
+        try:
+            notification = (
+                db.query(*NotificationPurgeService.COUNTED_COLUMNS)
+                .filter(Notification.id == notification_id, Notification.recalled_at.isnot(None))
+                .first()
+            )
+            if notification is None:
+                return
+            job.total = NotificationPurgeService._count_records(db, notification)
+
+            budget = _Budget(None, settings.NOTIFICATION_PURGE_PAUSE_MS / 1000)
+            NotificationPurgeService._run_until_done(
+                db, lambda: NotificationPurgeService.remove_recalled(db, notification, budget, job)[1]
+            )
+            job.result = {"notification_id": str(notification.id), "records_deleted": job.processed}
+        finally:
+            db.close()
+
+    @staticmethod
+    def purge(db: Session) -> int:
+        """
+        执行一次清理
+
+        单次运行最多处理 NOTIFICATION_PURGE_MAX_BATCHES 批，批间停顿
+        NOTIFICATION_PURGE_PAUSE_MS 毫秒；遇到锁等待超时则放弃本次运行，留给下次重试。
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            int: 本次删除的总行数
+        """
+        budget = _Budget(settings.NOTIFICATION_PURGE_MAX_BATCHES, settings.NOTIFICATION_PURGE_PAUSE_MS / 1000)
+        rows_before = metrics.get("notification_purge_rows_total")
+        start = time.perf_counter()
+        try:
+            NotificationPurgeService.purge_deleted_records(db, budget)
+            NotificationPurgeService.purge_dead_notifications(db, budget)
+        except OperationalError as exc:
+            db.rollback()
+            if getattr(exc.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                raise
+            metrics.inc("notification_purge_lock_timeouts_total")
+            logger.warning("站内信清理等待锁超时，本次运行提前结束")
+        finally:
+            # 按计数器差值统计，锁超时提前结束时也包含已提交的批次
+            purged = int(metrics.get("notification_purge_rows_total") - rows_before)
+            elapsed = time.perf_counter() - start
+            metrics.set("notification_purge_last_run_rows", purged)
+            metrics.set("notification_purge_last_run_seconds", elapsed)
+            metrics.set("notification_purge_rows_per_second", purged / elapsed if elapsed > 0 else 0.0)
+        return purged
@@ -0,0 +1,408 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.models.notification import ScheduledSend, ScheduledSendStatus
+from app.schemas.notification import AudienceRule, NotificationSendRequest, ScheduledSendResponse
+from app.services.audience_service import AudienceService
+from app.services.fanout_service import FanoutAborted, FanoutService
+from app.services.notification_service import NotificationService
+from app.services.segment_service import SegmentService
+from app.tasks.fanout import fanout_executor
+from app.tasks.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+# 调度器会处理的状态（发送中的心跳超时后会被重新领取）
+ACTIVE_STATUSES = (ScheduledSendStatus.PENDING.value, ScheduledSendStatus.RUNNING.value)
+
+
+class ScheduledSendService:
+    """定时发送服务"""
+
+    @staticmethod
+    def create(
+        db: Session,
+        notification_id: str,
+        send_request: NotificationSendRequest,
+        created_by_id: str,
+    ) -> ScheduledSendResponse:
+        """
+        创建定时发送
+
+        Args:
+            db: 数据库会话
+            notification_id: 站内信 ID
+            send_request: 发送请求（scheduled_at 为计划发送时间）
+            created_by_id: 创建者 ID
+
+        Returns:
+            ScheduledSendResponse: 定时发送信息
+
+        Raises:
+            HTTPException: 站内信不存在、已撤回，或用户 ID、按用户的模板变量、受众规则、受众分群无效
+        """
+        notification = NotificationService.get_notification(db, notification_id)
+        if notification.recalled_at is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="站内信已撤回",
+            )
+
+        if send_request.segment_id is not None:
+            SegmentService.get_segment(db, send_request.segment_id)
+
+        audience = None
+        if send_request.audience is not None:
+            AudienceService.validate(db, send_request.audience)
+            audience = send_request.audience.model_dump(mode="json", exclude_none=True)
+
+        user_ids = None
+        if not send_request.send_to_all and audience is None and send_request.segment_id is None:
+            try:
+                user_ids = list(dict.fromkeys(uuid.UUID(str(user_id)) for user_id in send_request.user_ids))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的用户 ID",
+                )
+        variables = NotificationService.validate_recipient_variables(
+            db, notification, user_ids or [], send_request.variables if user_ids is not None else None
+        )
+
+        scheduled_at = send_request.scheduled_at
+        if scheduled_at.tzinfo is None:
+            scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+
+        scheduled_send = ScheduledSend(
+            notification_id=notification.id,
+            send_to_all=send_request.send_to_all,
+            user_ids=user_ids,
+            variables={str(user_id): value for user_id, value in variables.items()} or None,
+            audience=audience,
+            segment_id=send_request.segment_id,
+            scheduled_at=scheduled_at,
+            created_by=created_by_id,
+        )
+        db.add(scheduled_send)
+        db.commit()
+        db.refresh(scheduled_send)
+
+        return ScheduledSendResponse.model_validate(scheduled_send)
+
+    @staticmethod
+    def list_scheduled_sends(
+        db: Session,
+        status_filter: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> List[ScheduledSendResponse]:
+        """
+        获取定时发送列表（按计划时间升序）
+
+        Args:
+            db: 数据库会话
+            status_filter: 状态筛选
+            skip: 跳过数量
+            limit: 返回数量
+
+        Returns:
+            List[ScheduledSendResponse]: 定时发送列表
+        """
+        query = db.query(ScheduledSend)
+        if status_filter:
+            query = query.filter(ScheduledSend.status == status_filter)
+        rows = query.order_by(ScheduledSend.scheduled_at).offset(skip).limit(limit).all()
+        return [ScheduledSendResponse.model_validate(row) for row in rows]
+
+    @staticmethod
+    def cancel(db: Session, scheduled_send_id: str) -> ScheduledSendResponse:
+        """
+        取消尚未开始的定时发送
+
+        Args:
+            db: 数据库会话
+            scheduled_send_id: 定时发送 ID
+
+        Returns:
+            ScheduledSendResponse: 取消后的定时发送信息
+
+        Raises:
+            HTTPException: 定时发送不存在或已开始
+        """
+        scheduled_send = db.query(ScheduledSend).filter(ScheduledSend.id == scheduled_send_id).first()
+        if not scheduled_send:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="定时发送不存在",
+            )
+
+        # 条件更新：与调度器领取竞争时只有一方成功
+        cancelled = (
+            db.query(ScheduledSend)
+            .filter(
+                ScheduledSend.id == scheduled_send.id,
+                ScheduledSend.status == ScheduledSendStatus.PENDING.value,
+            )
+            .update(
+                {"status": ScheduledSendStatus.CANCELLED.value, "finished_at": func.now()},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not cancelled:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="定时发送已开始或已结束，无法取消",
+            )
+
+        db.refresh(scheduled_send)
+        return ScheduledSendResponse.model_validate(scheduled_send)
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """
+        可被领取的条件：已到期的等待发送，或发送中但心跳超时（执行进程已退出）
+
+        执行中的发送按 SCHEDULED_SEND_HEARTBEAT_SECONDS 续约心跳，耗时再长也不会被重复领取。
+        """
+        stale_before = now - timedelta(seconds=settings.SCHEDULED_SEND_CLAIM_TIMEOUT_SECONDS)
+        return or_(
+            and_(ScheduledSend.status == ScheduledSendStatus.PENDING.value, ScheduledSend.scheduled_at <= now),
+            and_(ScheduledSend.status == ScheduledSendStatus.RUNNING.value, ScheduledSend.heartbeat_at < stale_before),
+        )
+
+    @staticmethod
+    def pending(db: Session, until: datetime, limit: int) -> List[Tuple]:
+        """
+        按计划时间顺序取出 until 之前到期、尚未完成的定时发送
+
+        走 scheduled_at 部分索引的范围扫描；已过期未发送的（如服务停机期间到期的）也会返回。
+
+        Args:
+            db: 数据库会话
+            until: 截止时间
+            limit: 最多返回数量
+
+        Returns:
+            List[Tuple]: (定时发送 ID, 计划发送时间)，按计划时间升序
+        """
+        rows = (
+            db.query(ScheduledSend.id, ScheduledSend.scheduled_at)
+            .filter(ScheduledSend.status.in_(ACTIVE_STATUSES), ScheduledSend.scheduled_at <= until)
+            .order_by(ScheduledSend.scheduled_at)
+            .limit(limit)
+            .all()
+        )
+        db.commit()
+        return [(row.id, row.scheduled_at) for row in rows]
+
+    @staticmethod
+    def claim(db: Session, scheduled_send_id: str) -> bool:
+        """
+        领取一条到期的定时发送
+
+        条件更新保证多个实例、或同一条被重复触发时只会领取一次。
+
+        Args:
+            db: 数据库会话
+            scheduled_send_id: 定时发送 ID
+
+        Returns:
+            bool: 是否领取成功
+        """
+        claimed = (
+            db.query(ScheduledSend)
+            .filter(
+                ScheduledSend.id == scheduled_send_id,
+                ScheduledSendService._claimable(datetime.now(timezone.utc)),
+            )
+            .update(
+                {
+                    "status": ScheduledSendStatus.RUNNING.value,
+                    "claimed_at": func.now(),
+                    "heartbeat_at": func.now(),
+                    "attempts": ScheduledSend.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(claimed)
+
+    @staticmethod
+    def heartbeat(db: Session, scheduled_send_id: str, attempt: int) -> bool:
+        """
+        续约发送中的定时发送
+
+        Args:
+            db: 数据库会话
+            scheduled_send_id: 定时发送 ID
+            attempt: 领取时的尝试次数（重新领取会加一，据此识别领取是否仍属于自己）
+
+        Returns:
+            bool: 是否续约成功（已结束或已被其他实例重新领取时返回 False）
+        """
+        renewed = (
+            db.query(ScheduledSend)
+            .filter(
+                ScheduledSend.id == scheduled_send_id,
+                ScheduledSend.status == ScheduledSendStatus.RUNNING.value,
+                ScheduledSend.attempts == attempt,
+            )
+            .update({"heartbeat_at": func.now()}, synchronize_session=False)
+        )
+        db.commit()
+        return bool(renewed)
+
+    @staticmethod
+    def _keep_alive(scheduled_send_id: str, attempt: int, stop: threading.Event) -> None:
+        """发送期间按间隔续约心跳，直到 stop 被设置或领取已不属于自己"""
+        while not stop.wait(settings.SCHEDULED_SEND_HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                if not ScheduledSendService.heartbeat(db, scheduled_send_id, attempt):
+                    return
+            except Exception:
+                logger.exception("定时发送 %s 续约心跳失败", scheduled_send_id)
+            finally:
+                db.close()
+
+    @staticmethod
+    def _finish(db: Session, scheduled_send_id: str, attempt: int, values: dict) -> bool:
+        """
+        写入执行结果
+
+        以领取时的尝试次数为条件：心跳中断后被其他实例重新领取时，不覆盖对方的状态。
+
+        Returns:
+            bool: 是否写入
+        """
+        updated = (
+            db.query(ScheduledSend)
+            .filter(
+                ScheduledSend.id == scheduled_send_id,
+                ScheduledSend.status == ScheduledSendStatus.RUNNING.value,
+                ScheduledSend.attempts == attempt,
+            )
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+
+    @staticmethod
+    def run(job: Job, scheduled_send_id: str) -> None:
+        """
+        执行已领取的定时发送（在后台作业中运行）
+
+        执行期间在独立线程中续约心跳，调度器只会重新领取心跳超时（执行进程已退出）的发送。
+        发送本身按 (站内信, 用户) 去重，被重新领取后重复执行是安全的。
+        失败时按 SCHEDULED_SEND_RETRY_DELAY_SECONDS 推迟重试，超过最大次数后标记为失败。
+
+        Args:
+            job: 后台作业
+            scheduled_send_id: 定时发送 ID
+        """
+        db = SessionLocal()
+        try:
+            scheduled_send = db.query(ScheduledSend).filter(ScheduledSend.id == scheduled_send_id).first()
+            if scheduled_send is None or scheduled_send.status != ScheduledSendStatus.RUNNING.value:
+                return
+            notification_id = str(scheduled_send.notification_id)
+            attempt = scheduled_send.attempts
+
+            stop = threading.Event()
+            keep_alive = threading.Thread(
+                target=ScheduledSendService._keep_alive,
+                args=(scheduled_send_id, attempt, stop),
+                name=f"scheduled-send-heartbeat-{scheduled_send_id}",
+                daemon=True,
+            )
+            keep_alive.start()
+            try:
+                count = ScheduledSendService._send(db, job, scheduled_send, notification_id)
+            except (HTTPException, FanoutAborted) as e:
+                # 站内信已被删除或撤回，重试没有意义
+                db.rollback()
+                ScheduledSendService._finish(
+                    db,
+                    scheduled_send_id,
+                    attempt,
+                    {"status": ScheduledSendStatus.FAILED.value, "error": e.detail, "finished_at": func.now()},
+                )
+                job.add_error({"message": e.detail})
+                return
+            except Exception as e:
+                db.rollback()
+                if attempt >= settings.SCHEDULED_SEND_MAX_ATTEMPTS:
+                    values = {"status": ScheduledSendStatus.FAILED.value, "finished_at": func.now()}
+                else:
+                    values = {
+                        "status": ScheduledSendStatus.PENDING.value,
+                        "scheduled_at": datetime.now(timezone.utc)
+                        + timedelta(seconds=settings.SCHEDULED_SEND_RETRY_DELAY_SECONDS),
+                    }
+                ScheduledSendService._finish(db, scheduled_send_id, attempt, {**values, "error": str(e)})
+                raise
+            finally:
+                stop.set()
+                keep_alive.join()
+
+            ScheduledSendService._finish(
+                db,
+                scheduled_send_id,
+                attempt,
+                {
+                    "status": ScheduledSendStatus.SENT.value,
+                    "sent_count": count,
+                    "error": None,
+                    "finished_at": func.now(),
+                },
+            )
+
+            job.advance(processed=count, succeeded=count)
+            job.result = {"scheduled_send_id": str(scheduled_send_id), "sent_count": count}
+        finally:
+            db.close()
+
+    @staticmethod
+    def _send(db: Session, job: Job, scheduled_send: ScheduledSend, notification_id: str) -> int:
+        """
+        执行一次发送
+
+        Returns:
+            int: 成功发送的用户数量
+        """
+        if scheduled_send.send_to_all or scheduled_send.audience is not None or scheduled_send.segment_id is not None:
+            # 与立即发送一样走扩散执行器，按站内信优先级与其他发送分享发送能力
+            audience = (
+                AudienceRule.model_validate(scheduled_send.audience) if scheduled_send.audience is not None else None
+            )
+            fanout = FanoutService.create(
+                db, notification_id, settings.FANOUT_PARTITIONS, audience, scheduled_send.segment_id
+            )
+            db.commit()  # 等待发送期间不占用事务
+            task = fanout_executor.submit(fanout)
+            task.wait()
+            if task.error is not None:
+                raise task.error
+            if task.failed_partitions:
+                # 重试时新建全员发送，已发送的用户会被去重跳过
+                raise RuntimeError(f"全员发送 {fanout.id} 的分区 {task.failed_partitions} 发送失败")
+            return task.sent
+
+        user_ids = [str(user_id) for user_id in scheduled_send.user_ids or []]
+        job.total = len(user_ids)
+        count, rejected = NotificationService.send_to_users(db, notification_id, user_ids, scheduled_send.variables)
+        job.advance(processed=len(rejected), failed=len(rejected))
+        for user_id in rejected:
+            job.add_error({"user_id": user_id, "message": "用户不存在"})
+        return count
@@ -0,0 +1,258 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, exists, func, literal, select
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.segment import Segment, SegmentMember
+from app.models.user import User
+from app.schemas.notification import AudienceRule
+from app.schemas.segment import SegmentCreate, SegmentResponse
+from app.services.audience_service import AudienceService
+from app.tasks.jobs import Job, job_registry
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentService:
+    """受众分群服务"""
+
+    @staticmethod
+    def create_segment(db: Session, segment_create: SegmentCreate, created_by_id: str) -> SegmentResponse:
+        """
+        创建受众分群（成员由调用方随后触发刷新）
+
+        Args:
+            db: 数据库会话
+            segment_create: 分群信息
+            created_by_id: 创建者 ID
+
+        Returns:
+            SegmentResponse: 分群信息
+
+        Raises:
+            HTTPException: 受众规则无效或分群名称已存在
+        """
+        AudienceService.validate(db, segment_create.audience)
+
+        segment = Segment(
+            name=segment_create.name,
+            audience=segment_create.audience.model_dump(mode="json", exclude_none=True),
+            refresh_interval_seconds=segment_create.refresh_interval_seconds,
+            created_by=created_by_id,
+        )
+        db.add(segment)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="分群名称已存在",
+            )
+        db.refresh(segment)
+
+        return SegmentResponse.model_validate(segment)
+
+    @staticmethod
+    def list_segments(db: Session, skip: int = 0, limit: int = 20) -> List[SegmentResponse]:
+        """
+        获取受众分群列表（按名称排序）
+
+        Args:
+            db: 数据库会话
+            skip: 跳过数量
+            limit: 返回数量
+
+        Returns:
+            List[SegmentResponse]: 分群列表
+        """
+        segments = db.query(Segment).order_by(Segment.name).offset(skip).limit(limit).all()
+        return [SegmentResponse.model_validate(segment) for segment in segments]
+
+    @staticmethod
+    def get_segment(db: Session, segment_id: str) -> SegmentResponse:
+        """
+        获取受众分群
+
+        Args:
+            db: 数据库会话
+            segment_id: 分群 ID
+
+        Returns:
+            SegmentResponse: 分群信息
+
+        Raises:
+            HTTPException: 分群不存在
+        """
+        segment = db.query(Segment).filter(Segment.id == segment_id).first()
+        if not segment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="受众分群不存在",
+            )
+        return SegmentResponse.model_validate(segment)
+
+    @staticmethod
+    def get_sendable_segment(db: Session, segment_id: str) -> SegmentResponse:
+        """
+        获取可用于发送的受众分群
+
+        Raises:
+            HTTPException: 分群不存在，或尚未完成首次刷新
+        """
+        segment = SegmentService.get_segment(db, segment_id)
+        if segment.refreshed_at is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="受众分群尚未完成首次刷新",
+            )
+        return segment
+
+    @staticmethod
+    def delete_segment(db: Session, segment_id: str) -> None:
+        """
+        删除受众分群（引用该分群的定时发送和全员发送记录一并删除）
+
+        Args:
+            db: 数据库会话
+            segment_id: 分群 ID
+
+        Raises:
+            HTTPException: 分群不存在
+        """
+        deleted = db.query(Segment).filter(Segment.id == segment_id).delete(synchronize_session=False)
+        db.commit()
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="受众分群不存在",
+            )
+
+    @staticmethod
+    def refresh(db: Session, segment_id) -> Optional[Tuple[int, int]]:
+        """
+        增量刷新分群成员
+
+        不清空重建：只插入新符合规则的用户、删除不再符合的成员，未变化的成员行不被改写。
+        同一分群同时只有一个刷新在执行（行锁 SKIP LOCKED），另一个直接跳过。
+
+        Args:
+            db: 数据库会话
+            segment_id: 分群 ID
+
+        Returns:
+            Optional[Tuple[int, int]]: (新增成员数, 移除成员数)；分群不存在或正在被其他刷新处理时返回 None
+        """
+        segment = (
+            db.query(Segment)
+            .filter(Segment.id == segment_id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if segment is None:
+            db.rollback()
+            return None
+
+        conditions = AudienceService.conditions(db, AudienceRule.model_validate(segment.audience))
+
+        added = db.execute(
+            insert(SegmentMember)
+            .from_select(
+                ["segment_id", "user_id"],
+                select(literal(segment.id, UUID(as_uuid=True)), User.id).where(*conditions),
+            )
+            .on_conflict_do_nothing()
+        ).rowcount
+
+        still_matching = exists().where(User.id == SegmentMember.user_id, *conditions)
+        removed = db.execute(
+            delete(SegmentMember).where(SegmentMember.segment_id == segment.id, ~still_matching)
+        ).rowcount
+
+        segment.member_count = (
+            db.query(func.count()).select_from(SegmentMember).filter(SegmentMember.segment_id == segment.id).scalar()
+        )
+        segment.refreshed_at = func.now()
+        db.commit()
+
+        return added, removed
+
+    @staticmethod
+    def submit_refresh(db: Session, segment_id: str) -> Job:
+        """
+        在后台刷新分群成员
+
+        Args:
+            db: 数据库会话
+            segment_id: 分群 ID
+
+        Returns:
+            Job: 刷新分群成员的后台作业
+
+        Raises:
+            HTTPException: 分群不存在
+        """
+        SegmentService.get_segment(db, segment_id)
+        return job_registry.submit(
+            "segment_refresh",
+            lambda job: SegmentService.run_refresh(job, segment_id),
+        )
+
+    @staticmethod
+    def run_refresh(job: Job, segment_id: str) -> None:
+        """
+        刷新分群成员（在后台作业中运行）
+
+        Args:
+            job: 后台作业
+            segment_id: 分群 ID
+        """
+        db = SessionLocal()
+        try:
+            result = SegmentService.refresh(db, segment_id)
+        finally:
+            db.close()
+
+        if result is None:
+            job.add_error({"message": "受众分群不存在或正在刷新"})
+            return
+        added, removed = result
+        job.advance(processed=added + removed, succeeded=added + removed)
+        job.result = {"segment_id": str(segment_id), "added": added, "removed": removed}
+
+    @staticmethod
+    def refresh_due(db: Session) -> int:
+        """
+        刷新所有到期的分群（从未刷新过的、或距上次刷新超过各自刷新间隔的）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            int: 刷新的分群数
+        """
+        now = datetime.now(timezone.utc)
+        due = [
+            segment_id
+            for segment_id, refreshed_at, interval in db.query(
+                Segment.id, Segment.refreshed_at, Segment.refresh_interval_seconds
+            ).all()
+            if refreshed_at is None or refreshed_at + timedelta(seconds=interval) <= now
+        ]
+        db.commit()
+
+        refreshed = 0
+        for segment_id in due:
+            try:
+                if SegmentService.refresh(db, segment_id) is not None:
+                    refreshed += 1
+            except Exception:
+                db.rollback()
+                logger.exception("刷新受众分群 %s 失败", segment_id)
+        return refreshed
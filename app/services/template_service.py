@@ -0,0 +1,299 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.templates import CompiledTemplate, TemplateError, template_cache
+from app.models.template import NotificationTemplate, NotificationTemplateVersion
+from app.schemas.template import (
+    TemplateCreate,
+    TemplateRenderResponse,
+    TemplateResponse,
+    TemplateUpdate,
+)
+
+# 渲染后标题的最大长度（与 notifications.title 一致）
+MAX_TITLE_LENGTH = 200
+
+
+class TemplateService:
+    """站内信模板服务"""
+
+    @staticmethod
+    def _compile(title: str, content: str, action_url: Optional[str]) -> CompiledTemplate:
+        """编译模板，语法错误时返回 400"""
+        try:
+            return CompiledTemplate(title, content, action_url)
+        except TemplateError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+
+    @staticmethod
+    def _get_active_template(db: Session, template_id: str, for_update: bool = False) -> NotificationTemplate:
+        """获取未删除的模板，不存在时返回 404"""
+        query = db.query(NotificationTemplate).filter(
+            NotificationTemplate.id == template_id,
+            NotificationTemplate.deleted_at.is_(None),
+        )
+        if for_update:
+            query = query.with_for_update()
+        template = query.first()
+        if not template:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="模板不存在",
+            )
+        return template
+
+    @staticmethod
+    def get_compiled(db: Session, template_id, version: int) -> CompiledTemplate:
+        """
+        获取编译后的模板版本（优先从缓存读取）
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+            version: 模板版本
+
+        Returns:
+            CompiledTemplate: 编译后的模板
+
+        Raises:
+            HTTPException: 模板版本不存在
+        """
+        compiled = template_cache.get(db, template_id, version)
+        if compiled is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="模板版本不存在",
+            )
+        return compiled
+
+    @staticmethod
+    def _response(db: Session, template: NotificationTemplate, version: Optional[int] = None) -> TemplateResponse:
+        """组装模板响应（指定版本的模板内容和变量名）"""
+        version = version or template.version
+        row = db.get(NotificationTemplateVersion, (template.id, version))
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="模板版本不存在",
+            )
+        compiled = TemplateService.get_compiled(db, template.id, version)
+        return TemplateResponse(
+            id=template.id,
+            name=template.name,
+            version=version,
+            title=row.title,
+            content=row.content,
+            action_url=row.action_url,
+            variables=sorted(compiled.variables),
+            created_by=template.created_by,
+            created_at=template.created_at,
+            updated_at=template.updated_at,
+        )
+
+    @staticmethod
+    def create_template(db: Session, template_create: TemplateCreate, created_by_id: str) -> TemplateResponse:
+        """
+        创建站内信模板（版本 1）
+
+        Args:
+            db: 数据库会话
+            template_create: 模板信息
+            created_by_id: 创建者 ID
+
+        Returns:
+            TemplateResponse: 模板信息
+
+        Raises:
+            HTTPException: 模板语法错误或模板名称已存在
+        """
+        compiled = TemplateService._compile(
+            template_create.title, template_create.content, template_create.action_url
+        )
+
+        template = NotificationTemplate(name=template_create.name, created_by=created_by_id)
+        db.add(template)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="模板名称已存在",
+            )
+        db.add(
+            NotificationTemplateVersion(
+                template_id=template.id,
+                version=1,
+                title=template_create.title,
+                content=template_create.content,
+                action_url=template_create.action_url,
+            )
+        )
+        db.commit()
+        db.refresh(template)
+        template_cache.put(template.id, 1, compiled)
+
+        return TemplateService._response(db, template)
+
+    @staticmethod
+    def list_templates(db: Session, skip: int = 0, limit: int = 20) -> List[TemplateResponse]:
+        """
+        获取站内信模板列表（按名称排序，返回当前版本）
+
+        Args:
+            db: 数据库会话
+            skip: 跳过数量
+            limit: 返回数量
+
+        Returns:
+            List[TemplateResponse]: 模板列表
+        """
+        templates = (
+            db.query(NotificationTemplate)
+            .filter(NotificationTemplate.deleted_at.is_(None))
+            .order_by(NotificationTemplate.name)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [TemplateService._response(db, template) for template in templates]
+
+    @staticmethod
+    def get_template(db: Session, template_id: str, version: Optional[int] = None) -> TemplateResponse:
+        """
+        获取站内信模板
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+            version: 模板版本（为空表示当前版本）
+
+        Returns:
+            TemplateResponse: 模板信息
+
+        Raises:
+            HTTPException: 模板或版本不存在
+        """
+        template = TemplateService._get_active_template(db, template_id)
+        return TemplateService._response(db, template, version)
+
+    @staticmethod
+    def update_template(db: Session, template_id: str, template_update: TemplateUpdate) -> TemplateResponse:
+        """
+        更新站内信模板
+
+        修改标题、内容或链接时新建版本，已创建的站内信仍引用原版本；只改名称不新建版本。
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+            template_update: 更新信息
+
+        Returns:
+            TemplateResponse: 更新后的模板信息
+
+        Raises:
+            HTTPException: 模板不存在、模板语法错误或模板名称已存在
+        """
+        template = TemplateService._get_active_template(db, template_id, for_update=True)
+        update_data = template_update.model_dump(exclude_unset=True)
+
+        if "name" in update_data and update_data["name"] is not None:
+            template.name = update_data["name"]
+
+        compiled = None
+        if any(field in update_data for field in ("title", "content", "action_url")):
+            current = db.get(NotificationTemplateVersion, (template.id, template.version))
+            title = update_data.get("title") or current.title
+            content = update_data.get("content") or current.content
+            action_url = update_data["action_url"] if "action_url" in update_data else current.action_url
+            compiled = TemplateService._compile(title, content, action_url)
+
+            template.version += 1
+            db.add(
+                NotificationTemplateVersion(
+                    template_id=template.id,
+                    version=template.version,
+                    title=title,
+                    content=content,
+                    action_url=action_url,
+                )
+            )
+
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="模板名称已存在",
+            )
+        db.refresh(template)
+        if compiled is not None:
+            template_cache.put(template.id, template.version, compiled)
+
+        return TemplateService._response(db, template)
+
+    @staticmethod
+    def delete_template(db: Session, template_id: str) -> None:
+        """
+        删除站内信模板（逻辑删除，已由该模板创建的站内信不受影响）
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+
+        Raises:
+            HTTPException: 模板不存在
+        """
+        template = TemplateService._get_active_template(db, template_id)
+        template.deleted_at = func.now()
+        db.commit()
+
+    @staticmethod
+    def render(
+        db: Session,
+        template_id: str,
+        variables: Dict[str, Any],
+        version: Optional[int] = None,
+        partial: bool = False,
+    ) -> TemplateRenderResponse:
+        """
+        用一组变量渲染模板
+
+        Args:
+            db: 数据库会话
+            template_id: 模板 ID
+            variables: 模板变量
+            version: 模板版本（为空表示当前版本）
+            partial: 是否部分渲染（缺少的变量保留占位符，留待按用户渲染）
+
+        Returns:
+            TemplateRenderResponse: 渲染结果
+
+        Raises:
+            HTTPException: 模板或版本不存在、缺少模板变量，或渲染后的标题过长
+        """
+        template = TemplateService._get_active_template(db, template_id)
+        version = version or template.version
+        compiled = TemplateService.get_compiled(db, template.id, version)
+        try:
+            rendered = compiled.render(variables, partial)
+        except TemplateError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+        if len(rendered["title"]) > MAX_TITLE_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"渲染后的标题超过 {MAX_TITLE_LENGTH} 个字符",
+            )
+        return TemplateRenderResponse(version=version, **rendered)
@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.tasks.jobs import Job
+
+
+class ImportFormat:
+    """批量导入文件格式"""
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class UserImportService:
+    """批量导入用户服务"""
+
+    @staticmethod
+    def iter_rows(path: str, file_format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        流式读取导入文件
+
+        Args:
+            path: 文件路径
+            file_format: 文件格式（csv / ndjson）
+
+        Yields:
+            Tuple[int, Dict[str, Any]]: (行号, 行数据)；无法解析的行数据为 None
+        """
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            if file_format == ImportFormat.CSV:
+                # 表头为第 1 行，数据从第 2 行开始
+                for line_no, row in enumerate(csv.DictReader(f), start=2):
+                    yield line_no, row
+            else:
+                for line_no, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        row = None
+                    yield line_no, row if isinstance(row, dict) else None
+
+    @staticmethod
+    def _chunks(rows: Iterator[Tuple[int, Dict[str, Any]]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def run_import(job: Job, path: str, file_format: str) -> None:
+        """
+        执行批量导入（在后台作业中运行）
+
+        每批依次执行：
+        1. 校验行数据（与 POST /auth/register 相同的规则）
+        2. 一次集合查询检查用户名/邮箱冲突
+        3. 在进程池中并行计算 bcrypt 哈希
+        4. 一条多行 INSERT 写入，ON CONFLICT DO NOTHING 兜底并发注册
+
+        Args:
+            job: 后台作业（用于汇报进度和逐行错误）
+            path: 已上传的导入文件路径
+            file_format: 文件格式
+        """
+        hash_workers = settings.USER_IMPORT_HASH_WORKERS or os.cpu_count() or 1
+        seen_usernames: Set[str] = set()
+        seen_emails: Set[str] = set()
+
+        db = SessionLocal()
+        try:
+            with ProcessPoolExecutor(max_workers=hash_workers) as pool:
+                rows = UserImportService.iter_rows(path, file_format)
+                for chunk in UserImportService._chunks(rows, settings.USER_IMPORT_BATCH_SIZE):
+                    UserImportService._import_chunk(db, pool, job, chunk, seen_usernames, seen_emails)
+        finally:
+            db.close()
+            os.remove(path)
+
+        job.total = job.processed
+        job.result = {"imported": job.succeeded, "failed": job.failed}
+
+    @staticmethod
+    def _import_chunk(
+        db: Session,
+        pool: ProcessPoolExecutor,
+        job: Job,
+        chunk: List[Tuple[int, Dict[str, Any]]],
+        seen_usernames: Set[str],
+        seen_emails: Set[str],
+    ) -> None:
+        def reject(line_no: int, message: str, username: str = None) -> None:
+            job.add_error({"row": line_no, "username": username, "message": message})
+
+        # 1. 校验，并排除文件内重复
+        candidates: List[Tuple[int, UserCreate]] = []
+        for line_no, row in chunk:
+            if row is None:
+                reject(line_no, "无法解析的行")
+                continue
+            try:
+                user_create = UserCreate.model_validate(row)
+            except ValidationError as e:
+                reject(line_no, "; ".join(err["msg"] for err in e.errors()), row.get("username"))
+                continue
+
+            if user_create.username in seen_usernames:
+                reject(line_no, "用户名在导入文件中重复", user_create.username)
+                continue
+            if user_create.email in seen_emails:
+                reject(line_no, "邮箱在导入文件中重复", user_create.username)
+                continue
+            seen_usernames.add(user_create.username)
+            seen_emails.add(user_create.email)
+            candidates.append((line_no, user_create))
+
+        # 2. 一次查询找出与已有用户冲突的用户名/邮箱
+        if candidates:
+            usernames = [u.username for _, u in candidates]
+            emails = [u.email for _, u in candidates]
+            existing = db.query(User.username, User.email).filter(
+                or_(User.username.in_(usernames), User.email.in_(emails))
+            ).all()
+            existing_usernames = {row.username for row in existing}
+            existing_emails = {row.email for row in existing}
+
+            remaining = []
+            for line_no, user_create in candidates:
+                if user_create.username in existing_usernames:
+                    reject(line_no, "用户名已存在", user_create.username)
+                elif user_create.email in existing_emails:
+                    reject(line_no, "邮箱已被使用", user_create.username)
+                else:
+                    remaining.append((line_no, user_create))
+            candidates = remaining
+
+        inserted = 0
+        if candidates:
+            # 3. 并行哈希密码
+            password_hashes = list(
+                pool.map(get_password_hash, [u.password for _, u in candidates], chunksize=16)
+            )
+
+            # 4. 多行 INSERT；检查之后才出现的冲突由 ON CONFLICT 跳过并逐行报告
+            stmt = (
+                insert(User)
+                .values(
+                    [
+                        {
+                            "username": user_create.username,
+                            "email": user_create.email,
+                            "password_hash": password_hash,
+                        }
+                        for (_, user_create), password_hash in zip(candidates, password_hashes)
+                    ]
+                )
+                .on_conflict_do_nothing()
+                .returning(User.username)
+            )
+            inserted_usernames = {row.username for row in db.execute(stmt)}
+            db.commit()
+
+            inserted = len(inserted_usernames)
+            for line_no, user_create in candidates:
+                if user_create.username not in inserted_usernames:
+                    reject(line_no, "用户名或邮箱已存在", user_create.username)
+
+        job.advance(processed=len(chunk), succeeded=inserted, failed=len(chunk) - inserted)
+
+    @staticmethod
+    def detect_format(filename: str, content_type: str) -> str:
+        """
+        根据文件名/Content-Type 判断导入格式
+
+        Returns:
+            str: ImportFormat.CSV 或 ImportFormat.NDJSON
+        """
+        filename = (filename or "").lower()
+        content_type = (content_type or "").lower()
+        if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+            return ImportFormat.NDJSON
+        return ImportFormat.CSV
@@ -0,0 +1,21 @@
+"""站内信记录归档任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.archive_service import NotificationArchiveService
+from app.tasks.periodic import register_periodic_task
+
+
+def archive_old_records() -> None:
+    """把超过期限的已读记录移入归档表"""
+    db = SessionLocal()
+    try:
+        NotificationArchiveService.archive_old_records(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "notification-archive",
+    settings.NOTIFICATION_ARCHIVE_INTERVAL_SECONDS,
+    archive_old_records,
+)
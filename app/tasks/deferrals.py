@@ -0,0 +1,21 @@
+"""免打扰推迟送达任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.deferral_service import NotificationDeferralService
+from app.tasks.periodic import register_periodic_task
+
+
+def deliver_deferred() -> None:
+    """把免打扰已结束的推迟登记写入收件箱"""
+    db = SessionLocal()
+    try:
+        NotificationDeferralService.deliver_due(db, settings.NOTIFICATION_DEFERRAL_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "notification-deferrals",
+    settings.NOTIFICATION_DEFERRAL_INTERVAL_SECONDS,
+    deliver_deferred,
+)
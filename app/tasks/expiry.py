@@ -0,0 +1,142 @@
+"""站内信过期处理任务"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.expiry_service import NotificationExpiryService
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """
+    定时器驱动的站内信过期处理器
+
+    内存中用小顶堆按过期时间保存即将到期的站内信，线程睡到堆顶到期时再处理，
+    不需要周期性扫描 notifications 表：
+    - 每次只从 expires_at 索引装载一个时间窗口（未来 horizon 秒、最多 batch_size 条），
+      窗口用完时再装载下一个
+    - 新建或修改过期时间的站内信通过 schedule() 直接加入堆并唤醒线程
+    """
+
+    def __init__(self, horizon_seconds: float, batch_size: int):
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[datetime, str]] = []
+        # 站内信 ID -> 堆中最新的过期时间，过期时间被修改后旧的堆元素据此跳过
+        self._scheduled: Dict[str, datetime] = {}
+        self._loaded_until = datetime.min.replace(tzinfo=timezone.utc)
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, notification_id, expires_at: datetime | None) -> None:
+        """
+        登记站内信的过期时间
+
+        只有落在当前已装载窗口内的才需要加入堆，更晚的会在装载后续窗口时从数据库读到。
+
+        Args:
+            notification_id: 站内信 ID
+            expires_at: 过期时间（None 表示不过期）
+        """
+        if expires_at is None:
+            return
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        with self._lock:
+            if expires_at > self._loaded_until:
+                return
+            key = str(notification_id)
+            self._scheduled[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """启动处理线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """停止处理线程"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _load(self, now: datetime) -> None:
+        """从数据库装载下一个时间窗口内待处理的站内信"""
+        until = now + self.horizon
+        db = SessionLocal()
+        try:
+            pending = NotificationExpiryService.pending(db, until, self.batch_size)
+        finally:
+            db.close()
+
+        with self._lock:
+            # 窗口被 batch_size 截断时，只能保证装载到最后一条的过期时间为止
+            self._loaded_until = pending[-1][1] if len(pending) >= self.batch_size else until
+            for notification_id, expires_at in pending:
+                key = str(notification_id)
+                self._scheduled[key] = expires_at
+                heapq.heappush(self._heap, (expires_at, key))
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        """弹出所有已到期的站内信"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._heap)
+                if self._scheduled.get(key) == expires_at:
+                    del self._scheduled[key]
+                    due.append(key)
+        return due
+
+    def _next_wait(self, now: datetime) -> float:
+        """距离下一次需要醒来（堆顶到期或窗口用完）的秒数"""
+        with self._lock:
+            wake_at = self._loaded_until
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+        return max((wake_at - now).total_seconds(), 0.0)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            # 先清除唤醒标记，之后 schedule() 的唤醒不会丢失
+            self._wakeup.clear()
+            try:
+                now = datetime.now(timezone.utc)
+                if now >= self._loaded_until:
+                    self._load(now)
+
+                due = self._pop_due(now)
+                if due:
+                    db = SessionLocal()
+                    try:
+                        for notification_id in due:
+                            NotificationExpiryService.expire(db, notification_id)
+                    finally:
+                        db.close()
+                    continue
+
+                wait = self._next_wait(now)
+            except Exception:
+                logger.exception("站内信过期处理失败")
+                wait = self.horizon.total_seconds()
+
+            self._wakeup.wait(wait)
+
+
+expiry_sweeper = ExpirySweeper(
+    horizon_seconds=settings.NOTIFICATION_EXPIRY_HORIZON_SECONDS,
+    batch_size=settings.NOTIFICATION_EXPIRY_BATCH_SIZE,
+)
@@ -0,0 +1,398 @@
+"""站内信扩散执行器"""
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.models.notification import FanoutStatus
+from app.schemas.notification import FanoutResponse
+from app.services.fanout_service import FanoutAborted, FanoutService
+from app.tasks.jobs import Job, JobStatus, job_registry
+
+logger = logging.getLogger(__name__)
+
+# 站内信优先级 -> 通道名
+PRIORITY_LANES = {0: "normal", 1: "important", 2: "urgent"}
+
+
+def _message(error: Exception) -> str:
+    return getattr(error, "detail", None) or str(error)
+
+
+class RateLimiter:
+    """
+    令牌桶写入限速（所有工作进程共用）
+
+    每块发送前按块大小预扣，发送后退回未实际写入的部分；rate 为 0 时不限速。
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._allowance = rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount: int) -> None:
+        """预扣 amount 行的额度，额度不足时睡眠到补足为止"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._allowance -= amount
+            wait = -self._allowance / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+    def refund(self, amount: int) -> None:
+        """退回预扣但未使用的额度"""
+        if self.rate <= 0 or amount <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._allowance = min(self.rate, self._allowance + amount)
+
+
+class _Partition:
+    """分区在执行器内的状态（断点同时持久化在 fanout_partitions 中）"""
+
+    def __init__(self, partition: int, cursor: Optional[uuid.UUID], upper_user_id: Optional[uuid.UUID]):
+        self.partition = partition
+        self.cursor = cursor
+        self.upper_user_id = upper_user_id
+        self.busy = False  # 正有一块在发送
+        self.finished = False  # 已发送完或已失败
+
+
+class FanoutTask:
+    """一次全员发送在执行器中的任务，各分区逐块推进"""
+
+    def __init__(self, fanout: FanoutResponse, lane: str, job: Job):
+        self.fanout_id = fanout.id
+        self.notification_id = str(fanout.notification_id)
+        self.audience = fanout.audience
+        self.segment_id = fanout.segment_id
+        self.lane = lane
+        self.job = job
+        self.partitions = [
+            _Partition(p.partition, p.cursor, p.upper_user_id)
+            for p in fanout.partitions
+            if p.status != FanoutStatus.DONE.value
+        ]
+        self.sent = 0
+        self.error: Optional[Exception] = None  # 整体中止原因（站内信被删除、撤回或服务停止）
+        self.failed_partitions: List[int] = []
+        self.submitted_at = time.monotonic()
+        self.last_served_at = self.submitted_at
+        self._next = 0
+        self._settled = False
+        self._done = threading.Event()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def _take_partition(self) -> Optional[_Partition]:
+        """轮流取一个空闲且未完成的分区（调用方持有执行器的锁）"""
+        if self.error is not None:
+            return None
+        for _ in range(len(self.partitions)):
+            partition = self.partitions[self._next]
+            self._next = (self._next + 1) % len(self.partitions)
+            if not partition.busy and not partition.finished:
+                partition.busy = True
+                return partition
+        return None
+
+    def _is_settled(self) -> bool:
+        if any(p.busy for p in self.partitions):
+            return False
+        return self.error is not None or all(p.finished for p in self.partitions)
+
+
+class FanoutExecutor:
+    """
+    带优先级通道的分区并行扩散执行器
+
+    - 每次全员发送按用户 ID 切成若干分区，分区的每一块在进程池中发送，每个工作进程使用自己的数据库连接，
+      写入吞吐不受单个连接限制；同一分区同一时刻只有一块在发送，断点按分区独立推进
+    - 每个优先级一个通道，调度线程用平滑加权轮询（smooth weighted round-robin）在有可发送分区的通道间
+      挑选下一块：紧急通道按权重获得大部分发送能力，进行中的普通大规模发送仍按比例推进，不会饿死
+    - 所有块在派发前经过同一个令牌桶，工作进程合计的写入速率不超过 FANOUT_MAX_ROWS_PER_SECOND
+    - 某个分区失败时只标记该分区，其余分区继续；结束后可通过重试接口只重发未完成的分区
+
+    各通道的队列深度、等待时间和送达耗时记录在运行指标中（fanout_<通道>_*）。
+    """
+
+    def __init__(self, workers: int, chunk_size: int, weights: Dict[str, int], max_rows_per_second: int = 0):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._weights = weights
+        self._current = {lane: 0 for lane in weights}
+        self._lanes: Dict[str, Deque[FanoutTask]] = {lane: deque() for lane in weights}
+        self._active: Set[uuid.UUID] = set()
+        self._limiter = RateLimiter(max_rows_per_second)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, fanout: FanoutResponse) -> FanoutTask:
+        """
+        提交全员发送（新创建的或重试的），只执行未完成的分区
+
+        Args:
+            fanout: 全员发送信息
+
+        Returns:
+            FanoutTask: 扩散任务，进度可通过 task.job 查询
+        """
+        lane = PRIORITY_LANES.get(fanout.priority, "normal")
+        job = job_registry.create("notification_fanout")
+        job.result = {"fanout_id": str(fanout.id), "notification_id": str(fanout.notification_id), "lane": lane}
+        task = FanoutTask(fanout, lane, job)
+        with self._cond:
+            self._active.add(task.fanout_id)
+            self._lanes[lane].append(task)
+            self._record_depth(lane)
+            settled = task._is_settled()
+            task._settled = settled
+            self._cond.notify_all()
+        if settled:
+            # 没有需要发送的分区
+            self._finish(task)
+        return task
+
+    def project(self, priority: int, rows: int) -> Tuple[str, Optional[float], Optional[float]]:
+        """
+        预估发送 rows 行所需的时间
+
+        以该通道最近一次完成的全员发送的实际写入速率为准，不超过全局限速；
+        通道尚无完成记录时按全局限速估算，都没有时无法预估。
+
+        Args:
+            priority: 站内信优先级
+            rows: 预计写入的记录数
+
+        Returns:
+            Tuple[str, Optional[float], Optional[float]]: (通道, 写入速率（行/秒）, 预计耗时（秒）)
+        """
+        lane = PRIORITY_LANES.get(priority, "normal")
+        rates = [
+            rate
+            for rate in (metrics.get_gauge(f"fanout_{lane}_last_rows_per_second"), self._limiter.rate)
+            if rate
+        ]
+        if not rates:
+            return lane, None, None
+        rate = min(rates)
+        return lane, rate, rows / rate
+
+    def is_active(self, fanout_id) -> bool:
+        """全员发送是否正在本进程中执行"""
+        with self._cond:
+            return uuid.UUID(str(fanout_id)) in self._active
+
+    def start(self) -> None:
+        """启动进程池和调度线程"""
+        with self._cond:
+            self._stopping = False
+        # spawn：工作进程不继承父进程的连接池和线程锁，各自建立数据库连接
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._threads = [
+            threading.Thread(target=self._work, name=f"fanout-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """停止执行器，尚未完成的任务标记为失败（可通过重试接口从断点继续）"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pool = None
+
+        with self._cond:
+            remaining = [task for lane in self._lanes.values() for task in lane if not task._settled]
+            for task in remaining:
+                task._settled = True
+                task.error = task.error or RuntimeError("服务停止，发送中断")
+        for task in remaining:
+            self._finish(task)
+
+    def _record_depth(self, lane: str) -> None:
+        metrics.set(f"fanout_{lane}_queue_depth", len(self._lanes[lane]))
+
+    def _pick_lane(self, ready: Set[str]) -> Optional[str]:
+        """在 ready 通道间平滑加权轮询挑选一个（调用方持有 _cond）"""
+        if not ready:
+            return None
+        total = 0
+        best = None
+        for lane in self._lanes:
+            if lane not in ready:
+                # 没有可发送分区的通道不积累权重，重新有任务时不会突然占满
+                self._current[lane] = 0
+                continue
+            self._current[lane] += self._weights[lane]
+            total += self._weights[lane]
+            if best is None or self._current[lane] > self._current[best]:
+                best = lane
+        self._current[best] -= total
+        return best
+
+    def _pick(self) -> Optional[Tuple[FanoutTask, _Partition]]:
+        """挑选下一块要发送的 (任务, 分区)（调用方持有 _cond）"""
+        ready = {
+            lane
+            for lane, queue in self._lanes.items()
+            if any(task.error is None and any(not p.busy and not p.finished for p in task.partitions) for task in queue)
+        }
+        lane = self._pick_lane(ready)
+        if lane is None:
+            return None
+        queue = self._lanes[lane]
+        for _ in range(len(queue)):
+            task = queue[0]
+            queue.rotate(-1)
+            partition = task._take_partition()
+            if partition is not None:
+                return task, partition
+        return None
+
+    def _send(self, task: FanoutTask, partition: _Partition) -> None:
+        """在进程池中发送分区的下一块，并回收结果"""
+        now = time.monotonic()
+        metrics.set(f"fanout_{task.lane}_last_queue_wait_seconds", now - task.last_served_at)
+        task.last_served_at = now
+        if task.job.status == JobStatus.PENDING:
+            task.job.status = JobStatus.RUNNING
+
+        self._limiter.acquire(self.chunk_size)
+        failure: Optional[Exception] = None
+        try:
+            cursor, count, exhausted = self._pool.submit(
+                FanoutService.send_chunk,
+                task.fanout_id,
+                partition.partition,
+                task.notification_id,
+                partition.cursor,
+                partition.upper_user_id,
+                self.chunk_size,
+                task.audience,
+                task.segment_id,
+            ).result()
+        except FanoutAborted as e:
+            # 站内信已被删除或撤回：整个全员发送中止
+            self._limiter.refund(self.chunk_size)
+            with self._cond:
+                task.error = task.error or e
+        except Exception as e:
+            logger.exception("全员发送 %s 分区 %s 发送失败", task.fanout_id, partition.partition)
+            self._limiter.refund(self.chunk_size)
+            failure = e
+        else:
+            self._limiter.refund(self.chunk_size - count)
+            metrics.inc(f"fanout_{task.lane}_chunks_total")
+            metrics.inc(f"fanout_{task.lane}_delivered_total", count)
+            task.job.advance(processed=count, succeeded=count)
+            with self._cond:
+                partition.cursor = cursor
+                partition.finished = exhausted
+                task.sent += count
+
+        if failure is not None:
+            task.job.add_error({"partition": partition.partition, "message": _message(failure)})
+            db = SessionLocal()
+            try:
+                FanoutService.fail_partition(db, task.fanout_id, partition.partition, _message(failure))
+            except Exception:
+                logger.exception("记录全员发送 %s 分区 %s 失败状态出错", task.fanout_id, partition.partition)
+            finally:
+                db.close()
+
+        with self._cond:
+            partition.busy = False
+            if failure is not None:
+                partition.finished = True
+                task.failed_partitions.append(partition.partition)
+            settled = not task._settled and task._is_settled()
+            if settled:
+                task._settled = True
+            self._cond.notify_all()
+        if settled:
+            self._finish(task)
+
+    def _finish(self, task: FanoutTask) -> None:
+        """任务结束：落库最终状态并更新作业"""
+        with self._cond:
+            queue = self._lanes[task.lane]
+            if task in queue:
+                queue.remove(task)
+                self._record_depth(task.lane)
+            self._active.discard(task.fanout_id)
+
+        db = SessionLocal()
+        try:
+            FanoutService.finish(db, task.fanout_id, _message(task.error) if task.error is not None else None)
+        except Exception:
+            logger.exception("记录全员发送 %s 结束状态出错", task.fanout_id)
+        finally:
+            db.close()
+
+        task.job.result["sent_count"] = task.sent
+        if task.error is not None:
+            task.job.add_error({"message": _message(task.error)})
+        if task.error is not None or task.failed_partitions:
+            task.job.result["failed_partitions"] = sorted(task.failed_partitions)
+            task.job.status = JobStatus.FAILED
+        else:
+            elapsed = time.monotonic() - task.submitted_at
+            metrics.set(f"fanout_{task.lane}_last_delivery_seconds", elapsed)
+            if task.sent > 0 and elapsed > 0:
+                metrics.set(f"fanout_{task.lane}_last_rows_per_second", task.sent / elapsed)
+            task.job.status = JobStatus.SUCCEEDED
+        task.job.finished_at = datetime.now(timezone.utc)
+        task._done.set()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                picked = None
+                while not self._stopping:
+                    picked = self._pick()
+                    if picked is not None:
+                        break
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            self._send(*picked)
+
+
+fanout_executor = FanoutExecutor(
+    workers=settings.FANOUT_WORKERS,
+    chunk_size=settings.FANOUT_CHUNK_SIZE,
+    weights={
+        "urgent": settings.FANOUT_WEIGHT_URGENT,
+        "important": settings.FANOUT_WEIGHT_IMPORTANT,
+        "normal": settings.FANOUT_WEIGHT_NORMAL,
+    },
+    max_rows_per_second=settings.FANOUT_MAX_ROWS_PER_SECOND,
+)
@@ -0,0 +1,21 @@
+"""过期幂等键清理任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.idempotency import idempotency_store
+from app.tasks.periodic import register_periodic_task
+
+
+def sweep_expired_idempotency_keys() -> None:
+    """分批删除已过期的幂等键"""
+    db = SessionLocal()
+    try:
+        idempotency_store.prune_expired(db, settings.IDEMPOTENCY_SWEEP_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "idempotency-key-sweeper",
+    settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS,
+    sweep_expired_idempotency_keys,
+)
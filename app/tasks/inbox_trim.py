@@ -0,0 +1,21 @@
+"""收件箱容量控制任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.inbox_trim_service import InboxTrimService
+from app.tasks.periodic import register_periodic_task
+
+
+def trim_inboxes() -> None:
+    """删除超限收件箱中最早的已读记录"""
+    db = SessionLocal()
+    try:
+        InboxTrimService.trim(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "inbox-trim",
+    settings.INBOX_TRIM_INTERVAL_SECONDS,
+    trim_inboxes,
+)
@@ -0,0 +1,129 @@
+import enum
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, enum.Enum):
+    """后台作业状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job:
+    """
+    后台作业
+
+    作业函数通过 advance()/add_error() 汇报进度，状态可通过作业查询接口获取。
+    """
+
+    # 每个作业最多保留的错误条数，避免错误过多时占用大量内存
+    MAX_ERRORS = 1000
+
+    def __init__(self, kind: str, total: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JobStatus.PENDING
+        self.total = total
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.result: Dict[str, Any] = {}
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def advance(self, processed: int = 0, succeeded: int = 0, failed: int = 0) -> None:
+        """累加进度"""
+        with self._lock:
+            self.processed += processed
+            self.succeeded += succeeded
+            self.failed += failed
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        """记录一条错误（超出上限后只计数）"""
+        with self._lock:
+            if len(self.errors) < self.MAX_ERRORS:
+                self.errors.append(error)
+
+
+class JobRegistry:
+    """
+    进程内后台作业注册表
+
+    作业在线程池中执行，只保留最近 history_size 个作业的状态。
+    """
+
+    def __init__(self, max_workers: int, history_size: int):
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(self, kind: str, func: Callable[[Job], None], total: Optional[int] = None) -> Job:
+        """
+        提交后台作业
+
+        Args:
+            kind: 作业类型
+            func: 作业函数，接收 Job 用于汇报进度
+            total: 预估总量（未知时为 None）
+
+        Returns:
+            Job: 已提交的作业
+        """
+        job = self.create(kind, total)
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def create(self, kind: str, total: Optional[int] = None) -> Job:
+        """
+        登记一个由调用方自行执行的作业（只用于状态查询）
+
+        调用方负责更新作业的 status 和 finished_at。
+
+        Args:
+            kind: 作业类型
+            total: 预估总量（未知时为 None）
+
+        Returns:
+            Job: 已登记的作业
+        """
+        job = Job(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_size:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """获取作业"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @staticmethod
+    def _run(job: Job, func: Callable[[Job], None]) -> None:
+        job.status = JobStatus.RUNNING
+        try:
+            func(job)
+            job.status = JobStatus.SUCCEEDED
+        except Exception as e:
+            logger.exception("后台作业 %s(%s) 执行失败", job.kind, job.id)
+            job.add_error({"message": str(e)})
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+
+job_registry = JobRegistry(max_workers=settings.JOB_WORKERS, history_size=settings.JOB_HISTORY_SIZE)
@@ -0,0 +1,21 @@
+"""站内信记录分区维护任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.partitions import ensure_partitions
+from app.tasks.periodic import register_periodic_task
+
+
+def ensure_future_partitions() -> None:
+    """提前创建未来月份的 notification_records 分区"""
+    db = SessionLocal()
+    try:
+        ensure_partitions(db, settings.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "notification-partitions",
+    settings.NOTIFICATION_PARTITION_CHECK_SECONDS,
+    ensure_future_partitions,
+)
@@ -0,0 +1,75 @@
+import logging
+import threading
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    周期性后台任务
+
+    在独立的守护线程中按固定间隔执行回调，回调抛出的异常只记录日志，不会终止任务。
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], None]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """启动任务线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """停止任务线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.func()
+            except Exception:
+                logger.exception("后台任务 %s 执行失败", self.name)
+
+
+# 已注册的后台任务，由应用启动/关闭时统一管理
+_tasks: List[PeriodicTask] = []
+
+
+def register_periodic_task(name: str, interval_seconds: float, func: Callable[[], None]) -> PeriodicTask:
+    """
+    注册周期性后台任务
+
+    Args:
+        name: 任务名称
+        interval_seconds: 执行间隔（秒）
+        func: 任务回调
+
+    Returns:
+        PeriodicTask: 已注册的任务
+    """
+    task = PeriodicTask(name, interval_seconds, func)
+    _tasks.append(task)
+    return task
+
+
+def start_periodic_tasks() -> None:
+    """启动所有已注册的后台任务"""
+    for task in _tasks:
+        task.start()
+
+
+def stop_periodic_tasks() -> None:
+    """停止所有已注册的后台任务"""
+    for task in _tasks:
+        task.stop(timeout=5)
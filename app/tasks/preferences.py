@@ -0,0 +1,21 @@
+"""用户通知偏好摘要同步任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.preferences import preference_cache
+from app.tasks.periodic import register_periodic_task
+
+
+def sync_preferences() -> None:
+    """从数据库重建本进程的偏好摘要"""
+    db = SessionLocal()
+    try:
+        preference_cache.sync(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "preference-sync",
+    settings.PREFERENCE_SYNC_SECONDS,
+    sync_preferences,
+)
@@ -0,0 +1,21 @@
+"""站内信数据清理任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.purge_service import NotificationPurgeService
+from app.tasks.periodic import register_periodic_task
+
+
+def purge_dead_rows() -> None:
+    """物理删除软删除超过保留期的记录和已过期的站内信"""
+    db = SessionLocal()
+    try:
+        NotificationPurgeService.purge(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "notification-purge",
+    settings.NOTIFICATION_PURGE_INTERVAL_SECONDS,
+    purge_dead_rows,
+)
@@ -0,0 +1,180 @@
+"""定时发送调度任务"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Set
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.schedule_service import ScheduledSendService
+from app.tasks.jobs import job_registry
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """
+    单层时间轮
+
+    每个槽对应 1 秒，共 size 个槽，只容纳 size 秒以内到期的任务；
+    推进时依次取出经过的每个槽，即使线程晚醒了几秒也不会漏掉。
+    """
+
+    def __init__(self, size: int, now_second: int):
+        self.size = size
+        self.cursor = now_second  # 已处理到的秒（含）
+        self._slots: List[Set[str]] = [set() for _ in range(size)]
+
+    def add(self, key: str, due_second: int) -> bool:
+        """
+        加入任务
+
+        已到期的任务放入下一秒的槽，下次推进时立即触发。
+
+        Returns:
+            bool: 是否加入（超出时间轮范围时返回 False）
+        """
+        due_second = max(due_second, self.cursor + 1)
+        if due_second > self.cursor + self.size:
+            return False
+        self._slots[due_second % self.size].add(key)
+        return True
+
+    def advance(self, now_second: int) -> List[str]:
+        """推进到 now_second，返回经过的槽中的全部任务"""
+        due: List[str] = []
+        # 落后超过一整圈时，每个槽只需取一次
+        start = max(self.cursor + 1, now_second - self.size + 1)
+        for second in range(start, now_second + 1):
+            slot = self._slots[second % self.size]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self.cursor = max(self.cursor, now_second)
+        return due
+
+
+class ScheduledSendDispatcher:
+    """
+    定时发送调度器
+
+    每秒推进一次时间轮，到期的定时发送被领取后交给后台作业执行：
+    - 只从 scheduled_at 索引装载未来 horizon 秒内到期的发送，每半个窗口重新装载一次，
+      不需要轮询整张表；新创建的发送通过 schedule() 直接放入时间轮
+    - 定时发送持久化在数据库中，重启后装载时会取回停机期间到期、以及发送中途中断的发送
+    - 比较墙上时钟与单调时钟的流逝，发现时钟跳变（NTP 校时、手动改时间）时清空时间轮重新装载
+    """
+
+    # 墙上时钟与单调时钟的流逝差超过该值视为时钟跳变（秒）
+    CLOCK_JUMP_TOLERANCE = 1.0
+
+    def __init__(self, horizon_seconds: int, batch_size: int):
+        self.horizon = horizon_seconds
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._wheel = TimingWheel(horizon_seconds + 2, int(time.time()))
+        self._loaded_until = 0.0
+        self._next_load = 0.0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, scheduled_send_id, scheduled_at: datetime) -> None:
+        """
+        把新创建的定时发送放入时间轮
+
+        超出当前已装载窗口的不需要处理，会在之后装载时从数据库读到。
+
+        Args:
+            scheduled_send_id: 定时发送 ID
+            scheduled_at: 计划发送时间
+        """
+        timestamp = scheduled_at.timestamp()
+        with self._lock:
+            if timestamp <= self._loaded_until:
+                self._wheel.add(str(scheduled_send_id), math.ceil(timestamp))
+
+    def start(self) -> None:
+        """启动调度线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduled-send", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """停止调度线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _load(self, now: float) -> None:
+        """从数据库装载未来 horizon 秒内到期的定时发送"""
+        until = datetime.fromtimestamp(now + self.horizon, tz=timezone.utc)
+        db = SessionLocal()
+        try:
+            pending = ScheduledSendService.pending(db, until, self.batch_size)
+        finally:
+            db.close()
+
+        with self._lock:
+            for scheduled_send_id, scheduled_at in pending:
+                self._wheel.add(str(scheduled_send_id), math.ceil(scheduled_at.timestamp()))
+            if len(pending) >= self.batch_size:
+                # 窗口被截断：只保证装载到最后一条的计划时间，尽快装载下一批
+                self._loaded_until = pending[-1][1].timestamp()
+                self._next_load = now + 1
+            else:
+                self._loaded_until = now + self.horizon
+                self._next_load = now + self.horizon / 2
+
+    def _reset(self, now: float) -> None:
+        """清空时间轮（时钟跳变后调用），随后重新装载"""
+        with self._lock:
+            self._wheel = TimingWheel(self.horizon + 2, int(now))
+            self._loaded_until = 0.0
+            self._next_load = 0.0
+
+    def _fire(self, due: List[str]) -> None:
+        """领取到期的定时发送并提交后台作业"""
+        db = SessionLocal()
+        try:
+            for scheduled_send_id in due:
+                if ScheduledSendService.claim(db, scheduled_send_id):
+                    job_registry.submit(
+                        "scheduled_send",
+                        lambda job, scheduled_send_id=scheduled_send_id: ScheduledSendService.run(job, scheduled_send_id),
+                    )
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        last_wall, last_mono = time.time(), time.monotonic()
+        while not self._stop_event.is_set():
+            now, mono = time.time(), time.monotonic()
+            try:
+                if abs((now - last_wall) - (mono - last_mono)) > self.CLOCK_JUMP_TOLERANCE:
+                    logger.warning("检测到系统时钟跳变 %.1f 秒，重新装载定时发送", (now - last_wall) - (mono - last_mono))
+                    self._reset(now)
+
+                if now >= self._next_load:
+                    self._load(now)
+
+                with self._lock:
+                    due = self._wheel.advance(int(now))
+                if due:
+                    self._fire(due)
+            except Exception:
+                logger.exception("定时发送调度失败")
+            last_wall, last_mono = now, mono
+
+            # 睡到下一个整秒
+            self._stop_event.wait(math.ceil(now + 1e-3) - time.time())
+
+
+scheduled_send_dispatcher = ScheduledSendDispatcher(
+    horizon_seconds=settings.SCHEDULED_SEND_HORIZON_SECONDS,
+    batch_size=settings.SCHEDULED_SEND_BATCH_SIZE,
+)
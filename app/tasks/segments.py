@@ -0,0 +1,21 @@
+"""受众分群刷新任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.segment_service import SegmentService
+from app.tasks.periodic import register_periodic_task
+
+
+def refresh_due_segments() -> None:
+    """增量刷新到期的受众分群成员"""
+    db = SessionLocal()
+    try:
+        SegmentService.refresh_due(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "segment-refresh",
+    settings.SEGMENT_REFRESH_CHECK_SECONDS,
+    refresh_due_segments,
+)
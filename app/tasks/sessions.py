@@ -0,0 +1,21 @@
+"""过期会话清理任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.session_store import session_store
+from app.tasks.periodic import register_periodic_task
+
+
+def sweep_expired_sessions() -> None:
+    """分批删除已过期的 Token 家族"""
+    db = SessionLocal()
+    try:
+        session_store.prune_expired(db, settings.SESSION_SWEEP_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "session-sweeper",
+    settings.SESSION_SWEEP_INTERVAL_SECONDS,
+    sweep_expired_sessions,
+)
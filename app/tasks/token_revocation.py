@@ -0,0 +1,35 @@
+"""Token 吊销列表同步任务"""
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.revocation import token_revocation
+from app.tasks.periodic import register_periodic_task
+
+
+def sync_revoked_tokens() -> None:
+    """从数据库增量同步吊销列表到本进程内存"""
+    db = SessionLocal()
+    try:
+        token_revocation.sync(db)
+    finally:
+        db.close()
+
+
+def purge_expired_revocations() -> None:
+    """清理已过期 Token 的吊销记录"""
+    db = SessionLocal()
+    try:
+        token_revocation.purge_expired(db)
+    finally:
+        db.close()
+
+
+register_periodic_task(
+    "token-revocation-sync",
+    settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    sync_revoked_tokens,
+)
+register_periodic_task(
+    "token-revocation-purge",
+    settings.TOKEN_REVOCATION_REBUILD_MINUTES * 60,
+    purge_expired_revocations,
+)
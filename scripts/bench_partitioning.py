@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+notification_records 分区表与单表性能对比
+
+分别创建单表和按月分区的测试表，写入相同的数据（按月均匀分布），
+对比收件箱常用查询的耗时，以及清理最旧一个月数据的耗时（DELETE vs DROP 分区）。
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+from app.core.partitions import add_months  # noqa: E402
+
+COLUMNS = """
+    id uuid NOT NULL DEFAULT gen_random_uuid(),
+    notification_id uuid NOT NULL,
+    user_id uuid NOT NULL,
+    is_read boolean NOT NULL DEFAULT false,
+    is_deleted boolean NOT NULL DEFAULT false,
+    created_at timestamptz NOT NULL
+"""
+
+QUERIES = {
+    "最新一页": """
+        SELECT id FROM {table}
+        WHERE user_id = :user_id AND NOT is_deleted
+        ORDER BY created_at DESC LIMIT 20
+    """,
+    "游标翻页（上月）": """
+        SELECT id FROM {table}
+        WHERE user_id = :user_id AND NOT is_deleted AND created_at < :cursor
+        ORDER BY created_at DESC LIMIT 20
+    """,
+    "近期未读数": """
+        SELECT count(*) FROM {table}
+        WHERE user_id = :user_id AND NOT is_read AND NOT is_deleted AND created_at >= :cursor
+    """,
+}
+
+
+def setup(engine, months: int, rows: int, users: int, first_month: date) -> list:
+    """
+    创建测试表并写入数据
+
+    Returns:
+        测试用户 ID 列表
+    """
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_records_mono, bench_records_part CASCADE"))
+        conn.execute(text(f"CREATE UNLOGGED TABLE bench_records_mono ({COLUMNS}, PRIMARY KEY (id))"))
+        conn.execute(
+            text(
+                f"CREATE UNLOGGED TABLE bench_records_part ({COLUMNS}, PRIMARY KEY (id, created_at)) "
+                f"PARTITION BY RANGE (created_at)"
+            )
+        )
+        for i in range(months):
+            month = add_months(first_month, i)
+            conn.execute(
+                text(
+                    f"CREATE UNLOGGED TABLE bench_records_part_{month:%Y%m} PARTITION OF bench_records_part "
+                    f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+                )
+            )
+        conn.execute(
+            text(
+                "CREATE TEMP TABLE bench_users AS "
+                "SELECT gen_random_uuid() AS id, row_number() OVER () AS n FROM generate_series(1, :users)"
+            ),
+            {"users": users},
+        )
+        user_ids = [row.id for row in conn.execute(text("SELECT id FROM bench_users"))]
+
+        per_month = rows // months
+        for i in range(months):
+            month = add_months(first_month, i)
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO bench_records_mono (notification_id, user_id, is_read, created_at)
+                    SELECT gen_random_uuid(),
+                           u.id,
+                           random() < 0.8,
+                           CAST(:month AS timestamptz) + random() * (CAST(:next AS timestamptz) - CAST(:month AS timestamptz))
+                    FROM generate_series(1, :n) g
+                    JOIN bench_users u ON u.n = 1 + g % :users
+                    """
+                ),
+                {"month": month, "next": add_months(month, 1), "n": per_month, "users": users},
+            )
+        conn.execute(text("INSERT INTO bench_records_part SELECT * FROM bench_records_mono"))
+        for table in ("bench_records_mono", "bench_records_part"):
+            conn.execute(text(f"CREATE INDEX ON {table} (user_id, created_at)"))
+            conn.execute(text(f"ANALYZE {table}"))
+    return user_ids
+
+
+def run_query(engine, sql: str, table: str, user_ids: list, cursor: date, repeat: int) -> float:
+    """执行查询 repeat 次，返回耗时中位数（毫秒）"""
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            params = {"user_id": random.choice(user_ids), "cursor": cursor}
+            start = time.perf_counter()
+            conn.execute(text(sql.format(table=table)), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='notification_records 分区表与单表性能对比',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 默认：24 个月、2000 万行、10 万用户
+  python scripts/bench_partitioning.py
+
+  # 快速验证
+  python scripts/bench_partitioning.py --rows 1000000 --users 10000
+        '''
+    )
+    parser.add_argument('--months', type=int, default=24, help='数据跨越的月数')
+    parser.add_argument('--rows', type=int, default=20_000_000, help='总行数')
+    parser.add_argument('--users', type=int, default=100_000, help='用户数')
+    parser.add_argument('--repeat', type=int, default=200, help='每个查询的执行次数')
+    parser.add_argument('--database-url', default=settings.DATABASE_URL, help='数据库连接 URL')
+    parser.add_argument('--keep', action='store_true', help='保留测试表')
+    args = parser.parse_args()
+
+    today = date.today()
+    current_month = date(today.year, today.month, 1)
+    first_month = add_months(current_month, -(args.months - 1))
+
+    engine = create_engine(args.database_url)
+    print(f"写入测试数据: {args.rows:,} 行，{args.months} 个月，{args.users:,} 用户 ...")
+    user_ids = setup(engine, args.months, args.rows, args.users, first_month)
+
+    cursor = add_months(current_month, -1)
+    print(f"\n{'查询':<16}{'单表(ms)':>12}{'分区表(ms)':>14}")
+    print("=" * 42)
+    for name, sql in QUERIES.items():
+        mono = run_query(engine, sql, "bench_records_mono", user_ids, cursor, args.repeat)
+        part = run_query(engine, sql, "bench_records_part", user_ids, cursor, args.repeat)
+        print(f"{name:<16}{mono:>12.2f}{part:>14.2f}")
+
+    # 清理最旧一个月：单表只能 DELETE，分区表可直接 DETACH + DROP
+    with engine.begin() as conn:
+        start = time.perf_counter()
+        conn.execute(
+            text("DELETE FROM bench_records_mono WHERE created_at < :before"),
+            {"before": add_months(first_month, 1)},
+        )
+        delete_elapsed = time.perf_counter() - start
+    with engine.begin() as conn:
+        start = time.perf_counter()
+        conn.execute(text(f"ALTER TABLE bench_records_part DETACH PARTITION bench_records_part_{first_month:%Y%m}"))
+        conn.execute(text(f"DROP TABLE bench_records_part_{first_month:%Y%m}"))
+        drop_elapsed = time.perf_counter() - start
+    print(f"{'清理最旧一个月':<16}{delete_elapsed * 1000:>12.2f}{drop_elapsed * 1000:>14.2f}")
+    print("=" * 42)
+
+    if not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS bench_records_mono, bench_records_part CASCADE"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+站内信模板渲染吞吐量测试
+
+对同一模板和同一批用户变量，对比三种渲染方式：
+- string.Template：每个用户每个字段调用一次 substitute（每次都做正则匹配）
+- 编译后逐个渲染：CompiledTemplate.render
+- 编译后批量渲染：CompiledTemplate.render_many
+
+只在内存中渲染，不需要数据库。
+"""
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.templates import CompiledTemplate  # noqa: E402
+
+TITLE = "${name}，您的订单 ${order_no} 已发货"
+CONTENT = (
+    "尊敬的 ${name}：\n"
+    "您于 ${order_date} 购买的 ${product} 已由 ${carrier} 发出，运单号 ${tracking_no}。\n"
+    "预计 ${eta} 送达，如有疑问请联系客服。"
+)
+ACTION_URL = "https://example.com/orders/${order_no}"
+
+
+def make_variables(count: int) -> list:
+    """生成每个用户的模板变量"""
+    return [
+        {
+            "name": f"用户{i}",
+            "order_no": f"SO{i:010d}",
+            "order_date": "2026-10-18",
+            "product": "机械键盘",
+            "carrier": "顺丰速运",
+            "tracking_no": f"SF{i:012d}",
+            "eta": "2026-10-20",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_string_template(variables_list: list) -> float:
+    templates = [string.Template(source) for source in (TITLE, CONTENT, ACTION_URL)]
+    start = time.perf_counter()
+    for variables in variables_list:
+        title, content, action_url = (template.substitute(variables) for template in templates)
+    return time.perf_counter() - start
+
+
+def bench_compiled(variables_list: list) -> float:
+    compiled = CompiledTemplate(TITLE, CONTENT, ACTION_URL)
+    start = time.perf_counter()
+    for variables in variables_list:
+        compiled.render(variables)
+    return time.perf_counter() - start
+
+
+def bench_compiled_batch(variables_list: list, batch_size: int) -> float:
+    compiled = CompiledTemplate(TITLE, CONTENT, ACTION_URL)
+    start = time.perf_counter()
+    for offset in range(0, len(variables_list), batch_size):
+        compiled.render_many(variables_list[offset:offset + batch_size])
+    return time.perf_counter() - start
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='站内信模板渲染吞吐量测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 默认 100 万个用户
+  python scripts/bench_templates.py
+
+  # 快速验证
+  python scripts/bench_templates.py --recipients 100000
+        '''
+    )
+    parser.add_argument('--recipients', type=int, default=1_000_000, help='渲染的用户数')
+    parser.add_argument('--batch-size', type=int, default=10_000, help='批量渲染每批的用户数')
+    args = parser.parse_args()
+
+    variables_list = make_variables(args.recipients)
+    results = [
+        ("string.Template", bench_string_template(variables_list)),
+        ("编译后逐个渲染", bench_compiled(variables_list)),
+        ("编译后批量渲染", bench_compiled_batch(variables_list, args.batch_size)),
+    ]
+
+    print(f"\n用户数: {args.recipients:,}  批大小: {args.batch_size:,}")
+    print("=" * 60)
+    print(f"{'方式':<16}{'耗时(s)':>12}{'用户/秒':>16}{'相对':>10}")
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:<16}{elapsed:>12.2f}{args.recipients / elapsed:>16,.0f}{baseline / elapsed:>9.1f}x")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+UUID 主键插入性能对比（uuid4 vs UUIDv7）
+
+在数据库中分别创建以 gen_random_uuid()（v4）和 uuid_generate_v7() 为主键默认值的
+临时表，按批插入相同数量的行，对比插入吞吐量和主键索引大小。
+
+需要先执行 `alembic upgrade head`（创建 uuid_generate_v7 函数）。
+"""
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+KEY_FUNCTIONS = {
+    "uuid4": "gen_random_uuid()",
+    "uuid7": "uuid_generate_v7()",
+}
+
+
+def bench(engine, name: str, key_function: str, rows: int, batch_size: int) -> dict:
+    """
+    对一种主键生成方式执行插入测试
+
+    Returns:
+        测试结果（耗时、吞吐量、表/索引大小）
+    """
+    table = f"bench_keys_{name}"
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        # 与 notification_records 相近的行宽
+        conn.execute(
+            text(
+                f"""
+                CREATE UNLOGGED TABLE {table} (
+                    id uuid PRIMARY KEY DEFAULT {key_function},
+                    notification_id uuid NOT NULL,
+                    user_id uuid NOT NULL,
+                    is_read boolean NOT NULL DEFAULT false,
+                    created_at timestamptz NOT NULL DEFAULT now()
+                )
+                """
+            )
+        )
+
+    start = time.perf_counter()
+    inserted = 0
+    while inserted < rows:
+        n = min(batch_size, rows - inserted)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"""
+                    INSERT INTO {table} (notification_id, user_id)
+                    SELECT gen_random_uuid(), gen_random_uuid() FROM generate_series(1, :n)
+                    """
+                ),
+                {"n": n},
+            )
+        inserted += n
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        table_size = conn.execute(text(f"SELECT pg_relation_size('{table}')")).scalar()
+        index_size = conn.execute(text(f"SELECT pg_relation_size('{table}_pkey')")).scalar()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table}"))
+
+    return {
+        "name": name,
+        "elapsed": elapsed,
+        "rows_per_sec": rows / elapsed,
+        "table_mb": table_size / 1024 / 1024,
+        "index_mb": index_size / 1024 / 1024,
+    }
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='UUID 主键插入性能对比（uuid4 vs UUIDv7）',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 默认 1000 万行
+  python scripts/bench_uuid_keys.py
+
+  # 快速验证
+  python scripts/bench_uuid_keys.py --rows 1000000
+        '''
+    )
+    parser.add_argument('--rows', type=int, default=10_000_000, help='每种主键插入的行数')
+    parser.add_argument('--batch-size', type=int, default=100_000, help='每批插入行数')
+    parser.add_argument('--database-url', default=settings.DATABASE_URL, help='数据库连接 URL')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    results = [
+        bench(engine, name, key_function, args.rows, args.batch_size)
+        for name, key_function in KEY_FUNCTIONS.items()
+    ]
+
+    print(f"\n行数: {args.rows:,}  批大小: {args.batch_size:,}")
+    print("=" * 70)
+    print(f"{'主键':<8}{'耗时(s)':>12}{'行/秒':>14}{'表大小(MB)':>16}{'主键索引(MB)':>18}")
+    for r in results:
+        print(
+            f"{r['name']:<8}{r['elapsed']:>12.1f}{r['rows_per_sec']:>14,.0f}"
+            f"{r['table_mb']:>16.1f}{r['index_mb']:>18.1f}"
+        )
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
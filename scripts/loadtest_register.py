@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+注册接口并发压测工具
+
+并发调用 POST /api/v1/auth/register，统计吞吐量，并验证同名并发注册时
+只有一个请求成功（不出现重复用户）。
+"""
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def register(client: httpx.Client, base_url: str, username: str, email: str) -> int:
+    """
+    发起一次注册请求
+
+    Returns:
+        HTTP 状态码
+    """
+    response = client.post(
+        f"{base_url}/api/v1/auth/register",
+        json={"username": username, "email": email, "password": "loadtest-password"},
+    )
+    return response.status_code
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='注册接口并发压测工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 1000 个不同用户，50 并发
+  python scripts/loadtest_register.py --users 1000 --concurrency 50
+
+  # 每个用户名同时注册 5 次，验证只有 1 次成功
+  python scripts/loadtest_register.py --users 200 --duplicates 5
+        '''
+    )
+    parser.add_argument('--base-url', default='http://localhost:8000', help='服务地址')
+    parser.add_argument('-n', '--users', type=int, default=1000, help='注册的不同用户数')
+    parser.add_argument('-c', '--concurrency', type=int, default=50, help='并发数')
+    parser.add_argument('-d', '--duplicates', type=int, default=1, help='每个用户名并发注册的次数')
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    # 同一用户名的多次注册交错排列，尽量让它们同时到达服务端
+    tasks = [
+        (f"lt_{run_id}_{i}", f"lt_{run_id}_{i}@example.com")
+        for _ in range(args.duplicates)
+        for i in range(args.users)
+    ]
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    with httpx.Client(limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            status_codes = list(
+                pool.map(lambda t: register(client, args.base_url, t[0], t[1]), tasks)
+            )
+        elapsed = time.perf_counter() - start
+
+    counts = Counter(status_codes)
+    created = counts.get(201, 0)
+    print(f"\n请求总数: {len(tasks)}  并发: {args.concurrency}  耗时: {elapsed:.2f}s")
+    print(f"吞吐量: {len(tasks) / elapsed:.1f} req/s")
+    print(f"状态码分布: {dict(counts)}")
+
+    if created != args.users:
+        print(f"\n[失败] 期望成功注册 {args.users} 个用户，实际 {created} 个")
+        return 1
+
+    print(f"\n[成功] {args.users} 个用户各注册成功一次，无重复用户")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+notification_records 分区管理工具
+
+查看、提前创建、卸载或删除 notification_records 的月分区。
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.core.partitions import detach_partitions_before, ensure_partitions, list_partitions  # noqa: E402
+
+
+def parse_month(value: str) -> date:
+    """解析 YYYY-MM 格式的月份"""
+    year, month = value.split("-")
+    return date(int(year), int(month), 1)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='notification_records 分区管理工具',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+  # 查看当前分区
+  python scripts/manage_partitions.py list
+
+  # 提前创建未来 6 个月的分区
+  python scripts/manage_partitions.py create --months-ahead 6
+
+  # 卸载 2025-01 之前的分区（保留为独立表，可归档后再删除）
+  python scripts/manage_partitions.py detach --before 2025-01
+
+  # 卸载并删除 2025-01 之前的分区
+  python scripts/manage_partitions.py detach --before 2025-01 --drop --yes
+        '''
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='列出分区')
+
+    create_parser = subparsers.add_parser('create', help='提前创建未来分区')
+    create_parser.add_argument(
+        '--months-ahead',
+        type=int,
+        default=settings.NOTIFICATION_PARTITION_MONTHS_AHEAD,
+        help='提前创建的月数',
+    )
+
+    detach_parser = subparsers.add_parser('detach', help='卸载旧分区')
+    detach_parser.add_argument('--before', type=parse_month, required=True, help='卸载早于该月份（YYYY-MM）的分区')
+    detach_parser.add_argument('--drop', action='store_true', help='卸载后直接删除分区表')
+    detach_parser.add_argument('-y', '--yes', action='store_true', help='跳过确认')
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == 'list':
+            for name, month in list_partitions(db):
+                print(f"{month:%Y-%m}  {name}")
+            return 0
+
+        if args.command == 'create':
+            created = ensure_partitions(db, args.months_ahead)
+            print(f"新建分区: {', '.join(created) if created else '无'}")
+            return 0
+
+        targets = [name for name, month in list_partitions(db) if month < args.before]
+        if not targets:
+            print("没有需要卸载的分区")
+            return 0
+
+        action = "卸载并删除" if args.drop else "卸载"
+        print(f"将{action}以下分区: {', '.join(targets)}")
+        if not args.yes:
+            response = input("确定继续吗？(y/N): ")
+            if response.lower() not in ['y', 'yes']:
+                print("已取消")
+                return 0
+
+        detached = detach_partitions_before(db, args.before, drop=args.drop)
+        print(f"[成功] 已{action} {len(detached)} 个分区")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -143,14 +143,16 @@ def test_admin_send_notification_with_expiry(client, auth_headers, db_session, t
     assert response.status_code == 200
 
 
-def test_admin_send_notification_to_all_users(client, auth_headers, db_session):
+def test_admin_send_notification_to_all_users(
+    client, auth_headers, db_session, fanout_executor, wait_for_job
+):
     """
     场景：管理员发送站内信给所有用户
     ================================
     1. 创建多个测试用户
     2. 管理员创建站内信
-    3. 发送给所有用户
-    4. 验证所有用户都收到站内信
+    3. 发送给所有用户（异步扩散，返回后台作业）
+    4. 等待作业完成，验证所有用户都收到站内信
     """
     from app.models.user import User
     from app.core.security import get_password_hash
@@ -193,7 +195,22 @@ def test_admin_send_notification_to_all_users(client, auth_headers, db_session):
     )
     assert response.status_code == 200
     send_result = response.json()
-    assert "成功发送给 5 个用户" in send_result["message"]
+    assert send_result["message"] == "已开始发送给所有用户"
+
+    job = wait_for_job(send_result["job"]["id"], auth_headers)
+    assert job["status"] == "succeeded"
+    total_users = db_session.query(User).count()
+    assert job["result"]["sent_count"] == total_users
+
+    for user in users:
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"username": user.username, "password": "password123"},
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = client.get("/api/v1/notifications", headers=headers)
+        assert response.status_code == 200
+        assert [item["notification"]["title"] for item in response.json()["items"]] == ["全员公告"]
 
 
 def test_admin_list_and_view_notifications(client, auth_headers):
@@ -207,14 +207,15 @@ def test_admin_update_nonexistent_notification(client, auth_headers):
     assert response.status_code == 404
 
 
-def test_admin_delete_notification(client, auth_headers, db_session, test_user):
+def test_admin_delete_notification(client, auth_headers, db_session, test_user, wait_for_job):
     """
     场景：管理员删除站内信
     =====================
     1. 创建站内信
     2. 发送给用户
-    3. 删除站内信
-    4. 验证站内信和用户记录都被删除
+    3. 删除站内信（返回后台作业）
+    4. 验证站内信立即不可见
+    5. 等待作业完成，验证用户记录被物理删除
     """
     from app.models.notification import NotificationRecord
 
@@ -252,18 +253,29 @@ def test_admin_delete_notification(client, auth_headers, db_session, test_user):
         f"/api/v1/admin/notifications/{notification_id}",
         headers=auth_headers,
     )
-    assert response.status_code == 204
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "notification_delete"
 
-    # 验证站内信已被删除
+    # 验证站内信已被删除（逻辑删除后立即不可见）
     response = client.get(
         f"/api/v1/admin/notifications/{notification_id}",
         headers=auth_headers,
     )
     assert response.status_code == 404
-
-    # 验证用户的站内信记录也被删除
     response = client.get("/api/v1/notifications", headers=auth_headers)
     assert response.json()["total"] == 0
+    response = client.get("/api/v1/notifications/unread-count", headers=auth_headers)
+    assert response.json()["unread_count"] == 0
+
+    # 验证后台作业物理删除了用户的站内信记录
+    job = wait_for_job(job["id"], auth_headers)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"notification_id": notification_id, "records_deleted": 1}
+    db_session.expire_all()
+    assert db_session.query(NotificationRecord).filter(
+        NotificationRecord.notification_id == notification_id
+    ).count() == 0
 
 
 def test_admin_delete_nonexistent_notification(client, auth_headers):
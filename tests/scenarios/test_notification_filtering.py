@@ -18,6 +18,7 @@ def test_filter_by_read_status(client, auth_headers, db_session, test_user):
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     from datetime import datetime
@@ -66,13 +67,7 @@ def test_filter_by_read_status(client, auth_headers, db_session, test_user):
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 测试：筛选未读站内信
     response = client.get(
@@ -115,6 +110,7 @@ def test_filter_by_notification_type(client, auth_headers, db_session, test_user
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -148,13 +144,7 @@ def test_filter_by_notification_type(client, auth_headers, db_session, test_user
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 筛选 system 类型
     response = client.get(
@@ -201,6 +191,7 @@ def test_filter_by_read_status_and_type_combined(client, auth_headers, db_sessio
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     from datetime import datetime
@@ -225,13 +216,7 @@ def test_filter_by_read_status_and_type_combined(client, auth_headers, db_sessio
     db_session.add(notification)
     db_session.commit()
     db_session.refresh(notification)
-    record = NotificationRecord(
-        notification_id=notification.id,
-        user_id=test_user.id,
-        is_read=False,
-    )
-    db_session.add(record)
-    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 创建 system 已读
     notification = Notification(
@@ -308,6 +293,7 @@ def test_filter_with_pagination(client, auth_headers, db_session, test_user):
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -333,13 +319,7 @@ def test_filter_with_pagination(client, auth_headers, db_session, test_user):
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 筛选未读，第一页（5 条）
     response = client.get(
@@ -451,6 +431,7 @@ def test_unread_count_with_filters(client, auth_headers, db_session, test_user):
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     from datetime import datetime
@@ -497,13 +478,7 @@ def test_unread_count_with_filters(client, auth_headers, db_session, test_user):
         db_session.add(notification)
         db_session.commit()
         db_session.refresh(notification)
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 筛选已读站内信
     response = client.get(
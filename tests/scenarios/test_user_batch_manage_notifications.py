@@ -19,6 +19,7 @@ def test_user_mark_all_as_read_flow(client, auth_headers, db_session, test_user)
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -44,13 +45,7 @@ def test_user_mark_all_as_read_flow(client, auth_headers, db_session, test_user)
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 验证初始状态：5 条未读
     response = client.get("/api/v1/notifications/unread-count", headers=auth_headers)
@@ -106,6 +101,7 @@ def test_user_mark_all_as_read_partial_already_read(client, auth_headers, db_ses
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     from datetime import datetime
@@ -132,13 +128,7 @@ def test_user_mark_all_as_read_partial_already_read(client, auth_headers, db_ses
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 创建 2 条已读站内信
     for i in range(2):
@@ -192,6 +182,7 @@ def test_user_progressive_reading_flow(client, auth_headers, db_session, test_us
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -219,14 +210,7 @@ def test_user_progressive_reading_flow(client, auth_headers, db_session, test_us
         db_session.refresh(notification)
         notification_ids.append(notification.id)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
-        db_session.refresh(record)
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 获取所有 record_id
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -264,6 +248,7 @@ def test_user_read_all_and_receive_new_notifications(client, auth_headers, db_se
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -289,13 +274,7 @@ def test_user_read_all_and_receive_new_notifications(client, auth_headers, db_se
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 全部标记为已读
     response = client.post("/api/v1/notifications/read-all", headers=auth_headers)
@@ -317,13 +296,7 @@ def test_user_read_all_and_receive_new_notifications(client, auth_headers, db_se
     db_session.commit()
     db_session.refresh(notification)
 
-    record = NotificationRecord(
-        notification_id=notification.id,
-        user_id=test_user.id,
-        is_read=False,
-    )
-    db_session.add(record)
-    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 验证未读数量为 1
     response = client.get("/api/v1/notifications/unread-count", headers=auth_headers)
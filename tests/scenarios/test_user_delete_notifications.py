@@ -18,6 +18,7 @@ def test_user_delete_single_notification(client, auth_headers, db_session, test_
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -43,13 +44,7 @@ def test_user_delete_single_notification(client, auth_headers, db_session, test_
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 验证初始有 3 条站内信
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -88,6 +83,7 @@ def test_user_delete_multiple_notifications(client, auth_headers, db_session, te
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -113,13 +109,7 @@ def test_user_delete_multiple_notifications(client, auth_headers, db_session, te
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 验证初始有 5 条站内信
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -151,6 +141,7 @@ def test_user_delete_all_notifications(client, auth_headers, db_session, test_us
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -176,13 +167,7 @@ def test_user_delete_all_notifications(client, auth_headers, db_session, test_us
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 删除所有站内信
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -240,6 +225,7 @@ def test_user_delete_read_and_unread_notifications(client, auth_headers, db_sess
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     from datetime import datetime
@@ -288,13 +274,7 @@ def test_user_delete_read_and_unread_notifications(client, auth_headers, db_sess
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 获取站内信列表
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -344,6 +324,7 @@ def test_user_delete_then_receive_new_notifications(client, auth_headers, db_ses
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -369,13 +350,7 @@ def test_user_delete_then_receive_new_notifications(client, auth_headers, db_ses
         db_session.commit()
         db_session.refresh(notification)
 
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 删除所有站内信
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -400,13 +375,7 @@ def test_user_delete_then_receive_new_notifications(client, auth_headers, db_ses
     db_session.commit()
     db_session.refresh(notification)
 
-    record = NotificationRecord(
-        notification_id=notification.id,
-        user_id=test_user.id,
-        is_read=False,
-    )
-    db_session.add(record)
-    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 验证用户能收到新站内信
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -19,6 +19,7 @@ def test_user_receive_and_read_notification_flow(client, auth_headers, db_sessio
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.core.security import get_password_hash
     from app.models.user import User
     import uuid
@@ -46,14 +47,7 @@ def test_user_receive_and_read_notification_flow(client, auth_headers, db_sessio
     db_session.refresh(notification)
 
     # 创建站内信记录（模拟发送）
-    record = NotificationRecord(
-        notification_id=notification.id,
-        user_id=test_user.id,
-        is_read=False,
-    )
-    db_session.add(record)
-    db_session.commit()
-    db_session.refresh(record)
+    NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 步骤 1: 用户获取站内信列表
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -115,6 +109,7 @@ def test_user_view_notifications_with_pagination(client, auth_headers, db_sessio
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
 
@@ -141,13 +136,7 @@ def test_user_view_notifications_with_pagination(client, auth_headers, db_sessio
         db_session.refresh(notification)
 
         # 创建记录
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
     # 第一页（默认每页 20 条）
     response = client.get(
@@ -255,6 +244,7 @@ def test_user_notifications_ordered_by_created_at(client, auth_headers, db_sessi
     """
     from app.models.notification import Notification, NotificationType
     from app.models.notification import NotificationRecord
+    from app.services.notification_service import NotificationService
     from app.models.user import User
     from app.core.security import get_password_hash
     import time
@@ -284,13 +274,7 @@ def test_user_notifications_ordered_by_created_at(client, auth_headers, db_sessi
         notification_ids.append(notification.id)
 
         # 创建记录
-        record = NotificationRecord(
-            notification_id=notification.id,
-            user_id=test_user.id,
-            is_read=False,
-        )
-        db_session.add(record)
-        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
 
         time.sleep(0.01)  # 确保创建时间不同
 
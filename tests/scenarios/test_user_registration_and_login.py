@@ -132,17 +132,16 @@ def test_user_logout_scenario(client, auth_headers):
     1. 用户已登录（通过 fixture）
     2. 调用登出接口
     3. 验证返回登出成功消息
-    4. 验证 token 仍然可以访问（因为是无状态 JWT）
+    4. 验证 token 已被吊销，无法继续访问
     """
     # 用户登出
     response = client.post("/api/v1/auth/logout", headers=auth_headers)
     assert response.status_code == 200
     assert response.json()["message"] == "登出成功，请删除客户端 Token"
 
-    # 注意：由于是无状态 JWT，token 在过期前仍然有效
-    # 客户端需要自行删除 token 来实现登出
+    # 登出会吊销当前 Access Token（本进程内立即生效）
     response = client.get("/api/v1/auth/me", headers=auth_headers)
-    assert response.status_code == 200  # token 仍然有效
+    assert response.status_code == 401
 
 
 def test_duplicate_registration_scenarios(client):
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.models.notification import Notification, NotificationRecord, NotificationRecordArchive
+from app.services.archive_service import NotificationArchiveService
+from app.services.notification_service import NotificationService
+
+
+def _archived_record(db_session, user):
+    """发送一条站内信并把记录归档"""
+    notification = Notification(type="system", title="归档测试", content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(user.id)])
+
+    record_id = db_session.execute(
+        select(NotificationRecord.id).where(NotificationRecord.notification_id == notification.id)
+    ).scalar_one()
+    NotificationService.mark_as_read(db_session, str(user.id), str(record_id))
+    assert NotificationArchiveService.archive_batch(db_session, datetime.now(timezone.utc) + timedelta(seconds=1), 10) == 1
+    db_session.commit()
+    return notification, record_id
+
+
+def test_delete_archived_record_is_soft(db_session, test_user):
+    """测试删除归档记录只写入删除时间，之后查不到，重复发送也不会再投递"""
+    notification, record_id = _archived_record(db_session, test_user)
+    user_id = str(test_user.id)
+    assert NotificationService.get_notification_detail(db_session, user_id, str(record_id))
+
+    NotificationService.delete_notification_record(db_session, user_id, str(record_id))
+    NotificationService.delete_notification_record(db_session, user_id, str(record_id))  # 重复删除无副作用
+
+    archived = db_session.get(NotificationRecordArchive, record_id)
+    db_session.refresh(archived)
+    assert archived.deleted_at is not None
+    with pytest.raises(HTTPException) as exc_info:
+        NotificationService.get_notification_detail(db_session, user_id, str(record_id))
+    assert exc_info.value.status_code == 404
+
+    sent, _ = NotificationService.send_to_users(db_session, str(notification.id), [user_id])
+    assert sent == 0
+    hot = db_session.execute(
+        select(func.count()).where(NotificationRecord.notification_id == notification.id)
+    ).scalar_one()
+    assert hot == 0
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.models.notification import Notification, NotificationRecord
+from app.models.user import User, UserStatus
+from app.schemas.notification import AudienceRule
+from app.services.audience_service import AudienceService
+from app.services.notification_service import NotificationService
+
+
+def _create_notification(db_session, title):
+    notification = Notification(type="system", title=title, content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    return str(notification.id)
+
+
+def _audience(db_session, **rule):
+    conditions = AudienceService.conditions(db_session, AudienceRule(**rule))
+    return set(db_session.scalars(select(User.username).where(*conditions)))
+
+
+def test_audience_by_status_and_last_login(db_session, multiple_users):
+    """测试按用户状态和最后登录时间筛选受众"""
+    now = datetime.now(timezone.utc)
+    for i, user in enumerate(multiple_users):
+        user.status = UserStatus.ONLINE if i < 3 else UserStatus.OFFLINE
+        user.last_login_at = now - timedelta(days=i * 10)
+    db_session.commit()
+
+    assert _audience(db_session, statuses=[UserStatus.ONLINE]) == {"user0", "user1", "user2"}
+    assert _audience(db_session, last_login_after=now - timedelta(days=15)) == {"user0", "user1"}
+    assert _audience(
+        db_session, statuses=[UserStatus.ONLINE], last_login_before=now - timedelta(days=5)
+    ) == {"user1", "user2"}
+
+
+def test_audience_by_received_and_read(db_session, multiple_users):
+    """测试按是否收到、读过另一条站内信筛选受众"""
+    previous_id = _create_notification(db_session, "上一条")
+    NotificationService.send_to_users(db_session, previous_id, [str(u.id) for u in multiple_users[:3]])
+    db_session.query(NotificationRecord).filter(NotificationRecord.user_id == multiple_users[0].id).update(
+        {"is_read": True}
+    )
+    db_session.commit()
+
+    assert _audience(db_session, received_notification_id=previous_id) == {"user0", "user1", "user2"}
+    assert _audience(db_session, read_notification_id=previous_id) == {"user0"}
+    assert _audience(db_session, unread_notification_id=previous_id) == {"user1", "user2"}
+
+
+def test_send_with_audience_rule(client, auth_headers, db_session, multiple_users, fanout_executor, wait_for_job):
+    """测试按受众规则发送：只有符合规则的用户收到站内信"""
+    for i, user in enumerate(multiple_users):
+        user.status = UserStatus.BUSY if i % 2 == 0 else UserStatus.AWAY
+    db_session.commit()
+    notification_id = _create_notification(db_session, "规则发送")
+
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send",
+        headers=auth_headers,
+        json={"audience": {"statuses": ["busy"]}},
+    )
+    assert response.status_code == 200
+    assert response.json()["message"] == "已开始按受众规则发送"
+    job = wait_for_job(response.json()["job"]["id"], auth_headers)
+    assert job["status"] == "succeeded"
+
+    recipients = db_session.scalars(
+        select(User.username)
+        .join(NotificationRecord, NotificationRecord.user_id == User.id)
+        .where(NotificationRecord.notification_id == notification_id)
+    ).all()
+    assert sorted(recipients) == ["user0", "user2", "user4"]
+
+
+def test_send_with_empty_audience_rule(client, auth_headers, db_session):
+    """测试没有任何条件的受众规则被拒绝"""
+    notification_id = _create_notification(db_session, "空规则")
+
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send",
+        headers=auth_headers,
+        json={"audience": {}},
+    )
+    assert response.status_code == 400
@@ -26,6 +26,53 @@ def test_register_duplicate_username(client, test_user):
         },
     )
     assert response.status_code == 400
+    assert response.json()["detail"] == "用户名已存在"
+
+
+def test_register_duplicate_email(client, test_user):
+    """测试重复邮箱注册"""
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "another",
+            "email": "test@example.com",
+            "password": "password123",
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "邮箱已被使用"
+
+
+def test_concurrent_register_same_username(db_session):
+    """测试并发注册同一用户名：只创建一个用户，其余请求得到用户名已存在"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi import HTTPException
+    from app.core.database import SessionLocal
+    from app.models.user import User
+    from app.schemas.user import UserCreate
+    from app.services.auth_service import AuthService
+
+    barrier = threading.Barrier(4)
+
+    def register(i):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            AuthService.register(
+                db, UserCreate(username="racer", email=f"racer{i}@example.com", password="password123")
+            )
+            return None
+        except HTTPException as e:
+            return e.detail
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(register, range(4)))
+
+    assert sorted(results, key=str) == [None] + ["用户名已存在"] * 3
+    assert db_session.query(User).filter(User.username == "racer").count() == 1
 
 
 def test_login_success(client, test_user):
@@ -61,3 +108,36 @@ def test_get_current_user_without_token(client):
     """测试未提供 token"""
     response = client.get("/api/v1/auth/me")
     assert response.status_code == 403
+
+
+def test_revoke_same_token_twice(db_session, test_user):
+    """测试重复吊销同一 Token 只写入一条吊销记录"""
+    from datetime import datetime, timedelta, timezone
+    from app.core.revocation import TokenRevocationCache
+    from app.models.token import RevokedToken
+
+    cache = TokenRevocationCache(capacity=100, error_rate=0.01, full_rebuild_interval=timedelta(minutes=5))
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=30)
+    for _ in range(2):
+        cache.revoke(db_session, "jti-1", "access", expires_at, user_id=str(test_user.id))
+
+    assert cache.is_revoked("jti-1")
+    assert db_session.query(RevokedToken).filter(RevokedToken.jti == "jti-1").count() == 1
+
+
+def test_rotate_with_stale_cache_in_other_worker(db_session, test_user):
+    """测试其他 worker 的缓存落后时，出示刚轮换出的 Refresh Token 不会被误判为重用"""
+    from app.core.session_store import SessionStore
+
+    worker_a, worker_b = SessionStore(capacity=10), SessionStore(capacity=10)
+    user_id = str(test_user.id)
+    family_id, jti = worker_a.create(db_session, user_id)
+    rotated = worker_b.rotate(db_session, family_id, user_id, jti)
+    assert rotated is not None
+
+    # worker_a 的缓存仍是第一个 jti，出示 worker_b 轮换出的 jti 应以数据库为准正常轮换
+    assert worker_a.rotate(db_session, family_id, user_id, rotated) is not None
+
+    # 真正的重用（出示已被轮换掉的旧 Token）仍吊销整个家族
+    assert worker_b.rotate(db_session, family_id, user_id, jti) is None
+    assert worker_a._load(db_session, family_id).revoked
@@ -0,0 +1,83 @@
+from sqlalchemy import select
+
+from app.models.notification import Notification, NotificationDelivery, NotificationRecord
+from app.services.counter_service import NotificationCounterService
+from app.services.notification_service import NotificationService
+
+
+def _create_notification(db_session, title):
+    notification = Notification(type="reminder", title=title, content="内容", collapse_key="task-due")
+    db_session.add(notification)
+    db_session.commit()
+    return notification
+
+
+def _records(db_session, user):
+    return db_session.execute(
+        select(
+            NotificationRecord.id,
+            NotificationRecord.notification_id,
+            NotificationRecord.created_at,
+            NotificationRecord.collapse_count,
+        )
+        .where(NotificationRecord.user_id == user.id)
+    ).all()
+
+
+def test_collapsed_record_moves_to_new_delivery_time(db_session, test_user):
+    """测试折叠合并后记录保留 ID、以合并时的送达时间为 created_at，重复发送不会再插入记录"""
+    first = _create_notification(db_session, "第一次提醒")
+    NotificationService.send_to_users(db_session, str(first.id), [str(test_user.id)])
+    record_id, first_created_at = db_session.execute(
+        select(NotificationRecord.id, NotificationRecord.created_at).where(NotificationRecord.user_id == test_user.id)
+    ).one()
+    second = _create_notification(db_session, "第二次提醒")
+    second_id = second.id
+
+    sent, _ = NotificationService.send_to_users(db_session, str(second_id), [str(test_user.id)])
+    assert sent == 1
+    sent, _ = NotificationService.send_to_users(db_session, str(second_id), [str(test_user.id)])
+    assert sent == 0
+
+    records = _records(db_session, test_user)
+    assert [(r.id, r.notification_id, r.collapse_count) for r in records] == [(record_id, second_id, 2)]
+    assert records[0].created_at > first_created_at
+    assert NotificationCounterService.get_unread_count(db_session, str(test_user.id)) == 1
+
+
+def test_collapsed_record_is_counted_once_when_removed(db_session, test_user):
+    """测试折叠后的记录在按站内信扣除未读数时被计入（不会因 created_at 早于站内信创建时间而漏掉）"""
+    first = _create_notification(db_session, "第一次提醒")
+    NotificationService.send_to_users(db_session, str(first.id), [str(test_user.id)])
+    second = _create_notification(db_session, "第二次提醒")
+    NotificationService.send_to_users(db_session, str(second.id), [str(test_user.id)])
+
+    second = db_session.get(Notification, second.id)
+    NotificationCounterService.remove_notification(db_session, second, second.type)
+    db_session.commit()
+
+    assert NotificationCounterService.get_unread_count(db_session, str(test_user.id)) == 0
+
+
+def test_collapse_merges_one_record_per_user(db_session, test_user):
+    """测试用户有多条同键未读记录时只合并最新的一条，其余保留，未读数不变"""
+    older = _create_notification(db_session, "第一次提醒")
+    newer = _create_notification(db_session, "第二次提醒")
+    for notification in (older, newer):
+        db_session.add(NotificationDelivery(notification_id=notification.id, user_id=test_user.id))
+        db_session.add(NotificationRecord(notification_id=notification.id, user_id=test_user.id))
+        NotificationCounterService.increment_users(db_session, "reminder", [test_user.id])
+        db_session.commit()
+    older_id, newer_id = older.id, newer.id
+    third = _create_notification(db_session, "第三次提醒")
+    third_id = third.id
+
+    sent, _ = NotificationService.send_to_users(db_session, str(third_id), [str(test_user.id)])
+
+    assert sent == 1
+    records = _records(db_session, test_user)
+    assert sorted((r.notification_id, r.collapse_count) for r in records) == sorted(
+        [(older_id, 1), (third_id, 2)]
+    )
+    assert newer_id not in {r.notification_id for r in records}
+    assert NotificationCounterService.get_unread_count(db_session, str(test_user.id)) == 2
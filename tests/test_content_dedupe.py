@@ -0,0 +1,57 @@
+from sqlalchemy import func, select
+
+from app.models.notification import Notification, NotificationContent, NotificationRecord
+from app.schemas.notification import NotificationCreate, NotificationUpdate
+from app.services.notification_service import NotificationService
+
+
+def _create(db_session, content="密码已修改"):
+    return NotificationService.create_notification(
+        db_session,
+        NotificationCreate(type="system", title="安全提醒", content=content, dedupe=True),
+        created_by_id=None,
+    )
+
+
+def test_dedupe_shares_content_but_creates_separate_notifications(db_session):
+    """测试按内容去重只共享正文，每次创建都是新的站内信"""
+    first = _create(db_session)
+    second = _create(db_session)
+
+    assert first.id != second.id
+    assert first.content_hash == second.content_hash
+    assert first.content == second.content == "密码已修改"
+    assert db_session.execute(select(func.count()).select_from(NotificationContent)).scalar_one() == 1
+    body = db_session.execute(select(Notification.body).where(Notification.id == second.id)).scalar_one()
+    assert body is None
+
+
+def test_repeated_event_is_delivered_again(db_session, test_user):
+    """测试相同正文的重复事件照常送达，不被 (站内信, 用户) 去重跳过"""
+    for _ in range(2):
+        notification = _create(db_session)
+        sent, _ = NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
+        assert sent == 1
+
+    assert db_session.execute(
+        select(func.count()).where(NotificationRecord.user_id == test_user.id)
+    ).scalar_one() == 2
+
+
+def test_update_copies_shared_content_back(db_session):
+    """测试修改站内信时正文写回本行，不影响引用同一正文的其他站内信"""
+    first = _create(db_session)
+    second = _create(db_session)
+
+    updated = NotificationService.update_notification(
+        db_session, str(first.id), NotificationUpdate(title="新标题")
+    )
+    assert updated.content == "密码已修改"
+    assert updated.content_hash is None
+
+    updated = NotificationService.update_notification(
+        db_session, str(second.id), NotificationUpdate(content="新内容")
+    )
+    assert updated.content == "新内容"
+    assert NotificationService.get_notification(db_session, str(first.id)).content == "密码已修改"
+    assert db_session.get(NotificationContent, _create(db_session).content_hash).content == "密码已修改"
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from app.models.notification import Notification, NotificationDeferral, NotificationRecord
+from app.schemas.preference import NotificationPreferenceUpdate
+from app.services.counter_service import NotificationCounterService
+from app.services.deferral_service import NotificationDeferralService
+from app.services.notification_service import NotificationService
+from app.services.preference_service import PreferenceService
+
+
+def _quiet_now(db_session, user):
+    now = datetime.now(timezone.utc)
+    start, end = now - timedelta(hours=1), now + timedelta(hours=1)
+    PreferenceService.update_preferences(
+        db_session,
+        str(user.id),
+        NotificationPreferenceUpdate(
+            quiet_hours_start=start.time().replace(second=0, microsecond=0),
+            quiet_hours_end=end.time().replace(second=0, microsecond=0),
+        ),
+    )
+    return end.replace(second=0, microsecond=0)
+
+
+def _create_notification(db_session, priority=0):
+    notification = Notification(type="business", title="免打扰测试", content="内容", priority=priority)
+    db_session.add(notification)
+    db_session.commit()
+    return notification.id
+
+
+def _deferrals(db_session):
+    return db_session.execute(
+        select(NotificationDeferral.user_id, NotificationDeferral.deliver_after)
+    ).all()
+
+
+def _make_due(db_session):
+    db_session.query(NotificationDeferral).update(
+        {"deliver_after": func.now() - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db_session.commit()
+
+
+def test_quiet_hours_defer_instead_of_drop(db_session, test_user):
+    """测试免打扰时段内的用户登记为推迟送达，时段结束后写入收件箱"""
+    quiet_end = _quiet_now(db_session, test_user)
+    notification_id = _create_notification(db_session)
+
+    sent, _ = NotificationService.send_to_users(db_session, str(notification_id), [str(test_user.id)])
+    assert sent == 0
+    assert _deferrals(db_session) == [(test_user.id, quiet_end)]
+
+    # 免打扰结束（取消免打扰、登记到期）后送达
+    PreferenceService.update_preferences(db_session, str(test_user.id), NotificationPreferenceUpdate())
+    _make_due(db_session)
+    assert NotificationDeferralService.deliver_due(db_session, 100) == 1
+
+    assert _deferrals(db_session) == []
+    assert db_session.execute(
+        select(func.count()).where(NotificationRecord.user_id == test_user.id)
+    ).scalar_one() == 1
+    assert NotificationCounterService.get_unread_count(db_session, str(test_user.id)) == 1
+
+
+def test_still_quiet_users_are_deferred_again(db_session, test_user):
+    """测试到期时仍处于免打扰时段的用户再次推迟，不会写入记录"""
+    quiet_end = _quiet_now(db_session, test_user)
+    notification_id = _create_notification(db_session)
+    NotificationService.send_to_users(db_session, str(notification_id), [str(test_user.id)])
+
+    _make_due(db_session)
+    NotificationDeferralService.deliver_due(db_session, 100)
+
+    assert _deferrals(db_session) == [(test_user.id, quiet_end)]
+    assert db_session.execute(
+        select(func.count()).where(NotificationRecord.user_id == test_user.id)
+    ).scalar_one() == 0
+
+
+def test_urgent_notifications_bypass_quiet_hours(db_session, test_user):
+    """测试紧急站内信在免打扰时段内照常送达，不登记推迟"""
+    _quiet_now(db_session, test_user)
+    notification_id = _create_notification(db_session, priority=2)
+
+    sent, _ = NotificationService.send_to_users(db_session, str(notification_id), [str(test_user.id)])
+    assert sent == 1
+    assert _deferrals(db_session) == []
+
+
+def test_deferrals_of_deleted_notification_are_dropped(db_session, test_user):
+    """测试站内信已删除时丢弃其推迟登记"""
+    _quiet_now(db_session, test_user)
+    notification_id = _create_notification(db_session)
+    NotificationService.send_to_users(db_session, str(notification_id), [str(test_user.id)])
+    db_session.query(Notification).filter(Notification.id == notification_id).update(
+        {"deleted_at": func.now()}, synchronize_session=False
+    )
+    db_session.commit()
+
+    _make_due(db_session)
+    assert NotificationDeferralService.deliver_due(db_session, 100) == 1
+    assert _deferrals(db_session) == []
+
+
+def test_fanout_defers_quiet_users(db_session, multiple_users):
+    """测试全员发送时免打扰中的用户同样登记为推迟送达"""
+    from app.services.fanout_service import FanoutService
+
+    quiet_user = multiple_users[0]
+    quiet_end = _quiet_now(db_session, quiet_user)
+    notification_id = str(_create_notification(db_session))
+    fanout = FanoutService.create(db_session, notification_id, 1)
+
+    _, sent, _ = FanoutService.send_chunk(fanout.id, 0, notification_id, None, None, 100)
+
+    assert sent == len(multiple_users) - 1
+    assert _deferrals(db_session) == [(quiet_user.id, quiet_end)]
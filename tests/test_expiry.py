@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.notification import Notification, NotificationCounter, NotificationRecord
+from app.services.archive_service import NotificationArchiveService
+from app.services.counter_service import NotificationCounterService
+from app.services.expiry_service import NotificationExpiryService
+from app.services.notification_service import NotificationService
+
+
+def _sent_notification(db_session, users, title):
+    notification = Notification(type="system", title=title, content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(u.id) for u in users])
+    return notification
+
+
+def _record_id(db_session, notification):
+    return str(
+        db_session.execute(
+            select(NotificationRecord.id).where(NotificationRecord.notification_id == notification.id)
+        ).scalar_one()
+    )
+
+
+def _expire_now(db_session, *notifications):
+    for notification in notifications:
+        notification.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+
+def test_expired_notification_is_hidden_from_read_paths(db_session, test_user):
+    """测试站内信到期后（过期处理之前）立即从列表、详情、标记已读和未读数中排除，归档记录同样排除"""
+    user_id = str(test_user.id)
+    archived = _sent_notification(db_session, [test_user], "已归档")
+    archived_id = _record_id(db_session, archived)
+    NotificationService.mark_as_read(db_session, user_id, archived_id)
+    assert NotificationArchiveService.archive_batch(db_session, datetime.now(timezone.utc) + timedelta(seconds=1), 10) == 1
+    db_session.commit()
+    hot = _sent_notification(db_session, [test_user], "未读")
+    hot_id = _record_id(db_session, hot)
+    _sent_notification(db_session, [test_user], "保留")
+    assert NotificationService.get_unread_count(db_session, user_id) == 2
+
+    _expire_now(db_session, archived, hot)
+
+    listing = NotificationService.get_user_notifications(db_session, user_id)
+    assert [item.notification.title for item in listing.items] == ["保留"]
+    assert listing.total == 1
+    assert listing.unread_count == 1
+    assert NotificationService.get_unread_count(db_session, user_id) == 1
+    for record_id in (hot_id, archived_id):
+        with pytest.raises(HTTPException) as exc_info:
+            NotificationService.get_notification_detail(db_session, user_id, record_id)
+        assert exc_info.value.status_code == 404
+        with pytest.raises(HTTPException) as exc_info:
+            NotificationService.mark_as_read(db_session, user_id, record_id)
+        assert exc_info.value.status_code == 404
+
+
+def test_expire_decrements_counters_once_in_batches(db_session, multiple_users, monkeypatch):
+    """测试过期处理按用户分批扣除未读数，每个用户只扣一次，重复处理无副作用"""
+    monkeypatch.setattr(settings, "NOTIFICATION_EXPIRY_USER_BATCH_SIZE", 2)
+    # 保留的站内信：重复扣减会把未读数扣到 0
+    _sent_notification(db_session, multiple_users, "保留")
+    expiring = _sent_notification(db_session, multiple_users, "限时")
+    _expire_now(db_session, expiring)
+    expiring_id = expiring.id
+
+    assert NotificationExpiryService.expire(db_session, expiring_id)
+    assert not NotificationExpiryService.expire(db_session, expiring_id)
+
+    counters = db_session.execute(
+        select(NotificationCounter.unread_count).where(
+            NotificationCounter.user_id.in_([u.id for u in multiple_users])
+        )
+    ).scalars().all()
+    assert counters == [1] * len(multiple_users)
+    expiring = db_session.get(Notification, expiring_id)
+    db_session.refresh(expiring)
+    assert expiring.expiry_processed_at is not None
+    assert expiring.expiry_cursor is None
+    for user in multiple_users:
+        assert NotificationCounterService.get_unread_count(db_session, str(user.id)) == 1
+
+
+def test_delete_record_during_batched_expiry_is_not_counted_twice(db_session, multiple_users):
+    """测试分批过期处理中途删除记录：进度之前的用户已扣除，不再扣减；之后的用户由删除扣减，过期处理不再扣减"""
+    users = sorted(multiple_users, key=lambda u: u.id)
+    _sent_notification(db_session, users, "保留")
+    expiring = _sent_notification(db_session, users, "限时")
+    _expire_now(db_session, expiring)
+    # 模拟过期处理已扣完前两个用户
+    NotificationCounterService.remove_notification_batch(db_session, expiring, expiring.type, None, 2)
+    expiring.expiry_cursor = users[1].id
+    db_session.commit()
+    expiring_id = expiring.id
+
+    for user in (users[0], users[4]):
+        record_id = db_session.execute(
+            select(NotificationRecord.id).where(
+                NotificationRecord.notification_id == expiring_id, NotificationRecord.user_id == user.id
+            )
+        ).scalar_one()
+        NotificationService.delete_notification_record(db_session, str(user.id), str(record_id))
+    assert NotificationExpiryService.expire(db_session, expiring_id)
+
+    for user in users:
+        assert NotificationCounterService.get_unread_count(db_session, str(user.id)) == 1
@@ -0,0 +1,79 @@
+import pickle
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.notification import FanoutPartition, FanoutStatus, Notification, NotificationRecord
+from app.services.fanout_service import FanoutAborted, FanoutService
+
+
+def _create_notification(db_session, title="全员发送测试"):
+    notification = Notification(type="system", title=title, content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    return str(notification.id)
+
+
+def _partitions(db_session, fanout_id):
+    return db_session.execute(
+        select(FanoutPartition)
+        .where(FanoutPartition.fanout_id == fanout_id)
+        .order_by(FanoutPartition.partition)
+        .execution_options(populate_existing=True)
+    ).scalars().all()
+
+
+def test_create_splits_users_into_partitions(db_session, multiple_users):
+    """测试按用户 ID 切分分区：各分区首尾相接，最后一个分区不设上界"""
+    notification_id = _create_notification(db_session)
+
+    fanout = FanoutService.create(db_session, notification_id, 2)
+
+    partitions = sorted(fanout.partitions, key=lambda p: p.partition)
+    assert len(partitions) == 2
+    user_ids = sorted(u.id for u in multiple_users)
+    assert partitions[0].cursor is None
+    assert partitions[0].upper_user_id == user_ids[2]
+    assert partitions[1].cursor == user_ids[2]
+    assert partitions[1].upper_user_id is None
+
+
+def test_send_chunk_commits_records_and_progress_together(db_session, multiple_users):
+    """测试分块发送后记录、断点和已发送数一起提交"""
+    notification_id = _create_notification(db_session)
+    fanout = FanoutService.create(db_session, notification_id, 1)
+
+    cursor, exhausted, sent = None, False, 0
+    while not exhausted:
+        cursor, count, exhausted = FanoutService.send_chunk(
+            fanout.id, 0, notification_id, cursor, None, 2
+        )
+        sent += count
+        (partition,) = _partitions(db_session, fanout.id)
+        assert partition.cursor == cursor
+        assert partition.sent_count == sent
+
+    assert partition.status == FanoutStatus.DONE.value
+    assert sent == len(multiple_users)
+    assert db_session.execute(
+        select(func.count()).where(NotificationRecord.notification_id == notification_id)
+    ).scalar_one() == len(multiple_users)
+
+
+def test_send_chunk_aborts_with_picklable_error(db_session, multiple_users):
+    """测试站内信在发送途中被删除时抛出可跨进程传回的异常，且不推进断点"""
+    notification_id = _create_notification(db_session)
+    fanout = FanoutService.create(db_session, notification_id, 1)
+    db_session.query(Notification).filter(Notification.id == notification_id).update(
+        {"deleted_at": func.now()}, synchronize_session=False
+    )
+    db_session.commit()
+
+    with pytest.raises(FanoutAborted) as excinfo:
+        FanoutService.send_chunk(fanout.id, 0, notification_id, None, None, 2)
+
+    restored = pickle.loads(pickle.dumps(excinfo.value))
+    assert restored.detail == excinfo.value.detail
+    (partition,) = _partitions(db_session, fanout.id)
+    assert partition.cursor is None
+    assert partition.sent_count == 0
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.idempotency import IdempotencyStore, _digest
+from app.models.idempotency import IdempotencyKey
+
+
+def _store():
+    return IdempotencyStore(capacity=100, ttl=timedelta(hours=1), lease=timedelta(seconds=60))
+
+
+def _expire_claim(db_session, key):
+    db_session.query(IdempotencyKey).filter(IdempotencyKey.key == _digest(key)).update(
+        {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db_session.commit()
+
+
+def test_retry_returns_first_response(db_session):
+    """测试同一幂等键的重试直接返回第一次的结果"""
+    store = _store()
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return {"count": len(calls)}
+
+    assert store.execute(db_session, "k", {"a": 1}, handler) == {"count": 1}
+    assert store.execute(db_session, "k", {"a": 1}, handler) == {"count": 1}
+    assert len(calls) == 1
+
+    record = db_session.get(IdempotencyKey, _digest("k"))
+    assert record.locked_until is None
+
+
+def test_concurrent_request_within_lease_is_rejected(db_session):
+    """测试占用期限内的同键请求返回 409"""
+    store = _store()
+
+    def handler():
+        with pytest.raises(HTTPException) as excinfo:
+            store.execute(db_session, "k", {"a": 1}, lambda: {"count": 0})
+        assert excinfo.value.status_code == 409
+        return {"count": 1}
+
+    assert store.execute(db_session, "k", {"a": 1}, handler) == {"count": 1}
+
+
+def test_stale_claim_is_taken_over(db_session):
+    """测试执行进程退出后留下的占用在期限过后由重试接管"""
+    store = _store()
+    db_session.add(
+        IdempotencyKey(
+            key=_digest("k"),
+            request_hash=_digest('{"a": 1}'),
+            expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+            locked_until=datetime.now(timezone.utc) - timedelta(seconds=1),
+        )
+    )
+    db_session.commit()
+
+    assert store.execute(db_session, "k", {"a": 1}, lambda: {"count": 1}) == {"count": 1}
+    assert db_session.get(IdempotencyKey, _digest("k"), populate_existing=True).response == {"count": 1}
+
+
+def test_taken_over_claim_does_not_overwrite_new_owner(db_session):
+    """测试被接管的一方完成后不覆盖接管方写回的结果"""
+    store = _store()
+
+    def slow_handler():
+        _expire_claim(db_session, "k")
+        assert _store().execute(db_session, "k", {"a": 1}, lambda: {"owner": "retry"}) == {"owner": "retry"}
+        return {"owner": "first"}
+
+    store.execute(db_session, "k", {"a": 1}, slow_handler)
+
+    record = db_session.get(IdempotencyKey, _digest("k"), populate_existing=True)
+    assert record.response == {"owner": "retry"}
+    assert store.execute(db_session, "k", {"a": 1}, lambda: {"owner": "again"}) == {"owner": "retry"}
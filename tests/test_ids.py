@@ -0,0 +1,40 @@
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.ids import uuid7
+
+
+def _timestamp_ms(value: uuid.UUID) -> int:
+    return value.int >> 80
+
+
+def test_uuid7_version_and_timestamp():
+    """测试 UUIDv7 的版本号、变体以及前 48 位的毫秒时间戳"""
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= _timestamp_ms(value) <= after
+
+
+def test_uuid7_monotonic_within_millisecond():
+    """测试同一进程内连续生成的 ID 严格递增（同一毫秒内靠序列号递增）"""
+    values = [uuid7() for _ in range(10000)]
+
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+
+
+def test_uuid_generate_v7_sql(db_session):
+    """测试数据库端生成的 UUIDv7 与 Python 端的版本号和时间戳一致"""
+    before = uuid7()
+    value = db_session.execute(text("SELECT uuid_generate_v7()")).scalar_one()
+    value = uuid.UUID(str(value))
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs(_timestamp_ms(value) - _timestamp_ms(before)) < 1000
@@ -0,0 +1,68 @@
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.notification import Notification, NotificationRecord
+from app.services.inbox_trim_service import InboxTrimService
+from app.services.notification_service import NotificationService
+
+
+def _fill_inbox(db_session, users, count):
+    notifications = []
+    for i in range(count):
+        notification = Notification(type="business", title=f"容量测试 {i}", content="内容")
+        db_session.add(notification)
+        db_session.commit()
+        NotificationService.send_to_users(db_session, str(notification.id), [str(u.id) for u in users])
+        notifications.append(notification)
+    return notifications
+
+
+def _record_count(db_session, user_id):
+    return db_session.execute(
+        select(func.count()).where(NotificationRecord.user_id == user_id)
+    ).scalar_one()
+
+
+def test_users_without_read_records_are_skipped(db_session, multiple_users, monkeypatch):
+    """测试记录全部未读的用户不会被挑出，不占用单次处理的名额"""
+    monkeypatch.setattr(settings, "INBOX_MAX_RECORDS_PER_TYPE", 1)
+    monkeypatch.setattr(settings, "INBOX_TRIM_MAX_USERS", 1)
+    unread_user, read_user = multiple_users[0], multiple_users[1]
+    _fill_inbox(db_session, [unread_user, read_user], 3)
+    NotificationService.mark_all_as_read(db_session, str(read_user.id))
+
+    assert InboxTrimService._over_limit(db_session, 10) == [(read_user.id, "business", 1)]
+    assert InboxTrimService.trim(db_session) == 2
+    assert _record_count(db_session, read_user.id) == 1
+    assert _record_count(db_session, unread_user.id) == 3
+
+
+def test_over_limit_users_take_turns(db_session, multiple_users, monkeypatch):
+    """测试超限用户按最近检查时间轮流处理，不会一直选中同一个用户"""
+    monkeypatch.setattr(settings, "INBOX_MAX_RECORDS_PER_TYPE", 1)
+    monkeypatch.setattr(settings, "INBOX_TRIM_MAX_USERS", 1)
+    users = multiple_users[:3]
+    _fill_inbox(db_session, users, 3)
+    for user in users:
+        NotificationService.mark_all_as_read(db_session, str(user.id))
+
+    picked = set()
+    for _ in users:
+        ((user_id, _, _),) = InboxTrimService._over_limit(db_session, 1)
+        picked.add(user_id)
+        # 模拟清理不掉：只重算记录数并记录检查时间，记录数仍超限
+        InboxTrimService.recount(db_session, user_id)
+    assert picked == {u.id for u in users}
+
+
+def test_resend_after_trim_does_not_redeliver(db_session, test_user, monkeypatch):
+    """测试被清理掉的记录在站内信重复发送时不会再次送达"""
+    monkeypatch.setattr(settings, "INBOX_MAX_RECORDS_PER_TYPE", 1)
+    oldest, *_ = _fill_inbox(db_session, [test_user], 3)
+    NotificationService.mark_all_as_read(db_session, str(test_user.id))
+    assert InboxTrimService.trim(db_session) == 2
+
+    sent, _ = NotificationService.send_to_users(db_session, str(oldest.id), [str(test_user.id)])
+
+    assert sent == 0
+    assert _record_count(db_session, test_user.id) == 1
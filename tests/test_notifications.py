@@ -41,6 +41,43 @@ def test_send_notification_to_user(client, auth_headers, db_session, test_user):
     assert send_response.status_code == 200
 
 
+def test_send_notification_rejects_invalid_user_ids(client, auth_headers, db_session, multiple_users):
+    """测试发送给格式错误或不存在的用户 ID 时只拒绝这些 ID，其余用户照常收到"""
+    import uuid
+    from app.models.notification import NotificationRecord
+
+    create_response = client.post(
+        "/api/v1/admin/notifications",
+        headers=auth_headers,
+        json={"type": "system", "title": "测试通知", "content": "这是一条测试通知", "priority": 0},
+    )
+    notification_id = create_response.json()["id"]
+    unknown_id = str(uuid.uuid4())
+    valid_ids = [str(u.id) for u in multiple_users[:2]]
+
+    send_response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send",
+        headers=auth_headers,
+        json={"user_ids": valid_ids + ["not-a-uuid", unknown_id, valid_ids[0]], "send_to_all": False},
+    )
+    assert send_response.status_code == 200
+    data = send_response.json()
+    assert "成功发送给 2 个用户" in data["message"]
+    assert sorted(data["rejected_user_ids"]) == sorted(["not-a-uuid", unknown_id])
+
+    recipients = db_session.query(NotificationRecord.user_id).filter(
+        NotificationRecord.notification_id == notification_id
+    ).all()
+    assert sorted(str(user_id) for user_id, in recipients) == sorted(valid_ids)
+
+    # 收件人的未读数在同一条语句中累加
+    response = client.post(
+        "/api/v1/auth/login", json={"username": multiple_users[0].username, "password": "password123"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get("/api/v1/notifications", headers=headers).json()["unread_count"] == 1
+
+
 def test_get_user_notifications(client, auth_headers, db_session, test_user):
     """测试获取用户站内信列表"""
     response = client.get("/api/v1/notifications", headers=auth_headers)
@@ -69,3 +106,33 @@ def test_get_unread_count(client, auth_headers):
     assert response.status_code == 200
     data = response.json()
     assert "unread_count" in data
+
+
+def test_create_and_update_schedule_expiry(client, auth_headers, monkeypatch):
+    """测试创建和修改过期时间后由接口层登记到过期处理器"""
+    from app.tasks.expiry import expiry_sweeper
+
+    scheduled = []
+
+    def schedule(notification_id, expires_at):
+        scheduled.append((str(notification_id), expires_at))
+
+    monkeypatch.setattr(expiry_sweeper, "schedule", schedule)
+
+    response = client.post(
+        "/api/v1/admin/notifications",
+        headers=auth_headers,
+        json={"type": "system", "title": "限时通知", "content": "内容", "expires_at": "2099-01-01T00:00:00Z"},
+    )
+    notification_id = response.json()["id"]
+    assert [item[0] for item in scheduled] == [notification_id]
+
+    client.put(f"/api/v1/admin/notifications/{notification_id}", headers=auth_headers, json={"title": "新标题"})
+    assert len(scheduled) == 1
+
+    client.put(
+        f"/api/v1/admin/notifications/{notification_id}",
+        headers=auth_headers,
+        json={"expires_at": "2099-02-01T00:00:00Z"},
+    )
+    assert len(scheduled) == 2 and scheduled[-1][1].month == 2
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.partitions import add_months, ensure_partitions, list_partitions, month_start, partition_name
+from app.models.notification import Notification, NotificationRecord
+from app.services.notification_service import NotificationService
+
+
+def _create_notification(db_session, title="分区测试"):
+    notification = Notification(type="system", title=title, content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    return notification
+
+
+def _record_count(db_session, notification):
+    return db_session.execute(
+        select(func.count()).where(NotificationRecord.notification_id == notification.id)
+    ).scalar_one()
+
+
+def test_ensure_partitions_creates_months_once(db_session):
+    """测试按月创建分区，已存在的分区不重复创建"""
+    current = month_start(datetime.now(timezone.utc))
+
+    created = ensure_partitions(db_session, 2)
+    assert created == [partition_name(add_months(current, 2))]
+    assert ensure_partitions(db_session, 2) == []
+
+    months = [month for _, month in list_partitions(db_session)]
+    assert months == [current, add_months(current, 1), add_months(current, 2)]
+
+
+def test_records_use_delivery_time(db_session, multiple_users):
+    """测试记录以各自的送达时间作为 created_at，首次发送时间只写入一次"""
+    notification = _create_notification(db_session)
+    assert notification.sent_at is None
+
+    NotificationService.send_to_users(db_session, str(notification.id), [str(multiple_users[0].id)])
+    db_session.refresh(notification)
+    sent_at = notification.sent_at
+    assert sent_at is not None
+
+    NotificationService.send_to_users(db_session, str(notification.id), [str(u.id) for u in multiple_users])
+    db_session.refresh(notification)
+    assert notification.sent_at == sent_at
+
+    created_at = dict(
+        db_session.execute(
+            select(NotificationRecord.user_id, NotificationRecord.created_at).where(
+                NotificationRecord.notification_id == notification.id
+            )
+        ).all()
+    )
+    assert len(created_at) == len(multiple_users)
+    first = created_at.pop(multiple_users[0].id)
+    assert first == sent_at
+    assert all(value > first for value in created_at.values())
+
+
+def test_resend_of_old_notification_writes_current_partition(db_session, multiple_users):
+    """测试重复发送首次发送于已卸载月份的站内信时，新记录写入当月分区"""
+    notification = _create_notification(db_session)
+    # 首次发送时间在一年前，那时的分区早已卸载（测试库中也不存在）
+    notification.sent_at = datetime(2025, 1, 15, tzinfo=timezone.utc)
+    db_session.commit()
+
+    sent, _ = NotificationService.send_to_users(db_session, str(notification.id), [str(multiple_users[0].id)])
+
+    assert sent == 1
+    created_at = db_session.execute(
+        select(NotificationRecord.created_at).where(NotificationRecord.notification_id == notification.id)
+    ).scalar_one()
+    assert month_start(created_at) == month_start(datetime.now(timezone.utc))
+
+
+def test_resend_does_not_duplicate_records(db_session, multiple_users):
+    """测试重复发送给同一批用户不会产生重复记录"""
+    notification = _create_notification(db_session)
+    user_ids = [str(u.id) for u in multiple_users]
+
+    sent, _ = NotificationService.send_to_users(db_session, str(notification.id), user_ids)
+    assert sent == len(user_ids)
+    sent, _ = NotificationService.send_to_users(db_session, str(notification.id), user_ids)
+    assert sent == 0
+    assert _record_count(db_session, notification) == len(user_ids)
+
+
+def test_concurrent_insert_is_skipped_by_delivery_key(db_session, test_user):
+    """测试绕过发送前去重的重复写入由送达表主键跳过（模拟并发发送在两条语句之间写入）"""
+    notification = _create_notification(db_session)
+    NotificationService.send_to_users(db_session, str(notification.id), [str(test_user.id)])
+
+    stmt = NotificationService._insert_records(notification, select(literal(test_user.id, UUID(as_uuid=True))))
+    assert db_session.execute(stmt).rowcount == 0
+    db_session.commit()
+
+    assert _record_count(db_session, notification) == 1
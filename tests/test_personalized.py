@@ -0,0 +1,83 @@
+from app.models.notification import Notification, NotificationRecord
+
+
+def _login(client, username):
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": "password123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _create_personalized(client, headers):
+    template = client.post(
+        "/api/v1/admin/templates",
+        headers=headers,
+        json={"name": "账单", "title": "$month 账单", "content": "$name，你本月消费 $amount 元"},
+    ).json()
+    response = client.post(
+        "/api/v1/admin/notifications",
+        headers=headers,
+        json={
+            "type": "business",
+            "template_id": template["id"],
+            "variables": {"month": "十月"},
+            "personalized": True,
+        },
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_personalized_send_renders_per_recipient(client, auth_headers, db_session, multiple_users):
+    """测试个性化发送只保存一份内容和每个用户的变量，用户读取时合并渲染"""
+    notification = _create_personalized(client, auth_headers)
+    assert notification["title"] == "十月 账单"
+    assert notification["content"] == "${name}，你本月消费 ${amount} 元"
+
+    users = multiple_users[:2]
+    variables = {str(u.id): {"name": u.username, "amount": 10 * (i + 1)} for i, u in enumerate(users)}
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification['id']}/send",
+        headers=auth_headers,
+        json={"user_ids": list(variables), "variables": variables},
+    )
+    assert response.status_code == 200
+    assert "成功发送给 2 个用户" in response.json()["message"]
+
+    assert db_session.query(Notification).count() == 1
+    stored = {
+        str(user_id): value
+        for user_id, value in db_session.query(NotificationRecord.user_id, NotificationRecord.variables)
+    }
+    assert stored == variables
+
+    for i, user in enumerate(users):
+        items = client.get("/api/v1/notifications", headers=_login(client, user.username)).json()["items"]
+        assert [item["notification"]["content"] for item in items] == [
+            f"{user.username}，你本月消费 {10 * (i + 1)} 元"
+        ]
+        assert items[0]["notification"]["title"] == "十月 账单"
+
+
+def test_personalized_send_requires_variables(client, auth_headers, db_session, multiple_users):
+    """测试个性化站内信必须为每个用户提供缺少的变量，且不能全员发送"""
+    notification = _create_personalized(client, auth_headers)
+    url = f"/api/v1/admin/notifications/{notification['id']}/send"
+    user_ids = [str(u.id) for u in multiple_users[:2]]
+
+    response = client.post(url, headers=auth_headers, json={"user_ids": user_ids})
+    assert response.status_code == 400
+
+    response = client.post(
+        url,
+        headers=auth_headers,
+        json={
+            "user_ids": user_ids,
+            "variables": {user_ids[0]: {"name": "a", "amount": 1}, user_ids[1]: {"name": "b"}},
+        },
+    )
+    assert response.status_code == 400
+    assert "amount" in response.json()["detail"]
+
+    response = client.post(url, headers=auth_headers, json={"send_to_all": True})
+    assert response.status_code == 400
+
+    assert db_session.query(NotificationRecord).count() == 0
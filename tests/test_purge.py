@@ -0,0 +1,123 @@
+from sqlalchemy import func, select
+
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.models.notification import Notification, NotificationRecord
+from app.services.notification_service import NotificationService
+from app.services.purge_service import NotificationPurgeService, _Budget
+
+
+def _sent_notification(db_session, users):
+    notification = Notification(type="system", title="清理测试", content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    NotificationService.send_to_users(db_session, str(notification.id), [str(u.id) for u in users])
+    return notification
+
+
+def _record_count(db_session, notification_id):
+    count = db_session.execute(
+        select(func.count()).where(NotificationRecord.notification_id == notification_id)
+    ).scalar_one()
+    db_session.commit()
+    return count
+
+
+def test_purge_is_not_done_while_rows_are_locked(db_session, multiple_users):
+    """测试 SKIP LOCKED 跳过了被锁住的记录时不视为清理完成，锁释放后再次运行删完"""
+    notification = _sent_notification(db_session, multiple_users)
+    notification_id = notification.id
+
+    other = SessionLocal()
+    try:
+        # 模拟在线请求正占用一条记录
+        other.execute(
+            select(NotificationRecord.id)
+            .where(NotificationRecord.notification_id == notification_id)
+            .limit(1)
+            .with_for_update()
+        ).all()
+
+        purged, done = NotificationPurgeService.purge_notification(db_session, notification, _Budget(None, 0))
+        assert purged == len(multiple_users) - 1
+        assert not done
+        assert _record_count(db_session, notification_id) == 1
+        assert db_session.get(Notification, notification_id) is not None
+    finally:
+        other.rollback()
+        other.close()
+
+    purged, done = NotificationPurgeService.purge_notification(db_session, notification, _Budget(None, 0))
+    assert done
+    assert db_session.get(Notification, notification_id) is None
+    assert _record_count(db_session, notification_id) == 0
+
+
+def test_periodic_purge_removes_old_deleted_records_and_dead_notifications(db_session, multiple_users, monkeypatch):
+    """测试定期清理：删除超过保留期的软删除记录，以及已过期处理完的站内信"""
+    from datetime import datetime, timedelta, timezone
+
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "NOTIFICATION_PURGE_PAUSE_MS", 0)
+    monkeypatch.setattr(settings, "NOTIFICATION_PURGE_BATCH_SIZE", 2)
+
+    kept = _sent_notification(db_session, multiple_users)
+    kept_id = kept.id
+    old = datetime.now(timezone.utc) - timedelta(days=settings.NOTIFICATION_PURGE_DELETED_AFTER_DAYS + 1)
+    db_session.query(NotificationRecord).filter(
+        NotificationRecord.notification_id == kept_id,
+        NotificationRecord.user_id.in_([multiple_users[0].id, multiple_users[1].id]),
+    ).update({"is_deleted": True, "deleted_at": old}, synchronize_session=False)
+    db_session.commit()
+
+    dead = _sent_notification(db_session, multiple_users)
+    dead_id = dead.id
+    dead.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    dead.expiry_processed_at = datetime.now(timezone.utc)
+    db_session.commit()
+
+    lock_wait_before = metrics.get("notification_purge_lock_wait_seconds_total")
+    purged = NotificationPurgeService.purge(db_session)
+
+    assert purged == 2 + len(multiple_users) + 1
+    assert metrics.get("notification_purge_lock_wait_seconds_total") > lock_wait_before
+    assert _record_count(db_session, kept_id) == len(multiple_users) - 2
+    assert _record_count(db_session, dead_id) == 0
+    assert db_session.get(Notification, dead_id) is None
+
+
+def test_delete_decrements_counters_in_job_batches(db_session, multiple_users, monkeypatch):
+    """测试删除站内信时请求内不扣减计数，未读数立即排除该站内信；删除作业按批扣减，每个用户只扣一次"""
+    import time
+
+    from app.config import settings
+    from app.models.notification import NotificationCounter
+    from app.services.counter_service import NotificationCounterService
+
+    monkeypatch.setattr(settings, "NOTIFICATION_PURGE_PAUSE_MS", 0)
+    monkeypatch.setattr(settings, "NOTIFICATION_PURGE_BATCH_SIZE", 2)
+
+    _sent_notification(db_session, multiple_users)  # 保留的站内信：重复扣减会把未读数扣到 0
+    notification = _sent_notification(db_session, multiple_users)
+    notification_id = notification.id
+    user_ids = [u.id for u in multiple_users]
+
+    def counters():
+        rows = db_session.execute(
+            select(NotificationCounter.unread_count).where(NotificationCounter.user_id.in_(user_ids))
+        ).scalars().all()
+        db_session.commit()
+        return rows
+
+    job = NotificationService.delete_notification(db_session, str(notification_id))
+    assert NotificationCounterService.get_unread_count(db_session, str(user_ids[0])) == 1
+
+    deadline = time.monotonic() + 30
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert job.status == "succeeded"
+    assert job.result == {"notification_id": str(notification_id), "records_deleted": len(multiple_users)}
+    assert counters() == [1] * len(multiple_users)
+    assert _record_count(db_session, notification_id) == 0
+    assert NotificationCounterService.get_unread_count(db_session, str(user_ids[0])) == 1
@@ -0,0 +1,67 @@
+from sqlalchemy import func, select
+
+from app.models.notification import NotificationCounter, NotificationRecord
+
+
+def _create_and_send(client, headers, users, title):
+    response = client.post(
+        "/api/v1/admin/notifications",
+        headers=headers,
+        json={"type": "system", "title": title, "content": "内容"},
+    )
+    assert response.status_code == 201
+    notification_id = response.json()["id"]
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send",
+        headers=headers,
+        json={"user_ids": [str(u.id) for u in users]},
+    )
+    assert response.status_code == 200
+    return notification_id
+
+
+def test_recall_hides_notification_and_removes_records(
+    client, db_session, admin_auth_headers, multiple_users, user_auth_headers, wait_for_job
+):
+    """测试撤回：立即从列表、详情和未读数中消失，作业删除记录并只扣减一次未读数，撤回后不能再发送"""
+    # 保留的站内信：重复扣减会把未读数扣到 0
+    _create_and_send(client, admin_auth_headers, multiple_users, "保留")
+    notification_id = _create_and_send(client, admin_auth_headers, multiple_users, "误发")
+    headers = user_auth_headers[0]
+    items = client.get("/api/v1/notifications", headers=headers).json()["items"]
+    record_id = next(item["id"] for item in items if item["notification"]["id"] == notification_id)
+
+    response = client.post(f"/api/v1/admin/notifications/{notification_id}/recall", headers=admin_auth_headers)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "notification_recall"
+
+    listing = client.get("/api/v1/notifications", headers=headers).json()
+    assert [item["notification"]["title"] for item in listing["items"]] == ["保留"]
+    assert listing["total"] == 1
+    assert client.get(f"/api/v1/notifications/{record_id}", headers=headers).status_code == 404
+    assert client.get("/api/v1/notifications/unread-count", headers=headers).json()["unread_count"] == 1
+
+    job = wait_for_job(job["id"], admin_auth_headers)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"notification_id": notification_id, "records_deleted": len(multiple_users)}
+    db_session.expire_all()
+    records = db_session.execute(
+        select(func.count()).where(NotificationRecord.notification_id == notification_id)
+    ).scalar_one()
+    assert records == 0
+    counters = db_session.execute(
+        select(NotificationCounter.unread_count).where(
+            NotificationCounter.user_id.in_([u.id for u in multiple_users])
+        )
+    ).scalars().all()
+    db_session.commit()
+    assert counters == [1] * len(multiple_users)
+    assert client.get("/api/v1/notifications/unread-count", headers=headers).json()["unread_count"] == 1
+
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send",
+        headers=admin_auth_headers,
+        json={"user_ids": [str(multiple_users[0].id)]},
+    )
+    assert response.status_code == 409
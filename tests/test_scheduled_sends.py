@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.models.notification import Notification, ScheduledSend, ScheduledSendStatus
+from app.services.schedule_service import ScheduledSendService
+from app.tasks.jobs import Job
+
+
+def _scheduled_send(db_session, users):
+    notification = Notification(type="system", title="定时发送测试", content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    scheduled_send = ScheduledSend(
+        notification_id=notification.id,
+        user_ids=[u.id for u in users],
+        scheduled_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+    )
+    db_session.add(scheduled_send)
+    db_session.commit()
+    return str(scheduled_send.id)
+
+
+def _age_heartbeat(db_session, scheduled_send_id, seconds):
+    db_session.query(ScheduledSend).filter(ScheduledSend.id == scheduled_send_id).update(
+        {
+            "claimed_at": datetime.now(timezone.utc) - timedelta(seconds=seconds),
+            "heartbeat_at": datetime.now(timezone.utc) - timedelta(seconds=seconds),
+        },
+        synchronize_session=False,
+    )
+    db_session.commit()
+
+
+def test_running_send_with_heartbeat_is_not_reclaimed(db_session, multiple_users):
+    """测试发送中持续续约心跳的定时发送不会因领取时间超时而被重复领取"""
+    scheduled_send_id = _scheduled_send(db_session, multiple_users)
+    assert ScheduledSendService.claim(db_session, scheduled_send_id)
+    assert not ScheduledSendService.claim(db_session, scheduled_send_id)
+
+    _age_heartbeat(db_session, scheduled_send_id, settings.SCHEDULED_SEND_CLAIM_TIMEOUT_SECONDS + 1)
+    assert ScheduledSendService.heartbeat(db_session, scheduled_send_id, attempt=1)
+    assert not ScheduledSendService.claim(db_session, scheduled_send_id)
+
+
+def test_stale_send_is_reclaimed_and_fences_old_worker(db_session, multiple_users):
+    """测试心跳超时的定时发送被重新领取后，原执行者不能再续约或写入结果"""
+    scheduled_send_id = _scheduled_send(db_session, multiple_users)
+    assert ScheduledSendService.claim(db_session, scheduled_send_id)
+
+    _age_heartbeat(db_session, scheduled_send_id, settings.SCHEDULED_SEND_CLAIM_TIMEOUT_SECONDS + 1)
+    assert ScheduledSendService.claim(db_session, scheduled_send_id)
+
+    assert not ScheduledSendService.heartbeat(db_session, scheduled_send_id, attempt=1)
+    assert not ScheduledSendService._finish(
+        db_session, scheduled_send_id, 1, {"status": ScheduledSendStatus.FAILED.value}
+    )
+    scheduled_send = db_session.get(ScheduledSend, scheduled_send_id)
+    db_session.refresh(scheduled_send)
+    assert scheduled_send.status == ScheduledSendStatus.RUNNING.value
+    assert scheduled_send.attempts == 2
+
+
+def test_run_sends_to_users(db_session, multiple_users):
+    """测试执行已领取的定时发送"""
+    scheduled_send_id = _scheduled_send(db_session, multiple_users)
+    assert ScheduledSendService.claim(db_session, scheduled_send_id)
+
+    job = Job("scheduled_send")
+    ScheduledSendService.run(job, scheduled_send_id)
+
+    scheduled_send = db_session.get(ScheduledSend, scheduled_send_id)
+    db_session.refresh(scheduled_send)
+    assert scheduled_send.status == ScheduledSendStatus.SENT.value
+    assert scheduled_send.sent_count == len(multiple_users)
+    assert job.result == {"scheduled_send_id": scheduled_send_id, "sent_count": len(multiple_users)}
@@ -0,0 +1,91 @@
+from sqlalchemy import select
+
+from app.models.notification import Notification, NotificationRecord
+from app.models.segment import Segment, SegmentMember
+from app.models.user import User, UserStatus
+from app.schemas.segment import SegmentCreate
+from app.services.segment_service import SegmentService
+
+
+def _set_statuses(db_session, users, busy):
+    for i, user in enumerate(users):
+        user.status = UserStatus.BUSY if i in busy else UserStatus.OFFLINE
+    db_session.commit()
+
+
+def _create_segment(db_session, user):
+    # 直接调用服务创建，不触发后台的首次刷新，由测试控制刷新时机
+    segment = SegmentService.create_segment(
+        db_session,
+        SegmentCreate(name="忙碌用户", audience={"statuses": ["busy"]}),
+        created_by_id=str(user.id),
+    )
+    return str(segment.id)
+
+
+def _members(db_session, segment_id):
+    return set(
+        db_session.scalars(
+            select(User.username)
+            .join(SegmentMember, SegmentMember.user_id == User.id)
+            .where(SegmentMember.segment_id == segment_id)
+        )
+    )
+
+
+def test_refresh_is_incremental(db_session, test_user, multiple_users):
+    """测试增量刷新：只插入新符合规则的用户、删除不再符合的成员"""
+    _set_statuses(db_session, multiple_users, {0, 1})
+    segment_id = _create_segment(db_session, test_user)
+
+    assert SegmentService.refresh(db_session, segment_id) == (2, 0)
+    assert _members(db_session, segment_id) == {"user0", "user1"}
+
+    _set_statuses(db_session, multiple_users, {1, 2, 3})
+    assert SegmentService.refresh(db_session, segment_id) == (2, 1)
+    assert _members(db_session, segment_id) == {"user1", "user2", "user3"}
+
+    assert SegmentService.refresh(db_session, segment_id) == (0, 0)
+    segment = db_session.get(Segment, segment_id, populate_existing=True)
+    assert segment.member_count == 3
+    assert segment.refreshed_at is not None
+
+
+def test_refresh_due_skips_fresh_segments(db_session, test_user, multiple_users):
+    """测试定时刷新只处理从未刷新或已超过刷新间隔的分群"""
+    _set_statuses(db_session, multiple_users, {0})
+    segment_id = _create_segment(db_session, test_user)
+
+    assert SegmentService.refresh_due(db_session) == 1
+    assert SegmentService.refresh_due(db_session) == 0
+    assert _members(db_session, segment_id) == {"user0"}
+
+
+def test_send_to_segment(
+    client, auth_headers, db_session, test_user, multiple_users, fanout_executor, wait_for_job
+):
+    """测试发送给分群：未刷新的分群不能发送，刷新后只有成员收到站内信"""
+    _set_statuses(db_session, multiple_users, {2, 4})
+    segment_id = _create_segment(db_session, test_user)
+    notification = Notification(type="system", title="分群发送", content="内容")
+    db_session.add(notification)
+    db_session.commit()
+    url = f"/api/v1/admin/notifications/{notification.id}/send"
+
+    response = client.post(url, headers=auth_headers, json={"segment_id": segment_id})
+    assert response.status_code == 409
+
+    SegmentService.refresh(db_session, segment_id)
+    # 刷新之后才变为忙碌的用户不是成员，不会收到
+    _set_statuses(db_session, multiple_users, {0, 2, 4})
+    response = client.post(url, headers=auth_headers, json={"segment_id": segment_id})
+    assert response.status_code == 200
+    job = wait_for_job(response.json()["job"]["id"], auth_headers)
+    assert job["status"] == "succeeded"
+
+    recipients = db_session.scalars(
+        select(User.username)
+        .join(NotificationRecord, NotificationRecord.user_id == User.id)
+        .where(NotificationRecord.notification_id == notification.id)
+    ).all()
+    assert sorted(recipients) == ["user2", "user4"]
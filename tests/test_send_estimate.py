@@ -0,0 +1,86 @@
+import uuid
+
+from sqlalchemy import text
+
+from app.core.metrics import metrics
+from app.models.notification import Notification, NotificationRecord
+from app.services.notification_service import NotificationService
+
+
+def _create_notification(db_session, priority=0):
+    notification = Notification(type="system", title="预估测试", content="内容", priority=priority)
+    db_session.add(notification)
+    db_session.commit()
+    return str(notification.id)
+
+
+def _estimate(client, headers, notification_id, body):
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send/estimate", headers=headers, json=body
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_estimate_user_ids_is_exact(client, auth_headers, db_session, multiple_users):
+    """测试指定用户时精确统计：无效 ID 不计入，已收到的用户计入跳过数，且不写入任何记录"""
+    notification_id = _create_notification(db_session)
+    NotificationService.send_to_users(db_session, notification_id, [str(multiple_users[0].id)])
+
+    estimate = _estimate(
+        client,
+        auth_headers,
+        notification_id,
+        {"user_ids": [str(u.id) for u in multiple_users[:3]] + ["not-a-uuid", str(uuid.uuid4())]},
+    )
+
+    assert estimate["exact"] is True
+    assert estimate["estimated_recipients"] == 3
+    assert estimate["already_delivered"] == 1
+    assert estimate["estimated_new"] == 2
+    assert db_session.query(NotificationRecord).count() == 1
+
+
+def test_estimate_broadcast_from_planner(client, auth_headers, db_session, multiple_users):
+    """测试发送给所有用户时按查询规划器统计估算，从未发送过的站内信跳过数为 0"""
+    notification_id = _create_notification(db_session)
+    db_session.execute(text("ANALYZE users"))
+    db_session.commit()
+
+    estimate = _estimate(client, auth_headers, notification_id, {"send_to_all": True})
+
+    assert estimate["exact"] is False
+    assert estimate["estimated_recipients"] == len(multiple_users) + 1
+    assert estimate["already_delivered"] == 0
+    assert estimate["estimated_new"] == estimate["estimated_recipients"]
+    assert db_session.query(NotificationRecord).count() == 0
+
+
+def test_estimate_duration_uses_lane_rate(client, auth_headers, db_session, multiple_users, monkeypatch):
+    """测试预计耗时按通道最近一次的写入速率计算"""
+    notification_id = _create_notification(db_session, priority=2)
+    monkeypatch.setitem(metrics._gauges, "fanout_urgent_last_rows_per_second", 2.0)
+
+    estimate = _estimate(client, auth_headers, notification_id, {"user_ids": [str(u.id) for u in multiple_users]})
+
+    assert estimate["lane"] == "urgent"
+    assert estimate["rows_per_second"] <= 2.0
+    assert estimate["estimated_seconds"] == estimate["estimated_new"] / estimate["rows_per_second"]
+
+
+def test_estimate_unrefreshed_segment(client, auth_headers, db_session, test_user):
+    """测试尚未刷新的分群不能预估"""
+    from app.schemas.segment import SegmentCreate
+    from app.services.segment_service import SegmentService
+
+    segment = SegmentService.create_segment(
+        db_session, SegmentCreate(name="未刷新", audience={"statuses": ["busy"]}), created_by_id=str(test_user.id)
+    )
+    notification_id = _create_notification(db_session)
+
+    response = client.post(
+        f"/api/v1/admin/notifications/{notification_id}/send/estimate",
+        headers=auth_headers,
+        json={"segment_id": str(segment.id)},
+    )
+    assert response.status_code == 409
@@ -0,0 +1,119 @@
+import pytest
+
+from app.core.templates import CompiledTemplate, TemplateCache, TemplateError
+
+
+def test_compiled_template_render():
+    """测试编译后的模板：$name、${name}、$$ 转义，花括号原样输出"""
+    compiled = CompiledTemplate("你好 ${name}", "订单 $order 金额 $$${amount} {不是变量}", "https://x/$order")
+
+    assert compiled.variables == {"name", "order", "amount"}
+    assert compiled.render({"name": "张三", "order": 42, "amount": "9.9"}) == {
+        "title": "你好 张三",
+        "content": "订单 42 金额 $9.9 {不是变量}",
+        "action_url": "https://x/42",
+    }
+
+
+def test_compiled_template_missing_and_partial():
+    """测试缺少变量时报错，部分渲染保留缺少的占位符"""
+    compiled = CompiledTemplate("你好 $name", "余额 $balance")
+
+    with pytest.raises(TemplateError, match="balance"):
+        compiled.render({"name": "张三"})
+    assert compiled.render({"name": "张三"}, partial=True) == {
+        "title": "你好 张三",
+        "content": "余额 ${balance}",
+        "action_url": None,
+    }
+
+
+def test_compiled_template_render_many():
+    """测试批量渲染与逐个渲染结果一致，任一组缺少变量时报错"""
+    compiled = CompiledTemplate("你好 $name", "第 $n 条")
+    variables_list = [{"name": f"用户{i}", "n": i} for i in range(100)]
+
+    assert compiled.render_many(variables_list) == [compiled.render(v) for v in variables_list]
+    with pytest.raises(TemplateError):
+        compiled.render_many([{"name": "a", "n": 1}, {"name": "b"}])
+
+
+def test_compile_syntax_error():
+    """测试无效的 $ 占位符在编译时报错"""
+    with pytest.raises(TemplateError):
+        CompiledTemplate("价格 $ 100", "内容")
+
+
+def test_template_versions_and_cache(client, auth_headers, db_session):
+    """测试修改模板新建版本，旧版本仍可渲染，编译结果按 (模板 ID, 版本) 缓存"""
+    response = client.post(
+        "/api/v1/admin/templates",
+        headers=auth_headers,
+        json={"name": "欢迎", "title": "欢迎 $name", "content": "你好 $name"},
+    )
+    assert response.status_code == 201
+    template = response.json()
+    assert template["version"] == 1
+    assert template["variables"] == ["name"]
+
+    response = client.put(
+        f"/api/v1/admin/templates/{template['id']}",
+        headers=auth_headers,
+        json={"content": "再次欢迎 $name"},
+    )
+    assert response.json()["version"] == 2
+
+    url = f"/api/v1/admin/templates/{template['id']}/render"
+    old = client.post(url, headers=auth_headers, json={"variables": {"name": "张三"}, "version": 1}).json()
+    new = client.post(url, headers=auth_headers, json={"variables": {"name": "张三"}}).json()
+    assert (old["version"], old["content"]) == (1, "你好 张三")
+    assert (new["version"], new["content"]) == (2, "再次欢迎 张三")
+
+    response = client.post(url, headers=auth_headers, json={"variables": {}})
+    assert response.status_code == 400
+
+    # 新的缓存未命中时从版本表读取并编译，之后命中同一对象
+    cache = TemplateCache(capacity=1)
+    compiled = cache.get(db_session, template["id"], 1)
+    assert compiled.render({"name": "李四"})["content"] == "你好 李四"
+    assert cache.get(db_session, template["id"], 1) is compiled
+    assert cache.get(db_session, template["id"], 3) is None
+
+
+def test_create_notification_from_template(client, auth_headers):
+    """测试由模板创建站内信，修改渲染后的文本后与模板脱离"""
+    template = client.post(
+        "/api/v1/admin/templates",
+        headers=auth_headers,
+        json={"name": "提醒", "title": "$event 提醒", "content": "$event 将于 $time 开始"},
+    ).json()
+
+    response = client.post(
+        "/api/v1/admin/notifications",
+        headers=auth_headers,
+        json={
+            "type": "reminder",
+            "template_id": template["id"],
+            "variables": {"event": "周会", "time": "10:00"},
+        },
+    )
+    assert response.status_code == 201
+    notification = response.json()
+    assert notification["title"] == "周会 提醒"
+    assert notification["content"] == "周会 将于 10:00 开始"
+    assert notification["template_id"] == template["id"]
+
+    response = client.put(
+        f"/api/v1/admin/notifications/{notification['id']}",
+        headers=auth_headers,
+        json={"content": "周会改期"},
+    )
+    assert response.status_code == 200
+    assert response.json()["template_id"] is None
+
+    response = client.post(
+        "/api/v1/admin/notifications",
+        headers=auth_headers,
+        json={"type": "reminder", "template_id": template["id"], "variables": {"event": "周会"}},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,65 @@
+from app.core.security import verify_password
+from app.models.user import User
+
+
+def _import(client, headers, wait_for_job, filename, content):
+    response = client.post(
+        "/api/v1/admin/users/import",
+        headers=headers,
+        files={"file": (filename, content.encode("utf-8"))},
+    )
+    assert response.status_code == 202
+    job = wait_for_job(response.json()["id"], headers)
+    assert job["status"] == "succeeded"
+    return job
+
+
+def test_import_csv_reports_row_errors(client, auth_headers, db_session, wait_for_job):
+    """测试 CSV 导入：有效行写入，文件内重复、已存在用户和校验失败的行逐行报告"""
+    job = _import(
+        client,
+        auth_headers,
+        wait_for_job,
+        "users.csv",
+        "username,email,password\n"
+        "alice,alice@example.com,password123\n"
+        "bob,bob@example.com,password123\n"
+        "alice,alice2@example.com,password123\n"
+        "testuser,other@example.com,password123\n"
+        "carol,not-an-email,password123\n",
+    )
+
+    assert job["result"] == {"imported": 2, "failed": 3}
+    assert job["processed"] == 5
+    assert sorted((e["row"], e["username"]) for e in job["errors"]) == [
+        (4, "alice"),
+        (5, "testuser"),
+        (6, "carol"),
+    ]
+
+    alice = db_session.query(User).filter(User.username == "alice").one()
+    assert alice.email == "alice@example.com"
+    assert verify_password("password123", alice.password_hash)
+    assert db_session.query(User).filter(User.username == "bob").count() == 1
+
+
+def test_import_ndjson_skips_unparseable_lines(client, auth_headers, db_session, wait_for_job):
+    """测试 NDJSON 导入：无法解析的行报告错误，其余行照常写入"""
+    job = _import(
+        client,
+        auth_headers,
+        wait_for_job,
+        "users.ndjson",
+        '{"username": "dave", "email": "dave@example.com", "password": "password123"}\n'
+        "not json\n"
+        "\n"
+        '{"username": "erin", "email": "test@example.com", "password": "password123"}\n',
+    )
+
+    assert job["result"] == {"imported": 1, "failed": 2}
+    assert [(e["row"], e["message"]) for e in job["errors"]] == [
+        (2, "无法解析的行"),
+        (4, "邮箱已被使用"),
+    ]
+    assert db_session.query(User).filter(User.username == "dave").count() == 1
+    assert db_session.query(User).filter(User.username == "erin").count() == 0